@@ -8,7 +8,8 @@ Archivo principal de la aplicación
 import os
 import logging
 from dotenv import load_dotenv
-from telegram.ext import Application, CommandHandler, MessageHandler, filters
+from telegram import Update
+from telegram.ext import Application, CommandHandler, InlineQueryHandler, MessageHandler, TypeHandler, filters
 
 # Cargar variables de entorno
 load_dotenv()
@@ -19,20 +20,80 @@ from bot.handlers import (
     help_command,
     handle_message,
     handle_photo,
-    cancel_command
+    cancel_command,
+    inline_query,
+    message_service,
+    autocompletado,
+    expiracion_sesiones,
+    instantaneas_sesiones,
+    alertas_seguridad,
+    perfilado
 )
+from database.backends import cerrar_backend
 from database.models import create_tables
+from config import Config
+from logging_setup import configurar_logging
+from metrics import ServidorMetricas
 
-# Configurar logging
-logging.basicConfig(
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-    level=getattr(logging, os.getenv('LOG_LEVEL', 'INFO'))
-)
 logger = logging.getLogger(__name__)
 
+def crear_builder(token: str):
+    """
+    Crea el builder de la aplicación apuntando al servidor de la Bot API configurado
+    """
+    builder = Application.builder().token(token)
+    if Config.TELEGRAM_API_URL:
+        builder = builder.base_url(Config.TELEGRAM_API_URL)
+    if Config.TELEGRAM_FILE_URL:
+        builder = builder.base_file_url(Config.TELEGRAM_FILE_URL)
+    return builder
+
+def registrar_manejadores(application: Application):
+    """
+    Registra los manejadores de comandos y mensajes en la aplicación
+    """
+    # Registrar manejadores de comandos
+    application.add_handler(CommandHandler("start", start_command))
+    application.add_handler(CommandHandler("help", help_command))
+    application.add_handler(CommandHandler("cancel", cancel_command))
+    
+    # Registrar manejadores de mensajes
+    application.add_handler(MessageHandler(filters.TEXT & ~filters.COMMAND, handle_message))
+    application.add_handler(MessageHandler(filters.PHOTO, handle_photo))
+    
+    # Sugerencias mientras se escribe (@bot texto; requiere el modo inline activado en BotFather)
+    application.add_handler(InlineQueryHandler(inline_query))
+    
+    # Avisos y expiración de sesiones inactivas (en el proceso dueño de las sesiones),
+    # alertas de seguridad de las reuniones que guarda este proceso y su autocompletado
+    if application.job_queue:
+        expiracion_sesiones.registrar(application.job_queue)
+        alertas_seguridad.registrar(application.job_queue)
+        autocompletado.registrar(application.job_queue)
+        perfilado.registrar(application.job_queue)
+
+def restaurar_sesiones(application: Application, ruta: str, filtro=None):
+    """
+    Restaura las sesiones de la última instantánea antes de empezar a recibir mensajes
+    y programa su guardado periódico
+    
+    Args:
+        application: Aplicación que atenderá a los usuarios restaurados
+        ruta: Ruta del archivo de instantánea
+        filtro: Función que indica si un user_id pertenece a este proceso (opcional)
+    """
+    instantaneas_sesiones.restaurar(ruta, filtro)
+    if application.job_queue:
+        instantaneas_sesiones.registrar(application.job_queue, ruta, Config.SESSION_SNAPSHOT_INTERVAL_SECONDS)
+
 def main():
     """Función principal para iniciar el bot"""
     
+    # Configurar logging: los registros se encolan y un hilo aparte los escribe.
+    # Va aquí y no al importar: los procesos trabajadores importan este módulo
+    # y configuran su propio logging (ver bot/sharding.py)
+    configurar_logging(**Config.get_logging_config())
+    
     # Obtener token del bot
     token = os.getenv('TELEGRAM_BOT_TOKEN')
     if not token:
@@ -47,21 +108,86 @@ def main():
         logger.error(f"Error al inicializar base de datos: {e}")
         return
     
-    # Crear aplicación del bot
-    application = Application.builder().token(token).build()
+    worker_processes = Config.WORKER_PROCESSES
     
-    # Registrar manejadores de comandos
-    application.add_handler(CommandHandler("start", start_command))
-    application.add_handler(CommandHandler("help", help_command))
-    application.add_handler(CommandHandler("cancel", cancel_command))
+    servidor_metricas = None
+    if Config.METRICS_PORT:
+        servidor_metricas = ServidorMetricas(Config.METRICS_HOST, Config.METRICS_PORT)
+        servidor_metricas.iniciar()
     
-    # Registrar manejadores de mensajes
-    application.add_handler(MessageHandler(filters.TEXT & ~filters.COMMAND, handle_message))
-    application.add_handler(MessageHandler(filters.PHOTO, handle_photo))
+    if worker_processes > 1:
+        # Modo multiproceso: este proceso solo recibe y reparte actualizaciones
+        from bot.sharding import DespachadorShards
+        
+        despachador = DespachadorShards(token, worker_processes, Config.LOG_LEVEL)
+        application = (
+            crear_builder(token)
+            .post_init(despachador.iniciar)
+            .post_shutdown(despachador.detener)
+            .build()
+        )
+        application.add_handler(TypeHandler(Update, despachador.despachar))
+        logger.info(f"Modo multiproceso activado con {worker_processes} procesos trabajadores")
+    else:
+        # Crear aplicación del bot
+        # Usuarios distintos se atienden en paralelo; los handlers serializan por usuario
+        # post_stop y no post_shutdown: el apagado cierra la conexión del bot
+        application = (
+            crear_builder(token)
+            .concurrent_updates(True)
+            .post_stop(message_service.vaciar)
+            .build()
+        )
+        registrar_manejadores(application)
+        restaurar_sesiones(application, Config.SESSION_SNAPSHOT_PATH)
+    
+    # Programar mantenimiento en segundo plano (en el proceso principal también en modo multiproceso)
+    if application.job_queue:
+        from services.maintenance_service import MaintenanceService
+        from services.session_service import SessionService
+        
+        photo_service = None
+        if Config.PHOTO_RETENTION_DAYS > 0:
+            from services.photo_service import PhotoService
+            photo_service = PhotoService(Config.PHOTO_STORAGE_PATH, Config.PHOTO_MAX_SIZE_MB)
+        
+        MaintenanceService(
+            SessionService(Config.SESSION_TIMEOUT_MINUTES, Config.SESSION_CODEC),
+            photo_service,
+            interval_minutes=Config.MAINTENANCE_INTERVAL_MINUTES,
+            window_start_hour=Config.MAINTENANCE_WINDOW_START,
+            window_end_hour=Config.MAINTENANCE_WINDOW_END,
+            jitter_seconds=Config.MAINTENANCE_JITTER_SECONDS,
+            batch_size=Config.MAINTENANCE_BATCH_SIZE,
+            time_budget_seconds=Config.MAINTENANCE_TIME_BUDGET_SECONDS,
+            photo_retention_days=Config.PHOTO_RETENTION_DAYS,
+            migration_batch_size=Config.MIGRATION_BATCH_SIZE,
+            migration_pause_seconds=Config.MIGRATION_BATCH_PAUSE_SECONDS,
+            business_hours=Config.MIGRATION_BUSINESS_HOURS,
+            business_slowdown=Config.MIGRATION_BUSINESS_SLOWDOWN,
+            partition_months_ahead=Config.MEETING_PARTITION_MONTHS_AHEAD,
+            archive_after_months=Config.MEETING_ARCHIVE_AFTER_MONTHS,
+            archive_path=Config.MEETING_ARCHIVE_PATH
+        ).registrar(application.job_queue)
+
+        # Réplica de lectura para estadísticas, exportaciones y reportes
+        if Config.DATABASE_REPLICA_URL:
+            from services.replica_service import ReplicaService
+            ReplicaService(Config.REPLICA_REFRESH_SECONDS).registrar(application.job_queue)
+    else:
+        logger.warning("JobQueue no disponible: instala python-telegram-bot[job-queue] para el mantenimiento")
     
     # Iniciar el bot
     logger.info("Iniciando SIRIJ BOT...")
-    application.run_polling(allowed_updates=['message'])
+    application.run_polling(allowed_updates=['message', 'inline_query'])
+    
+    # Apagado ordenado: conservar las conversaciones en curso para el próximo arranque
+    if worker_processes <= 1:
+        instantaneas_sesiones.guardar(Config.SESSION_SNAPSHOT_PATH)
+        perfilado.escribir()
+    cerrar_backend()
+    if servidor_metricas:
+        servidor_metricas.detener()
 
 if __name__ == '__main__':
-    main()
\ No newline at end of file
+    main()
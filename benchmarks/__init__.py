@@ -0,0 +1,5 @@
+# -*- coding: utf-8 -*-
+"""
+Módulo benchmarks - Mediciones de rendimiento para SIRIJ BOT
+Ejecutar desde la raíz del proyecto: python -m benchmarks.<nombre>
+"""
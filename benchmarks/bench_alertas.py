@@ -0,0 +1,153 @@
+# -*- coding: utf-8 -*-
+"""
+Benchmark de las alertas de seguridad
+Mide cuánto tarda evaluar las reglas de services/alert_service.py sobre una
+reunión con el autómata de Aho-Corasick frente a buscar cada palabra de cada
+regla con una expresión regular, con cantidades crecientes de reglas, y cuánto
+agrega la evaluación a guardar_reunion_completa.
+
+Uso: python -m benchmarks.bench_alertas [--reglas 4 100 1000] [--repeticiones 2000]
+
+Se usa un SQLite temporal.
+"""
+
+import argparse
+import os
+import random
+import re
+import statistics
+import tempfile
+import time
+from typing import Any, Callable, Dict, List
+
+NOTAS = [
+    'Se revisó el arnés de seguridad antes de subir al andamio. Un trabajador reportó estar herido '
+    'levemente en la mano al manipular la escalera, se le dieron primeros auxilios en sitio.',
+    'Trabajos en caliente con permiso vigente; se colocó extintor y vigía contra incendio.',
+    'Recordar uso obligatorio de casco, lentes y guantes dieléctricos en el tablero.',
+    'Meta: cero accidentes durante la jornada y cumplimiento del programa de mantenimiento.',
+]
+
+
+def _reunion() -> Dict[str, Any]:
+    return {
+        'departamento': 'Distribución', 'fecha': '2024-05-01', 'nombre_supervisor': 'Supervisor 1',
+        'hora_inicio': '07:30', 'hora_termino': '07:50', 'nombres_personal': ['Trabajador 1'],
+        'detecto_anomalias_salud': False,
+        'observaciones': NOTAS[0], 'otra_informacion': NOTAS[1],
+        'descripcion_actividades_seguridad': NOTAS[2], 'meta_proposito_jornada': NOTAS[3],
+    }
+
+
+def _reglas(cantidad: int) -> List[Dict[str, Any]]:
+    """Reglas predeterminadas más reglas sintéticas de 5 palabras cada una"""
+    from services.alert_service import CAMPOS_NOTAS, REGLAS_PREDETERMINADAS
+
+    rnd = random.Random(7)
+    reglas = list(REGLAS_PREDETERMINADAS)
+    while len(reglas) < cantidad:
+        palabras = [
+            ''.join(rnd.choice('abcdefghijlmnopqrstuv') for _ in range(rnd.randint(5, 10))) + rnd.choice(['', '*'])
+            for _ in range(5)
+        ]
+        reglas.append({
+            'nombre': f'regla_{len(reglas)}', 'tipo': 'palabras', 'campos': list(CAMPOS_NOTAS),
+            'palabras': palabras, 'mensaje': f'Regla sintética {len(reglas)}'
+        })
+    return reglas[:cantidad]
+
+
+def _evaluador_ingenuo(definiciones: List[Dict[str, Any]]) -> Callable[[Dict[str, Any]], List[str]]:
+    """Una expresión regular por palabra de cada regla (lo que crece con el número de reglas)"""
+    from services.alert_service import normalizar_texto
+
+    reglas = []
+    for definicion in definiciones:
+        if definicion['tipo'] != 'palabras':
+            continue
+        patrones = [
+            re.compile(r'(?<!\w)' + re.escape(normalizar_texto(p.rstrip('*'))) + ('' if p.endswith('*') else r'(?!\w)'))
+            for p in definicion['palabras']
+        ]
+        reglas.append((definicion['nombre'], definicion['campos'], patrones))
+
+    def evaluar(datos: Dict[str, Any]) -> List[str]:
+        textos = {campo: normalizar_texto(valor) for campo, valor in datos.items() if isinstance(valor, str)}
+        return [
+            nombre for nombre, campos, patrones in reglas
+            if any(patron.search(textos.get(campo, '')) for campo in campos for patron in patrones)
+        ]
+    return evaluar
+
+
+def medir(funcion: Callable[[], object], repeticiones: int) -> float:
+    """Mediana en microsegundos"""
+    funcion()
+    tiempos = []
+    for _ in range(repeticiones):
+        inicio = time.perf_counter()
+        funcion()
+        tiempos.append((time.perf_counter() - inicio) * 1_000_000)
+    return statistics.median(tiempos)
+
+
+def medir_guardado(cantidad: int, observador: Callable[[int, Dict[str, Any]], None]) -> Dict[str, float]:
+    """
+    Mediana en ms de guardar_reunion_completa sin y con el observador de alertas
+
+    Se alternan ambos casos para que el crecimiento de la base afecte a los dos por igual.
+    """
+    from database import models
+
+    activo = [False]
+    models.registrar_observador_reuniones(lambda reunion_id, datos: activo[0] and observador(reunion_id, datos))
+
+    tiempos: Dict[bool, List[float]] = {False: [], True: []}
+    for i in range(cantidad * 2):
+        activo[0] = bool(i % 2)
+        inicio = time.perf_counter()
+        models.guardar_reunion_completa(_reunion())
+        tiempos[activo[0]].append((time.perf_counter() - inicio) * 1000)
+    return {'sin': statistics.median(tiempos[False]), 'con': statistics.median(tiempos[True])}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--reglas', type=int, nargs='+', default=[4, 100, 1000])
+    parser.add_argument('--repeticiones', type=int, default=2000)
+    args = parser.parse_args()
+
+    os.environ['DATABASE_URL'] = f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'alertas.db')}"
+    import logging
+    logging.disable(logging.WARNING)
+
+    from services.alert_service import AlertService, MotorReglas, ReglaAlerta
+
+    reunion = _reunion()
+    print(f"Evaluación de una reunión ({sum(len(n) for n in NOTAS)} caracteres de notas), mediana en µs")
+    print(f"{'reglas':>8}{'palabras':>10}{'Aho-Corasick':>15}{'regex por palabra':>20}")
+    for cantidad in args.reglas:
+        definiciones = _reglas(cantidad)
+        motor = MotorReglas([ReglaAlerta.desde_dict(d) for d in definiciones])
+        ingenuo = _evaluador_ingenuo(definiciones)
+        assert sorted(a['regla'] for a in motor.evaluar(reunion) if a['coincidencias']) == sorted(ingenuo(reunion))
+        print(f"{cantidad:8}{len(motor.automata):10}{medir(lambda: motor.evaluar(reunion), args.repeticiones):15.1f}"
+              f"{medir(lambda: ingenuo(reunion), args.repeticiones):20.1f}")
+
+    from database import models
+
+    models.create_tables()
+
+    class _SinEnvio:
+        def enviar(self, *args, **kwargs):
+            pass
+
+    servicio = AlertService(_SinEnvio(), motor=MotorReglas([ReglaAlerta.desde_dict(d) for d in _reglas(args.reglas[-1])]),
+                            queue_size=10 ** 6)
+    guardado = medir_guardado(500, servicio.reunion_guardada)
+    print(f"\nguardar_reunion_completa: {guardado['sin']:.3f} ms sin alertas, {guardado['con']:.3f} ms con "
+          f"{args.reglas[-1]} reglas ({servicio.pendientes()} alertas encoladas)")
+
+
+if __name__ == '__main__':
+    main()
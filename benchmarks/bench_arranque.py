@@ -0,0 +1,133 @@
+# -*- coding: utf-8 -*-
+"""
+Benchmark de arranque en frío
+Desglosa con `python -X importtime` lo que cuesta importar app.py y mide el tiempo
+de pared desde que arranca el proceso hasta procesar la primera actualización
+(/start de un usuario, sin red). Con --registro agrega el resultado a un archivo
+JSON Lines para seguir la evolución entre versiones.
+
+Uso: python -m benchmarks.bench_arranque [--repeticiones 5] [--top 15] [--registro benchmarks/arranque.jsonl]
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+from typing import Dict, List, Tuple
+
+from config import Config
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Proceso hijo: importa la aplicación, prepara la base de datos y atiende un /start
+PRIMERA_ACTUALIZACION = """
+import time
+inicio = time.perf_counter()
+import app
+from database.models import create_tables
+create_tables()
+from bot.handlers import conversation_manager
+conversation_manager.iniciar_reunion(1)
+print(time.perf_counter() - inicio)
+"""
+
+
+def desglose_importtime(top: int) -> Tuple[float, List[Tuple[str, float]]]:
+    """
+    Ejecuta `python -X importtime -c "import app"` y agrupa por paquete raíz
+
+    Returns:
+        Tuple con (milisegundos totales, [(paquete, milisegundos)] de mayor a menor)
+    """
+    resultado = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', 'import app'],
+        cwd=RAIZ, capture_output=True, text=True, check=True
+    )
+
+    por_paquete: Dict[str, float] = {}
+    total = 0.0
+    for linea in resultado.stderr.splitlines():
+        if not linea.startswith('import time:') or 'self [us]' in linea:
+            continue
+        propio, _, modulo = [parte.strip() for parte in linea.split(':', 1)[1].split('|')]
+        # Solo se suma el tiempo propio: el acumulado contaría dos veces los submódulos
+        paquete = modulo.split('.')[0]
+        por_paquete[paquete] = por_paquete.get(paquete, 0.0) + int(propio) / 1000
+        total += int(propio) / 1000
+
+    ordenados = sorted(por_paquete.items(), key=lambda item: item[1], reverse=True)
+    return total, ordenados[:top]
+
+
+def tiempo_primera_actualizacion(repeticiones: int) -> Tuple[float, float]:
+    """
+    Mide el arranque del proceso hasta procesar la primera actualización
+
+    Returns:
+        Tuple con (mejor tiempo de pared en ms, mejor tiempo dentro del proceso en ms)
+    """
+    mejor_pared = mejor_proceso = float('inf')
+
+    with tempfile.TemporaryDirectory() as directorio:
+        entorno = dict(
+            os.environ,
+            DATABASE_URL=f"sqlite:///{os.path.join(directorio, 'arranque.db')}",
+            PHOTO_STORAGE_PATH=os.path.join(directorio, 'photos')
+        )
+        for _ in range(repeticiones):
+            inicio = time.perf_counter()
+            resultado = subprocess.run(
+                [sys.executable, '-c', PRIMERA_ACTUALIZACION],
+                cwd=RAIZ, env=entorno, capture_output=True, text=True, check=True
+            )
+            mejor_pared = min(mejor_pared, time.perf_counter() - inicio)
+            mejor_proceso = min(mejor_proceso, float(resultado.stdout.strip().splitlines()[-1]))
+
+    return mejor_pared * 1000, mejor_proceso * 1000
+
+
+def commit_actual() -> str:
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], cwd=RAIZ, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except Exception:
+        return ''
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--repeticiones', type=int, default=5)
+    parser.add_argument('--top', type=int, default=15)
+    parser.add_argument('--registro', help='Archivo JSON Lines donde agregar el resultado')
+    args = parser.parse_args()
+
+    total_import, paquetes = desglose_importtime(args.top)
+    pared, proceso = tiempo_primera_actualizacion(args.repeticiones)
+
+    print(f"Importación de app.py: {total_import:8.1f} ms")
+    for paquete, milisegundos in paquetes:
+        print(f"  {paquete:<30} {milisegundos:8.1f} ms")
+    print(f"Primera actualización (pared, incluye intérprete): {pared:8.1f} ms")
+    print(f"Primera actualización (dentro del proceso):        {proceso:8.1f} ms")
+
+    if args.registro:
+        with open(args.registro, 'a', encoding='utf-8') as archivo:
+            archivo.write(json.dumps({
+                'fecha': datetime.now().isoformat(timespec='seconds'),
+                'version': Config.APP_VERSION,
+                'commit': commit_actual(),
+                'importacion_ms': round(total_import, 1),
+                'primera_actualizacion_ms': round(pared, 1),
+                'primera_actualizacion_proceso_ms': round(proceso, 1),
+                'paquetes': {paquete: round(ms, 1) for paquete, ms in paquetes}
+            }, ensure_ascii=False) + '\n')
+        print(f"Resultado agregado a {args.registro}")
+
+
+if __name__ == '__main__':
+    main()
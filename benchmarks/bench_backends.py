@@ -0,0 +1,203 @@
+# -*- coding: utf-8 -*-
+"""
+Comparación de rendimiento entre backends de almacenamiento
+Ejecuta la misma carga con las funciones de database/models.py contra cada
+DATABASE_URL indicada: varios hilos simulan conversaciones (crear sesión,
+responder preguntas, guardar la reunión) y al final se mide la exportación CSV.
+Cada backend corre en su propio proceso hijo.
+
+Uso: python -m benchmarks.bench_backends [--url sqlite:///ruta.db] [--url postgresql://...]
+                                         [--hilos 8] [--conversaciones 200] [--exportar 20000]
+
+Usar una base desechable: el benchmark borra al final las filas que insertó,
+pero la carga compite con cualquier otro uso de la base.
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from typing import Any, Dict, List
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# IDs de usuario del benchmark, fuera del rango de los usuarios reales
+USUARIO_BASE = 9_000_000_000_000
+PREGUNTAS = 8
+
+
+def _reunion(usuario_id: int) -> Dict[str, Any]:
+    return {
+        'departamento': f'Departamento {usuario_id % 50}',
+        'fecha': '2024-06-01',
+        'categoria_maxima': 'Jefe de Turno',
+        'nombre_supervisor': f'Supervisor {usuario_id % 2000}',
+        'nombres_personal': ['Trabajador 1', 'Trabajador 2', 'Trabajador 3'],
+        'hora_inicio': '07:30',
+        'hora_termino': '07:50',
+        'saludo_inicio_jornada': True,
+        'realizo_ejercicios': False,
+        'meta_proposito_jornada': 'Cero accidentes',
+        'ruta_evidencia_fotografica': f'./photos/{usuario_id}.jpg',
+        'usuario_telegram_id': usuario_id
+    }
+
+
+def _conversaciones(hilo: int, total: int, latencias: Dict[str, List[float]], errores: List[int]):
+    from database import models
+
+    def medir(nombre: str, funcion, *args):
+        inicio = time.perf_counter()
+        resultado = funcion(*args)
+        latencias[nombre].append(time.perf_counter() - inicio)
+        if resultado is False or resultado is None or (isinstance(resultado, dict) and resultado.get('exito') is False):
+            errores[0] += 1
+
+    for i in range(total):
+        usuario_id = USUARIO_BASE + hilo * 1_000_000 + i
+        medir('save_session', models.save_session, usuario_id, usuario_id, '{}', 'esperando_respuesta', 'p0')
+        for pregunta in range(1, PREGUNTAS + 1):
+            medir('get_session', models.get_session, usuario_id, 60)
+            medir('update_session', models.update_session, usuario_id, json.dumps({'p': pregunta}), None,
+                  f'p{pregunta}')
+        medir('guardar_reunion_completa', models.guardar_reunion_completa, _reunion(usuario_id))
+        medir('obtener_reuniones_por_usuario', models.obtener_reuniones_por_usuario, usuario_id)
+        medir('delete_session', models.delete_session, usuario_id)
+
+
+def ejecutar_carga(hilos: int, conversaciones: int, exportar: int) -> Dict[str, Any]:
+    """
+    Ejecuta la carga contra el backend de DATABASE_URL (en el proceso hijo)
+
+    Returns:
+        Dict con operaciones por segundo, latencias por operación, errores y exportación
+    """
+    from database import models
+    from database.backends import obtener_backend
+
+    models.create_tables()
+    backend = obtener_backend()
+    nombres = ['save_session', 'get_session', 'update_session', 'guardar_reunion_completa',
+               'obtener_reuniones_por_usuario', 'delete_session']
+    latencias_hilo = [{nombre: [] for nombre in nombres} for _ in range(hilos)]
+    errores_hilo = [[0] for _ in range(hilos)]
+
+    trabajadores = [
+        threading.Thread(target=_conversaciones, args=(h, conversaciones, latencias_hilo[h], errores_hilo[h]))
+        for h in range(hilos)
+    ]
+    inicio = time.perf_counter()
+    for trabajador in trabajadores:
+        trabajador.start()
+    for trabajador in trabajadores:
+        trabajador.join()
+    duracion = time.perf_counter() - inicio
+
+    latencias = {nombre: [t for lat in latencias_hilo for t in lat[nombre]] for nombre in nombres}
+    operaciones = sum(len(tiempos) for tiempos in latencias.values())
+
+    # Exportación masiva: se cargan reuniones adicionales y se exporta el rango completo
+    columnas = list(_reunion(0).keys())
+    insercion = (
+        f"INSERT INTO reuniones_inicio_jornada ({', '.join(columnas)}) "
+        f"VALUES ({', '.join('?' for _ in columnas)})"
+    )
+    with models.get_db_connection() as conn:
+        conn.executemany(insercion, [
+            [json.dumps(v) if isinstance(v, list) else v for v in _reunion(USUARIO_BASE + 900_000_000 + i).values()]
+            for i in range(exportar)
+        ])
+        conn.commit()
+
+    archivo = tempfile.mktemp(suffix='.csv')
+    inicio_exportacion = time.perf_counter()
+    models.exportar_reuniones_csv(archivo, '2024-06-01', '2024-06-01')
+    duracion_exportacion = time.perf_counter() - inicio_exportacion
+    tamano = os.path.getsize(archivo) if os.path.exists(archivo) else 0
+    if tamano:
+        os.remove(archivo)
+
+    preparadas = None
+    with models.get_db_connection() as conn:
+        if backend.nombre == 'postgresql':
+            preparadas = conn.execute("SELECT COUNT(*) FROM pg_prepared_statements").fetchone()[0]
+        conn.execute("DELETE FROM reuniones_inicio_jornada WHERE usuario_telegram_id >= ?", (USUARIO_BASE,))
+        conn.commit()
+
+    return {
+        'backend': backend.nombre,
+        'duracion': duracion,
+        'operaciones': operaciones,
+        'ops_segundo': operaciones / duracion,
+        'errores': sum(e[0] for e in errores_hilo),
+        'latencias_ms': {
+            nombre: {
+                'p50': statistics.median(tiempos) * 1000,
+                'p99': sorted(tiempos)[int(len(tiempos) * 0.99)] * 1000
+            }
+            for nombre, tiempos in latencias.items() if tiempos
+        },
+        'exportacion_segundos': duracion_exportacion,
+        'exportacion_mb': tamano / 1_000_000,
+        'sentencias_preparadas': preparadas
+    }
+
+
+def medir_url(url: str, hilos: int, conversaciones: int, exportar: int) -> Dict[str, Any]:
+    entorno = dict(os.environ, DATABASE_URL=url, DATABASE_POOL_MAX_SIZE=str(hilos))
+    resultado = subprocess.run(
+        [sys.executable, '-m', 'benchmarks.bench_backends', '--hijo',
+         '--hilos', str(hilos), '--conversaciones', str(conversaciones), '--exportar', str(exportar)],
+        cwd=RAIZ, env=entorno, capture_output=True, text=True
+    )
+    if resultado.returncode != 0:
+        raise RuntimeError(f"{url}: {resultado.stderr.strip().splitlines()[-1:]}")
+    return json.loads(resultado.stdout.strip().splitlines()[-1])
+
+
+def imprimir(url: str, resultado: Dict[str, Any]):
+    print(f"\n== {resultado['backend']}: {url} ==")
+    print(f"{resultado['operaciones']:,} operaciones en {resultado['duracion']:.2f} s "
+          f"-> {resultado['ops_segundo']:,.0f} ops/s ({resultado['errores']} errores)")
+    for nombre, latencia in resultado['latencias_ms'].items():
+        print(f"  {nombre:<32} p50 {latencia['p50']:8.2f} ms   p99 {latencia['p99']:8.2f} ms")
+    print(f"Exportación CSV: {resultado['exportacion_mb']:.1f} MB en {resultado['exportacion_segundos']:.2f} s")
+    if resultado['sentencias_preparadas'] is not None:
+        print(f"Sentencias preparadas en la conexión: {resultado['sentencias_preparadas']}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--url', action='append', help='DATABASE_URL a medir (se puede repetir)')
+    parser.add_argument('--hilos', type=int, default=8)
+    parser.add_argument('--conversaciones', type=int, default=200, help='Conversaciones por hilo')
+    parser.add_argument('--exportar', type=int, default=20000, help='Reuniones para la exportación CSV')
+    parser.add_argument('--hijo', action='store_true', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.hijo:
+        print(json.dumps(ejecutar_carga(args.hilos, args.conversaciones, args.exportar)))
+        return
+
+    with tempfile.TemporaryDirectory() as directorio:
+        urls = args.url or [f"sqlite:///{os.path.join(directorio, 'backends.db')}"]
+        resultados = {}
+        for url in urls:
+            resultados[url] = medir_url(url, args.hilos, args.conversaciones, args.exportar)
+            imprimir(url, resultados[url])
+
+    if len(resultados) > 1:
+        base_url, base = next(iter(resultados.items()))
+        print(f"\n== Comparación con {base['backend']} ==")
+        for url, resultado in list(resultados.items())[1:]:
+            print(f"{resultado['backend']:<12} {resultado['ops_segundo'] / base['ops_segundo']:6.2f}x ops/s   "
+                  f"exportación {base['exportacion_segundos'] / resultado['exportacion_segundos']:6.2f}x")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,228 @@
+# -*- coding: utf-8 -*-
+"""
+Benchmark de la búsqueda de texto completo
+Carga reuniones sintéticas con notas de seguridad y compara la búsqueda con
+LIKE '%...%' sobre los cuatro campos de texto libre (lo único posible antes de
+la migración 5) con buscar_reuniones() de database/models.py (FTS5 en SQLite,
+índice GIN en PostgreSQL). Mide también el costo de mantener el índice al
+guardar reuniones.
+
+Uso: python -m benchmarks.bench_busqueda [--url postgresql://...] [--reuniones 1000000]
+                                         [--repeticiones 20]
+
+ATENCIÓN: usar una base desechable; las tablas de la aplicación se borran y se
+vuelven a crear. Sin --url se usa un SQLite temporal.
+"""
+
+import argparse
+import json
+import os
+import random
+import statistics
+import tempfile
+import time
+from datetime import date, timedelta
+from typing import Callable, Dict, List
+
+COLUMNAS = [
+    'departamento', 'fecha', 'categoria_maxima', 'nombre_supervisor', 'nombres_personal',
+    'hora_inicio', 'hora_termino', 'observaciones', 'otra_informacion',
+    'descripcion_actividades_seguridad', 'meta_proposito_jornada', 'usuario_telegram_id'
+]
+
+FRASES = [
+    'Se revisó el arnés de seguridad antes de subir al andamio',
+    'Riesgo de caída de objetos en la zona de carga',
+    'Derrame de aceite en el pasillo, se colocó señalización',
+    'Falta de guantes dieléctricos en el tablero eléctrico',
+    'Se recordó el uso obligatorio de casco y lentes',
+    'Montacargas operando cerca de peatones',
+    'Ruido excesivo en la nave de compresores',
+    'Trabajos en caliente con permiso vigente',
+    'Se detectó fuga de amoníaco menor, se ventiló el área',
+    'Escalera con peldaño dañado retirada de servicio',
+    'Capacitación sobre bloqueo y etiquetado de energías',
+    'Cero accidentes durante la jornada',
+    'Personal con síntomas de fatiga reasignado',
+    'Revisión de extintores vencidos en el almacén',
+]
+# Frase poco frecuente, para una búsqueda selectiva
+FRASE_RARA = 'Quemadura leve por contacto con tubería de vapor sin aislamiento'
+
+
+def _filas(reuniones: int, semilla: int = 42):
+    rnd = random.Random(semilla)
+    inicio = date.today() - timedelta(days=3 * 365)
+    for i in range(reuniones):
+        fecha = inicio + timedelta(days=int(i * 3 * 365 / reuniones))
+        notas = [rnd.choice(FRASES) if rnd.random() < 0.5 else None for _ in range(4)]
+        if rnd.random() < 0.0005:
+            notas[0] = FRASE_RARA
+        yield (
+            f'Departamento {rnd.randrange(50)}', fecha.isoformat(), 'Jefe de Turno', f'Supervisor {rnd.randrange(2000)}',
+            json.dumps(['Trabajador 1', 'Trabajador 2']), '07:30', '07:50', *notas, rnd.randrange(5000)
+        )
+
+
+def preparar(reuniones: int) -> Dict[str, float]:
+    """
+    Recrea el esquema sin índice de búsqueda, carga las reuniones y aplica la migración 5
+
+    Returns:
+        Dict con los segundos de carga y de indexación
+    """
+    from database.backends import obtener_backend
+    from database.migrations import MIGRACIONES, aplicar_migraciones
+    from database.models import get_db_connection
+
+    backend = obtener_backend()
+    with get_db_connection() as conn:
+        for tabla in ('reuniones_busqueda', 'reuniones_inicio_jornada', 'sesiones_temporales', 'schema_version'):
+            conn.execute(f"DROP TABLE IF EXISTS {tabla}{' CASCADE' if backend.nombre == 'postgresql' else ''}")
+        if backend.nombre == 'postgresql':
+            conn.execute("DROP SEQUENCE IF EXISTS reuniones_inicio_jornada_id_seq_particionada")
+        conn.commit()
+
+    aplicar_migraciones(migraciones=MIGRACIONES[:4])
+
+    inicio = time.perf_counter()
+    if backend.nombre == 'postgresql':
+        from database.partitions import asegurar_particiones, mes_de, sumar_meses
+
+        asegurar_particiones(37, desde=sumar_meses(mes_de(date.today()), -36))
+        with get_db_connection() as conn:
+            cursor = conn.cursor_nativo()
+            with cursor.copy(f"COPY reuniones_inicio_jornada ({', '.join(COLUMNAS)}) FROM STDIN") as copia:
+                for fila in _filas(reuniones):
+                    copia.write_row(fila)
+            conn.commit()
+    else:
+        with get_db_connection() as conn:
+            conn.executemany(
+                f"INSERT INTO reuniones_inicio_jornada ({', '.join(COLUMNAS)}) "
+                f"VALUES ({', '.join('?' for _ in COLUMNAS)})",
+                _filas(reuniones)
+            )
+            conn.commit()
+    carga = time.perf_counter() - inicio
+
+    inicio = time.perf_counter()
+    aplicar_migraciones(ejecutar_rellenos=True, tamano_lote=20000, pausa_segundos=0)
+    indexacion = time.perf_counter() - inicio
+
+    with get_db_connection() as conn:
+        conn.execute("ANALYZE" if backend.nombre == 'postgresql' else "PRAGMA optimize")
+    return {'carga': carga, 'indexacion': indexacion}
+
+
+def _like(palabras: List[str], departamento: str = None) -> Callable[[], object]:
+    from database.backends import COLUMNAS_BUSQUEDA
+    from database.models import get_db_connection
+
+    # Una condición por palabra: alguno de los cuatro campos la contiene
+    condiciones = [
+        '(' + ' OR '.join(f"{columna} LIKE ?" for columna in COLUMNAS_BUSQUEDA) + ')' for _ in palabras
+    ]
+    params = [f'%{palabra}%' for palabra in palabras for _ in COLUMNAS_BUSQUEDA]
+    if departamento:
+        condiciones.append("departamento = ?")
+        params.append(departamento)
+    consulta = (
+        f"SELECT id, fecha, departamento, nombre_supervisor FROM reuniones_inicio_jornada "
+        f"WHERE {' AND '.join(condiciones)} ORDER BY fecha DESC LIMIT 20"
+    )
+
+    def ejecutar():
+        with get_db_connection() as conn:
+            return conn.execute(consulta, params).fetchall()
+    return ejecutar
+
+
+def busquedas() -> Dict[str, Dict[str, Callable[[], object]]]:
+    from database import models
+
+    hace_un_mes = (date.today() - timedelta(days=30)).isoformat()
+    hace_dos_anos = date.today() - timedelta(days=730)
+    return {
+        'frase poco frecuente (quemadura vapor)': {
+            'LIKE': _like(['quemadura', 'vapor']),
+            'texto completo': lambda: models.buscar_reuniones('quemadura vapor'),
+        },
+        'término frecuente (arnés)': {
+            'LIKE': _like(['arnés']),
+            'texto completo': lambda: models.buscar_reuniones('arnes'),
+        },
+        'dos términos + departamento': {
+            'LIKE': _like(['fuga', 'amoníaco'], 'Departamento 7'),
+            'texto completo': lambda: models.buscar_reuniones('fuga amoniaco', departamento='Departamento 7'),
+        },
+        'término frecuente, último mes': {
+            'LIKE': None,
+            'texto completo': lambda: models.buscar_reuniones('extintores', fecha_inicio=hace_un_mes),
+        },
+        'término frecuente, un mes de hace 2 años': {
+            'LIKE': None,
+            'texto completo': lambda: models.buscar_reuniones(
+                'arnes', fecha_inicio=hace_dos_anos.isoformat(),
+                fecha_fin=(hace_dos_anos + timedelta(days=30)).isoformat()
+            ),
+        },
+        'término frecuente, últimos 2 años': {
+            'LIKE': None,
+            'texto completo': lambda: models.buscar_reuniones('arnes', fecha_inicio=hace_dos_anos.isoformat()),
+        },
+        'término inexistente': {
+            'LIKE': _like(['zzzz']),
+            'texto completo': lambda: models.buscar_reuniones('zzzz'),
+        },
+    }
+
+
+def medir(funcion: Callable[[], object], repeticiones: int) -> float:
+    funcion()  # calentamiento (caché y sentencias preparadas)
+    tiempos = []
+    for _ in range(repeticiones):
+        inicio = time.perf_counter()
+        funcion()
+        tiempos.append((time.perf_counter() - inicio) * 1000)
+    return statistics.median(tiempos)
+
+
+def medir_guardado(cantidad: int = 500) -> float:
+    """Mediana en ms de guardar_reunion_completa con notas (índice de búsqueda incluido)"""
+    from database import models
+
+    tiempos = []
+    for i in range(cantidad):
+        datos = dict(zip(COLUMNAS, next(_filas(1, semilla=i))))
+        datos['nombres_personal'] = json.loads(datos['nombres_personal'])
+        inicio = time.perf_counter()
+        models.guardar_reunion_completa(datos)
+        tiempos.append((time.perf_counter() - inicio) * 1000)
+    return statistics.median(tiempos)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--url', help='DATABASE_URL de una base desechable')
+    parser.add_argument('--reuniones', type=int, default=1000000)
+    parser.add_argument('--repeticiones', type=int, default=20)
+    args = parser.parse_args()
+
+    directorio = tempfile.mkdtemp()
+    os.environ['DATABASE_URL'] = args.url or f"sqlite:///{os.path.join(directorio, 'busqueda.db')}"
+
+    tiempos = preparar(args.reuniones)
+    print(f"{args.reuniones:,} reuniones cargadas en {tiempos['carga']:.1f} s, "
+          f"indexadas en {tiempos['indexacion']:.1f} s")
+
+    print(f"\n{'Búsqueda (mediana, ms)':<40}{'LIKE':>12}{'texto completo':>16}")
+    for nombre, variantes in busquedas().items():
+        like = f"{medir(variantes['LIKE'], max(1, args.repeticiones // 10)):12.1f}" if variantes['LIKE'] else f"{'-':>12}"
+        print(f"{nombre:<40}{like}{medir(variantes['texto completo'], args.repeticiones):16.2f}")
+
+    print(f"\nguardar_reunion_completa con índice de búsqueda: {medir_guardado():.2f} ms (mediana)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,376 @@
+# -*- coding: utf-8 -*-
+"""
+Prueba de carga de extremo a extremo
+Arranca app.py en un subproceso contra el servidor falso de la Bot API
+(benchmarks/telegram_falso.py) y simula N supervisores que completan la
+Reunión de Inicio de Jornada: /start, confirmación, todas las preguntas de
+ConversationManager.preguntas, la foto de evidencia y la confirmación final.
+
+Reporta el rendimiento (actualizaciones/s y reuniones/min), la latencia
+p50/p95/p99 de cada paso (desde que la actualización está disponible hasta
+que llega la respuesta esperada), las escrituras a la base por función
+(del endpoint de métricas del bot) y el crecimiento de memoria (RSS) del bot.
+Todo corre sin conexión, con SQLite y directorios temporales.
+
+Uso: python -m benchmarks.bench_carga [--supervisores 50] [--pensar 0.5 2]
+     [--rampa 10] [--latencia-api 20] [--tasa-429 0.01] [--tasa-error 0.005]
+     [--procesos 1] [--conservar]
+
+Con el límite por chat de Telegram (TELEGRAM_CHAT_RATE=1) y tiempos de
+reflexión menores a 1 s, la latencia medida incluye esa espera; se puede
+cambiar con --variable TELEGRAM_CHAT_RATE=100.
+"""
+
+import argparse
+import asyncio
+import io
+import os
+import random
+import re
+import signal
+import socket
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import time
+from collections import defaultdict
+from datetime import date
+from typing import Dict, List, Optional, Tuple
+
+from benchmarks.telegram_falso import ServidorTelegramFalso
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+TOKEN = '700000001:CARGA-sin-conexion'
+
+# Funciones de database/models.py que escriben en la base
+FUNCIONES_ESCRITURA = ('save_session', 'update_session', 'delete_session', 'guardar_reunion_completa')
+
+RESPUESTAS_POR_TIPO = {
+    'texto': 'Distribución zona centro',
+    'texto_opcional': 'Sin novedades en el área',
+    'fecha': date.today().strftime('%d/%m/%Y'),
+    'hora': '07:30',
+    'lista_nombres': 'Ana Pérez, Luis Gómez, María López',
+    'boolean': 'Sí'
+}
+
+
+class Paso:
+    """Un mensaje del supervisor y el texto que debe aparecer en la respuesta"""
+
+    __slots__ = ('nombre', 'texto', 'foto', 'esperado')
+
+    def __init__(self, nombre: str, esperado: str, texto: Optional[str] = None, foto: bool = False):
+        self.nombre = nombre
+        self.texto = texto
+        self.foto = foto
+        self.esperado = esperado
+
+
+def construir_pasos() -> List[Paso]:
+    """
+    Recorre ConversationManager.preguntas siguiendo 'siguiente' desde 'departamento'
+    """
+    from bot.conversation import ConversationManager
+
+    preguntas = ConversationManager().preguntas
+
+    pasos = [
+        Paso('/start', 'Responde "Sí"', texto='/start'),
+        Paso('confirmacion', preguntas['departamento']['texto'], texto='Sí')
+    ]
+    clave = 'departamento'
+    while clave != 'solicitar_foto':
+        config = preguntas[clave]
+        siguiente = config['siguiente']
+        pasos.append(Paso(clave, preguntas[siguiente]['texto'], texto=RESPUESTAS_POR_TIPO[config['tipo']]))
+        clave = siguiente
+    pasos.append(Paso('foto', 'Confirmas', foto=True))
+    pasos.append(Paso('confirmacion_final', 'Reunión registrada', texto='Sí'))
+    return pasos
+
+
+def generar_foto() -> bytes:
+    """JPEG de 1280x960 con ruido (comprime como una foto real, no como un color plano)"""
+    from PIL import Image
+
+    imagen = Image.merge('RGB', [Image.effect_noise((1280, 960), sigma) for sigma in (40, 60, 80)])
+    salida = io.BytesIO()
+    imagen.save(salida, format='JPEG', quality=85)
+    return salida.getvalue()
+
+
+def puerto_libre() -> int:
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def percentil(valores: List[float], p: float) -> float:
+    ordenados = sorted(valores)
+    return ordenados[min(len(ordenados) - 1, int(len(ordenados) * p))]
+
+
+class MedidorMemoria:
+    """
+    Muestrea el RSS del bot y de sus procesos hijos desde /proc (solo Linux)
+    """
+
+    def __init__(self, pid: int):
+        self.pid = pid
+        self.muestras: List[Tuple[float, int]] = []
+
+    @staticmethod
+    def _rss_kb(pid: int) -> int:
+        try:
+            with open(f'/proc/{pid}/status') as archivo:
+                for linea in archivo:
+                    if linea.startswith('VmRSS:'):
+                        return int(linea.split()[1])
+        except OSError:
+            pass
+        return 0
+
+    def _hijos(self) -> List[int]:
+        hijos = []
+        for entrada in os.listdir('/proc'):
+            if not entrada.isdigit():
+                continue
+            try:
+                with open(f'/proc/{entrada}/stat') as archivo:
+                    if int(archivo.read().rsplit(')', 1)[1].split()[1]) == self.pid:
+                        hijos.append(int(entrada))
+            except (OSError, IndexError, ValueError):
+                continue
+        return hijos
+
+    def muestrear(self) -> int:
+        rss = self._rss_kb(self.pid) + sum(self._rss_kb(hijo) for hijo in self._hijos())
+        self.muestras.append((time.monotonic(), rss))
+        return rss
+
+    async def ejecutar(self, intervalo: float = 0.5):
+        if not os.path.isdir('/proc'):
+            return
+        while True:
+            self.muestrear()
+            await asyncio.sleep(intervalo)
+
+
+def leer_metricas(host: str, puertos: List[int]) -> Dict[str, float]:
+    """
+    Suma las series sirij_db_segundos_count por función de los endpoints de métricas
+    """
+    from urllib.request import urlopen
+
+    patron = re.compile(r'^sirij_db_segundos_count\{funcion="([^"]+)"\} (\S+)$', re.MULTILINE)
+    conteos: Dict[str, float] = defaultdict(float)
+    for puerto in puertos:
+        try:
+            texto = urlopen(f'http://{host}:{puerto}/metrics', timeout=5).read().decode('utf-8')
+        except OSError as e:
+            print(f"  (sin métricas en el puerto {puerto}: {e})")
+            continue
+        for funcion, valor in patron.findall(texto):
+            conteos[funcion] += float(valor)
+    return conteos
+
+
+async def supervisor(servidor: ServidorTelegramFalso, user_id: int, pasos: List[Paso], foto: bytes,
+                     pensar: Tuple[float, float], espera_inicial: float, timeout: float,
+                     latencias: Dict[str, List[float]], errores: Dict[str, int], azar: random.Random) -> bool:
+    """
+    Completa una reunión; devuelve False al primer paso con error o sin respuesta
+    """
+    await asyncio.sleep(espera_inicial)
+    for paso in pasos:
+        await asyncio.sleep(azar.uniform(*pensar))
+
+        inicio = time.perf_counter()
+        if paso.foto:
+            servidor.encolar_foto(user_id, foto)
+        else:
+            servidor.encolar_texto(user_id, paso.texto)
+
+        limite = time.monotonic() + timeout
+        try:
+            while True:
+                respuesta = await servidor.esperar_mensaje(user_id, max(0.0, limite - time.monotonic()))
+                if paso.esperado in respuesta.replace('\\', ''):
+                    break
+                if respuesta.startswith(('❌', 'Por favor')):
+                    errores[f'{paso.nombre}: {respuesta.splitlines()[0][:60]}'] += 1
+                    return False
+        except asyncio.TimeoutError:
+            errores[f'{paso.nombre}: sin respuesta en {timeout:.0f} s'] += 1
+            return False
+
+        latencias[paso.nombre].append(time.perf_counter() - inicio)
+    return True
+
+
+def arrancar_bot(directorio: str, puerto_api: int, puerto_metricas: int, procesos: int,
+                 variables: Dict[str, str]) -> subprocess.Popen:
+    entorno = dict(os.environ)
+    entorno.update({
+        'TELEGRAM_BOT_TOKEN': TOKEN,
+        'TELEGRAM_API_URL': f'http://127.0.0.1:{puerto_api}/bot',
+        'TELEGRAM_FILE_URL': f'http://127.0.0.1:{puerto_api}/file/bot',
+        'DATABASE_URL': f"sqlite:///{os.path.join(directorio, 'carga.db')}",
+        'PHOTO_STORAGE_PATH': os.path.join(directorio, 'fotos'),
+        'SESSION_SNAPSHOT_PATH': os.path.join(directorio, 'sesiones.snapshot'),
+        'LOG_FILE': os.path.join(directorio, 'bot.log'),
+        'LOG_LEVEL': 'WARNING',
+        'METRICS_HOST': '127.0.0.1',
+        'METRICS_PORT': str(puerto_metricas),
+        'WORKER_PROCESSES': str(procesos),
+    })
+    entorno.update(variables)
+    salida = open(os.path.join(directorio, 'bot.out'), 'wb')
+    return subprocess.Popen([sys.executable, os.path.join(RAIZ, 'app.py')], cwd=RAIZ, env=entorno,
+                            stdout=salida, stderr=subprocess.STDOUT)
+
+
+def detener_bot(proceso: subprocess.Popen):
+    if proceso.poll() is None:
+        proceso.send_signal(signal.SIGINT)
+        try:
+            proceso.wait(30)
+        except subprocess.TimeoutExpired:
+            proceso.kill()
+            proceso.wait()
+
+
+async def ejecutar(args: argparse.Namespace, directorio: str) -> int:
+    pasos = construir_pasos()
+    foto = generar_foto()
+    variables = dict(v.split('=', 1) for v in args.variable)
+
+    servidor = ServidorTelegramFalso(args.latencia_api, args.tasa_429, args.tasa_error, args.retry_after)
+    puerto_api = await servidor.iniciar()
+    puerto_metricas = puerto_libre()
+    bot = arrancar_bot(directorio, puerto_api, puerto_metricas, args.procesos, variables)
+
+    try:
+        await asyncio.wait_for(servidor.listo.wait(), args.timeout_arranque)
+    except asyncio.TimeoutError:
+        detener_bot(bot)
+        print(f"El bot no empezó a sondear en {args.timeout_arranque:.0f} s; ver {directorio}/bot.out")
+        return 1
+    # En multiproceso los trabajadores arrancan después del sondeo del principal
+    await asyncio.sleep(2 if args.procesos > 1 else 0.2)
+
+    memoria = MedidorMemoria(bot.pid)
+    rss_inicial = memoria.muestrear()
+    tarea_memoria = asyncio.create_task(memoria.ejecutar())
+
+    print(f"{args.supervisores} supervisores, {len(pasos)} pasos cada uno, foto de {len(foto) / 1024:.0f} KiB, "
+          f"reflexión {args.pensar[0]}-{args.pensar[1]} s, rampa {args.rampa} s, "
+          f"latencia API {args.latencia_api} ms, 429 {args.tasa_429:.1%}, 502 {args.tasa_error:.1%}, "
+          f"{args.procesos} proceso(s)")
+
+    latencias: Dict[str, List[float]] = defaultdict(list)
+    errores: Dict[str, int] = defaultdict(int)
+    azar = random.Random(args.semilla)
+    inicio = time.perf_counter()
+    resultados = await asyncio.gather(*(
+        supervisor(servidor, 900000000 + i, pasos, foto, tuple(args.pensar),
+                   args.rampa * i / max(1, args.supervisores), args.timeout_paso,
+                   latencias, errores, random.Random(azar.random()))
+        for i in range(args.supervisores)
+    ))
+    duracion = time.perf_counter() - inicio
+    rss_final = memoria.muestrear()
+    tarea_memoria.cancel()
+
+    puertos = [puerto_metricas] if args.procesos == 1 else [puerto_metricas + 1 + i for i in range(args.procesos)]
+    escrituras = leer_metricas('127.0.0.1', puertos)
+
+    detener_bot(bot)
+    await servidor.detener()
+
+    # Resultados
+    completadas = sum(resultados)
+    actualizaciones = sum(len(v) for v in latencias.values())
+    print(f"\nDuración: {duracion:.1f} s. Reuniones completadas: {completadas}/{args.supervisores}")
+    print(f"Rendimiento: {actualizaciones / duracion:.1f} actualizaciones/s, "
+          f"{completadas / duracion * 60:.1f} reuniones/min")
+
+    print(f"\n{'Paso':<42}{'n':>6}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}")
+    todas: List[float] = []
+    for paso in pasos:
+        valores = latencias.get(paso.nombre)
+        if not valores:
+            continue
+        todas.extend(valores)
+        print(f"{paso.nombre:<42}{len(valores):6}{percentil(valores, 0.5) * 1000:10.1f}"
+              f"{percentil(valores, 0.95) * 1000:10.1f}{percentil(valores, 0.99) * 1000:10.1f}")
+    if todas:
+        print(f"{'(todos)':<42}{len(todas):6}{percentil(todas, 0.5) * 1000:10.1f}"
+              f"{percentil(todas, 0.95) * 1000:10.1f}{percentil(todas, 0.99) * 1000:10.1f}")
+
+    if errores:
+        print("\nErrores:")
+        for descripcion, cantidad in sorted(errores.items(), key=lambda x: -x[1]):
+            print(f"  {cantidad:5}  {descripcion}")
+
+    print("\nEscrituras a la base (llamadas de database/models.py):")
+    for funcion in FUNCIONES_ESCRITURA:
+        cantidad = escrituras.get(funcion, 0)
+        por_reunion = f"{cantidad / completadas:8.1f} por reunión" if completadas else ''
+        print(f"  {funcion:<28}{cantidad:8.0f}{por_reunion}")
+    lecturas = sum(v for k, v in escrituras.items() if k not in FUNCIONES_ESCRITURA)
+    print(f"  {'(otras llamadas)':<28}{lecturas:8.0f}")
+
+    try:
+        with sqlite3.connect(os.path.join(directorio, 'carga.db')) as conn:
+            guardadas = conn.execute("SELECT COUNT(*) FROM reuniones_inicio_jornada").fetchone()[0]
+        print(f"  Reuniones en la base: {guardadas}")
+    except sqlite3.Error as e:
+        print(f"  (no se pudo leer la base: {e})")
+
+    if len(memoria.muestras) > 1:
+        pico = max(rss for _, rss in memoria.muestras)
+        print(f"\nMemoria del bot (RSS): inicial {rss_inicial / 1024:.1f} MiB, pico {pico / 1024:.1f} MiB, "
+              f"final {rss_final / 1024:.1f} MiB, crecimiento {(rss_final - rss_inicial) / 1024:+.1f} MiB "
+              f"({(rss_final - rss_inicial) / max(1, completadas):+.1f} KiB por reunión)")
+
+    print(f"\nLlamadas a la API falsa: {dict(sorted(servidor.metricas.items()))}")
+    return 0 if completadas == args.supervisores else 2
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--supervisores', type=int, default=50)
+    parser.add_argument('--pensar', type=float, nargs=2, default=[0.5, 2.0], metavar=('MIN', 'MAX'),
+                        help='Segundos de reflexión entre mensajes (uniforme)')
+    parser.add_argument('--rampa', type=float, default=10.0, help='Segundos para que todos los supervisores empiecen')
+    parser.add_argument('--latencia-api', type=float, default=0.0, help='ms agregados a cada respuesta de la API')
+    parser.add_argument('--tasa-429', type=float, default=0.0, help='Fracción de llamadas con 429')
+    parser.add_argument('--tasa-error', type=float, default=0.0, help='Fracción de llamadas con 502')
+    parser.add_argument('--retry-after', type=int, default=1)
+    parser.add_argument('--procesos', type=int, default=1, help='WORKER_PROCESSES del bot')
+    parser.add_argument('--timeout-paso', type=float, default=30.0)
+    parser.add_argument('--timeout-arranque', type=float, default=60.0)
+    parser.add_argument('--semilla', type=int, default=42)
+    parser.add_argument('--variable', action='append', default=[], metavar='NOMBRE=VALOR',
+                        help='Variable de entorno extra para el bot (repetible)')
+    parser.add_argument('--conservar', action='store_true', help='No borrar el directorio temporal (base, logs, fotos)')
+    args = parser.parse_args()
+
+    directorio = tempfile.mkdtemp(prefix='sirij_carga_')
+    try:
+        codigo = asyncio.run(ejecutar(args, directorio))
+    finally:
+        if args.conservar:
+            print(f"\nArchivos en {directorio}")
+        else:
+            import shutil
+            shutil.rmtree(directorio, ignore_errors=True)
+    sys.exit(codigo)
+
+
+if __name__ == '__main__':
+    main()
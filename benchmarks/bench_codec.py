@@ -0,0 +1,93 @@
+# -*- coding: utf-8 -*-
+"""
+Benchmark de los codecs de datos_sesion
+Compara los codecs json y binario con sesiones a distintas alturas de la
+conversación: tamaño, tiempo de codificar, de cargar la sesión sin leer las
+respuestas (lo que hace cada mensaje antes de validar), de cargarla completa
+y del ciclo de guardar_respuesta (cargar, responder y codificar). Verifica
+además que cada codec devuelva las mismas respuestas que recibió.
+
+Uso: python -m benchmarks.bench_codec [--repeticiones 20000]
+"""
+
+import argparse
+import timeit
+from datetime import date, time as hora
+from typing import Any, Callable
+
+from services.session_codec import CODECS, leer_campos
+from services.session_state import CAMPOS, Respuestas, Sesion
+
+RESPUESTAS = {
+    'departamento': 'Mantenimiento Eléctrico', 'fecha': date(2024, 6, 1), 'categoria_maxima': 'Jefe de Turno',
+    'nombre_supervisor': 'Ana Pérez', 'nombres_personal': ['Luis Gómez', 'María López', 'Pedro Soto'],
+    'hora_inicio': hora(7, 30), 'hora_termino': hora(7, 50),
+    'saludo_inicio_jornada': True, 'enumero_personal': True, 'pregunto_estado_salud': True,
+    'realizo_ejercicios': False, 'detecto_anomalias_salud': False, 'tomo_lista_asistencia': True,
+    'comento_trabajos_mantenimiento': True, 'comento_trabajos_operacion': False,
+    'comento_trabajos_alto_riesgo': True, 'comento_incidentes_accidentes': False,
+    'otra_informacion': '', 'realizo_revision_espejo': True, 'realizo_prediccion_peligro': True,
+    'dio_lectura_reglamento': False, 'realizo_exposicion_sentir_peligro': True,
+    'actividades_posteriores': True, 'descripcion_actividades_seguridad': 'Inspección de tableros',
+    'meta_proposito_jornada': 'Cero accidentes', 'observaciones': ''
+}
+
+
+def sesion_con(respondidas: int) -> Sesion:
+    """Sesión con las primeras `respondidas` respuestas (y la foto si están todas)"""
+    respuestas = Respuestas(**{campo: RESPUESTAS[campo] for campo in CAMPOS[:respondidas] if campo in RESPUESTAS})
+    fotos = [('photos/2024/06/123456789_20240601_075012.jpg', '2024-06-01T07:50:12')] if respondidas >= len(RESPUESTAS) else []
+    return Sesion('123456789_20240601072500000000', 123456789, 123456789, 'esperando_respuesta',
+                  CAMPOS[respondidas] if respondidas < len(RESPUESTAS) else None, respuestas, fotos)
+
+
+def microsegundos(funcion: Callable[[], Any], repeticiones: int, rondas: int = 5) -> float:
+    """Mejor promedio por llamada entre varias rondas (descarta interrupciones de la máquina)"""
+    por_ronda = max(1, repeticiones // rondas)
+    return min(timeit.repeat(funcion, number=por_ronda, repeat=rondas)) / por_ronda * 1_000_000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--repeticiones', type=int, default=20000)
+    args = parser.parse_args()
+    repeticiones = args.repeticiones
+
+    print(f"{'respuestas':<12}{'codec':<9}{'bytes':>7}{'codificar':>11}{'cargar':>9}"
+          f"{'completa':>10}{'responder':>11}   (µs)")
+    for respondidas in (5, 15, len(RESPUESTAS)):
+        original = sesion_con(respondidas)
+        for nombre, codec in CODECS.items():
+            datos = codec.codificar(original)
+            copia = Sesion('', 0, 0, '')
+            codec.cargar(copia, datos)
+            if copia.respuestas != original.respuestas or copia.fotos != original.fotos:
+                raise SystemExit(f"El codec {nombre} no conserva la sesión con {respondidas} respuestas")
+
+            def cargar():
+                codec.cargar(Sesion('', 0, 0, ''), datos)
+
+            def completa():
+                sesion = Sesion('', 0, 0, '')
+                codec.cargar(sesion, datos)
+                return sesion.respuestas
+
+            def responder():
+                sesion = Sesion('', 0, 0, '')
+                codec.cargar(sesion, datos)
+                sesion.respuestas.establecer('observaciones', 'Sin novedades')
+                return codec.codificar(sesion)
+
+            print(f"{respondidas:<12}{nombre:<9}{len(datos):>7}"
+                  f"{microsegundos(lambda: codec.codificar(original), repeticiones):>11.2f}"
+                  f"{microsegundos(cargar, repeticiones):>9.2f}"
+                  f"{microsegundos(completa, repeticiones):>10.2f}"
+                  f"{microsegundos(responder, repeticiones):>11.2f}")
+
+    datos = CODECS['binario'].codificar(sesion_con(len(RESPUESTAS)))
+    print(f"\nleer_campos(['numero_pregunta']) sobre la sesión completa: "
+          f"{microsegundos(lambda: leer_campos(datos, ['numero_pregunta']), repeticiones):.2f} µs")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,246 @@
+# -*- coding: utf-8 -*-
+"""
+Prueba de estrés de la serialización por usuario
+Lleva a N usuarios por la reunión completa (/start, confirmación, todas las
+preguntas, la foto y la confirmación final) llamando directamente a los
+manejadores de bot/handlers.py, que pasan por serializado_por_usuario y
+BloqueoPorUsuario. Todas las actualizaciones se crean a la vez, con los
+mensajes de los usuarios entremezclados al azar (cada usuario en su orden),
+y la descarga de la foto y cada envío tardan un tiempo aleatorio, de modo
+que los mensajes de un usuario llegan mientras el anterior sigue en curso.
+
+Al final comprueba que cada usuario tiene exactamente una reunión guardada
+con todas sus respuestas (cada usuario responde valores distintos), que no
+recibió mensajes de error y que el último mensaje confirma el registro.
+Termina con código 1 si alguna comprobación falla.
+
+Uso: python -m benchmarks.bench_concurrencia [--usuarios 200] [--latencia-foto 0 50]
+     [--latencia-envio 0 5] [--semilla 42]
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import sqlite3
+import sys
+import tempfile
+import time
+from collections import defaultdict
+from datetime import date, timedelta
+from types import SimpleNamespace
+from typing import Any, Dict, List, Tuple
+
+PRIMER_USUARIO = 800000000
+
+
+def sufijo(indice: int) -> str:
+    """Palabra única por usuario, solo con letras (los nombres no aceptan dígitos)"""
+    letras = ''
+    while True:
+        indice, resto = divmod(indice, 26)
+        letras += 'abcdefghijklmnopqrstuvwxyz'[resto]
+        if indice == 0:
+            return letras.capitalize()
+
+
+def respuestas_usuario(preguntas: Dict[str, Dict], indice: int, azar: random.Random) -> Dict[str, str]:
+    """
+    Una respuesta válida y propia del usuario para cada pregunta, en el orden de la conversación
+    """
+    fecha = date.today() - timedelta(days=indice % 28)
+    respuestas = {}
+    for campo, config in preguntas.items():
+        tipo = config['tipo']
+        if tipo == 'foto':
+            continue
+        if tipo == 'fecha':
+            respuestas[campo] = fecha.strftime('%d/%m/%Y')
+        elif tipo == 'hora':
+            respuestas[campo] = f"{6 + indice % 3:02d}:{indice % 60:02d}"
+        elif tipo == 'lista_nombres':
+            respuestas[campo] = f"Ana Pérez {sufijo(indice)}, Luis Gómez {sufijo(indice)}"
+        elif tipo == 'boolean':
+            respuestas[campo] = azar.choice(('Sí', 'No'))
+        else:
+            respuestas[campo] = f"{campo.replace('_', ' ')} usuario {indice}"
+    return respuestas
+
+
+def comparar(campo: str, tipo: str, enviado: str, guardado: Any) -> bool:
+    """Compara la respuesta enviada con la columna guardada (ya validada y normalizada)"""
+    from database.duplicates import normalizar
+
+    if guardado is None:
+        return False
+    if tipo == 'fecha':
+        dia, mes, anio = enviado.split('/')
+        return str(guardado)[:10] == f"{anio}-{mes}-{dia}"
+    if tipo == 'hora':
+        return str(guardado)[:5] == enviado
+    if tipo == 'lista_nombres':
+        return [normalizar(nombre) for nombre in json.loads(guardado)] == \
+            [normalizar(nombre) for nombre in enviado.split(',')]
+    if tipo == 'boolean':
+        return bool(guardado) == (enviado == 'Sí')
+    return normalizar(guardado) == normalizar(enviado)
+
+
+class BotFalso:
+    """Bot que guarda los mensajes enviados por chat, con latencia aleatoria"""
+
+    def __init__(self, latencia: Tuple[float, float], azar: random.Random):
+        self.latencia = latencia
+        self.azar = azar
+        self.mensajes: Dict[int, List[str]] = defaultdict(list)
+
+    async def send_message(self, chat_id: int, text: str, **kwargs):
+        await asyncio.sleep(self.azar.uniform(*self.latencia) / 1000)
+        self.mensajes[chat_id].append(text)
+
+
+class FotoFalsa:
+    """PhotoSize y File de Telegram: la descarga tarda un tiempo aleatorio"""
+
+    def __init__(self, contenido: bytes, latencia: Tuple[float, float], azar: random.Random):
+        self.contenido = contenido
+        self.latencia = latencia
+        self.azar = azar
+
+    async def get_file(self):
+        await asyncio.sleep(0)
+        return self
+
+    async def download_as_bytearray(self) -> bytearray:
+        await asyncio.sleep(self.azar.uniform(*self.latencia) / 1000)
+        return bytearray(self.contenido)
+
+
+def actualizacion(user_id: int, texto: str = None, foto: FotoFalsa = None) -> SimpleNamespace:
+    usuario = SimpleNamespace(id=user_id, first_name=f"Supervisor {user_id}", username=None)
+    mensaje = SimpleNamespace(text=texto, photo=[foto] if foto else None)
+    return SimpleNamespace(effective_user=usuario, effective_chat=SimpleNamespace(id=user_id), message=mensaje)
+
+
+def entremezclar(colas: List[List[Any]], azar: random.Random) -> List[Any]:
+    """Une las colas en orden aleatorio conservando el orden de cada una"""
+    pendientes = [list(reversed(cola)) for cola in colas if cola]
+    resultado = []
+    while pendientes:
+        indice = azar.randrange(len(pendientes))
+        resultado.append(pendientes[indice].pop())
+        if not pendientes[indice]:
+            pendientes[indice] = pendientes[-1]
+            pendientes.pop()
+    return resultado
+
+
+async def ejecutar(args: argparse.Namespace, ruta_base: str) -> int:
+    from benchmarks.bench_carga import generar_foto
+    from bot import handlers
+    from database.models import create_tables
+
+    create_tables()
+    azar = random.Random(args.semilla)
+    preguntas = handlers.conversation_manager.preguntas
+    bot = BotFalso(tuple(args.latencia_envio), azar)
+    context = SimpleNamespace(bot=bot)
+    foto = FotoFalsa(generar_foto(), tuple(args.latencia_foto), azar)
+
+    esperadas: Dict[int, Dict[str, str]] = {}
+    colas = []
+    for indice in range(args.usuarios):
+        user_id = PRIMER_USUARIO + indice
+        respuestas = esperadas[user_id] = respuestas_usuario(preguntas, indice, azar)
+        cola = [(handlers.start_command, actualizacion(user_id, '/start')),
+                (handlers.handle_message, actualizacion(user_id, 'Sí'))]
+        cola += [(handlers.handle_message, actualizacion(user_id, texto)) for texto in respuestas.values()]
+        cola += [(handlers.handle_photo, actualizacion(user_id, foto=foto)),
+                 (handlers.handle_message, actualizacion(user_id, 'Sí'))]
+        colas.append(cola)
+
+    orden = entremezclar(colas, azar)
+    print(f"{args.usuarios} usuarios, {len(orden)} actualizaciones entremezcladas")
+
+    inicio = time.perf_counter()
+    # Como con concurrent_updates: cada actualización es una tarea creada en orden de llegada
+    tareas = [asyncio.create_task(manejador(update, context)) for manejador, update in orden]
+    await asyncio.gather(*tareas)
+    await handlers.message_service.vaciar()
+    duracion = time.perf_counter() - inicio
+    print(f"Procesadas en {duracion:.2f} s ({len(orden) / duracion:,.0f} actualizaciones/s)")
+
+    conexion = sqlite3.connect(ruta_base)
+    conexion.row_factory = sqlite3.Row
+    reuniones = defaultdict(list)
+    for fila in conexion.execute("SELECT * FROM reuniones_inicio_jornada"):
+        reuniones[fila['usuario_telegram_id']].append(fila)
+    conexion.close()
+
+    fallas = []
+    for user_id, respuestas in esperadas.items():
+        filas = reuniones.get(user_id, [])
+        mensajes = bot.mensajes.get(user_id, [])
+        if len(filas) != 1:
+            fallas.append(f"{user_id}: {len(filas)} reuniones guardadas")
+            continue
+        incorrectos = [
+            campo for campo, texto in respuestas.items()
+            if not comparar(campo, preguntas[campo]['tipo'], texto, filas[0][campo])
+        ]
+        if incorrectos:
+            fallas.append(f"{user_id}: respuestas distintas en {', '.join(incorrectos)}")
+        if not filas[0]['ruta_evidencia_fotografica']:
+            fallas.append(f"{user_id}: reunión sin fotografía")
+        if any('❌' in mensaje for mensaje in mensajes):
+            fallas.append(f"{user_id}: recibió mensajes de error")
+        if not mensajes or 'Reunión registrada' not in '\n'.join(mensajes[-2:]):
+            fallas.append(f"{user_id}: sin confirmación del registro")
+
+    print(f"Reuniones guardadas: {sum(len(filas) for filas in reuniones.values())} de {args.usuarios}")
+    print(f"Bloqueos de usuario en memoria: {len(handlers.bloqueo_usuarios)}")
+    if fallas:
+        print(f"\n{len(fallas)} comprobaciones fallidas:")
+        for falla in fallas[:20]:
+            print(f"  {falla}")
+        return 1
+
+    print("Todas las respuestas se guardaron en orden")
+    return 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--usuarios', type=int, default=200)
+    parser.add_argument('--latencia-foto', type=float, nargs=2, default=[0.0, 50.0], metavar=('MIN', 'MAX'),
+                        help='ms de la descarga de la foto (uniforme)')
+    parser.add_argument('--latencia-envio', type=float, nargs=2, default=[0.0, 5.0], metavar=('MIN', 'MAX'),
+                        help='ms de cada envío de mensaje (uniforme)')
+    parser.add_argument('--semilla', type=int, default=42)
+    args = parser.parse_args()
+
+    directorio = tempfile.mkdtemp(prefix='sirij_concurrencia_')
+    ruta_base = os.path.join(directorio, 'concurrencia.db')
+    # Antes de importar config: sin límites de envío ni perfilado, todo en el directorio temporal
+    os.environ.update({
+        'DATABASE_URL': f"sqlite:///{ruta_base}",
+        'PHOTO_STORAGE_PATH': os.path.join(directorio, 'fotos'),
+        'SESSION_SNAPSHOT_PATH': os.path.join(directorio, 'sesiones.snapshot'),
+        'TELEGRAM_GLOBAL_RATE': '1000000',
+        'TELEGRAM_CHAT_RATE': '1000000',
+        'PROFILE_SAMPLE_RATE': '0'
+    })
+    import logging
+    logging.disable(logging.WARNING)
+
+    try:
+        codigo = asyncio.run(ejecutar(args, ruta_base))
+    finally:
+        import shutil
+        shutil.rmtree(directorio, ignore_errors=True)
+    sys.exit(codigo)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,265 @@
+# -*- coding: utf-8 -*-
+"""
+Asesor de índices
+Reproduce las consultas de database/models.py sobre una base sintética y compara
+el plan (EXPLAIN QUERY PLAN) y el tiempo de cada una antes y después de las
+migraciones de índices (por defecto, desde el esquema inicial, sin los índices
+compuestos de las migraciones 2 y 3). Señala los recorridos completos (SCAN), los ordenamientos
+temporales (USE TEMP B-TREE) y las búsquedas que no usan un índice cubriente.
+
+Uso: python -m benchmarks.bench_indices [--filas 5000000] [--base ruta.db] [--antes 1]
+
+Con --base la base sintética se conserva y se reutiliza en ejecuciones posteriores.
+"""
+
+import argparse
+import os
+import random
+import sqlite3
+import statistics
+import tempfile
+import time
+from datetime import date, timedelta
+from typing import Any, Callable, Dict, List, Tuple
+
+from database.migrations import MIGRACIONES, VERSION_ESQUEMA
+
+DEPARTAMENTOS = 50
+SUPERVISORES = 2000
+USUARIOS = 5000
+DIAS = 5 * 365
+INICIO = date(2020, 1, 1)
+# Esquema inicial: los índices compuestos llegan con las migraciones 2 y 3
+ANTES_INDICES_COMPUESTOS = 1
+
+CAMPOS_BOOLEANOS = [
+    'saludo_inicio_jornada', 'enumero_personal', 'pregunto_estado_salud', 'realizo_ejercicios',
+    'detecto_anomalias_salud', 'tomo_lista_asistencia', 'comento_trabajos_mantenimiento',
+    'comento_trabajos_operacion', 'comento_trabajos_alto_riesgo', 'comento_incidentes_accidentes',
+    'realizo_revision_espejo', 'realizo_prediccion_peligro', 'dio_lectura_reglamento',
+    'realizo_exposicion_sentir_peligro', 'actividades_posteriores'
+]
+
+
+def _fecha(rnd: random.Random, dias: int = DIAS) -> str:
+    return (INICIO + timedelta(days=rnd.randrange(dias))).isoformat()
+
+
+def _rango(rnd: random.Random, dias: int) -> Tuple[str, str]:
+    inicio = INICIO + timedelta(days=rnd.randrange(DIAS - dias))
+    return inicio.isoformat(), (inicio + timedelta(days=dias - 1)).isoformat()
+
+
+# Consultas de database/models.py: (nombre, SQL, generador de parámetros)
+CARGA: List[Tuple[str, str, Callable[[random.Random], Tuple]]] = [
+    (
+        'obtener_reuniones_por_usuario',
+        "SELECT id, departamento, fecha, nombre_supervisor, fecha_registro "
+        "FROM reuniones_inicio_jornada WHERE usuario_telegram_id = ? ORDER BY fecha_registro DESC LIMIT ?",
+        lambda rnd: (rnd.randrange(USUARIOS), 10)
+    ),
+    (
+        'obtener_reuniones_por_fecha',
+        "SELECT * FROM reuniones_inicio_jornada WHERE fecha = ? ORDER BY id",
+        lambda rnd: (_fecha(rnd),)
+    ),
+    (
+        'estadisticas: total (30 días)',
+        "SELECT COUNT(*) FROM reuniones_inicio_jornada WHERE fecha BETWEEN ? AND ?",
+        lambda rnd: _rango(rnd, 30)
+    ),
+    (
+        'estadisticas: por departamento (30 días)',
+        "SELECT departamento, COUNT(*) as cantidad FROM reuniones_inicio_jornada "
+        "WHERE fecha BETWEEN ? AND ? GROUP BY departamento ORDER BY cantidad DESC",
+        lambda rnd: _rango(rnd, 30)
+    ),
+    (
+        'estadisticas: por fecha (30 días)',
+        "SELECT fecha, COUNT(*) as cantidad FROM reuniones_inicio_jornada "
+        "WHERE fecha BETWEEN ? AND ? GROUP BY fecha ORDER BY fecha DESC LIMIT 30",
+        lambda rnd: _rango(rnd, 30)
+    ),
+    (
+        'estadisticas: por departamento (1 año)',
+        "SELECT departamento, COUNT(*) as cantidad FROM reuniones_inicio_jornada "
+        "WHERE fecha BETWEEN ? AND ? GROUP BY departamento ORDER BY cantidad DESC",
+        lambda rnd: _rango(rnd, 365)
+    ),
+    (
+        'iterar_reuniones: departamento y mes',
+        "SELECT * FROM reuniones_inicio_jornada WHERE id > ? AND fecha >= ? AND fecha <= ? "
+        "AND departamento = ? ORDER BY id LIMIT ?",
+        lambda rnd: (0, *_rango(rnd, 30), f'Departamento {rnd.randrange(DEPARTAMENTOS)}', 500)
+    ),
+    (
+        'iterar_reuniones: supervisor',
+        "SELECT * FROM reuniones_inicio_jornada WHERE id > ? AND nombre_supervisor = ? ORDER BY id LIMIT ?",
+        lambda rnd: (0, f'Supervisor {rnd.randrange(SUPERVISORES)}', 500)
+    ),
+    (
+        'exportar_reuniones_csv (1 día)',
+        "SELECT * FROM reuniones_inicio_jornada WHERE fecha BETWEEN ? AND ? ORDER BY fecha_registro",
+        lambda rnd: _rango(rnd, 1)
+    ),
+    (
+        'get_session',
+        "SELECT * FROM sesiones_temporales WHERE usuario_telegram_id = ? AND fecha_actualizacion >= ? "
+        "ORDER BY fecha_actualizacion DESC LIMIT 1",
+        lambda rnd: (rnd.randrange(USUARIOS), '2024-01-01 00:00:00')
+    ),
+]
+
+
+def _sentencias(version_desde: int, version_hasta: int) -> List[str]:
+    return [
+        sentencia
+        for migracion in MIGRACIONES if version_desde < migracion.version <= version_hasta
+        for sentencia in migracion.sentencias('sqlite')
+    ]
+
+
+def generar_base(ruta: str, filas: int, version: int, semilla: int = 42):
+    """
+    Crea la base sintética con el esquema de las migraciones hasta `version`
+
+    Las tablas se crean primero y los índices después de cargar los datos,
+    que es mucho más rápido que mantenerlos durante la carga.
+    """
+    rnd = random.Random(semilla)
+    sentencias = _sentencias(0, version)
+
+    conn = sqlite3.connect(ruta)
+    conn.execute('PRAGMA journal_mode = OFF')
+    conn.execute('PRAGMA synchronous = OFF')
+    for sentencia in sentencias:
+        if sentencia.lstrip().upper().startswith('CREATE TABLE'):
+            conn.execute(sentencia)
+
+    columnas = [
+        'departamento', 'fecha', 'categoria_maxima', 'nombre_supervisor', 'nombres_personal',
+        'hora_inicio', 'hora_termino', *CAMPOS_BOOLEANOS, 'meta_proposito_jornada',
+        'ruta_evidencia_fotografica', 'fecha_registro', 'usuario_telegram_id'
+    ]
+    insercion = (
+        f"INSERT INTO reuniones_inicio_jornada ({', '.join(columnas)}) "
+        f"VALUES ({', '.join('?' for _ in columnas)})"
+    )
+
+    def filas_sinteticas():
+        for i in range(filas):
+            # Los registros llegan aproximadamente en orden de fecha, como en producción
+            dia = min(DIAS - 1, int(i * DIAS / filas) + rnd.randrange(-2, 3)) if filas else 0
+            fecha = (INICIO + timedelta(days=max(0, dia))).isoformat()
+            supervisor = rnd.randrange(SUPERVISORES)
+            yield (
+                f'Departamento {supervisor % DEPARTAMENTOS}', fecha, 'Jefe de Turno',
+                f'Supervisor {supervisor}', '["Trabajador 1", "Trabajador 2", "Trabajador 3"]',
+                '07:30', '07:50', *(rnd.random() < 0.8 for _ in CAMPOS_BOOLEANOS),
+                'Cero accidentes', f'./photos/{i}.jpg',
+                f'{fecha} 08:{rnd.randrange(60):02d}:00', rnd.randrange(USUARIOS)
+            )
+
+    inicio = time.perf_counter()
+    conn.executemany(insercion, filas_sinteticas())
+    conn.executemany(
+        "INSERT INTO sesiones_temporales (id, usuario_telegram_id, estado, datos_sesion, "
+        "fecha_creacion, fecha_actualizacion) VALUES (?, ?, 'esperando_respuesta', '{}', ?, ?)",
+        ((f'{u}_1', u, '2024-06-01 08:00:00', '2024-06-01 08:10:00') for u in range(USUARIOS))
+    )
+    conn.commit()
+    print(f"Datos sintéticos: {filas:,} reuniones en {time.perf_counter() - inicio:.1f} s")
+
+    aplicar(conn, sentencias)
+    conn.close()
+
+
+def aplicar(conn: sqlite3.Connection, sentencias: List[str]):
+    inicio = time.perf_counter()
+    for sentencia in sentencias:
+        conn.execute(sentencia)
+    conn.commit()
+    print(f"Esquema e índices aplicados en {time.perf_counter() - inicio:.1f} s")
+
+
+def _problemas(plan: List[str]) -> List[str]:
+    problemas = []
+    for paso in plan:
+        if paso.startswith('SCAN') and 'COVERING INDEX' not in paso:
+            problemas.append('recorrido completo')
+        if 'USE TEMP B-TREE' in paso:
+            problemas.append('ordenamiento temporal')
+    return problemas
+
+
+def medir_carga(conn: sqlite3.Connection, repeticiones: int, semilla: int = 7) -> Dict[str, Dict[str, Any]]:
+    """
+    Ejecuta cada consulta de la carga con parámetros variados
+
+    Returns:
+        Dict de nombre a {'plan', 'problemas', 'ms'} (mediana por ejecución)
+    """
+    resultados = {}
+    for nombre, sql, parametros in CARGA:
+        rnd = random.Random(semilla)
+        plan = [fila[3] for fila in conn.execute(f"EXPLAIN QUERY PLAN {sql}", parametros(rnd))]
+
+        tiempos = []
+        for _ in range(repeticiones):
+            params = parametros(rnd)
+            inicio = time.perf_counter()
+            conn.execute(sql, params).fetchall()
+            tiempos.append((time.perf_counter() - inicio) * 1000)
+
+        resultados[nombre] = {'plan': plan, 'problemas': _problemas(plan), 'ms': statistics.median(tiempos)}
+    return resultados
+
+
+def imprimir(titulo: str, resultados: Dict[str, Dict[str, Any]]):
+    print(f"\n== {titulo} ==")
+    for nombre, resultado in resultados.items():
+        aviso = f"  [{', '.join(resultado['problemas'])}]" if resultado['problemas'] else ''
+        print(f"{nombre:<45} {resultado['ms']:10.2f} ms{aviso}")
+        for paso in resultado['plan']:
+            print(f"    {paso}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--filas', type=int, default=5_000_000)
+    parser.add_argument('--base', help='Ruta de la base sintética (se reutiliza si existe)')
+    parser.add_argument('--antes', type=int, default=ANTES_INDICES_COMPUESTOS,
+                        help='Versión de esquema de referencia (por defecto, la anterior a los índices compuestos)')
+    parser.add_argument('--repeticiones', type=int, default=20)
+    args = parser.parse_args()
+
+    ruta = args.base or os.path.join(tempfile.mkdtemp(), 'indices.db')
+    if not os.path.exists(ruta):
+        generar_base(ruta, args.filas, args.antes)
+
+    conn = sqlite3.connect(ruta)
+    version = conn.execute('PRAGMA user_version').fetchone()[0] or args.antes
+    conn.execute(f'PRAGMA user_version = {version}')
+
+    antes = medir_carga(conn, args.repeticiones)
+    imprimir(f"Esquema v{version}", antes)
+
+    if version < VERSION_ESQUEMA:
+        print()
+        aplicar(conn, _sentencias(version, VERSION_ESQUEMA))
+        conn.execute(f'PRAGMA user_version = {VERSION_ESQUEMA}')
+        despues = medir_carga(conn, args.repeticiones)
+        imprimir(f"Esquema v{VERSION_ESQUEMA}", despues)
+
+        print("\n== Comparación (mediana por consulta) ==")
+        for nombre in antes:
+            a, d = antes[nombre]['ms'], despues[nombre]['ms']
+            print(f"{nombre:<45} {a:10.2f} -> {d:10.2f} ms  ({a / d if d else float('inf'):6.1f}x)")
+
+    conn.close()
+    if not args.base:
+        os.remove(ruta)
+
+
+if __name__ == '__main__':
+    main()
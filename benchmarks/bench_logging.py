@@ -0,0 +1,89 @@
+# -*- coding: utf-8 -*-
+"""
+Benchmark del logging
+Mide cuánto espera el hilo que registra con un archivo rotativo síncrono
+(formateo, escritura y rotación en el mismo hilo, como el FileHandler anterior)
+frente a la cola de logging_setup.py, y el costo de un registro descartado por
+muestreo. Se rota cada --rotar-kb para que la rotación aparezca en la cola
+de la distribución.
+
+Uso: python -m benchmarks.bench_logging [--registros 20000] [--rotar-kb 256]
+
+Los archivos se escriben en un directorio temporal.
+"""
+
+import argparse
+import logging
+import logging.handlers
+import os
+import statistics
+import tempfile
+import time
+from typing import Callable, Dict
+
+
+def medir(funcion: Callable[[int], None], registros: int) -> Dict[str, float]:
+    """Mediana, p99 y máximo en microsegundos por registro"""
+    tiempos = []
+    for i in range(registros):
+        inicio = time.perf_counter()
+        funcion(i)
+        tiempos.append((time.perf_counter() - inicio) * 1_000_000)
+    tiempos.sort()
+    return {'p50': statistics.median(tiempos), 'p99': tiempos[int(len(tiempos) * 0.99)], 'max': tiempos[-1]}
+
+
+def registrar_extra(logger: logging.Logger) -> Callable[[int], None]:
+    return lambda i: logger.info("Fotografía recibida", extra={
+        'user_id': 100000 + i, 'sesion_id': 'abc123', 'estado': 'esperando_confirmacion_final',
+        'duracion_ms': 12.5
+    })
+
+
+def imprimir(nombre: str, tiempos: Dict[str, float]):
+    print(f"{nombre:<30}{tiempos['p50']:10.2f}{tiempos['p99']:10.2f}{tiempos['max']:12.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--registros', type=int, default=20000)
+    parser.add_argument('--rotar-kb', type=int, default=256)
+    args = parser.parse_args()
+
+    import logging_setup
+
+    directorio = tempfile.mkdtemp()
+    max_bytes = args.rotar_kb * 1024
+    raiz = logging.getLogger()
+    logger = logging.getLogger('bot.handlers')
+    print(f"{'Caso':<30}{'p50 µs':>10}{'p99 µs':>10}{'máx µs':>12}")
+
+    # Síncrono: formateo JSON, escritura y rotación en el hilo que registra
+    archivo = logging.handlers.RotatingFileHandler(
+        os.path.join(directorio, 'sincrono.log'), maxBytes=max_bytes, backupCount=3, encoding='utf-8'
+    )
+    archivo.setFormatter(logging_setup.FormateadorJSON())
+    raiz.addHandler(archivo)
+    raiz.setLevel(logging.INFO)
+    imprimir('síncrono', medir(registrar_extra(logger), args.registros))
+    raiz.removeHandler(archivo)
+    archivo.close()
+
+    # Cola: el hilo que registra solo encola (la consola se quita para medir solo el archivo)
+    escucha = logging_setup.configurar_logging(
+        'INFO', os.path.join(directorio, 'cola.log'), max_bytes=max_bytes, respaldos=3,
+        tamano_cola=args.registros * 2
+    )
+    escucha.handlers = tuple(h for h in escucha.handlers if isinstance(h, logging.FileHandler))
+    imprimir('cola', medir(registrar_extra(logger), args.registros))
+
+    escucha = logging_setup.configurar_logging(
+        'INFO', None, muestreo={'bot.handlers': 100}, tamano_cola=args.registros * 2
+    )
+    escucha.handlers = ()
+    imprimir('cola, muestreo 1 de 100', medir(registrar_extra(logger), args.registros))
+    logging_setup.detener_logging()
+
+
+if __name__ == '__main__':
+    main()
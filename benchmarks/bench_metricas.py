@@ -0,0 +1,80 @@
+# -*- coding: utf-8 -*-
+"""
+Benchmark de las métricas internas
+Mide el costo por observación de metrics.py (contador, histograma, decorador
+cronometrar y búsqueda de un hijo por etiquetas) y el tiempo de exportar el
+texto de Prometheus con muchas series.
+
+Uso: python -m benchmarks.bench_metricas [--observaciones 1000000] [--hilos 4]
+"""
+
+import argparse
+import threading
+import time
+import timeit
+from typing import Callable
+
+
+def costo_ns(funcion: Callable[[], object], observaciones: int) -> float:
+    """Mejor de 3 repeticiones, en ns por llamada"""
+    return min(timeit.repeat(funcion, number=observaciones, repeat=3)) / observaciones * 1e9
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--observaciones', type=int, default=1_000_000)
+    parser.add_argument('--hilos', type=int, default=4, help='Hilos observando a la vez (prueba de exactitud)')
+    args = parser.parse_args()
+
+    from metrics import RegistroMetricas, cronometrar
+
+    registro = RegistroMetricas()
+    contador = registro.contador('bench_total', 'Contador de prueba', ('resultado',)).etiquetas('ok')
+    familia = registro.histograma('bench_segundos', 'Histograma de prueba', ('tipo',))
+    histograma = familia.etiquetas('texto')
+
+    def funcion():
+        return None
+
+    cronometrada = cronometrar(histograma)(funcion)
+    n = args.observaciones
+
+    vacia = costo_ns(lambda: None, n)
+    base = costo_ns(funcion, n)
+    print(f"{'Operación':<44}{'ns':>8}")
+    for nombre, costo in (
+        ('Contador.inc()', costo_ns(lambda: contador.inc(), n) - vacia),
+        ('Histograma.observar()', costo_ns(lambda: histograma.observar(0.0012), n) - vacia),
+        ('Familia.etiquetas() (hijo existente)', costo_ns(lambda: familia.etiquetas('texto'), n) - vacia),
+        ('@cronometrar (incluye 2 lecturas del reloj)', costo_ns(cronometrada, n) - base),
+        ('time.perf_counter()', costo_ns(time.perf_counter, n)),
+    ):
+        print(f"{nombre:<44}{costo:8.0f}")
+
+    # Exactitud con varios hilos observando la misma métrica
+    por_hilo = 100_000
+    compartido = registro.histograma('bench_hilos_segundos', 'Histograma compartido').etiquetas()
+
+    def observar():
+        for _ in range(por_hilo):
+            compartido.observar(0.003)
+
+    hilos = [threading.Thread(target=observar) for _ in range(args.hilos)]
+    for hilo in hilos:
+        hilo.start()
+    for hilo in hilos:
+        hilo.join()
+    total = compartido.instantanea()[0][-1]
+    print(f"\n{args.hilos} hilos x {por_hilo:,} observaciones: {total:,} registradas "
+          f"({'exacto' if total == args.hilos * por_hilo else 'PERDIDAS'})")
+
+    # Exportación con 50 funciones x 18 cubetas
+    for i in range(50):
+        familia.etiquetas(f'funcion_{i}').observar(0.001 * i)
+    inicio = time.perf_counter()
+    texto = registro.exportar()
+    print(f"Exportación: {len(texto.splitlines()):,} líneas en {(time.perf_counter() - inicio) * 1000:.2f} ms")
+
+
+if __name__ == '__main__':
+    main()
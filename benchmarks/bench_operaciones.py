@@ -0,0 +1,372 @@
+# -*- coding: utf-8 -*-
+"""
+Micro-benchmarks de database/models.py y SessionService
+Mide cada función de database/models.py que usa el bot y cada operación de
+SessionService que modifica sesiones, sobre bases SQLite sintéticas de 1 000,
+100 000 y 1 000 000 de reuniones (con el mismo número de sesiones abiertas).
+Informa mediana, p95 y mínimo por llamada, incluidos la conexión y el
+cronometraje de métricas, como en el bot.
+
+Con --guardar el resultado se escribe en JSON (versión, commit, SQLite) y con
+--comparar se compara con uno anterior: termina con código 1 si alguna
+operación tiene una mediana mayor que la de referencia × --tolerancia.
+
+Uso: python -m benchmarks.bench_operaciones [--filas 1000 100000 1000000] [--directorio cache/]
+     python -m benchmarks.bench_operaciones --guardar benchmarks/operaciones-1.4.json
+     python -m benchmarks.bench_operaciones --comparar benchmarks/operaciones-1.4.json --tolerancia 1.2
+
+Con --directorio las bases sintéticas se conservan y se reutilizan (cada
+ejecución trabaja sobre una copia).
+"""
+
+import argparse
+import json
+import os
+import platform
+import random
+import shutil
+import sqlite3
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+from benchmarks.bench_arranque import commit_actual
+from benchmarks.bench_indices import CAMPOS_BOOLEANOS, DIAS, INICIO, generar_base
+from config import Config
+from database.migrations import VERSION_ESQUEMA
+from services.session_codec import obtener_codec
+from services.session_state import Respuestas, Sesion
+
+# IDs de Telegram de las sesiones sintéticas
+PRIMER_USUARIO = 500_000_000
+
+# Sesiones vencidas que se insertan antes de cada limpieza medida
+SESIONES_VENCIDAS = 50
+
+# Operación: (nombre, preparar(i) sin cronometrar, ejecutar(i, preparado), pesada)
+Operacion = Tuple[str, Optional[Callable[[int], Any]], Callable[[int, Any], Any], bool]
+
+RESPUESTAS = {
+    'departamento': 'Mantenimiento Eléctrico', 'fecha': '2024-06-01', 'categoria_maxima': 'Jefe de Turno',
+    'nombre_supervisor': 'Ana Pérez', 'nombres_personal': ['Luis Gómez', 'María López', 'Pedro Soto'],
+    'hora_inicio': '07:30', 'hora_termino': '07:50',
+    'saludo_inicio_jornada': True, 'enumero_personal': True, 'pregunto_estado_salud': True
+}
+
+
+def _datos_sesion(rnd: random.Random) -> bytes:
+    """Sesión a mitad de la conversación, en el formato de SESSION_CODEC"""
+    respondidas = dict(list(RESPUESTAS.items())[:rnd.randrange(1, len(RESPUESTAS) + 1)])
+    sesion = Sesion('', 0, 0, 'esperando_respuesta', respuestas=Respuestas(**respondidas),
+                    numero_pregunta=len(respondidas))
+    return obtener_codec(Config.SESSION_CODEC).codificar(sesion)
+
+
+def generar_sesiones(ruta: str, filas: int, semilla: int = 42):
+    """
+    Reemplaza las sesiones de la base sintética por `filas` sesiones abiertas
+    """
+    rnd = random.Random(semilla)
+    conn = sqlite3.connect(ruta)
+    conn.execute('PRAGMA journal_mode = OFF')
+    conn.execute('PRAGMA synchronous = OFF')
+    conn.execute('DELETE FROM sesiones_temporales')
+    conn.executemany(
+        "INSERT INTO sesiones_temporales (id, usuario_telegram_id, estado, pregunta_actual, datos_sesion, "
+        "fecha_creacion, fecha_actualizacion) VALUES (?, ?, 'esperando_respuesta', 'hora_termino', ?, ?, ?)",
+        (
+            (f'{usuario}_20240601072500000000', usuario, _datos_sesion(rnd),
+             '2024-06-01 07:25:00', '2024-06-01 07:25:00')
+            for usuario in range(PRIMER_USUARIO, PRIMER_USUARIO + filas)
+        )
+    )
+    conn.execute(f'PRAGMA user_version = {VERSION_ESQUEMA}')
+    conn.commit()
+    conn.close()
+
+
+def preparar_base(filas: int, directorio_cache: Optional[str], trabajo: str) -> str:
+    """
+    Obtiene una copia de trabajo de la base sintética de `filas` reuniones
+
+    Las sesiones de la copia se marcan como recién usadas para que sigan
+    vigentes aunque la base guardada sea de otro día.
+    """
+    ruta = os.path.join(trabajo, f'operaciones-{filas}.db')
+    original = os.path.join(directorio_cache or trabajo, f'operaciones-{filas}-v{VERSION_ESQUEMA}.db')
+    if not os.path.exists(original):
+        generar_base(original, filas, VERSION_ESQUEMA)
+        generar_sesiones(original, filas)
+    if directorio_cache:
+        shutil.copyfile(original, ruta)
+    else:
+        os.replace(original, ruta)
+
+    from database.models import timestamp_utc
+    conn = sqlite3.connect(ruta)
+    conn.execute("UPDATE sesiones_temporales SET fecha_actualizacion = ?", (timestamp_utc(),))
+    conn.commit()
+    conn.close()
+    return ruta
+
+
+def _reunion(i: int) -> Dict[str, Any]:
+    return {
+        **RESPUESTAS,
+        **{campo: i % 5 != 0 for campo in CAMPOS_BOOLEANOS},
+        'otra_informacion': 'Se revisó el andamio del sector norte',
+        'meta_proposito_jornada': 'Cero accidentes',
+        'observaciones': 'Se reforzó el uso de arnés en trabajos en altura',
+        'ruta_evidencia_fotografica': f'./photos/bench_{i}.jpg',
+        'usuario_telegram_id': PRIMER_USUARIO + i
+    }
+
+
+def operaciones(filas: int, directorio: str) -> List[Operacion]:
+    """
+    Operaciones medidas; las que eliminan sesiones las crean antes (sin
+    cronometrar) para usuarios nuevos
+    """
+    from database import models
+    from services.session_service import SessionService
+
+    servicio = SessionService(Config.SESSION_TIMEOUT_MINUTES, Config.SESSION_CODEC)
+    ultimo_dia = INICIO + timedelta(days=DIAS - 1)
+    mes = ((ultimo_dia - timedelta(days=29)).isoformat(), ultimo_dia.isoformat())
+
+    def usuario(i: int) -> int:
+        return PRIMER_USUARIO + i % filas
+
+    def sesion(i: int) -> str:
+        return f'{usuario(i)}_20240601072500000000'
+
+    # Usuarios fuera de las sesiones sintéticas (sesiones vencidas o por eliminar)
+    usuarios_nuevos: Iterator[int] = iter(range(PRIMER_USUARIO + filas, sys.maxsize))
+
+    def sesion_nueva(i: int) -> int:
+        u = next(usuarios_nuevos)
+        models.save_session(u, u, _datos_sesion(random.Random(i)), estado='esperando_respuesta')
+        return u
+
+    def insertar_vencidas(i: int):
+        from database.models import get_db_connection, timestamp_utc
+        hace_dos_dias = timestamp_utc(timedelta(days=2))
+        with get_db_connection() as conn:
+            for _ in range(SESIONES_VENCIDAS):
+                u = next(usuarios_nuevos)
+                conn.execute(
+                    "INSERT INTO sesiones_temporales (id, usuario_telegram_id, estado, datos_sesion, "
+                    "fecha_creacion, fecha_actualizacion) VALUES (?, ?, 'esperando_respuesta', '{}', ?, ?)",
+                    (f'{u}_1', u, hace_dos_dias, hace_dos_dias)
+                )
+            conn.commit()
+
+    def reunion_existente(i: int) -> int:
+        return 1 + (i * 7919) % filas
+
+    csv = os.path.join(directorio, 'exportacion.csv')
+
+    return [
+        # database/models.py
+        ('models.guardar_reunion_completa', None,
+         lambda i, _: models.guardar_reunion_completa(_reunion(i))['exito'], False),
+        ('models.obtener_reunion_por_id', None,
+         lambda i, _: models.obtener_reunion_por_id(reunion_existente(i)), False),
+        ('models.obtener_reuniones_por_usuario', None,
+         lambda i, _: models.obtener_reuniones_por_usuario(i % 5000) is not None, False),
+        ('models.obtener_estadisticas_reuniones (30 días)', None,
+         lambda i, _: models.obtener_estadisticas_reuniones(*mes)['total_reuniones'], True),
+        ('models.obtener_estadisticas_reuniones (todo)', None,
+         lambda i, _: models.obtener_estadisticas_reuniones()['total_reuniones'], True),
+        ('models.exportar_reuniones_csv (30 días)', None,
+         lambda i, _: models.exportar_reuniones_csv(csv, *mes), True),
+        ('models.limpiar_sesiones_expiradas', insertar_vencidas,
+         lambda i, _: models.limpiar_sesiones_expiradas(24) == SESIONES_VENCIDAS, False),
+
+        # SessionService (flujo de conversación)
+        ('SessionService.guardar_respuesta', None,
+         lambda i, _: servicio.guardar_respuesta(sesion(i), 'hora_termino', '07:50'), False),
+        ('SessionService.actualizar_estado_sesion', None,
+         lambda i, _: servicio.actualizar_estado_sesion(
+             sesion(i), 'esperando_respuesta', {'pregunta_actual': 'hora_termino'}), False),
+
+        # SessionService (API original)
+        ('SessionService.update_session', lambda i: servicio.get_session(usuario(i)),
+         lambda i, datos: servicio.update_session(usuario(i), datos), False),
+        ('SessionService.add_answer', None,
+         lambda i, _: servicio.add_answer(usuario(i), 'hora_inicio', '07:30'), False),
+        ('SessionService.add_photo', None,
+         lambda i, _: servicio.add_photo(usuario(i), f'./photos/{i}.jpg'), False),
+        ('SessionService.advance_question', None,
+         lambda i, _: servicio.advance_question(usuario(i)), False),
+        ('SessionService.set_status', None,
+         lambda i, _: servicio.set_status(usuario(i), 'waiting_photo'), False),
+        ('SessionService.clean_expired_sessions', insertar_vencidas,
+         lambda i, _: servicio.clean_expired_sessions() == SESIONES_VENCIDAS, False),
+
+        # Reemplazan la sesión
+        ('SessionService.create_session', None,
+         lambda i, _: servicio.create_session(usuario(i), usuario(i)), False),
+        ('SessionService.crear_nueva_sesion', None,
+         lambda i, _: servicio.crear_nueva_sesion(usuario(i)), False),
+
+        # Eliminan la sesión
+        ('SessionService.delete_session', sesion_nueva,
+         lambda i, u: servicio.delete_session(u), False),
+        ('SessionService.cancelar_sesion', sesion_nueva,
+         lambda i, u: servicio.cancelar_sesion(u)['exito'], False),
+        ('SessionService.finalizar_sesion', sesion_nueva,
+         lambda i, u: servicio.finalizar_sesion(f'{u}_0'), False),
+    ]
+
+
+def medir_ronda(preparar: Optional[Callable[[int], Any]], ejecutar: Callable[[int, Any], Any],
+                desde: int, repeticiones: int) -> Tuple[List[float], int]:
+    """
+    Tiempos ordenados en microsegundos por llamada y llamadas sin éxito
+    """
+    tiempos, fallos = [], 0
+    for i in range(desde, desde + repeticiones):
+        preparado = preparar(i) if preparar else None
+        inicio = time.perf_counter()
+        resultado = ejecutar(i, preparado)
+        tiempos.append((time.perf_counter() - inicio) * 1_000_000)
+        if not resultado:
+            fallos += 1
+    tiempos.sort()
+    return tiempos, fallos
+
+
+def ejecutar_tamano(filas: int, args: argparse.Namespace, trabajo: str) -> Dict[str, Dict[str, float]]:
+    """
+    Mide las operaciones sobre la base de `filas` reuniones
+
+    Las rondas se alternan entre operaciones y de cada operación se informa la
+    ronda de menor mediana: una pausa del disco o de la máquina afecta a una
+    ronda, no a todas, y no se confunde con una regresión.
+    """
+    from database.backends import cerrar_backend
+
+    ruta = preparar_base(filas, args.directorio, trabajo)
+    os.environ['DATABASE_URL'] = f'sqlite:///{ruta}'
+    cerrar_backend()
+
+    medidas = [
+        (nombre, preparar, ejecutar, min(args.repeticiones_pesadas if pesada else args.repeticiones, filas))
+        for nombre, preparar, ejecutar, pesada in operaciones(filas, trabajo)
+        if not args.solo or args.solo in nombre
+    ]
+    mejores: Dict[str, List[float]] = {}
+    fallos: Dict[str, int] = {}
+    for ronda in range(args.rondas):
+        for nombre, preparar, ejecutar, repeticiones in medidas:
+            tiempos, sin_exito = medir_ronda(preparar, ejecutar, ronda * repeticiones, repeticiones)
+            fallos[nombre] = fallos.get(nombre, 0) + sin_exito
+            if nombre not in mejores or statistics.median(tiempos) < statistics.median(mejores[nombre]):
+                mejores[nombre] = tiempos
+
+    cerrar_backend()
+    os.remove(ruta)
+
+    print(f"\n== {filas:,} reuniones y sesiones ==")
+    print(f"{'Operación':<50}{'mediana µs':>12}{'p95 µs':>12}{'mín µs':>12}")
+    resultados = {}
+    for nombre, _, _, repeticiones in medidas:
+        tiempos = mejores[nombre]
+        resultado = resultados[nombre] = {
+            'mediana_us': round(statistics.median(tiempos), 1),
+            'p95_us': round(tiempos[min(len(tiempos) - 1, int(len(tiempos) * 0.95))], 1),
+            'min_us': round(tiempos[0], 1),
+            'n': repeticiones * args.rondas,
+            'fallos': fallos[nombre]
+        }
+        aviso = f"  [{resultado['fallos']} llamadas sin éxito]" if resultado['fallos'] else ''
+        print(f"{nombre:<50}{resultado['mediana_us']:12.1f}{resultado['p95_us']:12.1f}"
+              f"{resultado['min_us']:12.1f}{aviso}")
+    return resultados
+
+
+def comparar(actual: Dict[str, Dict[str, Dict[str, float]]], referencia: Dict[str, Any],
+             tolerancia: float) -> List[str]:
+    """
+    Compara las medianas con las de un resultado anterior
+
+    Returns:
+        List[str]: Operaciones más lentas que la referencia × tolerancia
+    """
+    regresiones = []
+    print(f"\n== Comparación con {referencia.get('version')} ({referencia.get('commit') or 'sin commit'}, "
+          f"{referencia.get('fecha')}), tolerancia ×{tolerancia} ==")
+    for filas, operaciones_actuales in actual.items():
+        anteriores = referencia['resultados'].get(filas, {})
+        for nombre, resultado in operaciones_actuales.items():
+            anterior = anteriores.get(nombre)
+            if not anterior:
+                continue
+            razon = resultado['mediana_us'] / anterior['mediana_us'] if anterior['mediana_us'] else 1.0
+            marca = ''
+            if razon > tolerancia:
+                marca = '  REGRESIÓN'
+                regresiones.append(f"{nombre} ({filas} filas): ×{razon:.2f}")
+            print(f"{filas:>9} {nombre:<50}{anterior['mediana_us']:10.1f} -> {resultado['mediana_us']:10.1f} µs"
+                  f"  ×{razon:.2f}{marca}")
+    return regresiones
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--filas', type=int, nargs='+', default=[1000, 100_000, 1_000_000])
+    parser.add_argument('--repeticiones', type=int, default=200)
+    parser.add_argument('--repeticiones-pesadas', type=int, default=10,
+                        help='Repeticiones de estadísticas y exportación')
+    parser.add_argument('--rondas', type=int, default=3, help='Rondas por operación (se informa la mejor)')
+    parser.add_argument('--solo', help='Medir solo las operaciones cuyo nombre contiene este texto')
+    parser.add_argument('--directorio', help='Directorio donde conservar las bases sintéticas')
+    parser.add_argument('--guardar', help='Archivo JSON donde escribir el resultado')
+    parser.add_argument('--comparar', help='Resultado JSON de referencia')
+    parser.add_argument('--tolerancia', type=float, default=1.2,
+                        help='Razón máxima entre la mediana actual y la de referencia')
+    args = parser.parse_args()
+
+    import logging
+    logging.disable(logging.WARNING)
+    if args.directorio:
+        os.makedirs(args.directorio, exist_ok=True)
+
+    trabajo = tempfile.mkdtemp()
+    try:
+        resultados = {str(filas): ejecutar_tamano(filas, args, trabajo) for filas in args.filas}
+    finally:
+        shutil.rmtree(trabajo, ignore_errors=True)
+
+    documento = {
+        'fecha': datetime.now().isoformat(timespec='seconds'),
+        'version': Config.APP_VERSION,
+        'commit': commit_actual(),
+        'python': platform.python_version(),
+        'sqlite': sqlite3.sqlite_version,
+        'repeticiones': args.repeticiones,
+        'rondas': args.rondas,
+        'resultados': resultados
+    }
+    if args.guardar:
+        with open(args.guardar, 'w', encoding='utf-8') as archivo:
+            json.dump(documento, archivo, ensure_ascii=False, indent=2)
+        print(f"\nResultado escrito en {args.guardar}")
+
+    if args.comparar:
+        with open(args.comparar, encoding='utf-8') as archivo:
+            regresiones = comparar(resultados, json.load(archivo), args.tolerancia)
+        if regresiones:
+            print(f"\n{len(regresiones)} operaciones más lentas que la referencia:")
+            for regresion in regresiones:
+                print(f"  {regresion}")
+            sys.exit(1)
+        print("\nSin regresiones")
+
+
+if __name__ == '__main__':
+    main()
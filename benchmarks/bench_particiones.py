@@ -0,0 +1,157 @@
+# -*- coding: utf-8 -*-
+"""
+Benchmark de particiones mensuales
+Carga historiales sintéticos de distinta longitud y mide las consultas del mes
+actual de database/models.py con la tabla sin particionar (esquema v3) y
+particionada por mes (v4). Con particiones el tiempo de "este mes" no debe
+crecer con los años acumulados.
+
+Uso: python -m benchmarks.bench_particiones --url postgresql://... [--meses 12 60]
+                                            [--filas-por-mes 20000] [--repeticiones 20]
+
+ATENCIÓN: usar una base desechable; las tablas de la aplicación se borran y se
+vuelven a crear en cada medición. Sin --url se usa un SQLite temporal (SQLite no
+particiona, así que v3 y v4 coinciden).
+"""
+
+import argparse
+import json
+import os
+import random
+import statistics
+import tempfile
+import time
+from datetime import date, timedelta
+from typing import Callable, Dict, List
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+COLUMNAS = [
+    'departamento', 'fecha', 'categoria_maxima', 'nombre_supervisor', 'nombres_personal',
+    'hora_inicio', 'hora_termino', 'meta_proposito_jornada', 'ruta_evidencia_fotografica',
+    'fecha_registro', 'usuario_telegram_id'
+]
+
+
+def _filas(meses: int, filas_por_mes: int, semilla: int = 42):
+    rnd = random.Random(semilla)
+    hoy = date.today()
+    inicio = date(hoy.year, hoy.month, 1)
+    for _ in range(meses - 1):
+        inicio = (inicio - timedelta(days=1)).replace(day=1)
+
+    total = meses * filas_por_mes
+    dias = (hoy - inicio).days + 1
+    for i in range(total):
+        # En orden aproximado de fecha, como llegan en producción
+        fecha = inicio + timedelta(days=min(dias - 1, int(i * dias / total)))
+        supervisor = rnd.randrange(2000)
+        yield (
+            f'Departamento {supervisor % 50}', fecha.isoformat(), 'Jefe de Turno', f'Supervisor {supervisor}',
+            json.dumps(['Trabajador 1', 'Trabajador 2']), '07:30', '07:50', 'Cero accidentes',
+            f'./photos/{i}.jpg', f'{fecha.isoformat()} 08:{rnd.randrange(60):02d}:00', rnd.randrange(5000)
+        )
+
+
+def preparar(version: int, meses: int, filas_por_mes: int) -> float:
+    """
+    Recrea el esquema en la versión indicada y carga el historial sintético
+
+    Returns:
+        float: Segundos de carga
+    """
+    from database.backends import obtener_backend
+    from database.migrations import MIGRACIONES, aplicar_migraciones
+    from database.models import get_db_connection
+
+    backend = obtener_backend()
+    with get_db_connection() as conn:
+        for tabla in ('reuniones_inicio_jornada', 'sesiones_temporales', 'schema_version'):
+            conn.execute(f"DROP TABLE IF EXISTS {tabla}{' CASCADE' if backend.nombre == 'postgresql' else ''}")
+        if backend.nombre == 'postgresql':
+            conn.execute("DROP SEQUENCE IF EXISTS reuniones_inicio_jornada_id_seq_particionada")
+        conn.commit()
+
+    aplicar_migraciones(migraciones=MIGRACIONES[:version])
+
+    inicio = time.perf_counter()
+    if backend.nombre == 'postgresql':
+        from database.partitions import asegurar_particiones, mes_de, sumar_meses
+
+        # Sin partición propia las filas irían a la partición por defecto
+        asegurar_particiones(meses, desde=sumar_meses(mes_de(date.today()), 1 - meses))
+        with get_db_connection() as conn:
+            cursor = conn.cursor_nativo()
+            with cursor.copy(f"COPY reuniones_inicio_jornada ({', '.join(COLUMNAS)}) FROM STDIN") as copia:
+                for fila in _filas(meses, filas_por_mes):
+                    copia.write_row(fila)
+            conn.commit()
+            conn.execute("ANALYZE reuniones_inicio_jornada")
+    else:
+        with get_db_connection() as conn:
+            conn.executemany(
+                f"INSERT INTO reuniones_inicio_jornada ({', '.join(COLUMNAS)}) "
+                f"VALUES ({', '.join('?' for _ in COLUMNAS)})",
+                _filas(meses, filas_por_mes)
+            )
+            conn.commit()
+    return time.perf_counter() - inicio
+
+
+def consultas_mes_actual() -> Dict[str, Callable[[], object]]:
+    from database import models
+
+    hoy = date.today()
+    inicio_mes = date(hoy.year, hoy.month, 1).isoformat()
+    archivo = os.path.join(tempfile.gettempdir(), 'bench_particiones.csv')
+
+    return {
+        'estadísticas del mes': lambda: models.obtener_estadisticas_reuniones(inicio_mes, hoy.isoformat()),
+        'reuniones de hoy': lambda: models.obtener_reuniones_por_fecha(hoy.isoformat()),
+        'departamento en el mes (iterar)': lambda: list(models.iterar_reuniones(
+            inicio_mes, hoy.isoformat(), departamento='Departamento 7'
+        )),
+        'exportar CSV del mes': lambda: models.exportar_reuniones_csv(archivo, inicio_mes, hoy.isoformat()),
+    }
+
+
+def medir(repeticiones: int) -> Dict[str, float]:
+    resultados = {}
+    for nombre, consulta in consultas_mes_actual().items():
+        consulta()  # calentamiento (caché y sentencias preparadas)
+        tiempos = []
+        for _ in range(repeticiones):
+            inicio = time.perf_counter()
+            consulta()
+            tiempos.append((time.perf_counter() - inicio) * 1000)
+        resultados[nombre] = statistics.median(tiempos)
+    return resultados
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--url', help='DATABASE_URL de una base desechable')
+    parser.add_argument('--meses', type=int, nargs='+', default=[12, 60], help='Longitudes del historial')
+    parser.add_argument('--filas-por-mes', type=int, default=20000)
+    parser.add_argument('--repeticiones', type=int, default=20)
+    args = parser.parse_args()
+
+    directorio = tempfile.mkdtemp()
+    os.environ['DATABASE_URL'] = args.url or f"sqlite:///{os.path.join(directorio, 'particiones.db')}"
+
+    resultados: Dict[str, Dict[str, float]] = {}
+    for meses in args.meses:
+        for version in (3, 4):
+            carga = preparar(version, meses, args.filas_por_mes)
+            etiqueta = f"{meses} meses, v{version}"
+            resultados[etiqueta] = medir(args.repeticiones)
+            print(f"{etiqueta}: {meses * args.filas_por_mes:,} reuniones cargadas en {carga:.1f} s")
+
+    nombres: List[str] = list(next(iter(resultados.values())))
+    print(f"\n{'Consulta (mediana, ms)':<34}" + ''.join(f"{etiqueta:>18}" for etiqueta in resultados))
+    for nombre in nombres:
+        print(f"{nombre:<34}" + ''.join(f"{resultados[etiqueta][nombre]:18.2f}" for etiqueta in resultados))
+
+
+if __name__ == '__main__':
+    main()
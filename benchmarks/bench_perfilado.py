@@ -0,0 +1,103 @@
+# -*- coding: utf-8 -*-
+"""
+Benchmark del perfilado de actualizaciones
+Recorre conversaciones completas (confirmación y todas las preguntas hasta la
+foto) con ConversationManager sobre un SQLite temporal y mide el costo por
+actualización sin perfilado, con una fracción perfilada y con todas
+perfiladas. Al final muestra los marcos con más tiempo propio del perfil y
+la ruta del archivo .folded (flamegraph.pl o speedscope).
+
+Uso: python -m benchmarks.bench_perfilado [--usuarios 100] [--tasas 0 0.01 1]
+"""
+
+import argparse
+import asyncio
+import os
+import tempfile
+import time
+from collections import defaultdict
+from datetime import date
+from types import SimpleNamespace
+from typing import Dict, List
+
+
+def _respuestas(preguntas: Dict[str, Dict]) -> List[str]:
+    """Una respuesta válida por pregunta, en el orden de la conversación"""
+    por_tipo = {
+        'texto': 'Distribución zona centro', 'texto_opcional': 'Sin novedades',
+        'fecha': date.today().strftime('%d/%m/%Y'), 'hora': '07:30',
+        'lista_nombres': 'Ana Pérez, Luis Gómez, María López', 'boolean': 'Sí'
+    }
+    return ['Sí'] + [por_tipo[config['tipo']] for config in preguntas.values() if config['tipo'] != 'foto']
+
+
+async def recorrer(manejador, conversation_manager, usuarios: int, primer_usuario: int, respuestas: List[str]) -> float:
+    """Microsegundos promedio por actualización"""
+    total, actualizaciones = 0.0, 0
+    for user_id in range(primer_usuario, primer_usuario + usuarios):
+        conversation_manager.iniciar_reunion(user_id)
+        for texto in respuestas:
+            update = SimpleNamespace(effective_user=SimpleNamespace(id=user_id), texto=texto)
+            inicio = time.perf_counter()
+            await manejador(update, None)
+            total += time.perf_counter() - inicio
+            actualizaciones += 1
+    return total / actualizaciones * 1_000_000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--usuarios', type=int, default=100)
+    parser.add_argument('--tasas', type=float, nargs='+', default=[0, 0.01, 1])
+    args = parser.parse_args()
+
+    directorio = tempfile.mkdtemp()
+    os.environ['DATABASE_URL'] = f"sqlite:///{os.path.join(directorio, 'perfilado.db')}"
+    import logging
+    logging.disable(logging.WARNING)
+
+    from bot.conversation import ConversationManager
+    from database.models import create_tables
+    from services.profiling_service import ProfilingService
+
+    create_tables()
+    conversation_manager = ConversationManager()
+    session_service = conversation_manager.session_service
+    respuestas = _respuestas(conversation_manager.preguntas)
+
+    def contexto(update):
+        sesion = session_service.obtener_sesion_activa(update.effective_user.id)
+        return (sesion.estado, sesion.pregunta_actual) if sesion else (None, None)
+
+    print(f"{args.usuarios} conversaciones de {len(respuestas)} mensajes")
+    print(f"{'tasa':>8}{'µs por actualización':>24}{'perfiladas':>12}")
+    perfil = None
+    for i, tasa in enumerate(args.tasas):
+        servicio = ProfilingService(tasa, os.path.join(directorio, 'perfiles'), contexto=contexto)
+
+        @servicio.perfilar('mensaje')
+        async def manejador(update, context):
+            conversation_manager.procesar_mensaje(update.effective_user.id, update.texto)
+
+        promedio = asyncio.run(recorrer(manejador, conversation_manager, args.usuarios, 100000 * (i + 1), respuestas))
+        print(f"{tasa:8.2f}{promedio:24.1f}{servicio.metricas['perfiladas']:12}")
+        if servicio.activo:
+            perfil = servicio
+
+    if perfil is None:
+        return
+
+    rutas = perfil.escribir()
+    propio: Dict[str, int] = defaultdict(int)
+    for linea in open(rutas[0], encoding='utf-8'):
+        pila, microsegundos = linea.rsplit(' ', 1)
+        propio[pila.rsplit(';', 1)[-1]] += int(microsegundos)
+    total = sum(propio.values())
+    print(f"\nMarcos con más tiempo propio (tasa {perfil.sample_rate}):")
+    for marco, microsegundos in sorted(propio.items(), key=lambda x: -x[1])[:10]:
+        print(f"{microsegundos / total:7.1%}  {marco}")
+    print(f"\nArchivo: {rutas[0]}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,179 @@
+# -*- coding: utf-8 -*-
+"""
+Benchmark de la réplica de lectura
+Mide la latencia de escritura de las conversaciones del bot (sesiones y
+reuniones de database/models.py) mientras otros procesos exportan CSV completos
+y calculan estadísticas sin pausa, en tres escenarios: sin reportes, reportes
+sobre la base principal y reportes sobre la réplica (renovada periódicamente
+con ReplicaService, cuyo costo se incluye en la medición).
+
+Uso: python -m benchmarks.bench_replica [--reuniones 200000] [--segundos 10]
+                                        [--escritores 4] [--lectores 2] [--refresco 2]
+                                        [--modo-journal WAL]
+
+Se usa un SQLite temporal.
+"""
+
+import argparse
+import json
+import multiprocessing
+import os
+import statistics
+import tempfile
+import threading
+import time
+from typing import Any, Dict, List
+
+USUARIO_BASE = 9_000_000_000_000
+
+
+def _reunion(i: int) -> Dict[str, Any]:
+    return {
+        'departamento': f'Departamento {i % 50}',
+        'fecha': f'2024-{i % 12 + 1:02d}-{i % 28 + 1:02d}',
+        'categoria_maxima': 'Jefe de Turno',
+        'nombre_supervisor': f'Supervisor {i % 2000}',
+        'nombres_personal': ['Trabajador 1', 'Trabajador 2', 'Trabajador 3'],
+        'hora_inicio': '07:30',
+        'hora_termino': '07:50',
+        'meta_proposito_jornada': 'Cero accidentes',
+        'ruta_evidencia_fotografica': f'./photos/{i}.jpg',
+        'usuario_telegram_id': USUARIO_BASE + i
+    }
+
+
+def preparar(reuniones: int):
+    from database import models
+
+    models.create_tables()
+    columnas = list(_reunion(0).keys())
+    with models.get_db_connection() as conn:
+        conn.executemany(
+            f"INSERT INTO reuniones_inicio_jornada ({', '.join(columnas)}) "
+            f"VALUES ({', '.join('?' for _ in columnas)})",
+            ([json.dumps(v) if isinstance(v, list) else v for v in _reunion(i).values()] for i in range(reuniones))
+        )
+        conn.commit()
+
+
+def _escritor(hilo: int, fin: float, latencias: List[float], errores: List[int]):
+    from database import models
+
+    i = 0
+    while time.monotonic() < fin:
+        usuario_id = USUARIO_BASE + 500_000_000 + hilo * 1_000_000 + i
+        for operacion in (
+            lambda: models.save_session(usuario_id, usuario_id, '{}', 'esperando_respuesta', 'p0'),
+            lambda: models.update_session(usuario_id, '{"p": 1}', None, 'p1'),
+            lambda: models.guardar_reunion_completa(_reunion(usuario_id - USUARIO_BASE)),
+            lambda: models.delete_session(usuario_id),
+        ):
+            inicio = time.perf_counter()
+            resultado = operacion()
+            latencias.append(time.perf_counter() - inicio)
+            if resultado is False or (isinstance(resultado, dict) and resultado.get('exito') is False):
+                errores[0] += 1
+        i += 1
+
+
+def _lector(replica: bool, segundos: float, directorio: str, contador: Any):
+    import logging
+    from database import models
+
+    logging.disable(logging.INFO)
+    # Proceso aparte, como un reporte lanzado fuera del bot: compite por la base, no por el GIL
+    archivo = os.path.join(directorio, f'exportacion_{os.getpid()}.csv')
+    fin = time.monotonic() + segundos
+    while time.monotonic() < fin:
+        models.exportar_reuniones_csv(archivo, replica=replica)
+        models.obtener_estadisticas_reuniones(replica=replica)
+        with contador.get_lock():
+            contador.value += 1
+
+
+def _refresco(servicio: Any, intervalo: float, fin: float):
+    while time.monotonic() < fin:
+        servicio.actualizar()
+        time.sleep(intervalo)
+
+
+def escenario(nombre: str, segundos: float, escritores: int, lectores: int, replica: bool,
+              refresco: float, directorio: str) -> Dict[str, Any]:
+    from services.replica_service import ReplicaService
+
+    servicio = ReplicaService()
+    if replica:
+        servicio.actualizar()
+
+    contexto = multiprocessing.get_context('spawn')
+    reportes = contexto.Value('i', 0)
+    procesos = [
+        contexto.Process(target=_lector, args=(replica, segundos, directorio, reportes)) for _ in range(lectores)
+    ]
+    for proceso in procesos:
+        proceso.start()
+
+    fin = time.monotonic() + segundos
+    latencias = [[] for _ in range(escritores)]
+    errores = [[0] for _ in range(escritores)]
+    hilos = [threading.Thread(target=_escritor, args=(h, fin, latencias[h], errores[h])) for h in range(escritores)]
+    if replica:
+        hilos.append(threading.Thread(target=_refresco, args=(servicio, refresco, fin)))
+
+    for hilo in hilos:
+        hilo.start()
+    for hilo in hilos:
+        hilo.join()
+    for proceso in procesos:
+        proceso.join()
+
+    tiempos = sorted(t for lat in latencias for t in lat)
+    return {
+        'escenario': nombre,
+        'escrituras_segundo': len(tiempos) / segundos,
+        'p50_ms': statistics.median(tiempos) * 1000,
+        'p99_ms': tiempos[int(len(tiempos) * 0.99)] * 1000,
+        'max_ms': tiempos[-1] * 1000,
+        'errores': sum(e[0] for e in errores),
+        'reportes': reportes.value,
+        'copias_replica': servicio.totales['actualizaciones']
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--reuniones', type=int, default=200000, help='Reuniones cargadas antes de medir')
+    parser.add_argument('--segundos', type=float, default=10, help='Duración de cada escenario')
+    parser.add_argument('--escritores', type=int, default=4, help='Hilos con conversaciones')
+    parser.add_argument('--lectores', type=int, default=2, help='Hilos exportando y calculando estadísticas')
+    parser.add_argument('--refresco', type=float, default=2, help='Segundos entre copias de la réplica')
+    parser.add_argument('--modo-journal', default='WAL', help='journal_mode de la base principal')
+    args = parser.parse_args()
+
+    directorio = tempfile.mkdtemp()
+    os.environ['DATABASE_URL'] = f"sqlite:///{os.path.join(directorio, 'principal.db')}"
+    os.environ['DATABASE_REPLICA_URL'] = f"sqlite:///{os.path.join(directorio, 'replica.db')}"
+    os.environ['SQLITE_JOURNAL_MODE'] = args.modo_journal
+
+    inicio = time.perf_counter()
+    preparar(args.reuniones)
+    print(f"{args.reuniones:,} reuniones cargadas en {time.perf_counter() - inicio:.1f} s "
+          f"(journal_mode={args.modo_journal})")
+
+    resultados = [
+        escenario('sin reportes', args.segundos, args.escritores, 0, False, args.refresco, directorio),
+        escenario('reportes en la principal', args.segundos, args.escritores, args.lectores, False,
+                  args.refresco, directorio),
+        escenario('reportes en la réplica', args.segundos, args.escritores, args.lectores, True,
+                  args.refresco, directorio),
+    ]
+
+    print(f"\n{'Escenario':<26}{'escr/s':>10}{'p50 ms':>10}{'p99 ms':>10}{'máx ms':>10}"
+          f"{'errores':>9}{'reportes':>10}{'copias':>8}")
+    for r in resultados:
+        print(f"{r['escenario']:<26}{r['escrituras_segundo']:10,.0f}{r['p50_ms']:10.2f}{r['p99_ms']:10.2f}"
+              f"{r['max_ms']:10.1f}{r['errores']:9}{r['reportes']:10}{r['copias_replica']:8}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,128 @@
+# -*- coding: utf-8 -*-
+"""
+Benchmark de generación de reportes
+Compara la concatenación con += contra las plantillas compiladas de report_service
+
+Uso: python -m benchmarks.bench_reportes [--reuniones 10000] [--repeticiones 3]
+"""
+
+import argparse
+import random
+import time
+from typing import Any, Dict, List
+
+from services.report_service import (
+    SECCIONES_BOOLEANAS,
+    escapar_markdown_v2 as esc,
+    renderizar_resumen_diario
+)
+
+CAMPOS_BOOLEANOS = [campo for seccion in SECCIONES_BOOLEANAS for campo in seccion.campos]
+
+
+def generar_reuniones(cantidad: int, semilla: int = 42) -> List[Dict[str, Any]]:
+    """
+    Genera reuniones sintéticas con la forma de reuniones_inicio_jornada
+    """
+    rnd = random.Random(semilla)
+    departamentos = ['Distribución', 'Transmisión', 'Subestaciones', 'Líneas (Norte)', 'Medición']
+
+    reuniones = []
+    for i in range(cantidad):
+        reunion = {
+            'id': i + 1,
+            'departamento': rnd.choice(departamentos),
+            'fecha': '2024-03-15',
+            'categoria_maxima': 'Jefe de Turno',
+            'nombre_supervisor': f'Supervisor {i % 300}',
+            'nombres_personal': [f'Trabajador {j}' for j in range(rnd.randint(3, 12))],
+            'hora_inicio': '07:30',
+            'hora_termino': '07:50',
+            'otra_informacion': 'Se revisó el programa de trabajo del día.',
+            'descripcion_actividades_seguridad': 'Revisión de EPP y herramientas [lote #3].',
+            'meta_proposito_jornada': 'Cero accidentes.',
+            'observaciones': 'Sin novedades_relevantes.' if i % 7 else '',
+            'ruta_evidencia_fotografica': f'./photos/2024-03/{i}.jpg',
+            'fecha_registro': '2024-03-15 08:00:00',
+            'usuario_telegram_id': 100000 + i % 300
+        }
+        for campo in CAMPOS_BOOLEANOS:
+            reunion[campo] = rnd.random() < 0.8
+        reuniones.append(reunion)
+
+    return reuniones
+
+
+def reporte_concatenado(reunion: Dict[str, Any]) -> str:
+    """
+    Reporte construido con += y una condición por booleano (enfoque anterior)
+
+    Los valores se escapan igual que en las plantillas para que ambos
+    produzcan MarkdownV2 válido y la comparación sea justa.
+    """
+    reporte = "📋 REPORTE DE REUNIÓN DE INICIO DE JORNADA\n\n"
+    reporte += "🏢 DATOS GENERALES:\n"
+    reporte += f"• ID: {esc(reunion.get('id', 'N/A'))}\n"
+    reporte += f"• Departamento: {esc(reunion.get('departamento', 'N/A'))}\n"
+    reporte += f"• Fecha: {esc(reunion.get('fecha', 'N/A'))}\n"
+    reporte += f"• Categoría máxima: {esc(reunion.get('categoria_maxima', 'N/A'))}\n"
+    reporte += f"• Supervisor: {esc(reunion.get('nombre_supervisor', 'N/A'))}\n"
+    reporte += f"• Hora inicio: {esc(reunion.get('hora_inicio', 'N/A'))}\n"
+    reporte += f"• Hora término: {esc(reunion.get('hora_termino', 'N/A'))}\n"
+    reporte += f"• Personal: {esc(', '.join(reunion.get('nombres_personal', [])))}\n"
+    for seccion in SECCIONES_BOOLEANAS:
+        reporte += f"\n{seccion.titulo}\n"
+        for campo, etiqueta in zip(seccion.campos, seccion.etiquetas):
+            reporte += f"• {etiqueta}: {'✅ Sí' if reunion.get(campo) else '❌ No'}\n"
+    reporte += "\n📝 INFORMACIÓN ADICIONAL:\n"
+    reporte += f"• Otra información: {esc(reunion.get('otra_informacion', 'N/A'))}\n"
+    reporte += f"• Actividades de seguridad: {esc(reunion.get('descripcion_actividades_seguridad', 'N/A'))}\n"
+    reporte += f"• Meta/Propósito de la jornada: {esc(reunion.get('meta_proposito_jornada', 'N/A'))}\n"
+    reporte += f"• Observaciones: {esc(reunion.get('observaciones', 'N/A'))}\n"
+    reporte += "\n📸 EVIDENCIA:\n"
+    reporte += f"• Fotografía: {esc(reunion.get('ruta_evidencia_fotografica', 'N/A'))}\n"
+    reporte += f"• Fecha de registro: {esc(reunion.get('fecha_registro', 'N/A'))}\n"
+    reporte += f"• Usuario: {esc(reunion.get('usuario_telegram_id', 'N/A'))}\n"
+    return reporte
+
+
+def resumen_concatenado(reuniones: List[Dict[str, Any]]) -> str:
+    resumen = ""
+    for reunion in reuniones:
+        resumen += reporte_concatenado(reunion) + "\n────────────\n\n"
+    return resumen
+
+
+def medir(funcion, repeticiones: int) -> float:
+    """
+    Devuelve el mejor tiempo (segundos) de varias repeticiones
+    """
+    mejor = float('inf')
+    for _ in range(repeticiones):
+        inicio = time.perf_counter()
+        funcion()
+        mejor = min(mejor, time.perf_counter() - inicio)
+    return mejor
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--reuniones', type=int, default=10000)
+    parser.add_argument('--repeticiones', type=int, default=3)
+    args = parser.parse_args()
+
+    reuniones = generar_reuniones(args.reuniones)
+
+    t_concatenado = medir(lambda: resumen_concatenado(reuniones), args.repeticiones)
+    t_plantillas = medir(lambda: renderizar_resumen_diario(reuniones, 'Resumen diario'), args.repeticiones)
+
+    print(f"Reuniones: {args.reuniones}")
+    print(f"Concatenación (+=): {t_concatenado * 1000:8.1f} ms  "
+          f"({args.reuniones / t_concatenado:,.0f} reuniones/s)")
+    print(f"Plantillas (MarkdownV2):           {t_plantillas * 1000:8.1f} ms  "
+          f"({args.reuniones / t_plantillas:,.0f} reuniones/s)")
+    print(f"Aceleración: {t_concatenado / t_plantillas:.2f}x")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,96 @@
+# -*- coding: utf-8 -*-
+"""
+Benchmark de la representación de las sesiones en memoria
+Compara los diccionarios anidados que devolvía obtener_sesion_activa (y los
+de los validadores) con las clases Sesion, Respuestas y ResultadoValidacion:
+memoria por elemento medida con tracemalloc y tiempo de creación de los
+resultados de validación. Los formatos de datos_sesion se comparan en
+benchmarks/bench_codec.py.
+
+Uso: python -m benchmarks.bench_representacion [--sesiones 10000] [--repeticiones 20000]
+"""
+
+import argparse
+import time
+import tracemalloc
+from datetime import date, time as hora
+from typing import Any, Callable, Dict, List
+
+from bot.validators import ResultadoValidacion
+from services.session_state import Respuestas, Sesion
+
+RESPUESTAS = {
+    'departamento': 'Mantenimiento Eléctrico', 'fecha': date(2024, 6, 1), 'categoria_maxima': 'Jefe de Turno',
+    'nombre_supervisor': 'Ana Pérez', 'nombres_personal': ['Luis Gómez', 'María López', 'Pedro Soto'],
+    'hora_inicio': hora(7, 30), 'hora_termino': hora(7, 50),
+    'saludo_inicio_jornada': True, 'enumero_personal': True, 'pregunto_estado_salud': True,
+    'realizo_ejercicios': False, 'detecto_anomalias_salud': False, 'tomo_lista_asistencia': True,
+    'comento_trabajos_mantenimiento': True, 'comento_trabajos_operacion': False,
+    'comento_trabajos_alto_riesgo': True, 'comento_incidentes_accidentes': False,
+    'otra_informacion': '', 'realizo_revision_espejo': True, 'realizo_prediccion_peligro': True,
+    'dio_lectura_reglamento': False, 'realizo_exposicion_sentir_peligro': True,
+    'actividades_posteriores': True, 'descripcion_actividades_seguridad': 'Inspección de tableros',
+    'meta_proposito_jornada': 'Cero accidentes', 'observaciones': ''
+}
+
+
+def sesion_dict(user_id: int) -> Dict[str, Any]:
+    """Sesión con la forma anterior de obtener_sesion_activa"""
+    return {
+        'sesion_id': f'{user_id}_20240601072500000000', 'estado': 'esperando_respuesta',
+        'pregunta_actual': 'observaciones', 'datos': {'respuestas': dict(RESPUESTAS)},
+        'fecha_creacion': '2024-06-01 07:25:00', 'fecha_actualizacion': '2024-06-01 07:49:00'
+    }
+
+
+def sesion_objeto(user_id: int) -> Sesion:
+    return Sesion(
+        f'{user_id}_20240601072500000000', user_id, user_id, 'esperando_respuesta', 'observaciones',
+        Respuestas(**RESPUESTAS), fecha_creacion='2024-06-01 07:25:00',
+        fecha_actualizacion='2024-06-01 07:49:00'
+    )
+
+
+def bytes_por_elemento(crear: Callable[[int], Any], cantidad: int) -> float:
+    """Memoria asignada por elemento manteniendo `cantidad` elementos vivos"""
+    tracemalloc.start()
+    inicial = tracemalloc.get_traced_memory()[0]
+    elementos = [crear(i) for i in range(cantidad)]
+    final = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del elementos
+    # Descontar la lista que los contiene
+    return (final - inicial) / cantidad - 8
+
+
+def microsegundos(funcion: Callable[[], Any], repeticiones: int) -> float:
+    inicio = time.perf_counter()
+    for _ in range(repeticiones):
+        funcion()
+    return (time.perf_counter() - inicio) / repeticiones * 1_000_000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sesiones', type=int, default=10000)
+    parser.add_argument('--repeticiones', type=int, default=20000)
+    args = parser.parse_args()
+
+    print(f"Memoria por elemento ({args.sesiones} vivos)")
+    filas: List = [
+        ('sesión', bytes_por_elemento(sesion_dict, args.sesiones), bytes_por_elemento(sesion_objeto, args.sesiones)),
+        ('validación', bytes_por_elemento(
+            lambda i: {'valida': True, 'valor_procesado': i, 'mensaje_error': None}, args.sesiones
+        ), bytes_por_elemento(lambda i: ResultadoValidacion.aceptada(i), args.sesiones)),
+    ]
+    print(f"{'':<14}{'dict':>10}{'__slots__':>12}{'ahorro':>9}")
+    for nombre, antes, despues in filas:
+        print(f"{nombre:<14}{antes:>9.0f}B{despues:>11.0f}B{1 - despues / antes:>9.0%}")
+
+    print(f"\nCreación de resultados de validación ({args.repeticiones * 10} repeticiones)")
+    print(f"{'dict':<22}{microsegundos(lambda: {'valida': True, 'valor_procesado': 1, 'mensaje_error': None}, args.repeticiones * 10):>8.3f} µs")
+    print(f"{'ResultadoValidacion':<22}{microsegundos(lambda: ResultadoValidacion.aceptada(1), args.repeticiones * 10):>8.3f} µs")
+
+
+if __name__ == '__main__':
+    main()
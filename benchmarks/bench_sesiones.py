@@ -0,0 +1,64 @@
+# -*- coding: utf-8 -*-
+"""
+Benchmark de instantáneas de sesiones
+Mide el guardado y la carga de la instantánea binaria de sesiones abiertas
+
+Uso: python -m benchmarks.bench_sesiones [--sesiones 50000]
+"""
+
+import argparse
+import os
+import random
+import tempfile
+import time
+
+from bot.conversation import ConversationManager
+from services.expiry_service import SessionExpiryService
+from services.snapshot_service import SessionSnapshotService
+
+
+class EstadosSinteticos:
+    """Sustituye a SessionService: estados de conversación generados en memoria"""
+
+    def __init__(self, estados):
+        self.estados = estados
+
+    def obtener_estados_activos(self):
+        return self.estados
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sesiones', type=int, default=50000)
+    args = parser.parse_args()
+
+    rnd = random.Random(42)
+    conversation_manager = ConversationManager()
+    preguntas = [clave for clave in conversation_manager.preguntas if clave != 'solicitar_foto']
+
+    origen = SessionExpiryService(None, None, timeout_minutes=60, warning_minutes=5)
+    estados = {}
+    for i in range(args.sesiones):
+        user_id = 100000000 + i
+        origen.registrar_actividad(user_id, user_id)
+        estados[user_id] = ('esperando_respuesta', rnd.choice(preguntas))
+
+    ruta = os.path.join(tempfile.mkdtemp(), 'sesiones.snapshot')
+
+    inicio = time.perf_counter()
+    guardadas = SessionSnapshotService(origen, EstadosSinteticos(estados), conversation_manager, None).guardar(ruta)
+    t_guardar = time.perf_counter() - inicio
+    tamano = os.path.getsize(ruta)
+
+    destino = SessionExpiryService(None, None, timeout_minutes=60, warning_minutes=5)
+    inicio = time.perf_counter()
+    restauradas = SessionSnapshotService(destino, EstadosSinteticos(estados), conversation_manager, None).restaurar(ruta)
+    t_cargar = time.perf_counter() - inicio
+
+    print(f"Sesiones: {args.sesiones}")
+    print(f"Guardado: {t_guardar * 1000:8.1f} ms  ({guardadas} sesiones, {tamano / 1024:,.0f} KiB)")
+    print(f"Carga:    {t_cargar * 1000:8.1f} ms  ({restauradas} sesiones restauradas)")
+
+
+if __name__ == '__main__':
+    main()
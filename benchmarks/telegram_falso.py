@@ -0,0 +1,285 @@
+# -*- coding: utf-8 -*-
+"""
+Servidor falso de la Bot API de Telegram para pruebas de carga sin conexión
+Atiende en HTTP local los métodos que usa SIRIJ BOT (getMe, deleteWebhook,
+getUpdates con long polling, sendMessage, getFile y la descarga de archivos)
+y permite inyectar latencia y errores (429 con retry_after y 502).
+
+Las actualizaciones se encolan desde la prueba con encolar_texto/encolar_foto
+y los mensajes que envía el bot se leen con esperar_mensaje. Solo usa la
+biblioteca estándar (asyncio).
+
+Uso con el bot: TELEGRAM_API_URL=http://127.0.0.1:<puerto>/bot y
+TELEGRAM_FILE_URL=http://127.0.0.1:<puerto>/file/bot
+"""
+
+import asyncio
+import json
+import random
+import time
+from collections import defaultdict
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.parse import parse_qs, urlsplit
+
+BOT = {
+    'id': 700000001, 'is_bot': True, 'first_name': 'SIRIJ', 'username': 'sirij_carga_bot',
+    'can_join_groups': False, 'can_read_all_group_messages': False, 'supports_inline_queries': False
+}
+
+# Métodos en los que se inyectan errores (getUpdates queda fuera para no frenar el sondeo)
+METODOS_CON_ERRORES = {'sendMessage', 'getFile', 'archivo'}
+
+_ESTADOS_HTTP = {200: 'OK', 400: 'Bad Request', 404: 'Not Found', 429: 'Too Many Requests', 502: 'Bad Gateway'}
+
+
+def _valor_formulario(valor: str) -> Any:
+    """python-telegram-bot envía los parámetros no textuales serializados en JSON"""
+    try:
+        return json.loads(valor)
+    except ValueError:
+        return valor
+
+
+class ServidorTelegramFalso:
+    """
+    Bot API falsa en asyncio
+
+    Cada chat es un usuario (chat privado con el mismo ID). Los mensajes
+    enviados por el bot se guardan en una cola por chat.
+    """
+
+    def __init__(self, latencia_ms: float = 0.0, tasa_429: float = 0.0, tasa_error: float = 0.0,
+                 retry_after: int = 1, semilla: int = 7):
+        """
+        Args:
+            latencia_ms: Retardo agregado a cada respuesta (red simulada)
+            tasa_429: Fracción de llamadas que responden 429 con retry_after
+            tasa_error: Fracción de llamadas que responden 502
+            retry_after: Segundos indicados en las respuestas 429
+            semilla: Semilla de la inyección de errores
+        """
+        self.latencia = latencia_ms / 1000
+        self.tasa_429 = tasa_429
+        self.tasa_error = tasa_error
+        self.retry_after = retry_after
+        self._azar = random.Random(semilla)
+
+        self._servidor: Optional[asyncio.AbstractServer] = None
+        self._actualizaciones: List[Dict[str, Any]] = []
+        self._nuevas = asyncio.Event()
+        self._siguiente_update = 1
+        self._siguiente_mensaje = 1
+        self._bandejas: Dict[int, asyncio.Queue] = defaultdict(asyncio.Queue)
+        self._archivos: Dict[str, bytes] = {}
+
+        self.listo = asyncio.Event()
+        self.metricas: Dict[str, int] = defaultdict(int)
+
+    async def iniciar(self, host: str = '127.0.0.1', puerto: int = 0) -> int:
+        """
+        Inicia el servidor
+
+        Returns:
+            int: Puerto en el que escucha
+        """
+        self._servidor = await asyncio.start_server(self._atender, host, puerto)
+        return self._servidor.sockets[0].getsockname()[1]
+
+    async def detener(self):
+        if self._servidor:
+            self._servidor.close()
+            await self._servidor.wait_closed()
+
+    # Actualizaciones entrantes (lo que escribiría el supervisor)
+
+    def _encolar(self, user_id: int, contenido: Dict[str, Any]):
+        mensaje = {
+            'message_id': self._siguiente_mensaje,
+            'date': int(time.time()),
+            'chat': {'id': user_id, 'type': 'private', 'first_name': f'Supervisor {user_id}'},
+            'from': {'id': user_id, 'is_bot': False, 'first_name': f'Supervisor {user_id}'},
+            **contenido
+        }
+        self._siguiente_mensaje += 1
+        self._actualizaciones.append({'update_id': self._siguiente_update, 'message': mensaje})
+        self._siguiente_update += 1
+        self._nuevas.set()
+
+    def encolar_texto(self, user_id: int, texto: str):
+        """
+        Encola un mensaje de texto (o comando si empieza con /)
+        """
+        contenido: Dict[str, Any] = {'text': texto}
+        if texto.startswith('/'):
+            contenido['entities'] = [{'type': 'bot_command', 'offset': 0, 'length': len(texto.split()[0])}]
+        self._encolar(user_id, contenido)
+
+    def encolar_foto(self, user_id: int, contenido: bytes, ancho: int = 1280, alto: int = 960):
+        """
+        Encola una foto; el bot la descarga con getFile y la URL de archivos
+        """
+        file_id = f'foto_{user_id}_{self._siguiente_mensaje}'
+        self._archivos[file_id] = contenido
+        self._encolar(user_id, {'photo': [
+            {'file_id': f'{file_id}_miniatura', 'file_unique_id': f'{file_id}_m', 'width': 320, 'height': 240},
+            {'file_id': file_id, 'file_unique_id': f'{file_id}_u', 'width': ancho, 'height': alto,
+             'file_size': len(contenido)}
+        ]})
+
+    async def esperar_mensaje(self, chat_id: int, timeout: float) -> str:
+        """
+        Espera el siguiente mensaje que el bot envíe al chat
+
+        Raises:
+            asyncio.TimeoutError: Si no llega a tiempo
+        """
+        return await asyncio.wait_for(self._bandejas[chat_id].get(), timeout)
+
+    # HTTP
+
+    async def _atender(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        try:
+            while True:
+                linea = await reader.readline()
+                if not linea:
+                    break
+                metodo_http, ruta, _ = linea.decode('latin-1').split(' ', 2)
+
+                encabezados = {}
+                while True:
+                    encabezado = await reader.readline()
+                    if encabezado in (b'\r\n', b'\n', b''):
+                        break
+                    nombre, _, valor = encabezado.decode('latin-1').partition(':')
+                    encabezados[nombre.strip().lower()] = valor.strip()
+
+                cuerpo = await reader.readexactly(int(encabezados.get('content-length', 0)))
+                estado, tipo, respuesta = await self._responder(metodo_http, ruta, encabezados, cuerpo)
+
+                writer.write(
+                    f"HTTP/1.1 {estado} {_ESTADOS_HTTP.get(estado, 'OK')}\r\n"
+                    f"Content-Type: {tipo}\r\nContent-Length: {len(respuesta)}\r\n\r\n".encode('latin-1')
+                    + respuesta
+                )
+                await writer.drain()
+                if encabezados.get('connection', '').lower() == 'close':
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError, ValueError, asyncio.CancelledError):
+            # CancelledError: long polling pendiente al cerrar el loop
+            pass
+        finally:
+            writer.close()
+
+    async def _responder(self, metodo_http: str, ruta: str, encabezados: Dict[str, str],
+                         cuerpo: bytes) -> Tuple[int, str, bytes]:
+        partes = urlsplit(ruta)
+        segmentos = partes.path.strip('/').split('/')
+
+        if self.latencia:
+            await asyncio.sleep(self.latencia)
+
+        # /file/bot<token>/<ruta del archivo>
+        if len(segmentos) >= 3 and segmentos[0] == 'file':
+            return self._descargar(segmentos[-1])
+
+        # /bot<token>/<método>
+        if len(segmentos) != 2 or not segmentos[0].startswith('bot'):
+            return self._json(404, {'ok': False, 'error_code': 404, 'description': 'Not Found'})
+
+        metodo = segmentos[1]
+        parametros: Dict[str, Any] = {clave: valores[0] for clave, valores in parse_qs(partes.query).items()}
+        tipo = encabezados.get('content-type', '')
+        if tipo.startswith('application/json') and cuerpo:
+            parametros.update(json.loads(cuerpo))
+        elif tipo.startswith('application/x-www-form-urlencoded'):
+            parametros.update({
+                clave: _valor_formulario(valores[0])
+                for clave, valores in parse_qs(cuerpo.decode('utf-8'), keep_blank_values=True).items()
+            })
+        elif cuerpo:
+            return self._json(400, {'ok': False, 'error_code': 400, 'description': 'Bad Request: multipart no soportado'})
+
+        self.metricas[metodo] += 1
+        inyectado = self._inyectar_error(metodo)
+        if inyectado:
+            return inyectado
+
+        if metodo == 'getMe':
+            return self._ok(BOT)
+        if metodo == 'getUpdates':
+            return self._ok(await self._get_updates(parametros))
+        if metodo == 'sendMessage':
+            return self._ok(self._send_message(parametros))
+        if metodo == 'getFile':
+            file_id = parametros.get('file_id')
+            if file_id not in self._archivos:
+                return self._json(400, {'ok': False, 'error_code': 400, 'description': 'Bad Request: invalid file_id'})
+            return self._ok({
+                'file_id': file_id, 'file_unique_id': f'{file_id}_u',
+                'file_size': len(self._archivos[file_id]), 'file_path': f'photos/{file_id}.jpg'
+            })
+
+        # deleteWebhook, setMyCommands, close, logOut...
+        return self._ok(True)
+
+    def _inyectar_error(self, metodo: str) -> Optional[Tuple[int, str, bytes]]:
+        if metodo not in METODOS_CON_ERRORES:
+            return None
+        sorteo = self._azar.random()
+        if sorteo < self.tasa_429:
+            self.metricas['inyectados_429'] += 1
+            return self._json(429, {
+                'ok': False, 'error_code': 429,
+                'description': f'Too Many Requests: retry after {self.retry_after}',
+                'parameters': {'retry_after': self.retry_after}
+            })
+        if sorteo < self.tasa_429 + self.tasa_error:
+            self.metricas['inyectados_502'] += 1
+            return self._json(502, {'ok': False, 'error_code': 502, 'description': 'Bad Gateway'})
+        return None
+
+    async def _get_updates(self, parametros: Dict[str, Any]) -> List[Dict[str, Any]]:
+        self.listo.set()
+        desplazamiento = int(parametros.get('offset') or 0)
+        limite = int(parametros.get('limit') or 100)
+        espera = float(parametros.get('timeout') or 0)
+
+        if desplazamiento:
+            # Telegram olvida las actualizaciones confirmadas con offset
+            self._actualizaciones = [u for u in self._actualizaciones if u['update_id'] >= desplazamiento]
+        if not self._actualizaciones and espera > 0:
+            self._nuevas.clear()
+            try:
+                await asyncio.wait_for(self._nuevas.wait(), espera)
+            except asyncio.TimeoutError:
+                pass
+        return self._actualizaciones[:limite]
+
+    def _send_message(self, parametros: Dict[str, Any]) -> Dict[str, Any]:
+        chat_id = int(parametros['chat_id'])
+        texto = str(parametros.get('text', ''))
+        self._bandejas[chat_id].put_nowait(texto)
+
+        mensaje = {
+            'message_id': self._siguiente_mensaje, 'date': int(time.time()),
+            'chat': {'id': chat_id, 'type': 'private'}, 'from': BOT, 'text': texto
+        }
+        self._siguiente_mensaje += 1
+        return mensaje
+
+    def _descargar(self, nombre: str) -> Tuple[int, str, bytes]:
+        self.metricas['archivo'] += 1
+        inyectado = self._inyectar_error('archivo')
+        if inyectado:
+            return inyectado
+        contenido = self._archivos.get(nombre.rsplit('.', 1)[0])
+        if contenido is None:
+            return self._json(404, {'ok': False, 'error_code': 404, 'description': 'Not Found'})
+        return 200, 'image/jpeg', contenido
+
+    @staticmethod
+    def _json(estado: int, datos: Any) -> Tuple[int, str, bytes]:
+        return estado, 'application/json', json.dumps(datos, ensure_ascii=False).encode('utf-8')
+
+    def _ok(self, resultado: Any) -> Tuple[int, str, bytes]:
+        return self._json(200, {'ok': True, 'result': resultado})
@@ -6,11 +6,20 @@ Maneja el flujo de preguntas y respuestas del formulario
 
 import logging
 from datetime import datetime
-from typing import Dict, Any
+from typing import Dict, Any, Optional
 
 from .validators import ResponseValidator
+from services.autocomplete_service import CAMPOS_AUTOCOMPLETADO, AutocompleteService
 from services.session_service import SessionService
+from services.session_state import Sesion
+from database.duplicates import validar_politica
 from database.models import guardar_reunion_completa
+from services.report_service import (
+    PLANTILLA_RESUMEN_CONFIRMACION,
+    PLANTILLA_RESUMEN_FINAL,
+    PLANTILLA_REUNION_DUPLICADA,
+    PLANTILLA_ERROR_GUARDADO
+)
 
 logger = logging.getLogger(__name__)
 
@@ -19,9 +28,12 @@ class ConversationManager:
     Maneja el flujo de conversación del bot
     """
     
-    def __init__(self):
+    def __init__(self, session_service: Optional[SessionService] = None, politica_duplicados: str = 'marcar',
+                 autocompletado: Optional[AutocompleteService] = None):
         self.validator = ResponseValidator()
-        self.session_service = SessionService()
+        self.session_service = session_service or SessionService()
+        self.politica_duplicados = validar_politica(politica_duplicados)
+        self.autocompletado = autocompletado if autocompletado is not None and autocompletado.activo else None
         
         # Definir el flujo de preguntas
         self.preguntas = {
@@ -196,7 +208,7 @@ class ConversationManager:
                 'mensaje': '¡Hola! Soy SIRIJ BOT, tu asistente para las Reuniones de Inicio de Jornada de CFE. '
                           '¿Estás listo para comenzar con el registro de hoy?\n\n'
                           'Responde "Sí" para continuar.',
-                'sesion_id': sesion['sesion_id'],
+                'sesion_id': sesion.sesion_id,
                 'estado': 'esperando_confirmacion'
             }
             
@@ -207,6 +219,52 @@ class ConversationManager:
                 'estado': 'error'
             }
     
+    def _sugerir(self, respuesta: Dict[str, Any], user_id: int, pregunta: Optional[str],
+                 anterior: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Agrega a la respuesta las sugerencias de la pregunta en 'sugerencias'
+        
+        Una lista vacía indica que hay que quitar las sugerencias de la pregunta
+        anterior; sin la clave no cambia nada.
+        """
+        if self.autocompletado is None:
+            return respuesta
+        
+        if pregunta in CAMPOS_AUTOCOMPLETADO:
+            respuesta['sugerencias'] = self.autocompletado.sugerencias(pregunta, user_id)
+        elif anterior in CAMPOS_AUTOCOMPLETADO:
+            respuesta['sugerencias'] = []
+        return respuesta
+    
+    def texto_reanudacion(self, estado: str, pregunta_actual: Optional[str] = None) -> Optional[str]:
+        """
+        Obtiene el texto que vuelve a plantear el paso pendiente de una sesión
+        
+        Args:
+            estado: Estado de la conversación
+            pregunta_actual: Pregunta actual (si el estado es esperando_respuesta)
+            
+        Returns:
+            str con el texto a enviar o None si el estado no admite reanudación
+        """
+        if estado == 'esperando_respuesta':
+            config_pregunta = self.preguntas.get(pregunta_actual)
+            return config_pregunta['texto'] if config_pregunta else None
+        
+        if estado == 'esperando_foto':
+            return self.preguntas['solicitar_foto']['texto']
+        
+        if estado == 'esperando_confirmacion':
+            return '¿Estás listo para comenzar con el registro de hoy?\n\nResponde "Sí" para continuar.'
+        
+        if estado == 'sesion_existente':
+            return 'Responde "Continuar" para seguir con la reunión actual o "Nueva" para empezar de nuevo.'
+        
+        if estado == 'esperando_confirmacion_final':
+            return '¿Confirmas que toda la información es correcta? (Sí/No)'
+        
+        return None
+    
     def procesar_mensaje(self, user_id: int, mensaje: str) -> Dict[str, Any]:
         """
         Procesa un mensaje del usuario y determina la respuesta
@@ -221,7 +279,7 @@ class ConversationManager:
                     'estado': 'sin_sesion'
                 }
             
-            estado_actual = sesion.get('estado', 'esperando_confirmacion')
+            estado_actual = sesion.estado or 'esperando_confirmacion'
             
             # Manejar diferentes estados
             if estado_actual == 'esperando_confirmacion':
@@ -240,6 +298,9 @@ class ConversationManager:
                     'estado': 'esperando_foto'
                 }
             
+            elif estado_actual == 'esperando_confirmacion_final':
+                return self._manejar_confirmacion_final(user_id, mensaje)
+            
             else:
                 return {
                     'mensaje': '❌ Estado de conversación no reconocido. Usa /cancel para reiniciar.',
@@ -253,7 +314,7 @@ class ConversationManager:
                 'estado': 'error'
             }
     
-    def _manejar_confirmacion_inicial(self, user_id: int, mensaje: str, sesion: Dict) -> Dict[str, Any]:
+    def _manejar_confirmacion_inicial(self, user_id: int, mensaje: str, sesion: Sesion) -> Dict[str, Any]:
         """
         Maneja la confirmación inicial para comenzar la reunión
         """
@@ -266,16 +327,16 @@ class ConversationManager:
             
             # Actualizar sesión
             self.session_service.actualizar_estado_sesion(
-                sesion['sesion_id'], 
+                sesion.sesion_id, 
                 'esperando_respuesta',
                 {'pregunta_actual': primera_pregunta}
             )
             
-            return {
+            return self._sugerir({
                 'mensaje': config_pregunta['texto'],
                 'estado': 'esperando_respuesta',
                 'pregunta_actual': primera_pregunta
-            }
+            }, user_id, primera_pregunta)
         
         elif respuesta_lower in ['no', 'n']:
             # Cancelar sesión
@@ -291,7 +352,7 @@ class ConversationManager:
                 'estado': 'esperando_confirmacion'
             }
     
-    def _manejar_sesion_existente(self, user_id: int, mensaje: str, sesion: Dict) -> Dict[str, Any]:
+    def _manejar_sesion_existente(self, user_id: int, mensaje: str, sesion: Sesion) -> Dict[str, Any]:
         """
         Maneja la decisión sobre sesión existente
         """
@@ -299,20 +360,21 @@ class ConversationManager:
         
         if respuesta_lower in ['continuar', 'continúa', 'continua']:
             # Continuar con la sesión existente
-            pregunta_actual = sesion.get('pregunta_actual', 'departamento')
+            pregunta_actual = sesion.pregunta_actual or 'departamento'
             config_pregunta = self.preguntas.get(pregunta_actual)
             
             if config_pregunta:
                 self.session_service.actualizar_estado_sesion(
-                    sesion['sesion_id'], 
-                    'esperando_respuesta'
+                    sesion.sesion_id, 
+                    'esperando_respuesta',
+                    {'pregunta_actual': pregunta_actual}
                 )
                 
-                return {
+                return self._sugerir({
                     'mensaje': f"Continuando con la reunión...\n\n{config_pregunta['texto']}",
                     'estado': 'esperando_respuesta',
                     'pregunta_actual': pregunta_actual
-                }
+                }, user_id, pregunta_actual)
         
         elif respuesta_lower in ['nueva', 'nuevo', 'cancelar']:
             # Cancelar sesión actual y crear nueva
@@ -324,11 +386,38 @@ class ConversationManager:
             'estado': 'sesion_existente'
         }
     
-    def _manejar_respuesta_pregunta(self, user_id: int, mensaje: str, sesion: Dict) -> Dict[str, Any]:
+    def _manejar_confirmacion_final(self, user_id: int, mensaje: str) -> Dict[str, Any]:
+        """
+        Maneja la confirmación del resumen antes de guardar la reunión
+        
+        Con "Sí" devuelve el estado 'completado' y el manejador guarda la
+        reunión con generar_resumen_final.
+        """
+        respuesta_lower = mensaje.lower().strip()
+        
+        if respuesta_lower in ['sí', 'si', 's', 'yes', 'y']:
+            return {
+                'mensaje': '✅ Información confirmada. Guardando la reunión...',
+                'estado': 'completado'
+            }
+        
+        elif respuesta_lower in ['no', 'n']:
+            self.session_service.cancelar_sesion(user_id)
+            return {
+                'mensaje': '👋 Reunión descartada. Usa /start para registrarla de nuevo.',
+                'estado': 'cancelado'
+            }
+        
+        return {
+            'mensaje': 'Por favor, responde "Sí" para guardar la reunión o "No" para descartarla.',
+            'estado': 'esperando_confirmacion_final'
+        }
+    
+    def _manejar_respuesta_pregunta(self, user_id: int, mensaje: str, sesion: Sesion) -> Dict[str, Any]:
         """
         Maneja la respuesta a una pregunta específica
         """
-        pregunta_actual = sesion.get('pregunta_actual')
+        pregunta_actual = sesion.pregunta_actual
         config_pregunta = self.preguntas.get(pregunta_actual)
         
         if not config_pregunta:
@@ -340,18 +429,23 @@ class ConversationManager:
         # Validar respuesta
         validacion = self.validator.validar_respuesta(mensaje, config_pregunta['tipo'])
         
-        if not validacion['valida']:
-            return {
-                'mensaje': f"Por favor, {validacion['mensaje_error']}",
+        if not validacion.valida:
+            return self._sugerir({
+                'mensaje': f"Por favor, {validacion.mensaje_error}",
                 'estado': 'esperando_respuesta',
                 'pregunta_actual': pregunta_actual
-            }
+            }, user_id, pregunta_actual)
+        
+        valor = validacion.valor_procesado
+        if self.autocompletado is not None:
+            # Variantes de un valor conocido: se guarda (y se resume) su escritura canónica
+            valor = self.autocompletado.canonico(pregunta_actual, valor)
         
         # Guardar respuesta
         self.session_service.guardar_respuesta(
-            sesion['sesion_id'], 
+            sesion.sesion_id, 
             pregunta_actual, 
-            validacion['valor_procesado']
+            valor
         )
         
         # Determinar siguiente pregunta
@@ -362,21 +456,21 @@ class ConversationManager:
             config_siguiente = self.preguntas[siguiente_pregunta]
             
             self.session_service.actualizar_estado_sesion(
-                sesion['sesion_id'],
+                sesion.sesion_id,
                 'esperando_respuesta',
                 {'pregunta_actual': siguiente_pregunta}
             )
             
-            return {
+            return self._sugerir({
                 'mensaje': config_siguiente['texto'],
                 'estado': 'esperando_respuesta',
                 'pregunta_actual': siguiente_pregunta
-            }
+            }, user_id, siguiente_pregunta, pregunta_actual)
         
         elif siguiente_pregunta == 'solicitar_foto':
             # Solicitar fotografía
             self.session_service.actualizar_estado_sesion(
-                sesion['sesion_id'],
+                sesion.sesion_id,
                 'esperando_foto'
             )
             
@@ -399,7 +493,7 @@ class ConversationManager:
         try:
             sesion = self.session_service.obtener_sesion_activa(user_id)
             
-            if not sesion or sesion.get('estado') != 'esperando_foto':
+            if not sesion or sesion.estado != 'esperando_foto':
                 return {
                     'mensaje': '❌ Error: no se esperaba una fotografía en este momento.',
                     'estado': 'error'
@@ -407,24 +501,25 @@ class ConversationManager:
             
             # Actualizar sesión con la ruta de la foto
             self.session_service.guardar_respuesta(
-                sesion['sesion_id'],
+                sesion.sesion_id,
                 'ruta_evidencia_fotografica',
                 ruta_foto
             )
             
             # Generar resumen para confirmación
-            resumen = self._generar_resumen_confirmacion(sesion['sesion_id'])
+            resumen = self._generar_resumen_confirmacion(sesion)
             
             # Actualizar estado para esperar confirmación final
             self.session_service.actualizar_estado_sesion(
-                sesion['sesion_id'],
+                sesion.sesion_id,
                 'esperando_confirmacion_final'
             )
             
             return {
-                'mensaje': f"¡Excelente! He registrado toda la información de la Reunión de Inicio de Jornada.\n\n"
+                'mensaje': f"¡Excelente\\! He registrado toda la información de la Reunión de Inicio de Jornada\\.\n\n"
                           f"{resumen}\n\n"
-                          f"¿Confirmas que toda la información es correcta? (Sí/No)",
+                          f"¿Confirmas que toda la información es correcta? \\(Sí/No\\)",
+                'parse_mode': 'MarkdownV2',
                 'estado': 'esperando_confirmacion_final'
             }
             
@@ -435,70 +530,52 @@ class ConversationManager:
                 'estado': 'error'
             }
     
-    def _generar_resumen_confirmacion(self, sesion_id: str) -> str:
+    def _generar_resumen_confirmacion(self, sesion: Sesion) -> str:
         """
-        Genera un resumen de la información para confirmación
-        """
-        datos = self.session_service.obtener_datos_sesion_completa(sesion_id)
-        
-        resumen = "📋 **RESUMEN:**\n"
-        resumen += f"• Departamento: {datos.get('departamento', 'N/A')}\n"
-        resumen += f"• Fecha: {datos.get('fecha', 'N/A')}\n"
-        resumen += f"• Supervisor: {datos.get('nombre_supervisor', 'N/A')}\n"
-        
-        if datos.get('nombres_personal'):
-            nombres = ', '.join(datos['nombres_personal'])
-            resumen += f"• Personal: {nombres}\n"
-        
-        resumen += f"• Horario: {datos.get('hora_inicio', 'N/A')} - {datos.get('hora_termino', 'N/A')}\n"
-        resumen += f"• Evidencia fotográfica: ✅ Guardada"
+        Genera un resumen de la información para confirmación (MarkdownV2)
         
-        return resumen
+        Usa las respuestas de la sesión y no obtener_datos_sesion_completa: esta
+        devuelve fechas y horas en ISO, y el resumen las muestra como DD/MM/AAAA y HH:MM.
+        """
+        return PLANTILLA_RESUMEN_CONFIRMACION.renderizar_dict(dict(sesion.respuestas))
     
     def generar_resumen_final(self, user_id: int) -> str:
         """
-        Genera el resumen final después de guardar en base de datos
+        Genera el resumen final después de guardar en base de datos (MarkdownV2)
         """
         try:
             sesion = self.session_service.obtener_sesion_activa(user_id)
             
             if not sesion:
-                return "❌ Error generando resumen final."
+                return "❌ Error generando resumen final\\."
             
             # Obtener todos los datos y guardar en base de datos
-            datos_completos = self.session_service.obtener_datos_sesion_completa(sesion['sesion_id'])
+            datos_completos = self.session_service.obtener_datos_sesion_completa(sesion.sesion_id)
+            if self.autocompletado is not None:
+                # Respuestas dadas antes de que se cargara el índice de autocompletado
+                for campo in CAMPOS_AUTOCOMPLETADO:
+                    if campo in datos_completos:
+                        datos_completos[campo] = self.autocompletado.canonico(campo, datos_completos[campo])
             
             # Guardar en base de datos
-            resultado = guardar_reunion_completa(datos_completos)
+            resultado = guardar_reunion_completa(datos_completos, self.politica_duplicados)
             
-            i# REEMPLAZA LA PARTE FINAL DE LA FUNCIÓN CON ESTO
-
-        if resultado['exito']:
-            # Limpiar sesión
-            self.session_service.finalizar_sesion(sesion['sesion_id'])
-
-            return (f"""✅ **¡Reunión registrada exitosamente!**
-
-🆔 **ID de registro:** {resultado['reunion_id']}
-📅 **Fecha de registro:** {datetime.now().strftime('%d/%m/%Y %H:%M')}
-
-¡Gracias por usar SIRIJ BOT! 🚀
-
-Usa /start cuando necesites registrar otra reunión.""")
-        else:
-            return f"❌ **Error al guardar la reunión:**\n{resultado['error']}\n\n" \
-                   f"Por favor, contacta al administrador."
-
-    except Exception as e:
-        logger.error(f"Error generando resumen final para usuario {user_id}: {e}")
-        return "❌ Error generando resumen final. Contacta al administrador."
+            if resultado.get('duplicado') and not resultado['exito']:
+                # Rechazada: la reunión ya estaba registrada (p. ej. segundo envío tras /start)
+                self.session_service.finalizar_sesion(sesion.sesion_id)
+                return PLANTILLA_REUNION_DUPLICADA.renderizar_dict({'reunion_id': resultado['reunion_id']})
+            
+            if resultado['exito']:
+                # Limpiar sesión
+                self.session_service.finalizar_sesion(sesion.sesion_id)
                 
-                # actualizacion de error
-return (f"""✅ **¡Reunión registrada exitosamente!**
+                return PLANTILLA_RESUMEN_FINAL.renderizar_dict({
+                    'reunion_id': resultado['reunion_id'],
+                    'fecha_registro': datetime.now().strftime('%d/%m/%Y %H:%M')
+                })
             else:
-                return f"❌ **Error al guardar la reunión:**\n{resultado['error']}\n\n"
-                      f"Por favor, contacta al administrador."
-                      
+                return PLANTILLA_ERROR_GUARDADO.renderizar_dict(resultado)
+                
         except Exception as e:
             logger.error(f"Error generando resumen final para usuario {user_id}: {e}")
-            return "❌ Error generando resumen final. Contacta al administrador."
\ No newline at end of file
+            return "❌ Error generando resumen final\\. Contacta al administrador\\."
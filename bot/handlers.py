@@ -3,35 +3,283 @@
 Manejadores de mensajes y comandos para SIRIJ BOT
 """
 
+import asyncio
+import functools
 import logging
-from telegram import Update
+import os
+import tempfile
+import time
+from contextlib import asynccontextmanager
+from typing import Any, Dict, List, Optional, Tuple
+
+from telegram import (
+    InlineQueryResultArticle, InputTextMessageContent, ReplyKeyboardMarkup, ReplyKeyboardRemove, Update
+)
 from telegram.ext import ContextTypes
 
+from config import Config
+from metrics import ERRORES_MANEJADORES, LATENCIA_FOTOS, LATENCIA_MANEJADORES, REGISTRO, cronometrar
 from .conversation import ConversationManager
 from services.session_service import SessionService
-from services.photo_service import PhotoService
+from services.message_service import MessageService
+from services.expiry_service import SessionExpiryService
+from services.snapshot_service import SessionSnapshotService
+from services.alert_service import AlertService, MotorReglas
+from services.autocomplete_service import CAMPOS_AUTOCOMPLETADO, AutocompleteService
+from services.profiling_service import ProfilingService
 
 logger = logging.getLogger(__name__)
 
 # Instancias de servicios
-conversation_manager = ConversationManager()
-session_service = SessionService()
-photo_service = PhotoService()
+session_service = SessionService(Config.SESSION_TIMEOUT_MINUTES, Config.SESSION_CODEC)
+autocompletado = AutocompleteService(
+    Config.AUTOCOMPLETE_SUGGESTIONS,
+    Config.AUTOCOMPLETE_HISTORY_MONTHS,
+    Config.AUTOCOMPLETE_REFRESH_MINUTES
+)
+conversation_manager = ConversationManager(session_service, Config.DUPLICATE_POLICY, autocompletado)
+_photo_service = None
+message_service = MessageService(
+    global_rate=Config.TELEGRAM_GLOBAL_RATE,
+    chat_rate=Config.TELEGRAM_CHAT_RATE,
+    chat_burst=Config.TELEGRAM_CHAT_BURST
+)
+
+_ETAPA_DESCARGA = LATENCIA_FOTOS.etiquetas('descarga')
+
+def obtener_photo_service():
+    """
+    Crea el servicio de fotografías al llegar la primera foto (arranque rápido)
+    """
+    global _photo_service
+    if _photo_service is None:
+        from services.photo_service import PhotoService
+        _photo_service = PhotoService(Config.PHOTO_STORAGE_PATH, Config.PHOTO_MAX_SIZE_MB)
+    return _photo_service
+
+def guardar_foto_descargada(contenido: bytes, user_id: int, sesion_id: str) -> Tuple[bool, str, Optional[str]]:
+    """
+    Guarda una foto descargada de Telegram con PhotoService
+    
+    Args:
+        contenido: Bytes de la imagen
+        user_id: ID del usuario que la envió
+        sesion_id: ID de la sesión de la reunión
+        
+    Returns:
+        Tuple[bool, str, Optional[str]]: (éxito, mensaje, ruta_guardada)
+    """
+    descriptor, temporal = tempfile.mkstemp(suffix='.upload')
+    try:
+        with os.fdopen(descriptor, 'wb') as archivo:
+            archivo.write(contenido)
+        return obtener_photo_service().save_photo(temporal, str(user_id), sesion_id)
+    finally:
+        os.remove(temporal)
+
+class _EntradaBloqueo:
+    """Bloqueo de un usuario con su contador de uso"""
+    
+    __slots__ = ('lock', 'en_uso', 'ultimo_uso')
+    
+    def __init__(self):
+        self.lock = asyncio.Lock()
+        self.en_uso = 0
+        self.ultimo_uso = time.monotonic()
+
+class BloqueoPorUsuario:
+    """
+    Serializa las actualizaciones de un mismo usuario
+    
+    Usuarios distintos se procesan en paralelo; los mensajes de un mismo
+    usuario se procesan estrictamente en orden de llegada (asyncio.Lock
+    atiende a los que esperan en orden FIFO). Los bloqueos sin uso se
+    eliminan tras un periodo de inactividad.
+    """
+    
+    def __init__(self, inactividad_segundos: float = 300.0):
+        self.inactividad_segundos = inactividad_segundos
+        self._bloqueos: Dict[int, _EntradaBloqueo] = {}
+        self._ultima_limpieza = time.monotonic()
+    
+    @asynccontextmanager
+    async def bloquear(self, user_id: int):
+        """
+        Adquiere el bloqueo exclusivo del usuario
+        
+        Args:
+            user_id: ID del usuario
+        """
+        entrada = self._bloqueos.get(user_id)
+        if entrada is None:
+            entrada = self._bloqueos[user_id] = _EntradaBloqueo()
+        
+        entrada.en_uso += 1
+        try:
+            async with entrada.lock:
+                yield
+        finally:
+            entrada.en_uso -= 1
+            entrada.ultimo_uso = time.monotonic()
+            self._limpiar_inactivos(entrada.ultimo_uso)
+    
+    def _limpiar_inactivos(self, ahora: float):
+        """
+        Elimina los bloqueos sin uso que superaron el tiempo de inactividad
+        """
+        if ahora - self._ultima_limpieza < self.inactividad_segundos:
+            return
+        
+        self._ultima_limpieza = ahora
+        limite = ahora - self.inactividad_segundos
+        inactivos = [
+            user_id for user_id, entrada in self._bloqueos.items()
+            if entrada.en_uso == 0 and entrada.ultimo_uso < limite
+        ]
+        for user_id in inactivos:
+            del self._bloqueos[user_id]
+        
+        if inactivos:
+            logger.debug(f"Eliminados {len(inactivos)} bloqueos de usuario inactivos")
+    
+    def __len__(self) -> int:
+        return len(self._bloqueos)
+
+bloqueo_usuarios = BloqueoPorUsuario()
+
+expiracion_sesiones = SessionExpiryService(
+    session_service,
+    message_service,
+    timeout_minutes=Config.SESSION_TIMEOUT_MINUTES,
+    warning_minutes=Config.SESSION_WARNING_MINUTES,
+    bloqueo=bloqueo_usuarios
+)
+
+instantaneas_sesiones = SessionSnapshotService(
+    expiracion_sesiones,
+    session_service,
+    conversation_manager,
+    message_service
+)
+
+alertas_seguridad = AlertService(
+    message_service,
+    Config.ALERT_CHAT_IDS,
+    MotorReglas.desde_json(Config.ALERT_RULES_PATH),
+    queue_size=Config.ALERT_QUEUE_SIZE,
+    flush_seconds=Config.ALERT_FLUSH_SECONDS
+)
+
+def estado_conversacion(update: Update) -> Tuple[Optional[str], Optional[str]]:
+    """
+    Obtiene el estado y la pregunta actual del usuario (raíz de los perfiles)
+    """
+    sesion = session_service.obtener_sesion_activa(update.effective_user.id)
+    return (sesion.estado, sesion.pregunta_actual) if sesion else (None, None)
 
+# Con PROFILE_SAMPLE_RATE=0 los manejadores no se envuelven. Va dentro de
+# serializado_por_usuario para leer el estado después de los mensajes previos del usuario
+perfilado = ProfilingService(
+    Config.PROFILE_SAMPLE_RATE,
+    Config.PROFILE_OUTPUT_DIR,
+    flush_seconds=Config.PROFILE_FLUSH_SECONDS,
+    contexto=estado_conversacion
+)
+
+# Contadores que ya llevan los servicios, leídos al exportar las métricas
+REGISTRO.calculada(
+    'sirij_mensajes_salientes_total', 'Mensajes de MessageService por evento',
+    lambda: {(evento,): valor for evento, valor in message_service.metricas.items()},
+    etiquetas=('evento',), tipo='counter'
+)
+REGISTRO.calculada(
+    'sirij_alertas_total', 'Alertas de seguridad por evento',
+    lambda: {(evento,): valor for evento, valor in alertas_seguridad.metricas.items()},
+    etiquetas=('evento',), tipo='counter'
+)
+REGISTRO.calculada(
+    'sirij_autocompletado_total', 'Cargas del índice, reuniones agregadas y valores normalizados',
+    lambda: {(evento,): valor for evento, valor in autocompletado.metricas.items()},
+    etiquetas=('evento',), tipo='counter'
+)
+REGISTRO.calculada(
+    'sirij_perfilado_total', 'Actualizaciones perfiladas y archivos de perfil escritos',
+    lambda: {(evento,): valor for evento, valor in perfilado.metricas.items()},
+    etiquetas=('evento',), tipo='counter'
+)
+REGISTRO.calculada(
+    'sirij_usuarios_en_memoria', 'Usuarios con bloqueo de serialización en memoria',
+    lambda: {(): len(bloqueo_usuarios)}
+)
+
+# Resultados de una consulta inline (máximo de Telegram: 50)
+MAX_RESULTADOS_INLINE = 20
+
+def teclado_sugerencias(sugerencias: Optional[List[str]]) -> Any:
+    """
+    Teclado de respuesta de un toque con las sugerencias de la pregunta
+    
+    Args:
+        sugerencias: Valores sugeridos; lista vacía para quitar el teclado, None para no cambiarlo
+    """
+    if sugerencias is None:
+        return None
+    if not sugerencias:
+        return ReplyKeyboardRemove()
+    return ReplyKeyboardMarkup(
+        [[valor] for valor in sugerencias],
+        resize_keyboard=True,
+        one_time_keyboard=True,
+        input_field_placeholder='Elige una opción o escribe otra'
+    )
+
+# Estados de respuesta tras los cuales el usuario ya no tiene sesión abierta
+ESTADOS_SIN_SESION = {'cancelado', 'sin_sesion', 'completado'}
+
+def seguir_expiracion(update: Update, estado: str):
+    """
+    Reinicia el plazo de inactividad del usuario o deja de seguirlo si su sesión terminó
+    """
+    user_id = update.effective_user.id
+    if estado in ESTADOS_SIN_SESION:
+        expiracion_sesiones.cancelar(user_id)
+    else:
+        expiracion_sesiones.registrar_actividad(user_id, update.effective_chat.id)
+
+def serializado_por_usuario(handler):
+    """
+    Decorador que procesa en orden las actualizaciones de cada usuario
+    """
+    @functools.wraps(handler)
+    async def wrapper(update: Update, context: ContextTypes.DEFAULT_TYPE):
+        usuario = update.effective_user
+        if usuario is None:
+            return await handler(update, context)
+        
+        async with bloqueo_usuarios.bloquear(usuario.id):
+            return await handler(update, context)
+    
+    return wrapper
+
+@cronometrar(LATENCIA_MANEJADORES.etiquetas('start'))
+@serializado_por_usuario
+@perfilado.perfilar('start')
 async def start_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """
     Maneja el comando /start
     """
     user_id = update.effective_user.id
-    username = update.effective_user.username or update.effective_user.first_name
-    
-    logger.info(f"Usuario {username} ({user_id}) inició el bot")
     
     # Inicializar conversación
     response = conversation_manager.iniciar_reunion(user_id)
+    seguir_expiracion(update, response.get('estado'))
+    logger.info("Reunión iniciada", extra={
+        'user_id': user_id, 'sesion_id': response.get('sesion_id'), 'estado': response.get('estado')
+    })
     
-    await update.message.reply_text(response['mensaje'])
+    message_service.responder(update, context, response['mensaje'])
 
+@cronometrar(LATENCIA_MANEJADORES.etiquetas('help'))
 async def help_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """
     Maneja el comando /help
@@ -60,8 +308,11 @@ async def help_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
 ¿Necesitas ayuda? Contacta al administrador.
     """
     
-    await update.message.reply_text(help_text, parse_mode='Markdown')
+    message_service.responder(update, context, help_text, parse_mode='Markdown')
 
+@cronometrar(LATENCIA_MANEJADORES.etiquetas('cancel'))
+@serializado_por_usuario
+@perfilado.perfilar('cancel')
 async def cancel_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """
     Maneja el comando /cancel
@@ -70,90 +321,142 @@ async def cancel_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
     
     # Cancelar sesión activa
     result = session_service.cancelar_sesion(user_id)
+    expiracion_sesiones.cancelar(user_id)
     
     if result['exito']:
         mensaje = "✅ Reunión cancelada. Puedes iniciar una nueva con /start"
     else:
         mensaje = "ℹ️ No tienes ninguna reunión activa."
     
-    await update.message.reply_text(mensaje)
+    # Quitar las sugerencias si la reunión se canceló en una pregunta con teclado
+    message_service.responder(update, context, mensaje, reply_markup=ReplyKeyboardRemove())
 
+@cronometrar(LATENCIA_MANEJADORES.etiquetas('mensaje'))
+@serializado_por_usuario
+@perfilado.perfilar('mensaje')
 async def handle_message(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """
     Maneja mensajes de texto del usuario
     """
     user_id = update.effective_user.id
     mensaje_usuario = update.message.text
-    
-    logger.info(f"Usuario {user_id} envió: {mensaje_usuario}")
+    inicio = time.perf_counter()
     
     try:
         # Procesar mensaje a través del manejador de conversación
         response = conversation_manager.procesar_mensaje(user_id, mensaje_usuario)
+        seguir_expiracion(update, response.get('estado'))
+        
+        # Sin el texto: solo su longitud. El extra se arma solo si DEBUG está activo
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("Mensaje procesado", extra={
+                'user_id': user_id, 'estado': response.get('estado'), 'caracteres': len(mensaje_usuario),
+                'duracion_ms': round((time.perf_counter() - inicio) * 1000, 3)
+            })
         
         # Enviar respuesta
-        await update.message.reply_text(response['mensaje'])
+        message_service.responder(
+            update, context, response['mensaje'], parse_mode=response.get('parse_mode'),
+            reply_markup=teclado_sugerencias(response.get('sugerencias'))
+        )
         
         # Si la conversación terminó, mostrar resumen
         if response.get('estado') == 'completado':
-            resumen = conversation_manager.generar_resumen(user_id)
-            await update.message.reply_text(resumen, parse_mode='Markdown')
+            resumen = conversation_manager.generar_resumen_final(user_id)
+            message_service.responder(update, context, resumen, parse_mode='MarkdownV2')
             
     except Exception as e:
-        logger.error(f"Error procesando mensaje de usuario {user_id}: {e}")
-        await update.message.reply_text(
+        ERRORES_MANEJADORES.etiquetas('mensaje').inc()
+        logger.error(f"Error procesando mensaje de usuario {user_id}: {e}", extra={'user_id': user_id})
+        message_service.responder(
+            update, context,
             "❌ Ocurrió un error procesando tu mensaje. Por favor, intenta de nuevo o usa /cancel para reiniciar."
         )
 
+@cronometrar(LATENCIA_MANEJADORES.etiquetas('foto'))
+@serializado_por_usuario
+@perfilado.perfilar('foto')
 async def handle_photo(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """
     Maneja fotografías enviadas por el usuario
     """
     user_id = update.effective_user.id
     
-    logger.info(f"Usuario {user_id} envió una fotografía")
-    
     try:
         # Verificar si el usuario está en el estado correcto para enviar foto
         sesion = session_service.obtener_sesion_activa(user_id)
         
-        if not sesion or sesion.get('estado') != 'esperando_foto':
-            await update.message.reply_text(
+        if not sesion or sesion.estado != 'esperando_foto':
+            message_service.responder(
+                update, context,
                 "ℹ️ No estoy esperando una fotografía en este momento. "
                 "Completa primero todas las preguntas de la reunión."
             )
             return
         
         # Obtener el archivo de foto más grande disponible
+        inicio = time.perf_counter()
         photo = update.message.photo[-1]
         photo_file = await photo.get_file()
         
         # Descargar y procesar la foto
         photo_bytes = await photo_file.download_as_bytearray()
+        _ETAPA_DESCARGA.observar(time.perf_counter() - inicio)
         
-        # Guardar foto usando el servicio
-        result = photo_service.guardar_foto_evidencia(
-            sesion['sesion_id'], 
-            photo_bytes, 
-            photo.file_id
-        )
+        # Guardar foto usando el servicio (valida y optimiza desde un archivo temporal)
+        exito, mensaje_foto, ruta_foto = guardar_foto_descargada(photo_bytes, user_id, sesion.sesion_id)
         
-        if result['exito']:
+        if exito:
             # Continuar con la conversación
-            response = conversation_manager.procesar_foto_recibida(user_id, result['ruta_archivo'])
-            await update.message.reply_text(response['mensaje'])
+            response = conversation_manager.procesar_foto_recibida(user_id, ruta_foto)
+            seguir_expiracion(update, response.get('estado'))
+            logger.info("Fotografía recibida", extra={
+                'user_id': user_id, 'sesion_id': sesion.sesion_id, 'estado': response.get('estado'),
+                'duracion_ms': round((time.perf_counter() - inicio) * 1000, 3)
+            })
+            message_service.responder(update, context, response['mensaje'], parse_mode=response.get('parse_mode'))
             
             # Si se completó la reunión, mostrar resumen final
             if response.get('estado') == 'completado':
                 resumen = conversation_manager.generar_resumen_final(user_id)
-                await update.message.reply_text(resumen, parse_mode='Markdown')
+                message_service.responder(update, context, resumen, parse_mode='MarkdownV2')
         else:
-            await update.message.reply_text(
-                f"❌ Error al procesar la fotografía: {result['error']}"
+            message_service.responder(
+                update, context,
+                f"❌ Error al procesar la fotografía: {mensaje_foto}"
             )
             
     except Exception as e:
-        logger.error(f"Error procesando foto de usuario {user_id}: {e}")
-        await update.message.reply_text(
+        ERRORES_MANEJADORES.etiquetas('foto').inc()
+        logger.error(f"Error procesando foto de usuario {user_id}: {e}", extra={'user_id': user_id})
+        message_service.responder(
+            update, context,
             "❌ Ocurrió un error procesando la fotografía. Por favor, intenta enviarla de nuevo."
-        )
\ No newline at end of file
+        )
+
+@cronometrar(LATENCIA_MANEJADORES.etiquetas('inline'))
+async def inline_query(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """
+    Maneja las consultas inline (@bot texto): sugiere valores de la pregunta
+    actual que coinciden con lo escrito hasta ahora
+    """
+    consulta = update.inline_query
+    user_id = consulta.from_user.id
+    resultados = []
+    
+    sesion = session_service.obtener_sesion_activa(user_id)
+    if sesion and sesion.estado == 'esperando_respuesta' and sesion.pregunta_actual in CAMPOS_AUTOCOMPLETADO:
+        valores = autocompletado.sugerencias(
+            sesion.pregunta_actual, user_id, consulta.query, limite=MAX_RESULTADOS_INLINE
+        )
+        resultados = [
+            InlineQueryResultArticle(id=str(indice), title=valor, input_message_content=InputTextMessageContent(valor))
+            for indice, valor in enumerate(valores)
+        ]
+    
+    try:
+        # Resultados personales y sin caché: dependen de la sesión del usuario
+        await consulta.answer(resultados, cache_time=0, is_personal=True)
+    except Exception as e:
+        ERRORES_MANEJADORES.etiquetas('inline').inc()
+        logger.error(f"Error respondiendo consulta inline de usuario {user_id}: {e}", extra={'user_id': user_id})
@@ -0,0 +1,186 @@
+# -*- coding: utf-8 -*-
+"""
+Reparto de actualizaciones entre procesos trabajadores para SIRIJ BOT
+Cada usuario se asigna siempre al mismo proceso, que es dueño de su sesión
+"""
+
+import asyncio
+import logging
+import multiprocessing
+from typing import Any, Dict, List, Optional
+
+from telegram import Update
+from telegram.ext import Application, ContextTypes
+
+logger = logging.getLogger(__name__)
+
+
+def calcular_shard(user_id: int, total_workers: int) -> int:
+    """
+    Calcula el proceso trabajador que atiende a un usuario
+
+    Los IDs de Telegram son enteros estables, por lo que el módulo
+    da el mismo resultado entre reinicios (a diferencia de hash()).
+
+    Args:
+        user_id: ID de Telegram del usuario
+        total_workers: Número de procesos trabajadores
+
+    Returns:
+        int: Índice del proceso trabajador
+    """
+    return user_id % total_workers
+
+
+def _ejecutar_worker(indice: int, total_workers: int, token: str, cola: Any, nivel_log: str):
+    """
+    Punto de entrada de cada proceso trabajador
+    """
+    from config import Config
+    from logging_setup import configurar_logging
+
+    # Cada proceso tiene su propio hilo escritor y su propio archivo rotativo
+    configuracion = Config.get_logging_config(f'worker-{indice}')
+    configuracion['nivel'] = nivel_log
+    configurar_logging(**configuracion)
+
+    try:
+        asyncio.run(_bucle_worker(indice, total_workers, token, cola))
+    except KeyboardInterrupt:
+        pass
+
+
+async def _bucle_worker(indice: int, total_workers: int, token: str, cola: Any):
+    """
+    Procesa las actualizaciones recibidas del despachador en orden de llegada
+    """
+    # Importación diferida: cada proceso crea sus propias instancias de servicios
+    from app import crear_builder, registrar_manejadores, restaurar_sesiones
+    from bot.handlers import instantaneas_sesiones, message_service, perfilado
+    from config import Config
+    from database.backends import cerrar_backend
+    from metrics import ServidorMetricas
+
+    # Cada proceso guarda y restaura solo las sesiones de sus usuarios
+    ruta_instantanea = f"{Config.SESSION_SNAPSHOT_PATH}.{indice}"
+
+    application = crear_builder(token).updater(None).concurrent_updates(True).build()
+    registrar_manejadores(application)
+    restaurar_sesiones(
+        application, ruta_instantanea,
+        lambda user_id: calcular_shard(user_id, total_workers) == indice
+    )
+
+    # Cada proceso tiene sus propias métricas y su propio puerto
+    servidor_metricas = None
+    if Config.METRICS_PORT:
+        servidor_metricas = ServidorMetricas(Config.METRICS_HOST, Config.METRICS_PORT + 1 + indice)
+        servidor_metricas.iniciar()
+
+    loop = asyncio.get_running_loop()
+
+    try:
+        async with application:
+            await application.start()
+            logger.info(f"Proceso trabajador {indice} listo")
+
+            while True:
+                datos = await loop.run_in_executor(None, cola.get)
+                if datos is None:
+                    break
+
+                update = Update.de_json(datos, application.bot)
+                await application.update_queue.put(update)
+
+            await application.stop()
+            # Los envíos no se esperan en los handlers: enviar lo pendiente antes de cerrar el bot
+            await message_service.vaciar()
+    finally:
+        instantaneas_sesiones.guardar(ruta_instantanea)
+        perfilado.escribir()
+        cerrar_backend()
+        if servidor_metricas:
+            servidor_metricas.detener()
+
+    logger.info(f"Proceso trabajador {indice} detenido")
+
+
+class DespachadorShards:
+    """
+    Reparte las actualizaciones entrantes entre N procesos trabajadores
+
+    Todas las actualizaciones de un mismo usuario llegan al mismo proceso,
+    lo que conserva el orden de sus mensajes sin necesidad de bloqueos.
+    """
+
+    def __init__(self, token: str, total_workers: int, nivel_log: str = 'INFO'):
+        if total_workers < 1:
+            raise ValueError("total_workers debe ser mayor a 0")
+
+        self.token = token
+        self.total_workers = total_workers
+        self.nivel_log = nivel_log
+
+        # 'spawn' evita heredar el estado del event loop del proceso principal
+        self._contexto = multiprocessing.get_context('spawn')
+        self.colas: List[Any] = []
+        self.procesos: List[Any] = []
+        self.despachadas: List[int] = [0] * total_workers
+
+    async def iniciar(self, application: Optional[Application] = None):
+        """
+        Inicia los procesos trabajadores (usable como post_init)
+        """
+        for indice in range(self.total_workers):
+            cola = self._contexto.Queue()
+            proceso = self._contexto.Process(
+                target=_ejecutar_worker,
+                args=(indice, self.total_workers, self.token, cola, self.nivel_log),
+                name=f'sirij-worker-{indice}',
+                daemon=True
+            )
+            proceso.start()
+
+            self.colas.append(cola)
+            self.procesos.append(proceso)
+
+        logger.info(f"Iniciados {self.total_workers} procesos trabajadores")
+
+    async def despachar(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
+        """
+        Envía la actualización al proceso dueño del usuario
+        """
+        usuario = update.effective_user
+        indice = calcular_shard(usuario.id, self.total_workers) if usuario else 0
+
+        self.colas[indice].put_nowait(update.to_dict())
+        self.despachadas[indice] += 1
+
+    async def detener(self, application: Optional[Application] = None, timeout: float = 10.0):
+        """
+        Detiene los procesos trabajadores tras vaciar sus colas (usable como post_shutdown)
+        """
+        for cola in self.colas:
+            cola.put(None)
+
+        loop = asyncio.get_running_loop()
+        for proceso in self.procesos:
+            await loop.run_in_executor(None, proceso.join, timeout)
+            if proceso.is_alive():
+                logger.warning(f"Proceso {proceso.name} no terminó a tiempo, forzando cierre")
+                proceso.terminate()
+
+        logger.info(f"Procesos trabajadores detenidos. Actualizaciones despachadas: {self.despachadas}")
+
+    def obtener_estado(self) -> Dict[str, Any]:
+        """
+        Obtiene el estado de los procesos trabajadores
+
+        Returns:
+            Dict con procesos vivos y actualizaciones despachadas por proceso
+        """
+        return {
+            'total_workers': self.total_workers,
+            'vivos': [proceso.is_alive() for proceso in self.procesos],
+            'despachadas': list(self.despachadas)
+        }
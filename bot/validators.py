@@ -5,15 +5,38 @@ Valida diferentes tipos de entrada del usuario
 """
 
 import re
+import time
 from datetime import datetime
-from typing import Dict, Any, List
+from typing import Any, Optional
+
+from metrics import LATENCIA_VALIDACION
+
+class ResultadoValidacion:
+    """
+    Resultado de validar una respuesta
+    """
+    
+    __slots__ = ('valida', 'valor_procesado', 'mensaje_error')
+    
+    def __init__(self, valida: bool, valor_procesado: Any = None, mensaje_error: Optional[str] = None):
+        self.valida = valida
+        self.valor_procesado = valor_procesado
+        self.mensaje_error = mensaje_error
+    
+    @classmethod
+    def aceptada(cls, valor_procesado: Any) -> 'ResultadoValidacion':
+        return cls(True, valor_procesado)
+    
+    @classmethod
+    def rechazada(cls, mensaje_error: str) -> 'ResultadoValidacion':
+        return cls(False, mensaje_error=mensaje_error)
 
 class ResponseValidator:
     """
     Clase para validar diferentes tipos de respuestas del usuario
     """
     
-    def validar_respuesta(self, respuesta: str, tipo: str) -> Dict[str, Any]:
+    def validar_respuesta(self, respuesta: str, tipo: str) -> ResultadoValidacion:
         """
         Valida una respuesta según el tipo especificado
         
@@ -22,10 +45,14 @@ class ResponseValidator:
             tipo: El tipo de validación a aplicar
             
         Returns:
-            Dict con 'valida', 'valor_procesado' y 'mensaje_error'
+            ResultadoValidacion con valida, valor_procesado y mensaje_error
         """
-        respuesta = respuesta.strip()
-        
+        inicio = time.perf_counter()
+        resultado = self._validar_tipo(respuesta.strip(), tipo)
+        LATENCIA_VALIDACION.etiquetas(tipo).observar(time.perf_counter() - inicio)
+        return resultado
+    
+    def _validar_tipo(self, respuesta: str, tipo: str) -> ResultadoValidacion:
         if tipo == 'boolean':
             return self._validar_boolean(respuesta)
         elif tipo == 'fecha':
@@ -39,12 +66,9 @@ class ResponseValidator:
         elif tipo == 'lista_nombres':
             return self._validar_lista_nombres(respuesta)
         else:
-            return {
-                'valida': False,
-                'mensaje_error': 'tipo de validación no reconocido'
-            }
+            return ResultadoValidacion.rechazada('tipo de validación no reconocido')
     
-    def _validar_boolean(self, respuesta: str) -> Dict[str, Any]:
+    def _validar_boolean(self, respuesta: str) -> ResultadoValidacion:
         """
         Valida respuestas Sí/No
         """
@@ -52,25 +76,16 @@ class ResponseValidator:
         
         # Respuestas afirmativas
         if respuesta_lower in ['sí', 'si', 's', 'yes', 'y', '1', 'true', 'verdadero']:
-            return {
-                'valida': True,
-                'valor_procesado': True
-            }
+            return ResultadoValidacion.aceptada(True)
         
         # Respuestas negativas
         elif respuesta_lower in ['no', 'n', '0', 'false', 'falso']:
-            return {
-                'valida': True,
-                'valor_procesado': False
-            }
+            return ResultadoValidacion.aceptada(False)
         
         else:
-            return {
-                'valida': False,
-                'mensaje_error': 'responde con "Sí" o "No"'
-            }
+            return ResultadoValidacion.rechazada('responde con "Sí" o "No"')
     
-    def _validar_fecha(self, respuesta: str) -> Dict[str, Any]:
+    def _validar_fecha(self, respuesta: str) -> ResultadoValidacion:
         """
         Valida formato de fecha DD/MM/AAAA
         """
@@ -93,32 +108,20 @@ class ResponseValidator:
                     # Verificar que no sea una fecha futura muy lejana
                     año_actual = datetime.now().year
                     if int(año) > año_actual + 1:
-                        return {
-                            'valida': False,
-                            'mensaje_error': f'el año no puede ser mayor a {año_actual + 1}'
-                        }
+                        return ResultadoValidacion.rechazada(f'el año no puede ser mayor a {año_actual + 1}')
                     
                     # Verificar que no sea muy antigua (más de 10 años)
                     if int(año) < año_actual - 10:
-                        return {
-                            'valida': False,
-                            'mensaje_error': f'el año no puede ser menor a {año_actual - 10}'
-                        }
+                        return ResultadoValidacion.rechazada(f'el año no puede ser menor a {año_actual - 10}')
                     
-                    return {
-                        'valida': True,
-                        'valor_procesado': fecha_obj.date()
-                    }
+                    return ResultadoValidacion.aceptada(fecha_obj.date())
                     
                 except ValueError:
                     continue
         
-        return {
-            'valida': False,
-            'mensaje_error': 'ingresa la fecha en formato DD/MM/AAAA (ejemplo: 15/03/2024)'
-        }
+        return ResultadoValidacion.rechazada('ingresa la fecha en formato DD/MM/AAAA (ejemplo: 15/03/2024)')
     
-    def _validar_hora(self, respuesta: str) -> Dict[str, Any]:
+    def _validar_hora(self, respuesta: str) -> ResultadoValidacion:
         """
         Valida formato de hora HH:MM
         """
@@ -144,96 +147,60 @@ class ResponseValidator:
                     
                     # Validar rangos
                     if not (0 <= hora_int <= 23):
-                        return {
-                            'valida': False,
-                            'mensaje_error': 'la hora debe estar entre 00 y 23'
-                        }
+                        return ResultadoValidacion.rechazada('la hora debe estar entre 00 y 23')
                     
                     if not (0 <= minuto_int <= 59):
-                        return {
-                            'valida': False,
-                            'mensaje_error': 'los minutos deben estar entre 00 y 59'
-                        }
+                        return ResultadoValidacion.rechazada('los minutos deben estar entre 00 y 59')
                     
                     # Crear objeto time
                     hora_obj = datetime.strptime(f"{hora_int:02d}:{minuto_int:02d}", '%H:%M').time()
                     
-                    return {
-                        'valida': True,
-                        'valor_procesado': hora_obj
-                    }
+                    return ResultadoValidacion.aceptada(hora_obj)
                     
                 except ValueError:
                     continue
         
-        return {
-            'valida': False,
-            'mensaje_error': 'ingresa la hora en formato HH:MM (ejemplo: 08:30)'
-        }
+        return ResultadoValidacion.rechazada('ingresa la hora en formato HH:MM (ejemplo: 08:30)')
     
-    def _validar_texto(self, respuesta: str) -> Dict[str, Any]:
+    def _validar_texto(self, respuesta: str) -> ResultadoValidacion:
         """
         Valida texto obligatorio
         """
         if len(respuesta) == 0:
-            return {
-                'valida': False,
-                'mensaje_error': 'este campo no puede estar vacío'
-            }
+            return ResultadoValidacion.rechazada('este campo no puede estar vacío')
         
         if len(respuesta) < 2:
-            return {
-                'valida': False,
-                'mensaje_error': 'ingresa al menos 2 caracteres'
-            }
+            return ResultadoValidacion.rechazada('ingresa al menos 2 caracteres')
         
         if len(respuesta) > 500:
-            return {
-                'valida': False,
-                'mensaje_error': 'el texto no puede exceder 500 caracteres'
-            }
+            return ResultadoValidacion.rechazada('el texto no puede exceder 500 caracteres')
         
         # Limpiar texto
         texto_limpio = self._limpiar_texto(respuesta)
         
-        return {
-            'valida': True,
-            'valor_procesado': texto_limpio
-        }
+        return ResultadoValidacion.aceptada(texto_limpio)
     
-    def _validar_texto_opcional(self, respuesta: str) -> Dict[str, Any]:
+    def _validar_texto_opcional(self, respuesta: str) -> ResultadoValidacion:
         """
         Valida texto opcional (puede estar vacío o ser "No")
         """
         if respuesta.lower() in ['no', 'n', 'ninguno', 'ninguna', 'nada', '']:
-            return {
-                'valida': True,
-                'valor_procesado': ''
-            }
+            return ResultadoValidacion.aceptada('')
         
         if len(respuesta) > 500:
-            return {
-                'valida': False,
-                'mensaje_error': 'el texto no puede exceder 500 caracteres'
-            }
+            return ResultadoValidacion.rechazada('el texto no puede exceder 500 caracteres')
         
         # Limpiar texto
         texto_limpio = self._limpiar_texto(respuesta)
         
-        return {
-            'valida': True,
-            'valor_procesado': texto_limpio
-        }
+        return ResultadoValidacion.aceptada(texto_limpio)
     
-    def _validar_lista_nombres(self, respuesta: str) -> Dict[str, Any]:
+    def _validar_lista_nombres(self, respuesta: str) -> ResultadoValidacion:
         """
         Valida lista de nombres separados por comas
         """
         if len(respuesta) == 0:
-            return {
-                'valida': False,
-                'mensaje_error': 'debes ingresar al menos un nombre'
-            }
+            return ResultadoValidacion.rechazada('debes ingresar al menos un nombre')
         
         # Separar por comas, punto y coma, o saltos de línea
         separadores = [',', ';', '\n']
@@ -252,43 +219,25 @@ class ResponseValidator:
             if len(nombre) > 0:
                 # Validar que el nombre tenga al menos 2 caracteres
                 if len(nombre) < 2:
-                    return {
-                        'valida': False,
-                        'mensaje_error': f'el nombre "{nombre}" es demasiado corto (mínimo 2 caracteres)'
-                    }
+                    return ResultadoValidacion.rechazada(f'el nombre "{nombre}" es demasiado corto (mínimo 2 caracteres)')
                 
                 # Validar que no sea demasiado largo
                 if len(nombre) > 100:
-                    return {
-                        'valida': False,
-                        'mensaje_error': f'el nombre "{nombre[:20]}..." es demasiado largo (máximo 100 caracteres)'
-                    }
+                    return ResultadoValidacion.rechazada(f'el nombre "{nombre[:20]}..." es demasiado largo (máximo 100 caracteres)')
                 
                 # Validar caracteres básicos (letras, espacios, acentos, guiones)
                 if not re.match(r'^[a-zA-ZáéíóúÁÉÍÓÚñÑüÜ\s\-\.]+$', nombre):
-                    return {
-                        'valida': False,
-                        'mensaje_error': f'el nombre "{nombre}" contiene caracteres no válidos'
-                    }
+                    return ResultadoValidacion.rechazada(f'el nombre "{nombre}" contiene caracteres no válidos')
                 
                 nombres_validos.append(self._limpiar_texto(nombre))
         
         if len(nombres_validos) == 0:
-            return {
-                'valida': False,
-                'mensaje_error': 'debes ingresar al menos un nombre válido'
-            }
+            return ResultadoValidacion.rechazada('debes ingresar al menos un nombre válido')
         
         if len(nombres_validos) > 50:
-            return {
-                'valida': False,
-                'mensaje_error': 'no puedes ingresar más de 50 nombres'
-            }
-        
-        return {
-            'valida': True,
-            'valor_procesado': nombres_validos
-        }
+            return ResultadoValidacion.rechazada('no puedes ingresar más de 50 nombres')
+        
+        return ResultadoValidacion.aceptada(nombres_validos)
     
     def _limpiar_texto(self, texto: str) -> str:
         """
@@ -310,56 +259,39 @@ class ResponseValidator:
         # Si tiene menos de 50 caracteres y no tiene números, probablemente es un nombre
         return len(texto) < 50 and not any(char.isdigit() for char in texto)
     
-    def validar_horario_coherente(self, hora_inicio: str, hora_fin: str) -> Dict[str, Any]:
+    def validar_horario_coherente(self, hora_inicio: str, hora_fin: str) -> ResultadoValidacion:
         """
         Valida que el horario de fin sea posterior al de inicio
+        
+        Returns:
+            ResultadoValidacion con valor_procesado (hora_inicio, hora_fin, duracion_minutos)
         """
         validacion_inicio = self._validar_hora(hora_inicio)
         validacion_fin = self._validar_hora(hora_fin)
         
-        if not validacion_inicio['valida']:
-            return {
-                'valida': False,
-                'mensaje_error': f'Hora de inicio inválida: {validacion_inicio["mensaje_error"]}'
-            }
+        if not validacion_inicio.valida:
+            return ResultadoValidacion.rechazada(f'Hora de inicio inválida: {validacion_inicio.mensaje_error}')
         
-        if not validacion_fin['valida']:
-            return {
-                'valida': False,
-                'mensaje_error': f'Hora de fin inválida: {validacion_fin["mensaje_error"]}'
-            }
+        if not validacion_fin.valida:
+            return ResultadoValidacion.rechazada(f'Hora de fin inválida: {validacion_fin.mensaje_error}')
         
-        inicio = validacion_inicio['valor_procesado']
-        fin = validacion_fin['valor_procesado']
+        inicio = validacion_inicio.valor_procesado
+        fin = validacion_fin.valor_procesado
         
         # Convertir a minutos para comparar
         minutos_inicio = inicio.hour * 60 + inicio.minute
         minutos_fin = fin.hour * 60 + fin.minute
         
         if minutos_fin <= minutos_inicio:
-            return {
-                'valida': False,
-                'mensaje_error': 'la hora de término debe ser posterior a la hora de inicio'
-            }
+            return ResultadoValidacion.rechazada('la hora de término debe ser posterior a la hora de inicio')
         
         # Verificar que la duración sea razonable (máximo 12 horas)
         duracion_minutos = minutos_fin - minutos_inicio
         if duracion_minutos > 12 * 60:
-            return {
-                'valida': False,
-                'mensaje_error': 'la duración de la reunión no puede exceder 12 horas'
-            }
+            return ResultadoValidacion.rechazada('la duración de la reunión no puede exceder 12 horas')
         
         # Verificar duración mínima (al menos 5 minutos)
         if duracion_minutos < 5:
-            return {
-                'valida': False,
-                'mensaje_error': 'la reunión debe durar al menos 5 minutos'
-            }
-        
-        return {
-            'valida': True,
-            'hora_inicio': inicio,
-            'hora_fin': fin,
-            'duracion_minutos': duracion_minutos
-        }
\ No newline at end of file
+            return ResultadoValidacion.rechazada('la reunión debe durar al menos 5 minutos')
+        
+        return ResultadoValidacion.aceptada((inicio, fin, duracion_minutos))
\ No newline at end of file
@@ -14,6 +14,13 @@ class Config:
     
     # Configuración de Base de Datos
     DATABASE_URL = os.getenv('DATABASE_URL', 'sqlite:///sirij_bot.db')
+    DATABASE_POOL_MIN_SIZE = int(os.getenv('DATABASE_POOL_MIN_SIZE', '1'))  # solo PostgreSQL
+    DATABASE_POOL_MAX_SIZE = int(os.getenv('DATABASE_POOL_MAX_SIZE', '10'))
+    SQLITE_JOURNAL_MODE = os.getenv('SQLITE_JOURNAL_MODE', 'WAL')
+    
+    # Réplica de lectura para estadísticas, exportaciones y reportes (vacío = desactivada)
+    DATABASE_REPLICA_URL = os.getenv('DATABASE_REPLICA_URL', '')
+    REPLICA_REFRESH_SECONDS = int(os.getenv('REPLICA_REFRESH_SECONDS', '300'))  # copias de SQLite
     
     # Configuración de Almacenamiento de Fotos
     PHOTO_STORAGE_PATH = os.getenv('PHOTO_STORAGE_PATH', './photos')
@@ -21,10 +28,75 @@ class Config:
     
     # Configuración de Sesiones
     SESSION_TIMEOUT_MINUTES = int(os.getenv('SESSION_TIMEOUT_MINUTES', '60'))
+    SESSION_WARNING_MINUTES = int(os.getenv('SESSION_WARNING_MINUTES', '5'))  # 0 = sin aviso
+    SESSION_SNAPSHOT_PATH = os.getenv('SESSION_SNAPSHOT_PATH', './sesiones.snapshot')
+    SESSION_SNAPSHOT_INTERVAL_SECONDS = int(os.getenv('SESSION_SNAPSHOT_INTERVAL_SECONDS', '60'))  # 0 = solo al apagar
+    SESSION_CODEC = os.getenv('SESSION_CODEC', 'binario')  # formato de datos_sesion: binario o json
+    DUPLICATE_POLICY = os.getenv('DUPLICATE_POLICY', 'marcar')  # reuniones repetidas: rechazar, fusionar o marcar
+    
+    # Sugerencias de departamento, categoría y supervisor (ver services/autocomplete_service.py)
+    AUTOCOMPLETE_SUGGESTIONS = int(os.getenv('AUTOCOMPLETE_SUGGESTIONS', '4'))  # 0 = sin sugerencias
+    AUTOCOMPLETE_HISTORY_MONTHS = int(os.getenv('AUTOCOMPLETE_HISTORY_MONTHS', '12'))
+    AUTOCOMPLETE_REFRESH_MINUTES = int(os.getenv('AUTOCOMPLETE_REFRESH_MINUTES', '60'))  # 0 = solo al arrancar
+    
+    # Configuración de Mantenimiento (limpieza de sesiones y fotos)
+    MAINTENANCE_INTERVAL_MINUTES = int(os.getenv('MAINTENANCE_INTERVAL_MINUTES', '15'))
+    MAINTENANCE_WINDOW_START = int(os.getenv('MAINTENANCE_WINDOW_START', '22'))
+    MAINTENANCE_WINDOW_END = int(os.getenv('MAINTENANCE_WINDOW_END', '6'))
+    MAINTENANCE_JITTER_SECONDS = int(os.getenv('MAINTENANCE_JITTER_SECONDS', '60'))
+    MAINTENANCE_BATCH_SIZE = int(os.getenv('MAINTENANCE_BATCH_SIZE', '500'))
+    MAINTENANCE_TIME_BUDGET_SECONDS = float(os.getenv('MAINTENANCE_TIME_BUDGET_SECONDS', '5'))
+    PHOTO_RETENTION_DAYS = int(os.getenv('PHOTO_RETENTION_DAYS', '0'))  # 0 = conservar siempre
+    
+    # Configuración de Migraciones (rellenos de datos en segundo plano)
+    MIGRATION_BATCH_SIZE = int(os.getenv('MIGRATION_BATCH_SIZE', '500'))
+    MIGRATION_BATCH_PAUSE_SECONDS = float(os.getenv('MIGRATION_BATCH_PAUSE_SECONDS', '0.05'))
+    MIGRATION_BUSINESS_HOURS = tuple(int(h) for h in os.getenv('MIGRATION_BUSINESS_HOURS', '7-19').split('-'))
+    MIGRATION_BUSINESS_SLOWDOWN = int(os.getenv('MIGRATION_BUSINESS_SLOWDOWN', '10'))
+    
+    # Particiones mensuales de reuniones (ver database/partitions.py)
+    MEETING_PARTITION_MONTHS_AHEAD = int(os.getenv('MEETING_PARTITION_MONTHS_AHEAD', '2'))
+    MEETING_ARCHIVE_AFTER_MONTHS = int(os.getenv('MEETING_ARCHIVE_AFTER_MONTHS', '0'))  # 0 = no archivar
+    MEETING_ARCHIVE_PATH = os.getenv('MEETING_ARCHIVE_PATH', './archivo')
+    
+    # Límites de envío de Telegram (mensajes por segundo)
+    TELEGRAM_GLOBAL_RATE = float(os.getenv('TELEGRAM_GLOBAL_RATE', '30'))
+    TELEGRAM_CHAT_RATE = float(os.getenv('TELEGRAM_CHAT_RATE', '1'))
+    TELEGRAM_CHAT_BURST = int(os.getenv('TELEGRAM_CHAT_BURST', '3'))
+    
+    # Servidor de la Bot API (vacío = api.telegram.org); p. ej. un servidor local
+    # de la Bot API o el servidor falso de benchmarks/bench_carga.py
+    TELEGRAM_API_URL = os.getenv('TELEGRAM_API_URL', '')  # http://127.0.0.1:8081/bot
+    TELEGRAM_FILE_URL = os.getenv('TELEGRAM_FILE_URL', '')  # http://127.0.0.1:8081/file/bot
+    
+    # Alertas de seguridad de las reuniones guardadas (ver services/alert_service.py)
+    ALERT_CHAT_IDS = [int(c) for c in os.getenv('ALERT_CHAT_IDS', '').split(',') if c.strip()]
+    ALERT_RULES_PATH = os.getenv('ALERT_RULES_PATH', '')  # vacío = reglas predeterminadas
+    ALERT_QUEUE_SIZE = int(os.getenv('ALERT_QUEUE_SIZE', '1000'))
+    ALERT_FLUSH_SECONDS = float(os.getenv('ALERT_FLUSH_SECONDS', '2'))
+    
+    # Endpoint de métricas en formato Prometheus (0 = desactivado, el valor por
+    # defecto; en modo multiproceso cada trabajador usa METRICS_PORT + 1 + índice)
+    METRICS_HOST = os.getenv('METRICS_HOST', '127.0.0.1')
+    METRICS_PORT = int(os.getenv('METRICS_PORT', '0'))
+    
+    # Perfilado de actualizaciones (0 = desactivado; 0.01 = 1 de cada 100)
+    PROFILE_SAMPLE_RATE = float(os.getenv('PROFILE_SAMPLE_RATE', '0'))
+    PROFILE_OUTPUT_DIR = os.getenv('PROFILE_OUTPUT_DIR', './perfiles')
+    PROFILE_FLUSH_SECONDS = float(os.getenv('PROFILE_FLUSH_SECONDS', '60'))
+    
+    # Configuración de Procesos (1 = un solo proceso)
+    WORKER_PROCESSES = int(os.getenv('WORKER_PROCESSES', '1'))
     
     # Configuración de Logging
     LOG_LEVEL = os.getenv('LOG_LEVEL', 'INFO')
-    LOG_FILE = os.getenv('LOG_FILE', 'sirij_bot.log')
+    LOG_FILE = os.getenv('LOG_FILE', 'sirij_bot.log')  # JSON, con rotación
+    LOG_FORMAT = os.getenv('LOG_FORMAT', 'texto')  # formato de consola: texto o json
+    LOG_MAX_MB = float(os.getenv('LOG_MAX_MB', '10'))
+    LOG_BACKUP_COUNT = int(os.getenv('LOG_BACKUP_COUNT', '5'))
+    LOG_QUEUE_SIZE = int(os.getenv('LOG_QUEUE_SIZE', '10000'))
+    # Muestreo de INFO/DEBUG por logger, 1 de cada N: 'bot.handlers=10,database.models=100'
+    LOG_SAMPLING = os.getenv('LOG_SAMPLING', '')
     
     # Configuración de Debug
     DEBUG = os.getenv('DEBUG', 'False').lower() == 'true'
@@ -70,6 +142,14 @@ class Config:
             "Todos los datos han sido eliminados. "
             "Puedes iniciar una nueva reunión cuando gustes con /start."
         ),
+        'session_warning': (
+            "⏳ Tu reunión sigue abierta, pero expirará en {minutos} minutos por inactividad.\n\n"
+            "Responde la pregunta pendiente para continuar."
+        ),
+        'session_restored': (
+            "🔄 El bot se reinició, pero tu reunión sigue guardada. Continuemos donde te quedaste:\n\n"
+            "{pregunta}"
+        ),
         'session_expired': (
             "⏰ Tu sesión ha expirado por inactividad.\n\n"
             "Por favor, inicia una nueva reunión con /start."
@@ -167,6 +247,23 @@ class Config:
                     os.makedirs(db_dir, exist_ok=True)
                 except Exception as e:
                     errors.append(f"No se puede crear directorio de base de datos: {e}")
+        elif cls.DATABASE_URL.startswith('postgresql:'):
+            if not 1 <= cls.DATABASE_POOL_MIN_SIZE <= cls.DATABASE_POOL_MAX_SIZE:
+                errors.append("DATABASE_POOL_MIN_SIZE debe estar entre 1 y DATABASE_POOL_MAX_SIZE")
+        else:
+            errors.append("DATABASE_URL debe comenzar con sqlite: o postgresql:")
+        
+        if cls.DATABASE_REPLICA_URL:
+            if cls.DATABASE_REPLICA_URL.startswith('sqlite:'):
+                if not cls.DATABASE_URL.startswith('sqlite:'):
+                    errors.append("Una réplica SQLite solo puede copiarse de una base SQLite")
+                elif cls.DATABASE_REPLICA_URL == cls.DATABASE_URL:
+                    errors.append("DATABASE_REPLICA_URL debe ser un archivo distinto de DATABASE_URL")
+            elif not cls.DATABASE_REPLICA_URL.startswith('postgresql:'):
+                errors.append("DATABASE_REPLICA_URL debe comenzar con sqlite: o postgresql:")
+            
+            if cls.REPLICA_REFRESH_SECONDS <= 0:
+                errors.append("REPLICA_REFRESH_SECONDS debe ser mayor a 0")
         
         # Validar configuración numérica
         if cls.PHOTO_MAX_SIZE_MB <= 0:
@@ -175,6 +272,45 @@ class Config:
         if cls.SESSION_TIMEOUT_MINUTES <= 0:
             errors.append("SESSION_TIMEOUT_MINUTES debe ser mayor a 0")
         
+        if not 0 <= cls.SESSION_WARNING_MINUTES < cls.SESSION_TIMEOUT_MINUTES:
+            errors.append("SESSION_WARNING_MINUTES debe estar entre 0 y SESSION_TIMEOUT_MINUTES")
+        
+        if cls.SESSION_SNAPSHOT_INTERVAL_SECONDS < 0:
+            errors.append("SESSION_SNAPSHOT_INTERVAL_SECONDS no puede ser negativo")
+        
+        if not (0 <= cls.MAINTENANCE_WINDOW_START <= 24 and 0 <= cls.MAINTENANCE_WINDOW_END <= 24):
+            errors.append("MAINTENANCE_WINDOW_START y MAINTENANCE_WINDOW_END deben estar entre 0 y 24")
+        
+        if cls.MEETING_PARTITION_MONTHS_AHEAD < 0 or cls.MEETING_ARCHIVE_AFTER_MONTHS < 0:
+            errors.append("MEETING_PARTITION_MONTHS_AHEAD y MEETING_ARCHIVE_AFTER_MONTHS no pueden ser negativos")
+        
+        if cls.ALERT_RULES_PATH and not os.path.isfile(cls.ALERT_RULES_PATH):
+            errors.append(f"ALERT_RULES_PATH no existe: {cls.ALERT_RULES_PATH}")
+        
+        if cls.ALERT_QUEUE_SIZE <= 0 or cls.ALERT_FLUSH_SECONDS <= 0:
+            errors.append("ALERT_QUEUE_SIZE y ALERT_FLUSH_SECONDS deben ser mayores a 0")
+        
+        if not 0 <= cls.METRICS_PORT <= 65535 - cls.WORKER_PROCESSES:
+            errors.append("METRICS_PORT debe estar entre 0 y 65535 (más los puertos de los trabajadores)")
+        
+        if not 0 <= cls.PROFILE_SAMPLE_RATE <= 1 or cls.PROFILE_FLUSH_SECONDS <= 0:
+            errors.append("PROFILE_SAMPLE_RATE debe estar entre 0 y 1 y PROFILE_FLUSH_SECONDS ser mayor a 0")
+        
+        if cls.WORKER_PROCESSES <= 0:
+            errors.append("WORKER_PROCESSES debe ser mayor a 0")
+        
+        if cls.LOG_FORMAT not in ('texto', 'json'):
+            errors.append("LOG_FORMAT debe ser 'texto' o 'json'")
+        
+        if cls.LOG_MAX_MB <= 0 or cls.LOG_BACKUP_COUNT < 0 or cls.LOG_QUEUE_SIZE <= 0:
+            errors.append("LOG_MAX_MB y LOG_QUEUE_SIZE deben ser mayores a 0 y LOG_BACKUP_COUNT no negativo")
+        
+        try:
+            from logging_setup import parsear_muestreo
+            parsear_muestreo(cls.LOG_SAMPLING)
+        except ValueError:
+            errors.append("LOG_SAMPLING debe tener el formato 'logger=N,otro.logger=M'")
+        
         return {
             'valid': len(errors) == 0,
             'errors': errors,
@@ -206,45 +342,27 @@ class Config:
             }
     
     @classmethod
-    def get_logging_config(cls) -> Dict[str, Any]:
+    def get_logging_config(cls, proceso: str = None) -> Dict[str, Any]:
         """
-        Obtiene la configuración de logging
+        Obtiene la configuración de logging para logging_setup.configurar_logging
+        
+        Args:
+            proceso: Nombre del proceso trabajador (su archivo lleva el nombre como sufijo)
         
         Returns:
-            Dict con configuración de logging
+            Dict con los argumentos de configurar_logging
         """
+        from logging_setup import parsear_muestreo
+        
         return {
-            'version': 1,
-            'disable_existing_loggers': False,
-            'formatters': {
-                'standard': {
-                    'format': '%(asctime)s [%(levelname)s] %(name)s: %(message)s'
-                },
-                'detailed': {
-                    'format': '%(asctime)s [%(levelname)s] %(name)s:%(lineno)d: %(message)s'
-                }
-            },
-            'handlers': {
-                'console': {
-                    'level': cls.LOG_LEVEL,
-                    'class': 'logging.StreamHandler',
-                    'formatter': 'standard'
-                },
-                'file': {
-                    'level': cls.LOG_LEVEL,
-                    'class': 'logging.FileHandler',
-                    'filename': cls.LOG_FILE,
-                    'formatter': 'detailed',
-                    'encoding': 'utf-8'
-                }
-            },
-            'loggers': {
-                '': {
-                    'handlers': ['console', 'file'],
-                    'level': cls.LOG_LEVEL,
-                    'propagate': False
-                }
-            }
+            'nivel': cls.LOG_LEVEL,
+            'archivo': f"{cls.LOG_FILE}.{proceso}" if cls.LOG_FILE and proceso else cls.LOG_FILE or None,
+            'formato_consola': cls.LOG_FORMAT,
+            'max_bytes': int(cls.LOG_MAX_MB * 1024 * 1024),
+            'respaldos': cls.LOG_BACKUP_COUNT,
+            'muestreo': parsear_muestreo(cls.LOG_SAMPLING),
+            'tamano_cola': cls.LOG_QUEUE_SIZE,
+            'proceso': proceso
         }
     
     @classmethod
@@ -261,6 +379,7 @@ class Config:
         print(f"• Almacenamiento fotos: {cls.PHOTO_STORAGE_PATH}")
         print(f"• Tamaño máximo foto: {cls.PHOTO_MAX_SIZE_MB}MB")
         print(f"• Timeout sesión: {cls.SESSION_TIMEOUT_MINUTES} minutos")
+        print(f"• Procesos trabajadores: {cls.WORKER_PROCESSES}")
         
         validation = cls.validate_config()
         if validation['errors']:
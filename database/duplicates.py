@@ -0,0 +1,284 @@
+# -*- coding: utf-8 -*-
+"""
+Detección de reuniones duplicadas de SIRIJ BOT
+
+Cada reunión guarda una huella (columna huella, migración 7) calculada a
+partir de departamento, fecha, supervisor, hora de inicio y el conjunto del
+personal, normalizados (sin acentos, mayúsculas ni espacios repetidos, y el
+personal sin importar el orden). Dos envíos de la misma reunión, por ejemplo
+tras expirar la sesión y volver a empezar con /start, tienen la misma huella.
+
+Al guardar, guardar_reunion_completa busca la huella en su índice y aplica
+una política (el índice único de originales, migración 8, cubre dos envíos
+simultáneos: la inserción del segundo no hace nada y se trata como duplicado):
+- rechazar: no guarda la reunión y devuelve el ID de la original
+- fusionar: completa la original con los valores no vacíos del nuevo envío
+- marcar: la guarda con duplicado_de apuntando a la original
+
+Para el historial, deduplicar_historial() recorre las reuniones una sola vez
+en orden de huella y aplica la política a cada grupo de iguales (la original
+es la de menor id). Las reuniones archivadas no se revisan.
+
+Uso: python -m database.duplicates [--politica marcar] [--aplicar]
+"""
+
+import argparse
+import hashlib
+import json
+import logging
+import re
+import unicodedata
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+POLITICAS = ('rechazar', 'fusionar', 'marcar')
+
+# Columnas de la huella (sirven también para calcularla en el relleno de la migración)
+COLUMNAS_HUELLA = ('departamento', 'fecha', 'nombre_supervisor', 'hora_inicio', 'nombres_personal')
+
+# Columnas que una fusión no modifica
+_COLUMNAS_FIJAS = frozenset(('id', 'huella', 'duplicado_de', 'usuario_telegram_id', 'fecha_registro'))
+
+_NO_ALFANUMERICO = re.compile(r'[\W_]+')
+
+# Marca de los cambios de deduplicar_historial que fusionan una copia en su original
+_FUSIONAR = 'fusionar'
+
+
+def normalizar(texto: Any) -> str:
+    """
+    Normaliza un texto para comparar: sin acentos, en minúsculas y sin signos ni espacios repetidos
+    """
+    descompuesto = unicodedata.normalize('NFKD', str(texto or ''))
+    sin_acentos = ''.join(caracter for caracter in descompuesto if not unicodedata.combining(caracter))
+    return _NO_ALFANUMERICO.sub(' ', sin_acentos.casefold()).strip()
+
+
+def huella_reunion(datos: Dict[str, Any]) -> str:
+    """
+    Calcula la huella de una reunión
+
+    Args:
+        datos: Datos de la reunión; nombres_personal puede ser lista o JSON
+
+    Returns:
+        str: Huella hexadecimal de 32 caracteres
+    """
+    personal = datos.get('nombres_personal') or []
+    if isinstance(personal, str):
+        personal = json.loads(personal)
+    integrantes = sorted({normalizar(nombre) for nombre in personal} - {''})
+
+    partes = (
+        normalizar(datos.get('departamento')),
+        str(datos.get('fecha') or '')[:10],
+        normalizar(datos.get('nombre_supervisor')),
+        # HH:MM, con o sin segundos
+        str(datos.get('hora_inicio') or '')[:5],
+        hashlib.blake2b('\x1f'.join(integrantes).encode('utf-8'), digest_size=16).hexdigest()
+    )
+    return hashlib.blake2b('\x1e'.join(partes).encode('utf-8'), digest_size=16).hexdigest()
+
+
+def validar_politica(politica: str) -> str:
+    """
+    Raises:
+        ValueError: Si la política no existe
+    """
+    if politica not in POLITICAS:
+        raise ValueError(f"Política de duplicados no soportada: {politica} (opciones: {', '.join(POLITICAS)})")
+    return politica
+
+
+def buscar_original(conn: Any, huella: str, fecha: Any) -> Optional[int]:
+    """
+    Busca la reunión original con una huella
+
+    La fecha forma parte de la huella; filtrar también por ella limita la
+    búsqueda a una partición en PostgreSQL.
+
+    Returns:
+        ID de la reunión original o None
+    """
+    fila = conn.execute(
+        "SELECT id FROM reuniones_inicio_jornada WHERE huella = ? AND fecha = ? AND duplicado_de IS NULL "
+        "ORDER BY id LIMIT 1",
+        (huella, str(fecha)[:10])
+    ).fetchone()
+    return fila[0] if fila else None
+
+
+def fusionar_en(conn: Any, original: int, fecha: Any, datos: Dict[str, Any]) -> int:
+    """
+    Completa la reunión original con los valores no vacíos de otra
+
+    Args:
+        conn: Conexión con la transacción en curso (no se confirma aquí)
+        original: ID de la reunión original
+        fecha: Fecha de la reunión (clave de partición)
+        datos: Columnas del nuevo envío
+
+    Returns:
+        int: Columnas actualizadas
+    """
+    cambios = {
+        columna: valor for columna, valor in datos.items()
+        if columna not in _COLUMNAS_FIJAS and valor is not None and valor != '' and valor != '[]'
+    }
+    if cambios:
+        conn.execute(
+            f"UPDATE reuniones_inicio_jornada SET {', '.join(f'{columna} = ?' for columna in cambios)} "
+            f"WHERE id = ? AND fecha = ?",
+            [*cambios.values(), original, str(fecha)[:10]]
+        )
+    return len(cambios)
+
+
+def rellenar_huellas(conn: Any, filas: List[Tuple]):
+    """
+    Relleno de la migración 7: huella de las reuniones existentes
+
+    Si ya hay una original con la misma huella, la reunión queda marcada como
+    su duplicado: el índice único de la migración 8 admite una sola original.
+    """
+    conn.executemany(
+        "UPDATE reuniones_inicio_jornada SET huella = ?, duplicado_de = COALESCE(duplicado_de, ("
+        "SELECT o.id FROM reuniones_inicio_jornada o WHERE o.huella = ? AND o.fecha = reuniones_inicio_jornada.fecha "
+        "AND o.duplicado_de IS NULL AND o.id <> reuniones_inicio_jornada.id LIMIT 1"
+        ")) WHERE id = ? AND fecha = ?",
+        [
+            (huella, huella, fila[0], str(fila[2])[:10])
+            for fila in filas
+            for huella in (huella_reunion(dict(zip(COLUMNAS_HUELLA, fila[1:]))),)
+        ]
+    )
+
+
+def _grupos(tamano_lote: int, completas: bool) -> Iterable[List[Dict[str, Any]]]:
+    """
+    Recorre las reuniones con huella en orden (huella, id) y agrupa las iguales
+
+    Pagina por clave (huella, id) como iterar_reuniones: cada lote abre su
+    propia conexión y la memoria solo depende del lote y del grupo más grande.
+    """
+    from database.models import get_db_connection
+
+    columnas = '*' if completas else 'id, huella, fecha, duplicado_de'
+    consulta = (
+        f"SELECT {columnas} FROM reuniones_inicio_jornada "
+        f"WHERE huella IS NOT NULL AND (huella, id) > (?, ?) ORDER BY huella, id LIMIT ?"
+    )
+    ultimo: Tuple[str, int] = ('', 0)
+    grupo: List[Dict[str, Any]] = []
+
+    while True:
+        with get_db_connection() as conn:
+            filas = [dict(fila) for fila in conn.execute(consulta, (*ultimo, tamano_lote)).fetchall()]
+
+        for fila in filas:
+            if grupo and fila['huella'] != grupo[0]['huella']:
+                yield grupo
+                grupo = []
+            grupo.append(fila)
+
+        if len(filas) < tamano_lote:
+            if grupo:
+                yield grupo
+            return
+        ultimo = (filas[-1]['huella'], filas[-1]['id'])
+
+
+def deduplicar_historial(politica: str = 'marcar', aplicar: bool = False,
+                         tamano_lote: int = 1000) -> Dict[str, Any]:
+    """
+    Busca reuniones duplicadas en el historial en una sola pasada ordenada
+
+    Los cambios se reúnen durante la lectura y se aplican al final, por
+    lotes, para no modificar la tabla mientras se recorre.
+
+    Args:
+        politica: 'marcar' (duplicado_de), 'fusionar' (completar la original y
+            borrar las copias) o 'rechazar' (borrar las copias)
+        aplicar: Aplicar los cambios (por defecto solo se informa)
+        tamano_lote: Filas por consulta y por transacción de cambios
+
+    Returns:
+        Dict con 'revisadas', 'grupos' (con duplicados), 'duplicadas',
+        'sin_huella' (relleno pendiente) y 'cambios' aplicados
+    """
+    from database.models import get_db_connection
+
+    validar_politica(politica)
+    resumen = {'revisadas': 0, 'grupos': 0, 'duplicadas': 0, 'sin_huella': 0, 'cambios': 0}
+    # (sentencia o _FUSIONAR, parámetros) en el orden en que deben ejecutarse
+    cambios: List[Tuple[str, Any]] = []
+
+    for grupo in _grupos(tamano_lote, completas=politica == 'fusionar'):
+        resumen['revisadas'] += len(grupo)
+        original, copias = grupo[0], grupo[1:]
+
+        if copias:
+            resumen['grupos'] += 1
+            resumen['duplicadas'] += len(copias)
+        for copia in copias:
+            clave = (copia['id'], str(copia['fecha'])[:10])
+            if politica == 'marcar':
+                if copia['duplicado_de'] != original['id']:
+                    cambios.append(("UPDATE reuniones_inicio_jornada SET duplicado_de = ? WHERE id = ? AND fecha = ?",
+                                    (original['id'], *clave)))
+                continue
+            if politica == 'fusionar':
+                cambios.append((_FUSIONAR, (original, copia)))
+            cambios.append(("DELETE FROM reuniones_inicio_jornada WHERE id = ? AND fecha = ?", clave))
+
+        if original['duplicado_de'] is not None:
+            # Su original se borró o se archivó. Va después de las copias: el índice
+            # único admite una sola original por huella y una copia puede serlo ahora
+            cambios.append(("UPDATE reuniones_inicio_jornada SET duplicado_de = NULL WHERE id = ? AND fecha = ?",
+                            (original['id'], str(original['fecha'])[:10])))
+
+    with get_db_connection() as conn:
+        resumen['sin_huella'] = conn.execute(
+            "SELECT COUNT(*) FROM reuniones_inicio_jornada WHERE huella IS NULL"
+        ).fetchone()[0]
+
+    if not aplicar:
+        logger.info(f"Duplicados encontrados (sin aplicar, política {politica}): {resumen}")
+        return resumen
+
+    for inicio in range(0, len(cambios), tamano_lote):
+        with get_db_connection() as conn:
+            for sentencia, parametros in cambios[inicio:inicio + tamano_lote]:
+                if sentencia == _FUSIONAR:
+                    original, copia = parametros
+                    fusionar_en(conn, original['id'], original['fecha'], copia)
+                else:
+                    conn.execute(sentencia, parametros)
+            conn.commit()
+    resumen['cambios'] = len(cambios)
+
+    logger.info(f"Duplicados del historial procesados con la política {politica}: {resumen}")
+    return resumen
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--politica', choices=POLITICAS, default='marcar')
+    parser.add_argument('--aplicar', action='store_true', help='Aplicar los cambios (sin esto solo se informa)')
+    parser.add_argument('--lote', type=int, default=1000, help='Filas por consulta y por transacción')
+    args = parser.parse_args()
+
+    logging.basicConfig(format='%(asctime)s - %(name)s - %(levelname)s - %(message)s', level=logging.INFO)
+
+    from database.models import create_tables
+    create_tables()
+    resumen = deduplicar_historial(args.politica, args.aplicar, args.lote)
+    for clave, valor in resumen.items():
+        print(f"{clave:<12}{valor:>10,}")
+    if resumen['sin_huella']:
+        print("Hay reuniones sin huella: ejecute python -m database.migrations --rellenar y repita")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,495 @@
+# -*- coding: utf-8 -*-
+"""
+Migraciones versionadas del esquema de SIRIJ BOT
+
+Cada migración tiene un número de versión y se registra en la tabla
+schema_version. El DDL se aplica al arrancar; los rellenos de datos de tablas
+grandes se ejecutan después, en segundo plano, por lotes cortos y reanudables.
+
+Uso: python -m database.migrations [--rellenar] [--presupuesto SEGUNDOS]
+"""
+
+import argparse
+import logging
+import time
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+from database.backends import COLUMNAS_BUSQUEDA, DOCUMENTO_BUSQUEDA_POSTGRES, obtener_backend
+from database.duplicates import COLUMNAS_HUELLA, rellenar_huellas
+from database.models import get_db_connection
+
+logger = logging.getLogger(__name__)
+
+
+class Relleno:
+    """
+    Relleno de datos por lotes para una migración
+
+    Recorre la tabla por una clave entera creciente (por defecto id, que
+    existe también en PostgreSQL, a diferencia de rowid) y llama a
+    procesar_lote(conn, filas) con cada lote; el avance se guarda en schema_version en la misma transacción que el
+    lote, por lo que una interrupción retoma desde el último lote confirmado.
+    Las filas insertadas durante el relleno deben escribirse ya con el formato
+    nuevo desde el código de la aplicación.
+
+    `backends` limita el relleno a ciertos motores (por defecto, todos).
+    """
+
+    def __init__(self, tabla: str, columnas: Sequence[str],
+                 procesar_lote: Callable[[Any, List[Tuple]], None], clave: str = 'id',
+                 backends: Optional[Sequence[str]] = None):
+        self.tabla = tabla
+        self.columnas = list(columnas)
+        self.procesar_lote = procesar_lote
+        self.clave = clave
+        self.backends = list(backends) if backends is not None else None
+
+
+class Migracion:
+    """
+    Cambio numerado del esquema: sentencias DDL y, opcionalmente, un relleno
+
+    `dialectos` sustituye las sentencias en un backend concreto
+    ({'postgresql': [...]}) cuando el cambio no se puede expresar igual en ambos.
+    """
+
+    def __init__(self, version: int, descripcion: str, sql: Sequence[str] = (),
+                 relleno: Optional[Relleno] = None, dialectos: Optional[Dict[str, Sequence[str]]] = None):
+        self.version = version
+        self.descripcion = descripcion
+        self.sql = list(sql)
+        self.relleno = relleno
+        self.dialectos = {backend: list(sentencias) for backend, sentencias in (dialectos or {}).items()}
+
+    def sentencias(self, backend: str) -> List[str]:
+        """Sentencias DDL de la migración para un backend"""
+        return self.dialectos.get(backend, self.sql)
+
+    def relleno_de(self, backend: str) -> Optional[Relleno]:
+        """Relleno de la migración para un backend (None si no necesita)"""
+        if self.relleno is None or (self.relleno.backends is not None and backend not in self.relleno.backends):
+            return None
+        return self.relleno
+
+
+def _indexar_busqueda(conn: Any, filas: List[Tuple]):
+    # INSERT OR REPLACE: las reuniones nuevas ya las indexan los disparadores
+    conn.executemany(
+        f"INSERT OR REPLACE INTO reuniones_busqueda (rowid, {', '.join(COLUMNAS_BUSQUEDA)}) "
+        f"VALUES (?, {', '.join('?' for _ in COLUMNAS_BUSQUEDA)})",
+        [fila for fila in filas if any(fila[1:])]
+    )
+
+
+_NUEVOS = ', '.join(f'new.{columna}' for columna in COLUMNAS_BUSQUEDA)
+_CON_TEXTO = f"COALESCE({_NUEVOS}) IS NOT NULL"
+
+
+MIGRACIONES: List[Migracion] = [
+    Migracion(1, 'Esquema inicial', [
+        '''
+        CREATE TABLE IF NOT EXISTS reuniones_inicio_jornada (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+
+            -- Datos Generales
+            departamento VARCHAR(255) NOT NULL,
+            fecha DATE NOT NULL,
+            categoria_maxima VARCHAR(255),
+            nombre_supervisor VARCHAR(255) NOT NULL,
+            nombres_personal TEXT, -- JSON array de nombres
+            hora_inicio TIME NOT NULL,
+            hora_termino TIME NOT NULL,
+
+            -- Sección Inicio (S/N)
+            saludo_inicio_jornada BOOLEAN,
+            enumero_personal BOOLEAN,
+            pregunto_estado_salud BOOLEAN,
+            realizo_ejercicios BOOLEAN,
+            detecto_anomalias_salud BOOLEAN,
+            tomo_lista_asistencia BOOLEAN,
+
+            -- Sección Información (S/N)
+            comento_trabajos_mantenimiento BOOLEAN,
+            comento_trabajos_operacion BOOLEAN,
+            comento_trabajos_alto_riesgo BOOLEAN,
+            comento_incidentes_accidentes BOOLEAN,
+            otra_informacion TEXT,
+
+            -- Sección Actividades de Seguridad (S/N)
+            realizo_revision_espejo BOOLEAN,
+            realizo_prediccion_peligro BOOLEAN,
+            dio_lectura_reglamento BOOLEAN,
+            realizo_exposicion_sentir_peligro BOOLEAN,
+            actividades_posteriores BOOLEAN,
+            descripcion_actividades_seguridad TEXT,
+
+            -- Meta y Observaciones
+            meta_proposito_jornada TEXT,
+            observaciones TEXT,
+
+            -- Evidencia y Metadatos
+            ruta_evidencia_fotografica VARCHAR(500),
+            fecha_registro TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            usuario_telegram_id INTEGER
+        )
+        ''',
+        '''
+        CREATE TABLE IF NOT EXISTS sesiones_temporales (
+            id VARCHAR(50) PRIMARY KEY,
+            usuario_telegram_id INTEGER NOT NULL,
+            estado VARCHAR(50) NOT NULL,
+            pregunta_actual VARCHAR(100),
+            datos_sesion TEXT, -- JSON con las respuestas
+            fecha_creacion TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            fecha_actualizacion TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+        ''',
+        'CREATE INDEX IF NOT EXISTS idx_fecha ON reuniones_inicio_jornada(fecha)',
+        'CREATE INDEX IF NOT EXISTS idx_departamento ON reuniones_inicio_jornada(departamento)',
+        'CREATE INDEX IF NOT EXISTS idx_supervisor ON reuniones_inicio_jornada(nombre_supervisor)',
+        'CREATE INDEX IF NOT EXISTS idx_fecha_registro ON reuniones_inicio_jornada(fecha_registro)',
+        'CREATE INDEX IF NOT EXISTS idx_usuario_telegram ON reuniones_inicio_jornada(usuario_telegram_id)',
+        'CREATE INDEX IF NOT EXISTS idx_sesion_usuario ON sesiones_temporales(usuario_telegram_id)',
+        'CREATE INDEX IF NOT EXISTS idx_sesion_actualizacion ON sesiones_temporales(fecha_actualizacion)'
+    ]),
+    # Las consultas por departamento filtran también por rango de fechas; el índice
+    # compuesto cubre ambas y hace redundante el de solo departamento (su prefijo)
+    Migracion(2, 'Índice compuesto (departamento, fecha)', [
+        'CREATE INDEX IF NOT EXISTS idx_departamento_fecha ON reuniones_inicio_jornada(departamento, fecha)',
+        'DROP INDEX IF EXISTS idx_departamento'
+    ]),
+    # Índices probados con benchmarks/bench_indices.py (ver README):
+    # - reuniones de un usuario ordenadas por fecha_registro sin ordenamiento temporal
+    # - estadísticas por fecha/departamento resueltas solo con el índice (cubriente)
+    # Cada uno tiene como prefijo al índice de una columna que reemplaza
+    Migracion(3, 'Índices compuestos para reuniones por usuario y estadísticas', [
+        'CREATE INDEX IF NOT EXISTS idx_usuario_fecha_registro '
+        'ON reuniones_inicio_jornada(usuario_telegram_id, fecha_registro)',
+        'DROP INDEX IF EXISTS idx_usuario_telegram',
+        'CREATE INDEX IF NOT EXISTS idx_fecha_departamento ON reuniones_inicio_jornada(fecha, departamento)',
+        'DROP INDEX IF EXISTS idx_fecha'
+    ]),
+    # PostgreSQL: una partición por mes de fecha (ver database/partitions.py). La
+    # clave primaria debe incluir la columna de partición; los ids siguen saliendo
+    # de una sola secuencia. En SQLite la tabla no cambia.
+    Migracion(4, 'Reuniones particionadas por mes', dialectos={'postgresql': [
+        'ALTER TABLE reuniones_inicio_jornada RENAME TO reuniones_inicio_jornada_v3',
+        *(f'DROP INDEX IF EXISTS {indice}' for indice in (
+            'idx_supervisor', 'idx_fecha_registro', 'idx_departamento_fecha',
+            'idx_usuario_fecha_registro', 'idx_fecha_departamento'
+        )),
+        'CREATE SEQUENCE reuniones_inicio_jornada_id_seq_particionada',
+        'CREATE TABLE reuniones_inicio_jornada (LIKE reuniones_inicio_jornada_v3 INCLUDING DEFAULTS, '
+        'PRIMARY KEY (id, fecha)) PARTITION BY RANGE (fecha)',
+        "ALTER TABLE reuniones_inicio_jornada ALTER COLUMN id "
+        "SET DEFAULT nextval('reuniones_inicio_jornada_id_seq_particionada')",
+        'ALTER SEQUENCE reuniones_inicio_jornada_id_seq_particionada OWNED BY reuniones_inicio_jornada.id',
+        'CREATE TABLE reuniones_inicio_jornada_pdefault PARTITION OF reuniones_inicio_jornada DEFAULT',
+        '''
+        DO $$
+        DECLARE mes DATE;
+        BEGIN
+            FOR mes IN SELECT DISTINCT date_trunc('month', fecha)::DATE FROM reuniones_inicio_jornada_v3 LOOP
+                EXECUTE format(
+                    'CREATE TABLE %I PARTITION OF reuniones_inicio_jornada FOR VALUES FROM (%L) TO (%L)',
+                    'reuniones_inicio_jornada_p' || to_char(mes, 'YYYY_MM'), mes, (mes + INTERVAL '1 month')::DATE
+                );
+            END LOOP;
+        END $$
+        ''',
+        'INSERT INTO reuniones_inicio_jornada SELECT * FROM reuniones_inicio_jornada_v3',
+        "SELECT setval('reuniones_inicio_jornada_id_seq_particionada', "
+        "COALESCE((SELECT MAX(id) FROM reuniones_inicio_jornada), 0) + 1, false)",
+        'DROP TABLE reuniones_inicio_jornada_v3',
+        'CREATE INDEX idx_supervisor ON reuniones_inicio_jornada(nombre_supervisor)',
+        'CREATE INDEX idx_fecha_registro ON reuniones_inicio_jornada(fecha_registro)',
+        'CREATE INDEX idx_departamento_fecha ON reuniones_inicio_jornada(departamento, fecha)',
+        'CREATE INDEX idx_usuario_fecha_registro ON reuniones_inicio_jornada(usuario_telegram_id, fecha_registro)',
+        'CREATE INDEX idx_fecha_departamento ON reuniones_inicio_jornada(fecha, departamento)'
+    ]}),
+    # Búsqueda de texto completo en las notas de seguridad (ver buscar_reuniones):
+    # - SQLite: tabla FTS5 (rowid = id de la reunión) sin acentos ni mayúsculas,
+    #   con índices de prefijos para que cada palabra busque también sus variantes
+    #   ('caida' encuentra 'caídas'). Los disparadores la mantienen al día en cada
+    #   alta, cambio o borrado (también al archivar); el relleno indexa las existentes.
+    # - PostgreSQL: índice GIN sobre el tsvector en español, sin acentos; no necesita relleno
+    Migracion(5, 'Búsqueda de texto completo en notas de seguridad', [
+        f'''
+        CREATE VIRTUAL TABLE IF NOT EXISTS reuniones_busqueda USING fts5(
+            {', '.join(COLUMNAS_BUSQUEDA)},
+            tokenize = 'unicode61 remove_diacritics 2',
+            prefix = '2 3 4'
+        )
+        ''',
+        f'''
+        CREATE TRIGGER IF NOT EXISTS reuniones_busqueda_alta AFTER INSERT ON reuniones_inicio_jornada
+        WHEN {_CON_TEXTO}
+        BEGIN
+            INSERT OR REPLACE INTO reuniones_busqueda (rowid, {', '.join(COLUMNAS_BUSQUEDA)})
+            VALUES (new.id, {_NUEVOS});
+        END
+        ''',
+        f'''
+        CREATE TRIGGER IF NOT EXISTS reuniones_busqueda_cambio
+        AFTER UPDATE OF {', '.join(COLUMNAS_BUSQUEDA)} ON reuniones_inicio_jornada
+        BEGIN
+            DELETE FROM reuniones_busqueda WHERE rowid = old.id;
+            INSERT INTO reuniones_busqueda (rowid, {', '.join(COLUMNAS_BUSQUEDA)})
+            SELECT new.id, {_NUEVOS} WHERE {_CON_TEXTO};
+        END
+        ''',
+        '''
+        CREATE TRIGGER IF NOT EXISTS reuniones_busqueda_baja AFTER DELETE ON reuniones_inicio_jornada
+        BEGIN
+            DELETE FROM reuniones_busqueda WHERE rowid = old.id;
+        END
+        '''
+    ], relleno=Relleno('reuniones_inicio_jornada', COLUMNAS_BUSQUEDA, _indexar_busqueda, backends=('sqlite',)),
+       dialectos={'postgresql': [
+        f'CREATE INDEX IF NOT EXISTS idx_busqueda ON reuniones_inicio_jornada USING GIN (({DOCUMENTO_BUSQUEDA_POSTGRES}))'
+    ]}),
+    # datos_sesion pasa a guardar bytes (ver services/session_codec.py). Las
+    # sesiones en JSON se conservan como su texto UTF-8 y se siguen leyendo.
+    # En SQLite la columna TEXT ya admite valores BLOB.
+    Migracion(6, 'datos_sesion binario', dialectos={'postgresql': [
+        "ALTER TABLE sesiones_temporales ALTER COLUMN datos_sesion TYPE BYTEA USING convert_to(datos_sesion, 'UTF8')"
+    ]}),
+    # Detección de reuniones duplicadas (ver database/duplicates.py): huella
+    # normalizada e índice para buscarla al guardar; el relleno calcula la
+    # huella de las reuniones existentes. En PostgreSQL el índice es hash
+    # (solo se busca por igualdad) y la fecha de la consulta elige la partición
+    Migracion(7, 'Huella de reuniones duplicadas', [
+        'ALTER TABLE reuniones_inicio_jornada ADD COLUMN huella VARCHAR(32)',
+        'ALTER TABLE reuniones_inicio_jornada ADD COLUMN duplicado_de INTEGER',
+        'CREATE INDEX IF NOT EXISTS idx_huella ON reuniones_inicio_jornada(huella)'
+    ], relleno=Relleno('reuniones_inicio_jornada', COLUMNAS_HUELLA, rellenar_huellas),
+       dialectos={'postgresql': [
+        'ALTER TABLE reuniones_inicio_jornada ADD COLUMN huella VARCHAR(32)',
+        'ALTER TABLE reuniones_inicio_jornada ADD COLUMN duplicado_de INTEGER',
+        'CREATE INDEX IF NOT EXISTS idx_huella ON reuniones_inicio_jornada USING HASH (huella)'
+    ]}),
+    # Una sola original por huella: guardar_reunion_completa inserta con ON
+    # CONFLICT DO NOTHING y dos envíos simultáneos de la misma reunión ya no
+    # pueden guardarse ambos como originales. Antes se marcan las copias que
+    # queden en el historial. Las marcadas (duplicado_de) quedan fuera del
+    # índice; en PostgreSQL incluye la fecha, clave de partición
+    Migracion(8, 'Índice único de reuniones originales por huella', [
+        '''
+        UPDATE reuniones_inicio_jornada SET duplicado_de = (
+            SELECT MIN(o.id) FROM reuniones_inicio_jornada o
+            WHERE o.huella = reuniones_inicio_jornada.huella AND o.fecha = reuniones_inicio_jornada.fecha
+              AND o.duplicado_de IS NULL
+        )
+        WHERE huella IS NOT NULL AND duplicado_de IS NULL AND id > (
+            SELECT MIN(o.id) FROM reuniones_inicio_jornada o
+            WHERE o.huella = reuniones_inicio_jornada.huella AND o.fecha = reuniones_inicio_jornada.fecha
+              AND o.duplicado_de IS NULL
+        )
+        ''',
+        'CREATE UNIQUE INDEX IF NOT EXISTS idx_huella_original '
+        'ON reuniones_inicio_jornada(huella, fecha) WHERE duplicado_de IS NULL'
+    ]),
+]
+
+# Versión que alcanza el esquema con todas las migraciones aplicadas
+VERSION_ESQUEMA = MIGRACIONES[-1].version
+
+
+def _asegurar_tabla_versiones(conn: Any):
+    conn.execute(obtener_backend().traducir_ddl('''
+        CREATE TABLE IF NOT EXISTS schema_version (
+            version INTEGER PRIMARY KEY,
+            descripcion TEXT NOT NULL,
+            estado VARCHAR(20) NOT NULL, -- en_progreso | aplicada
+            ultimo_rowid INTEGER NOT NULL DEFAULT 0, -- avance del relleno
+            fecha_inicio TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            fecha_aplicacion TIMESTAMP
+        )
+    '''))
+
+
+def _en_horario_laboral(horario_laboral: Optional[Tuple[int, int]], ahora: Optional[datetime] = None) -> bool:
+    if not horario_laboral:
+        return False
+    inicio, fin = horario_laboral
+    hora = (ahora or datetime.now()).hour
+    if inicio <= fin:
+        return inicio <= hora < fin
+    return hora >= inicio or hora < fin
+
+
+def _ejecutar_relleno(conn: Any, version: int, relleno: Relleno, ultimo_rowid: int, tamano_lote: int,
+                      pausa_segundos: float, horario_laboral: Optional[Tuple[int, int]],
+                      factor_laboral: int, limite: Optional[float]) -> bool:
+    """
+    Ejecuta lotes del relleno hasta terminarlo o agotar el presupuesto
+
+    Returns:
+        bool: True si el relleno terminó
+    """
+    consulta = (
+        f"SELECT {relleno.clave}, {', '.join(relleno.columnas)} FROM {relleno.tabla} "
+        f"WHERE {relleno.clave} > ? ORDER BY {relleno.clave} LIMIT ?"
+    )
+
+    while True:
+        # En horario laboral los lotes son más pequeños y las pausas más largas
+        laboral = _en_horario_laboral(horario_laboral)
+        lote = max(1, tamano_lote // factor_laboral) if laboral else tamano_lote
+        pausa = pausa_segundos * factor_laboral if laboral else pausa_segundos
+
+        filas = conn.execute(consulta, (ultimo_rowid, lote)).fetchall()
+        if not filas:
+            conn.execute(
+                "UPDATE schema_version SET estado = 'aplicada', fecha_aplicacion = CURRENT_TIMESTAMP "
+                "WHERE version = ?",
+                (version,)
+            )
+            conn.commit()
+            logger.info(f"Relleno de la migración {version} terminado")
+            return True
+
+        relleno.procesar_lote(conn, filas)
+        ultimo_rowid = filas[-1][0]
+        conn.execute(
+            "UPDATE schema_version SET ultimo_rowid = ? WHERE version = ?",
+            (ultimo_rowid, version)
+        )
+        conn.commit()
+
+        if limite is not None and time.monotonic() >= limite:
+            logger.info(f"Relleno de la migración {version} pausado en {relleno.clave} {ultimo_rowid}")
+            return False
+
+        if pausa > 0:
+            time.sleep(pausa)
+
+
+def aplicar_migraciones(ejecutar_rellenos: bool = False, tamano_lote: int = 500,
+                        pausa_segundos: float = 0.05, horario_laboral: Optional[Tuple[int, int]] = None,
+                        factor_laboral: int = 10, presupuesto_segundos: Optional[float] = None,
+                        migraciones: Optional[List[Migracion]] = None) -> Dict[str, Any]:
+    """
+    Aplica en orden las migraciones pendientes
+
+    El DDL de cada migración y su registro en schema_version se confirman
+    juntos. Una migración con relleno queda 'en_progreso' y detiene a las
+    siguientes hasta que el relleno termine (ejecutar_rellenos=True).
+
+    Args:
+        ejecutar_rellenos: Ejecutar también los rellenos de datos
+        tamano_lote: Filas por lote de relleno (cada lote es una transacción)
+        pausa_segundos: Pausa entre lotes para dejar pasar las escrituras de los usuarios
+        horario_laboral: (hora_inicio, hora_fin) en que el relleno va más despacio
+        factor_laboral: Divisor del lote y multiplicador de la pausa en horario laboral
+        presupuesto_segundos: Tiempo máximo de relleno en esta llamada (None = sin límite)
+        migraciones: Lista de migraciones (por defecto MIGRACIONES)
+
+    Returns:
+        Dict con 'version' (última aplicada por completo), 'aplicadas' y 'pendientes'
+    """
+    migraciones = MIGRACIONES if migraciones is None else migraciones
+    limite = time.monotonic() + presupuesto_segundos if presupuesto_segundos is not None else None
+    aplicadas = []
+    version = 0
+    backend = obtener_backend()
+
+    with get_db_connection() as conn:
+        _asegurar_tabla_versiones(conn)
+        registradas = {
+            fila[0]: (fila[1], fila[2])
+            for fila in conn.execute("SELECT version, estado, ultimo_rowid FROM schema_version")
+        }
+
+        for migracion in migraciones:
+            estado, ultimo_rowid = registradas.get(migracion.version, (None, 0))
+            relleno = migracion.relleno_de(backend.nombre)
+
+            if estado is None:
+                # Con la tabla vacía no hay nada que rellenar ni motivo para detener a las siguientes
+                if relleno and conn.execute(f"SELECT 1 FROM {relleno.tabla} LIMIT 1").fetchone() is None:
+                    relleno = None
+                estado = 'en_progreso' if relleno else 'aplicada'
+                for sentencia in migracion.sentencias(backend.nombre):
+                    conn.execute(backend.traducir_ddl(sentencia))
+                conn.execute(
+                    "INSERT INTO schema_version (version, descripcion, estado, fecha_aplicacion) "
+                    "VALUES (?, ?, ?, CASE WHEN ? = 'aplicada' THEN CURRENT_TIMESTAMP END)",
+                    (migracion.version, migracion.descripcion, estado, estado)
+                )
+                conn.commit()
+                logger.info(f"Migración {migracion.version} aplicada: {migracion.descripcion}")
+
+            if estado == 'en_progreso':
+                if not ejecutar_rellenos or not _ejecutar_relleno(
+                    conn, migracion.version, relleno, ultimo_rowid, tamano_lote, pausa_segundos,
+                    horario_laboral, factor_laboral, limite
+                ):
+                    break
+
+            if registradas.get(migracion.version, (None,))[0] != 'aplicada':
+                aplicadas.append(migracion.version)
+            version = migracion.version
+
+        # Marca rápida para el arranque (ver create_tables)
+        backend.fijar_version(conn, version)
+
+    pendientes = version < migraciones[-1].version
+    return {'version': version, 'aplicadas': aplicadas, 'pendientes': pendientes}
+
+
+def hay_rellenos_pendientes() -> bool:
+    """
+    Indica si alguna migración tiene un relleno de datos sin terminar
+    """
+    with get_db_connection() as conn:
+        _asegurar_tabla_versiones(conn)
+        fila = conn.execute("SELECT COUNT(*) FROM schema_version WHERE estado = 'en_progreso'").fetchone()
+    return fila[0] > 0
+
+
+def obtener_estado_migraciones() -> List[Dict[str, Any]]:
+    """
+    Obtiene el estado de cada migración conocida
+
+    Returns:
+        Lista de dicts con versión, descripción, estado y avance del relleno
+    """
+    with get_db_connection() as conn:
+        _asegurar_tabla_versiones(conn)
+        registradas = {
+            fila['version']: dict(fila)
+            for fila in conn.execute("SELECT * FROM schema_version")
+        }
+
+    return [
+        {
+            'version': migracion.version,
+            'descripcion': migracion.descripcion,
+            'estado': registradas.get(migracion.version, {}).get('estado', 'pendiente'),
+            'ultimo_rowid': registradas.get(migracion.version, {}).get('ultimo_rowid', 0)
+        }
+        for migracion in MIGRACIONES
+    ]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rellenar', action='store_true', help='Ejecutar también los rellenos de datos')
+    parser.add_argument('--presupuesto', type=float, default=None, help='Segundos máximos de relleno')
+    parser.add_argument('--lote', type=int, default=500)
+    parser.add_argument('--pausa', type=float, default=0.05)
+    args = parser.parse_args()
+
+    logging.basicConfig(format='%(asctime)s - %(name)s - %(levelname)s - %(message)s', level=logging.INFO)
+
+    resultado = aplicar_migraciones(args.rellenar, args.lote, args.pausa, presupuesto_segundos=args.presupuesto)
+    for migracion in obtener_estado_migraciones():
+        print(f"{migracion['version']:>4}  {migracion['estado']:<12} {migracion['descripcion']}")
+    print(f"Versión del esquema: {resultado['version']}"
+          f"{' (con rellenos pendientes)' if resultado['pendientes'] else ''}")
+
+
+if __name__ == '__main__':
+    main()
@@ -4,116 +4,159 @@ Modelos de base de datos para SIRIJ BOT
 Define las tablas y operaciones de base de datos
 """
 
-import sqlite3
 import json
 import os
-from datetime import datetime
-from typing import Dict, Any, Optional, List
+import re
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Callable, Dict, Any, Optional, List, Iterator, Tuple
 import logging
 
+from database.backends import BackendAlmacenamiento, obtener_backend, obtener_backend_replica
+from database.duplicates import buscar_original, fusionar_en, huella_reunion, validar_politica
+from metrics import CONSULTAS_SESION, REUNIONES_DUPLICADAS, cronometrar_db
+
 logger = logging.getLogger(__name__)
 
-# Ruta de la base de datos
-DB_PATH = os.getenv('DATABASE_URL', 'sqlite:///sirij_bot.db').replace('sqlite:///', '')
+# Mismo formato (UTC) que CURRENT_TIMESTAMP de SQLite: permite comparar
+# fecha_actualizacion directamente y aprovechar su índice
+FORMATO_TIMESTAMP = '%Y-%m-%d %H:%M:%S'
+
+# Resultado de las consultas de sesión (proporción de mensajes con sesión vigente)
+_SESION_VIGENTE = CONSULTAS_SESION.etiquetas('vigente')
+_SESION_AUSENTE = CONSULTAS_SESION.etiquetas('ausente')
 
-def get_db_connection():
+# Funciones llamadas con (reunion_id, datos) tras guardar cada reunión
+_observadores_reuniones: List[Callable[[int, Dict[str, Any]], None]] = []
+
+def timestamp_utc(hace: timedelta = timedelta()) -> str:
     """
-    Obtiene una conexión a la base de datos
+    Obtiene el timestamp UTC actual (o de hace un intervalo) en formato SQLite
     """
-    conn = sqlite3.connect(DB_PATH)
-    conn.row_factory = sqlite3.Row  # Para acceder a columnas por nombre
-    return conn
+    return (datetime.now(timezone.utc) - hace).strftime(FORMATO_TIMESTAMP)
 
-def create_tables():
+def get_db_connection(replica: bool = False):
     """
-    Crea las tablas necesarias en la base de datos
+    Obtiene una conexión a la base de datos del backend configurado (DATABASE_URL)
+    
+    Args:
+        replica: Leer de la réplica (DATABASE_REPLICA_URL) si está configurada y
+            disponible; solo para consultas que toleran datos algo atrasados
     """
-    with get_db_connection() as conn:
-        cursor = conn.cursor()
-        
-        # Tabla principal de reuniones
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS reuniones_inicio_jornada (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                
-                -- Datos Generales
-                departamento VARCHAR(255) NOT NULL,
-                fecha DATE NOT NULL,
-                categoria_maxima VARCHAR(255),
-                nombre_supervisor VARCHAR(255) NOT NULL,
-                nombres_personal TEXT, -- JSON array de nombres
-                hora_inicio TIME NOT NULL,
-                hora_termino TIME NOT NULL,
-                
-                -- Sección Inicio (S/N)
-                saludo_inicio_jornada BOOLEAN,
-                enumero_personal BOOLEAN,
-                pregunto_estado_salud BOOLEAN,
-                realizo_ejercicios BOOLEAN,
-                detecto_anomalias_salud BOOLEAN,
-                tomo_lista_asistencia BOOLEAN,
-                
-                -- Sección Información (S/N)
-                comento_trabajos_mantenimiento BOOLEAN,
-                comento_trabajos_operacion BOOLEAN,
-                comento_trabajos_alto_riesgo BOOLEAN,
-                comento_incidentes_accidentes BOOLEAN,
-                otra_informacion TEXT,
-                
-                -- Sección Actividades de Seguridad (S/N)
-                realizo_revision_espejo BOOLEAN,
-                realizo_prediccion_peligro BOOLEAN,
-                dio_lectura_reglamento BOOLEAN,
-                realizo_exposicion_sentir_peligro BOOLEAN,
-                actividades_posteriores BOOLEAN,
-                descripcion_actividades_seguridad TEXT,
-                
-                -- Meta y Observaciones
-                meta_proposito_jornada TEXT,
-                observaciones TEXT,
-                
-                -- Evidencia y Metadatos
-                ruta_evidencia_fotografica VARCHAR(500),
-                fecha_registro TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                usuario_telegram_id INTEGER
-            )
-        ''')
-        
-        # Tabla de sesiones temporales
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS sesiones_temporales (
-                id VARCHAR(50) PRIMARY KEY,
-                usuario_telegram_id INTEGER NOT NULL,
-                estado VARCHAR(50) NOT NULL,
-                pregunta_actual VARCHAR(100),
-                datos_sesion TEXT, -- JSON con las respuestas
-                fecha_creacion TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                fecha_actualizacion TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-            )
-        ''')
-        
-        # Crear índices
-        cursor.execute('CREATE INDEX IF NOT EXISTS idx_fecha ON reuniones_inicio_jornada(fecha)')
-        cursor.execute('CREATE INDEX IF NOT EXISTS idx_departamento ON reuniones_inicio_jornada(departamento)')
-        cursor.execute('CREATE INDEX IF NOT EXISTS idx_supervisor ON reuniones_inicio_jornada(nombre_supervisor)')
-        cursor.execute('CREATE INDEX IF NOT EXISTS idx_fecha_registro ON reuniones_inicio_jornada(fecha_registro)')
-        cursor.execute('CREATE INDEX IF NOT EXISTS idx_usuario_telegram ON reuniones_inicio_jornada(usuario_telegram_id)')
-        cursor.execute('CREATE INDEX IF NOT EXISTS idx_sesion_usuario ON sesiones_temporales(usuario_telegram_id)')
+    return _backend_lectura(replica).conectar()
+
+def _backend_lectura(replica: bool) -> BackendAlmacenamiento:
+    if replica:
+        backend = obtener_backend_replica()
+        # Hasta la primera copia de la réplica se lee de la base principal
+        if backend is not None and backend.disponible():
+            return backend
+    return obtener_backend()
+
+@cronometrar_db
+def obtener_antiguedad_replica() -> Optional[float]:
+    """
+    Obtiene el atraso de los datos que leen las consultas con replica=True
+    
+    Returns:
+        float: Segundos de atraso (0 si se leen de la base principal), o None si
+        no se pudo consultar la réplica
+    """
+    backend = _backend_lectura(True)
+    if backend is obtener_backend():
+        return 0.0
+    
+    try:
+        with backend.conectar() as conn:
+            return backend.antiguedad_replica(conn)
+    except Exception as e:
+        logger.error(f"Error obteniendo la antigüedad de la réplica: {e}")
+        return None
+
+def create_tables(forzar: bool = False) -> bool:
+    """
+    Crea o actualiza las tablas aplicando las migraciones pendientes
+    
+    La versión alcanzada se guarda también en una marca del backend (PRAGMA
+    user_version en SQLite): si coincide con la última migración, el arranque
+    solo hace esa lectura. Los rellenos de
+    datos no se ejecutan aquí sino en segundo plano (ver database/migrations.py).
+    
+    Args:
+        forzar: Revisar las migraciones aunque la versión coincida
         
-        conn.commit()
-        logger.info("Tablas de base de datos creadas/verificadas correctamente")
+    Returns:
+        bool: True si se revisaron las migraciones
+    """
+    from database.migrations import VERSION_ESQUEMA, aplicar_migraciones
+    
+    if not forzar:
+        with get_db_connection() as conn:
+            if obtener_backend().leer_version(conn) == VERSION_ESQUEMA:
+                logger.debug(f"Esquema de base de datos en versión {VERSION_ESQUEMA}, sin cambios")
+                return False
+    
+    resultado = aplicar_migraciones()
+    if resultado['pendientes']:
+        logger.info(f"Esquema en versión {resultado['version']}; rellenos de datos pendientes en segundo plano")
+    logger.info("Tablas de base de datos creadas/verificadas correctamente")
+    return True
+
+def registrar_observador_reuniones(observador: Callable[[int, Dict[str, Any]], None]):
+    """
+    Registra una función que se llama tras confirmar cada reunión guardada
+
+    Se ejecuta en el mismo hilo que guardar_reunion_completa, así que debe ser
+    rápida (p. ej. encolar trabajo); sus errores se registran y no afectan al guardado.
+    No se llama con las reuniones duplicadas (ver database/duplicates.py).
+
+    Args:
+        observador: Función que recibe el ID de la reunión y sus columnas
+    """
+    _observadores_reuniones.append(observador)
+
+def _insertar_reunion(cursor: Any, datos_db: Dict[str, Any]) -> Optional[int]:
+    """
+    Inserta una reunión si no choca con el índice único de originales
+
+    Returns:
+        ID de la reunión o None si ya existe una original con la misma huella
+    """
+    columnas = list(datos_db.keys())
+    placeholders = ', '.join(['?' for _ in columnas])
+    columnas_str = ', '.join(columnas)
+    
+    # RETURNING funciona igual en SQLite (3.35+) y PostgreSQL, que no tiene lastrowid.
+    # Sin columnas de conflicto: sirve también antes de crear el índice (migración 8)
+    query = (
+        f"INSERT INTO reuniones_inicio_jornada ({columnas_str}) VALUES ({placeholders}) "
+        f"ON CONFLICT DO NOTHING RETURNING id"
+    )
+    
+    cursor.execute(query, list(datos_db.values()))
+    fila = cursor.fetchone()
+    return fila[0] if fila else None
 
-def guardar_reunion_completa(datos: Dict[str, Any]) -> Dict[str, Any]:
+@cronometrar_db
+def guardar_reunion_completa(datos: Dict[str, Any], politica_duplicados: str = 'marcar') -> Dict[str, Any]:
     """
     Guarda una reunión completa en la base de datos
     
+    Si ya existe una reunión con la misma huella (ver database/duplicates.py)
+    se aplica la política: 'rechazar' no la guarda, 'fusionar' completa la
+    original y 'marcar' la guarda con duplicado_de.
+    
     Args:
         datos: Diccionario con todos los datos de la reunión
+        politica_duplicados: 'rechazar', 'fusionar' o 'marcar'
         
     Returns:
-        Dict con 'exito', 'reunion_id' o 'error'
+        Dict con 'exito', 'reunion_id' (la original si se rechazó o fusionó),
+        'duplicado' o 'error'
     """
     try:
+        validar_politica(politica_duplicados)
+
         with get_db_connection() as conn:
             cursor = conn.cursor()
             
@@ -171,22 +214,52 @@ def guardar_reunion_completa(datos: Dict[str, Any]) -> Dict[str, Any]:
                         'error': f'Campo requerido faltante: {campo}'
                     }
             
-            # Construir query de inserción
-            columnas = list(datos_db.keys())
-            placeholders = ', '.join(['?' for _ in columnas])
-            columnas_str = ', '.join(columnas)
-            
-            query = f"INSERT INTO reuniones_inicio_jornada ({columnas_str}) VALUES ({placeholders})"
-            
-            cursor.execute(query, list(datos_db.values()))
-            reunion_id = cursor.lastrowid
+            datos_db['huella'] = huella_reunion(datos_db)
+            original = buscar_original(conn, datos_db['huella'], datos_db['fecha'])
+            
+            reunion_id = None
+            if original is None:
+                # El índice único de originales (migración 8) hace atómica la comprobación:
+                # si otro envío de la misma reunión se guardó después de la búsqueda,
+                # la inserción no hace nada y se trata como duplicado
+                reunion_id = _insertar_reunion(cursor, datos_db)
+                if reunion_id is None:
+                    original = buscar_original(conn, datos_db['huella'], datos_db['fecha'])
+                    if original is None:
+                        raise RuntimeError("La inserción entró en conflicto pero no se encontró la reunión original")
+            
+            if original is not None:
+                REUNIONES_DUPLICADAS.etiquetas(politica_duplicados).inc()
+                logger.info(f"Reunión duplicada de la {original} (política {politica_duplicados})")
+                
+                if politica_duplicados == 'rechazar':
+                    return {
+                        'exito': False,
+                        'duplicado': True,
+                        'reunion_id': original,
+                        'error': f'La reunión ya está registrada con el ID {original}'
+                    }
+                if politica_duplicados == 'fusionar':
+                    fusionar_en(conn, original, datos_db['fecha'], datos_db)
+                    conn.commit()
+                    return {'exito': True, 'duplicado': True, 'reunion_id': original}
+                
+                datos_db['duplicado_de'] = original
+                reunion_id = _insertar_reunion(cursor, datos_db)
             
             conn.commit()
             
             logger.info(f"Reunión guardada exitosamente con ID: {reunion_id}")
             
+            for observador in _observadores_reuniones if original is None else ():
+                try:
+                    observador(reunion_id, datos_db)
+                except Exception as e:
+                    logger.error(f"Error notificando la reunión {reunion_id}: {e}")
+            
             return {
                 'exito': True,
+                'duplicado': original is not None,
                 'reunion_id': reunion_id
             }
             
@@ -197,6 +270,7 @@ def guardar_reunion_completa(datos: Dict[str, Any]) -> Dict[str, Any]:
             'error': str(e)
         }
 
+@cronometrar_db
 def obtener_reunion_por_id(reunion_id: int) -> Optional[Dict[str, Any]]:
     """
     Obtiene una reunión por su ID
@@ -225,6 +299,7 @@ def obtener_reunion_por_id(reunion_id: int) -> Optional[Dict[str, Any]]:
         logger.error(f"Error obteniendo reunión {reunion_id}: {e}")
         return None
 
+@cronometrar_db
 def obtener_reuniones_por_usuario(usuario_id: int, limite: int = 10) -> List[Dict[str, Any]]:
     """
     Obtiene las últimas reuniones de un usuario
@@ -251,12 +326,110 @@ def obtener_reuniones_por_usuario(usuario_id: int, limite: int = 10) -> List[Dic
         logger.error(f"Error obteniendo reuniones de usuario {usuario_id}: {e}")
         return []
 
-def obtener_estadisticas_reuniones(fecha_inicio: str = None, fecha_fin: str = None) -> Dict[str, Any]:
+@cronometrar_db
+def obtener_reuniones_por_fecha(fecha: str, replica: bool = False) -> List[Dict[str, Any]]:
+    """
+    Obtiene todas las reuniones de una fecha
+    
+    Args:
+        fecha: Fecha (YYYY-MM-DD)
+        replica: Leer de la réplica de lectura (ver get_db_connection)
+    """
+    try:
+        with get_db_connection(replica) as conn:
+            cursor = conn.cursor()
+            
+            cursor.execute(
+                "SELECT * FROM reuniones_inicio_jornada WHERE fecha = ? ORDER BY id",
+                (fecha,)
+            )
+            
+            reuniones = []
+            for row in cursor.fetchall():
+                reunion = dict(row)
+                if reunion['nombres_personal']:
+                    reunion['nombres_personal'] = json.loads(reunion['nombres_personal'])
+                reuniones.append(reunion)
+            
+            return reuniones
+            
+    except Exception as e:
+        logger.error(f"Error obteniendo reuniones de la fecha {fecha}: {e}")
+        return []
+
+def iterar_reuniones(fecha_inicio: str = None, fecha_fin: str = None, departamento: str = None,
+                     supervisor: str = None, tamano_lote: int = 500,
+                     replica: bool = False) -> Iterator[Dict[str, Any]]:
+    """
+    Recorre las reuniones que cumplen los filtros usando paginación por clave (id)
+    
+    Cada lote abre su propia conexión, por lo que no se mantiene una
+    transacción de lectura abierta durante todo el recorrido y la memoria
+    usada no depende del número de reuniones.
+    
+    Args:
+        fecha_inicio: Fecha mínima (YYYY-MM-DD, opcional)
+        fecha_fin: Fecha máxima (YYYY-MM-DD, opcional)
+        departamento: Departamento exacto (opcional)
+        supervisor: Nombre del supervisor exacto (opcional)
+        tamano_lote: Reuniones leídas por consulta
+        replica: Leer de la réplica de lectura (ver get_db_connection)
+        
+    Yields:
+        Dict con los datos de cada reunión, en orden de id
+    """
+    condiciones = ["id > ?"]
+    params: List[Any] = []
+    
+    if fecha_inicio:
+        condiciones.append("fecha >= ?")
+        params.append(fecha_inicio)
+    if fecha_fin:
+        condiciones.append("fecha <= ?")
+        params.append(fecha_fin)
+    if departamento:
+        condiciones.append("departamento = ?")
+        params.append(departamento)
+    if supervisor:
+        condiciones.append("nombre_supervisor = ?")
+        params.append(supervisor)
+    
+    query = (
+        f"SELECT * FROM reuniones_inicio_jornada WHERE {' AND '.join(condiciones)} "
+        f"ORDER BY id LIMIT ?"
+    )
+    
+    ultimo_id = 0
+    while True:
+        with get_db_connection(replica) as conn:
+            rows = conn.execute(query, [ultimo_id, *params, tamano_lote]).fetchall()
+        
+        if not rows:
+            return
+        
+        for row in rows:
+            reunion = dict(row)
+            if reunion['nombres_personal']:
+                reunion['nombres_personal'] = json.loads(reunion['nombres_personal'])
+            yield reunion
+        
+        ultimo_id = rows[-1]['id']
+        if len(rows) < tamano_lote:
+            return
+
+@cronometrar_db
+def obtener_estadisticas_reuniones(fecha_inicio: str = None, fecha_fin: str = None,
+                                   replica: bool = False) -> Dict[str, Any]:
     """
     Obtiene estadísticas de las reuniones
+    
+    Args:
+        fecha_inicio: Fecha mínima (YYYY-MM-DD, opcional)
+        fecha_fin: Fecha máxima (YYYY-MM-DD, opcional)
+        replica: Leer de la réplica de lectura (ver get_db_connection)
     """
     try:
-        with get_db_connection() as conn:
+        with get_db_connection(replica) as conn:
             cursor = conn.cursor()
             
             # Query base
@@ -316,68 +489,357 @@ def obtener_estadisticas_reuniones(fecha_inicio: str = None, fecha_fin: str = No
             'por_fecha': []
         }
 
-def limpiar_sesiones_expiradas(horas_expiracion: int = 24):
+@cronometrar_db
+def obtener_valores_frecuentes(fecha_inicio: str = None, replica: bool = False) -> List[Dict[str, Any]]:
     """
-    Limpia sesiones temporales expiradas
+    Obtiene las combinaciones de departamento, categoría y supervisor usadas por cada usuario
+
+    Alimenta las sugerencias de services/autocomplete_service.py con una sola
+    agrupación; no cuenta las reuniones marcadas como duplicadas.
+
+    Args:
+        fecha_inicio: Fecha mínima (YYYY-MM-DD, opcional)
+        replica: Leer de la réplica de lectura (ver get_db_connection)
+
+    Returns:
+        Lista de dicts con usuario_telegram_id, departamento, categoria_maxima,
+        nombre_supervisor, 'cantidad' y 'ultimo_id' (su reunión más reciente)
+    """
+    condiciones = ["duplicado_de IS NULL"]
+    params: List[Any] = []
+    if fecha_inicio:
+        condiciones.append("fecha >= ?")
+        params.append(fecha_inicio)
+
+    try:
+        with get_db_connection(replica) as conn:
+            cursor = conn.execute(
+                f"""
+                SELECT usuario_telegram_id, departamento, categoria_maxima, nombre_supervisor,
+                       COUNT(*) AS cantidad, MAX(id) AS ultimo_id
+                FROM reuniones_inicio_jornada
+                WHERE {' AND '.join(condiciones)}
+                GROUP BY usuario_telegram_id, departamento, categoria_maxima, nombre_supervisor
+                """,
+                params
+            )
+            return [dict(row) for row in cursor.fetchall()]
+
+    except Exception as e:
+        logger.error(f"Error obteniendo valores frecuentes: {e}")
+        return []
+
+def _raiz_busqueda(termino: str) -> str:
+    # Stemming ligero del español para buscar por prefijo: sin plural ni vocal
+    # final ('caídas' -> 'caíd', que encuentra caída, caídas y caído)
+    raiz = termino.lower()
+    for sufijo in ('es', 's'):
+        if raiz.endswith(sufijo) and len(raiz) - len(sufijo) >= 4:
+            raiz = raiz[:-len(sufijo)]
+            break
+    if len(raiz) > 4 and raiz[-1] in 'aeoáéó':
+        raiz = raiz[:-1]
+    return raiz
+
+@cronometrar_db
+def buscar_reuniones(texto: str, fecha_inicio: str = None, fecha_fin: str = None, departamento: str = None,
+                     limite: int = 20, marcas: Tuple[str, str] = ('[', ']'), candidatos: int = 200,
+                     replica: bool = False) -> List[Dict[str, Any]]:
+    """
+    Busca reuniones por el texto de sus observaciones, otra información,
+    actividades de seguridad y meta de la jornada
+    
+    Usa el índice de texto completo (migración 5): no distingue mayúsculas ni
+    acentos, cada palabra se busca por su raíz (singular y plural, masculino y
+    femenino: 'caidas' encuentra 'caída') y deben aparecer todas. La relevancia
+    ordena las `candidatos` coincidencias más recientes, lo que mantiene el
+    tiempo de respuesta aunque un término aparezca en millones de reuniones.
+    
+    Args:
+        texto: Palabras a buscar
+        fecha_inicio: Fecha mínima (YYYY-MM-DD, opcional)
+        fecha_fin: Fecha máxima (YYYY-MM-DD, opcional)
+        departamento: Departamento exacto (opcional)
+        limite: Máximo de resultados
+        marcas: Texto antes y después de cada coincidencia en el fragmento
+        candidatos: Coincidencias más recientes que se ordenan por relevancia
+        replica: Leer de la réplica de lectura (ver get_db_connection)
+        
+    Returns:
+        Lista de dicts con id, fecha, departamento, nombre_supervisor, fragmento
+        y puntaje, de mayor a menor relevancia
+    """
+    terminos = [_raiz_busqueda(termino) for termino in re.findall(r'\w+', texto or '')]
+    if not terminos:
+        return []
+    
+    try:
+        backend = _backend_lectura(replica)
+        with backend.conectar() as conn:
+            filas = backend.buscar_reuniones(
+                conn, terminos, fecha_inicio, fecha_fin, departamento, limite, candidatos, marcas
+            )
+        return [dict(fila) for fila in filas]
+        
+    except Exception as e:
+        logger.error(f"Error buscando reuniones ({texto}): {e}")
+        return []
+
+@cronometrar_db
+def save_session(user_id: int, chat_id: int, session_data: bytes, estado: str = 'activa',
+                 pregunta_actual: Optional[str] = None) -> bool:
+    """
+    Crea la sesión temporal del usuario, reemplazando la anterior si existía
+    
+    Args:
+        user_id: ID de Telegram del usuario
+        chat_id: ID del chat (en chats privados coincide con el usuario)
+        session_data: Datos de la sesión serializados (ver services/session_codec.py)
+        estado: Estado inicial de la conversación
+        pregunta_actual: Pregunta actual (opcional)
+        
+    Returns:
+        bool: True si se guardó exitosamente
     """
     try:
+        ahora = timestamp_utc()
+        sesion_id = f"{user_id}_{datetime.now().strftime('%Y%m%d%H%M%S%f')}"
+        
         with get_db_connection() as conn:
-            cursor = conn.cursor()
-            
-            cursor.execute(
+            conn.execute("DELETE FROM sesiones_temporales WHERE usuario_telegram_id = ?", (user_id,))
+            conn.execute(
                 """
-                DELETE FROM sesiones_temporales 
-                WHERE datetime(fecha_actualizacion) < datetime('now', '-{} hours')
-                """.format(horas_expiracion)
+                INSERT INTO sesiones_temporales
+                    (id, usuario_telegram_id, estado, pregunta_actual, datos_sesion,
+                     fecha_creacion, fecha_actualizacion)
+                VALUES (?, ?, ?, ?, ?, ?, ?)
+                """,
+                (sesion_id, user_id, estado, pregunta_actual, session_data, ahora, ahora)
             )
-            
-            eliminadas = cursor.rowcount
             conn.commit()
-            
-            if eliminadas > 0:
-                logger.info(f"Eliminadas {eliminadas} sesiones expiradas")
-                
+        
+        return True
+        
+    except Exception as e:
+        logger.error(f"Error guardando sesión de usuario {user_id}: {e}")
+        return False
+
+@cronometrar_db
+def get_session(user_id: int, timeout_minutes: Optional[int] = None) -> Optional[Dict[str, Any]]:
+    """
+    Obtiene la sesión temporal vigente del usuario
+    
+    Args:
+        user_id: ID de Telegram del usuario
+        timeout_minutes: Minutos de inactividad tras los que la sesión se considera expirada
+        
+    Returns:
+        Dict con la sesión o None si no existe o expiró
+    """
+    try:
+        query = "SELECT * FROM sesiones_temporales WHERE usuario_telegram_id = ?"
+        params: List[Any] = [user_id]
+        
+        if timeout_minutes:
+            query += " AND fecha_actualizacion >= ?"
+            params.append(timestamp_utc(timedelta(minutes=timeout_minutes)))
+        
+        with get_db_connection() as conn:
+            row = conn.execute(query + " ORDER BY fecha_actualizacion DESC LIMIT 1", params).fetchone()
+        
+        if not row:
+            _SESION_AUSENTE.inc()
+            return None
+        
+        _SESION_VIGENTE.inc()
+        return {
+            'id': row['id'],
+            'user_id': row['usuario_telegram_id'],
+            'chat_id': row['usuario_telegram_id'],
+            'estado': row['estado'],
+            'pregunta_actual': row['pregunta_actual'],
+            'session_data': row['datos_sesion'],
+            'created_at': row['fecha_creacion'],
+            'updated_at': row['fecha_actualizacion']
+        }
+        
+    except Exception as e:
+        logger.error(f"Error obteniendo sesión de usuario {user_id}: {e}")
+        return None
+
+@cronometrar_db
+def update_session(user_id: int, session_data: bytes, estado: Optional[str] = None,
+                   pregunta_actual: Optional[str] = None, borrar_pregunta: bool = False) -> bool:
+    """
+    Actualiza los datos de la sesión del usuario y su fecha de actualización
+    
+    estado y pregunta_actual en None no se modifican; borrar_pregunta deja
+    pregunta_actual en NULL.
+    
+    Returns:
+        bool: True si se actualizó alguna sesión
+    """
+    try:
+        campos = ["datos_sesion = ?", "fecha_actualizacion = ?"]
+        params: List[Any] = [session_data, timestamp_utc()]
+        
+        if estado is not None:
+            campos.append("estado = ?")
+            params.append(estado)
+        if pregunta_actual is not None:
+            campos.append("pregunta_actual = ?")
+            params.append(pregunta_actual)
+        elif borrar_pregunta:
+            campos.append("pregunta_actual = NULL")
+        
+        params.append(user_id)
+        
+        with get_db_connection() as conn:
+            cursor = conn.execute(
+                f"UPDATE sesiones_temporales SET {', '.join(campos)} WHERE usuario_telegram_id = ?",
+                params
+            )
+            conn.commit()
+            return cursor.rowcount > 0
+        
+    except Exception as e:
+        logger.error(f"Error actualizando sesión de usuario {user_id}: {e}")
+        return False
+
+@cronometrar_db
+def delete_session(user_id: int) -> bool:
+    """
+    Elimina la sesión temporal del usuario
+    
+    Returns:
+        bool: True si se eliminó alguna sesión
+    """
+    try:
+        with get_db_connection() as conn:
+            cursor = conn.execute("DELETE FROM sesiones_temporales WHERE usuario_telegram_id = ?", (user_id,))
+            conn.commit()
+            return cursor.rowcount > 0
+        
+    except Exception as e:
+        logger.error(f"Error eliminando sesión de usuario {user_id}: {e}")
+        return False
+
+@cronometrar_db
+def clean_expired_sessions(timeout_minutes: int, tamano_lote: int = 500,
+                           presupuesto_segundos: Optional[float] = None) -> int:
+    """
+    Elimina por lotes las sesiones sin actividad durante timeout_minutes
+    
+    Cada lote es una transacción corta (DELETE de a lo más tamano_lote filas
+    localizadas por el índice de fecha_actualizacion), de modo que las
+    escrituras de las conversaciones en curso no esperan a la limpieza.
+    
+    Args:
+        timeout_minutes: Minutos de inactividad para considerar una sesión expirada
+        tamano_lote: Filas eliminadas por transacción
+        presupuesto_segundos: Tiempo máximo de ejecución (None = sin límite)
+        
+    Returns:
+        int: Número de sesiones eliminadas
+    """
+    limite = timestamp_utc(timedelta(minutes=timeout_minutes))
+    inicio = time.monotonic()
+    eliminadas = 0
+    
+    try:
+        while True:
+            with get_db_connection() as conn:
+                # DELETE ... LIMIT no es estándar (ni existe en PostgreSQL); la subconsulta es portable
+                cursor = conn.execute(
+                    """
+                    DELETE FROM sesiones_temporales WHERE id IN (
+                        SELECT id FROM sesiones_temporales
+                        WHERE fecha_actualizacion < ?
+                        LIMIT ?
+                    )
+                    """,
+                    (limite, tamano_lote)
+                )
+                conn.commit()
+                eliminadas += cursor.rowcount
+            
+            if cursor.rowcount < tamano_lote:
+                break
+            if presupuesto_segundos is not None and time.monotonic() - inicio >= presupuesto_segundos:
+                logger.info("Limpieza de sesiones interrumpida por presupuesto de tiempo")
+                break
+        
+        if eliminadas > 0:
+            logger.info(f"Eliminadas {eliminadas} sesiones expiradas")
+        
     except Exception as e:
         logger.error(f"Error limpiando sesiones expiradas: {e}")
+    
+    return eliminadas
 
-def exportar_reuniones_csv(archivo_salida: str, fecha_inicio: str = None, fecha_fin: str = None) -> bool:
+@cronometrar_db
+def obtener_estados_sesiones(timeout_minutes: Optional[int] = None) -> Dict[int, Tuple[str, Optional[str]]]:
     """
-    Exporta reuniones a archivo CSV
+    Obtiene el estado de conversación de todas las sesiones vigentes
+    
+    Args:
+        timeout_minutes: Minutos de inactividad tras los que la sesión se considera expirada
+        
+    Returns:
+        Dict de user_id a (estado, pregunta_actual)
     """
     try:
-        import csv
+        query = "SELECT usuario_telegram_id, estado, pregunta_actual FROM sesiones_temporales"
+        params: List[Any] = []
+        
+        if timeout_minutes:
+            query += " WHERE fecha_actualizacion >= ?"
+            params.append(timestamp_utc(timedelta(minutes=timeout_minutes)))
         
         with get_db_connection() as conn:
-            cursor = conn.cursor()
-            
-            # Query con filtros de fecha
-            where_clause = ""
-            params = []
-            
-            if fecha_inicio and fecha_fin:
-                where_clause = "WHERE fecha BETWEEN ? AND ?"
-                params = [fecha_inicio, fecha_fin]
-            
-            cursor.execute(f"SELECT * FROM reuniones_inicio_jornada {where_clause} ORDER BY fecha_registro", params)
-            
-            rows = cursor.fetchall()
-            
-            if not rows:
-                return False
-            
-            # Escribir CSV
-            with open(archivo_salida, 'w', newline='', encoding='utf-8') as csvfile:
-                writer = csv.writer(csvfile)
-                
-                # Escribir encabezados
-                writer.writerow([description[0] for description in cursor.description])
-                
-                # Escribir datos
-                for row in rows:
-                    writer.writerow(row)
-            
-            logger.info(f"Exportadas {len(rows)} reuniones a {archivo_salida}")
-            return True
+            return {row[0]: (row[1], row[2]) for row in conn.execute(query, params)}
+        
+    except Exception as e:
+        logger.error(f"Error obteniendo estados de sesiones: {e}")
+        return {}
+
+def limpiar_sesiones_expiradas(horas_expiracion: int = 24) -> int:
+    """
+    Limpia sesiones temporales expiradas
+    """
+    return clean_expired_sessions(horas_expiracion * 60)
+
+@cronometrar_db
+def exportar_reuniones_csv(archivo_salida: str, fecha_inicio: str = None, fecha_fin: str = None,
+                           replica: bool = False) -> bool:
+    """
+    Exporta reuniones a archivo CSV
+    
+    Las filas se escriben a medida que se leen (COPY en PostgreSQL), sin
+    cargarlas todas en memoria. Con replica=True la lectura larga no compite
+    con las escrituras del bot (ver get_db_connection).
+    """
+    try:
+        # Query con filtros de fecha
+        where_clause = ""
+        params = []
+        
+        if fecha_inicio and fecha_fin:
+            where_clause = "WHERE fecha BETWEEN ? AND ?"
+            params = [fecha_inicio, fecha_fin]
+        
+        query = f"SELECT * FROM reuniones_inicio_jornada {where_clause} ORDER BY fecha_registro"
+        
+        backend = _backend_lectura(replica)
+        with backend.conectar() as conn:
+            filas = backend.exportar_csv(conn, query, params, archivo_salida)
+        
+        if not filas:
+            os.remove(archivo_salida)
+            return False
+        
+        logger.info(f"Exportadas {filas} reuniones a {archivo_salida}")
+        return True
             
     except Exception as e:
         logger.error(f"Error exportando a CSV: {e}")
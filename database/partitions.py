@@ -0,0 +1,202 @@
+# -*- coding: utf-8 -*-
+"""
+Particiones mensuales de las reuniones de SIRIJ BOT
+
+En PostgreSQL reuniones_inicio_jornada está particionada por rango de fecha, un
+mes por partición (migración 4): las consultas con filtro de fecha solo leen las
+particiones del rango, así que las de "este mes" no dependen de los años
+acumulados. Este módulo crea por adelantado las particiones de los próximos
+meses y archiva los meses antiguos en archivos (CSV comprimido).
+
+En SQLite la tabla no se particiona (las consultas por fecha recorren solo el
+rango en el índice (fecha, departamento)); los meses antiguos se archivan igual,
+cada uno en su propia base .db con la misma tabla.
+
+Uso: python -m database.partitions [--archivar-antes-de YYYY-MM] [--directorio ./archivo]
+"""
+
+import argparse
+import logging
+import os
+import re
+import time
+from datetime import date
+from typing import Any, Dict, List, Optional, Tuple, Union
+
+from database.backends import obtener_backend
+from database.models import get_db_connection
+
+logger = logging.getLogger(__name__)
+
+_FORMATO_MES = re.compile(r'^\d{4}-(0[1-9]|1[0-2])$')
+
+
+def mes_de(fecha: Union[str, date]) -> str:
+    """
+    Obtiene el mes ('YYYY-MM') de una fecha (date o 'YYYY-MM-DD')
+    """
+    return str(fecha)[:7]
+
+
+def sumar_meses(mes: str, meses: int) -> str:
+    """
+    Suma (o resta) meses a un mes 'YYYY-MM'
+    """
+    anio, numero = (int(parte) for parte in mes.split('-'))
+    indice = anio * 12 + numero - 1 + meses
+    return f"{indice // 12:04d}-{indice % 12 + 1:02d}"
+
+
+def rango_mes(mes: str) -> Tuple[str, str]:
+    """
+    Obtiene los límites de un mes para filtrar por fecha
+
+    Returns:
+        Tuple con (primer día, primer día del mes siguiente) en formato YYYY-MM-DD;
+        el segundo límite es exclusivo
+    """
+    if not _FORMATO_MES.match(mes):
+        raise ValueError(f"Mes inválido: {mes} (se espera YYYY-MM)")
+    return f"{mes}-01", f"{sumar_meses(mes, 1)}-01"
+
+
+def asegurar_particiones(meses_adelante: int = 2, desde: Optional[str] = None) -> List[str]:
+    """
+    Crea las particiones del mes actual y de los siguientes
+
+    Las reuniones de un mes sin partición van a la partición por defecto y se
+    trasladan al crearla; tenerlas creadas de antemano evita ese traslado.
+
+    Args:
+        meses_adelante: Meses posteriores al actual que deben existir
+        desde: Primer mes ('YYYY-MM', por defecto el actual)
+
+    Returns:
+        Lista de meses cuya partición se creó
+    """
+    backend = obtener_backend()
+    desde = desde or mes_de(date.today())
+    creadas = []
+
+    with get_db_connection() as conn:
+        for i in range(meses_adelante + 1):
+            mes = sumar_meses(desde, i)
+            if backend.asegurar_particion(conn, mes):
+                creadas.append(mes)
+
+    if creadas:
+        logger.info(f"Particiones de reuniones creadas: {', '.join(creadas)}")
+    return creadas
+
+
+def _ruta_archivo(directorio: str, mes: str, extension: str) -> str:
+    # Un mes puede archivarse más de una vez (reuniones registradas tarde)
+    base = os.path.join(directorio, f"reuniones_{mes.replace('-', '_')}")
+    ruta = f"{base}{extension}"
+    copia = 1
+    while os.path.exists(ruta):
+        copia += 1
+        ruta = f"{base}.{copia}{extension}"
+    return ruta
+
+
+def archivar_mes(mes: str, directorio: str) -> Dict[str, Any]:
+    """
+    Mueve las reuniones de un mes a un archivo y las quita de la base
+
+    Args:
+        mes: Mes a archivar ('YYYY-MM')
+        directorio: Directorio de los archivos
+
+    Returns:
+        Dict con 'exito', 'archivo' y 'reuniones', o 'error'
+    """
+    backend = obtener_backend()
+    ruta = None
+
+    try:
+        rango_mes(mes)
+        os.makedirs(directorio, exist_ok=True)
+        ruta = _ruta_archivo(directorio, mes, '.csv.gz' if backend.nombre == 'postgresql' else '.db')
+
+        with get_db_connection() as conn:
+            reuniones = backend.archivar_mes(conn, mes, ruta)
+
+        if not reuniones:
+            os.remove(ruta)
+            return {'exito': True, 'archivo': None, 'reuniones': 0}
+
+        logger.info(f"Mes {mes} archivado en {ruta} ({reuniones} reuniones)")
+        return {'exito': True, 'archivo': ruta, 'reuniones': reuniones}
+
+    except Exception as e:
+        logger.error(f"Error archivando el mes {mes}: {e}")
+        if ruta and os.path.exists(ruta):
+            os.remove(ruta)
+        return {'exito': False, 'error': str(e)}
+
+
+def archivar_anteriores_a(mes: str, directorio: str,
+                          presupuesto_segundos: Optional[float] = None) -> List[Dict[str, Any]]:
+    """
+    Archiva, del más antiguo al más reciente, los meses anteriores a uno dado
+
+    Args:
+        mes: Primer mes que permanece en la base ('YYYY-MM')
+        directorio: Directorio de los archivos
+        presupuesto_segundos: Tiempo máximo de ejecución (None = sin límite)
+
+    Returns:
+        Lista con el resultado de cada mes archivado
+    """
+    limite = rango_mes(mes)[0]
+    inicio = time.monotonic()
+    resultados = []
+
+    while presupuesto_segundos is None or time.monotonic() - inicio < presupuesto_segundos:
+        with get_db_connection() as conn:
+            fila = conn.execute(
+                "SELECT MIN(fecha) FROM reuniones_inicio_jornada WHERE fecha < ?", (limite,)
+            ).fetchone()
+        if fila[0] is None:
+            break
+
+        resultado = archivar_mes(mes_de(fila[0]), directorio)
+        resultados.append(resultado)
+        if not resultado['exito']:
+            break
+
+    return resultados
+
+
+def listar_particiones() -> List[Tuple[str, int]]:
+    """
+    Lista los meses de reuniones de la base
+
+    Returns:
+        Lista de (mes, reuniones) ordenada por mes (estimación en PostgreSQL)
+    """
+    with get_db_connection() as conn:
+        return obtener_backend().listar_particiones(conn)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--adelante', type=int, default=2, help='Meses futuros con partición creada')
+    parser.add_argument('--archivar-antes-de', metavar='YYYY-MM', help='Archivar los meses anteriores a este')
+    parser.add_argument('--directorio', default='./archivo', help='Directorio de los archivos')
+    args = parser.parse_args()
+
+    logging.basicConfig(format='%(asctime)s - %(name)s - %(levelname)s - %(message)s', level=logging.INFO)
+
+    asegurar_particiones(args.adelante)
+    if args.archivar_antes_de:
+        for resultado in archivar_anteriores_a(args.archivar_antes_de, args.directorio):
+            print(resultado)
+
+    for mes, reuniones in listar_particiones():
+        print(f"{mes}  {reuniones:>10,}")
+
+
+if __name__ == '__main__':
+    main()
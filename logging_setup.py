@@ -0,0 +1,272 @@
+# -*- coding: utf-8 -*-
+"""
+Logging estructurado y asíncrono de SIRIJ BOT
+Los manejadores solo encolan el registro (QueueHandler); un hilo aparte
+(QueueListener) lo formatea como JSON y lo escribe en consola y en un archivo
+rotativo, de modo que la E/S y la rotación nunca bloquean el event loop.
+
+Los campos de contexto se pasan con extra={'user_id': ..., 'sesion_id': ...,
+'estado': ..., 'duracion_ms': ...}; los campos con texto del usuario se
+redactan al formatear. Los loggers ruidosos pueden muestrearse por nombre.
+"""
+
+import atexit
+import itertools
+import json
+import logging
+import logging.handlers
+import queue
+import re
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterable, Optional
+
+from metrics import REGISTRO
+
+# Atributos propios de LogRecord: todo lo demás en __dict__ viene de extra=
+_ATRIBUTOS_REGISTRO = frozenset(vars(logging.LogRecord('', 0, '', 0, '', (), None))) | {'message', 'asctime'}
+
+# Campos de extra que llevan texto escrito por el usuario (respuestas, notas, nombres)
+CAMPOS_SENSIBLES = frozenset({
+    'texto', 'mensaje_usuario', 'respuesta', 'respuestas', 'nombres_personal', 'nombre_supervisor',
+    'observaciones', 'otra_informacion', 'descripcion_actividades_seguridad', 'meta_proposito_jornada',
+    'username', 'nombre'
+})
+
+_PATRON_CORREO = re.compile(r'[\w.+-]+@[\w-]+\.[\w.-]+')
+
+_REGISTROS_LOG = REGISTRO.contador(
+    'sirij_logs_total', 'Registros de log por resultado', ('resultado',)
+)
+_ENCOLADOS = _REGISTROS_LOG.etiquetas('encolado')
+_MUESTREADOS = _REGISTROS_LOG.etiquetas('muestreo')
+_DESCARTADOS = _REGISTROS_LOG.etiquetas('cola_llena')
+
+
+def redactar(valor: Any) -> str:
+    """
+    Reemplaza un texto del usuario por su longitud
+
+    Args:
+        valor: Texto (o lista de textos) a redactar
+
+    Returns:
+        str: Marcador con la longitud original
+    """
+    if isinstance(valor, (list, tuple)):
+        return f"[redactado: {len(valor)} elementos]"
+    return f"[redactado: {len(str(valor))} caracteres]"
+
+
+class FormateadorJSON(logging.Formatter):
+    """
+    Formatea cada registro como una línea JSON
+
+    Incluye fecha UTC, nivel, logger, mensaje, los campos de extra (con los
+    de CAMPOS_SENSIBLES redactados) y la excepción si la hay.
+    """
+
+    def __init__(self, proceso: Optional[str] = None, campos_sensibles: Iterable[str] = CAMPOS_SENSIBLES):
+        super().__init__()
+        self.proceso = proceso
+        self.campos_sensibles = frozenset(campos_sensibles)
+
+    def format(self, record: logging.LogRecord) -> str:
+        datos: Dict[str, Any] = {
+            'ts': datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec='milliseconds'),
+            'nivel': record.levelname,
+            'logger': record.name,
+            'mensaje': _PATRON_CORREO.sub('[correo]', record.getMessage())
+        }
+        if self.proceso:
+            datos['proceso'] = self.proceso
+
+        for clave, valor in record.__dict__.items():
+            if clave in _ATRIBUTOS_REGISTRO or clave.startswith('_'):
+                continue
+            datos[clave] = redactar(valor) if clave in self.campos_sensibles and valor else valor
+
+        if record.exc_info:
+            datos['excepcion'] = self.formatException(record.exc_info)
+        elif record.exc_text:
+            datos['excepcion'] = record.exc_text
+
+        return json.dumps(datos, ensure_ascii=False, default=str)
+
+
+class FormateadorTexto(logging.Formatter):
+    """
+    Formato legible para la consola, con los correos redactados
+
+    Los campos de extra no se muestran; quedan en el archivo JSON.
+    """
+
+    def format(self, record: logging.LogRecord) -> str:
+        return _PATRON_CORREO.sub('[correo]', super().format(record))
+
+
+class FiltroMuestreo(logging.Filter):
+    """
+    Deja pasar 1 de cada N registros de los loggers configurados
+
+    Solo se muestrean niveles INFO y menores; WARNING y superiores pasan
+    siempre. La regla de un logger aplica también a sus hijos
+    ('bot' cubre 'bot.handlers').
+    """
+
+    def __init__(self, tasas: Dict[str, int]):
+        super().__init__()
+        self.tasas = {nombre: tasa for nombre, tasa in tasas.items() if tasa > 1}
+        # Por nombre de logger: (tasa, contador) o None si no se muestrea
+        self._resueltos: Dict[str, Optional[tuple]] = {}
+
+    def _resolver(self, nombre: str) -> Optional[tuple]:
+        partes = nombre.split('.')
+        for i in range(len(partes), 0, -1):
+            tasa = self.tasas.get('.'.join(partes[:i]))
+            if tasa:
+                regla = (tasa, itertools.count())
+                break
+        else:
+            regla = None
+        return self._resueltos.setdefault(nombre, regla)
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno > logging.INFO or not self.tasas:
+            return True
+
+        regla = self._resueltos.get(record.name, False)
+        if regla is False:
+            regla = self._resolver(record.name)
+        if regla is None:
+            return True
+
+        tasa, contador = regla
+        if next(contador) % tasa == 0:
+            return True
+        _MUESTREADOS.inc()
+        return False
+
+
+def parsear_muestreo(texto: str) -> Dict[str, int]:
+    """
+    Parsea reglas de muestreo con el formato 'logger=N,otro.logger=M'
+
+    Args:
+        texto: Reglas separadas por comas
+
+    Returns:
+        Dict: Tasa (1 de cada N) por nombre de logger
+    """
+    tasas = {}
+    for regla in texto.split(','):
+        if not regla.strip():
+            continue
+        nombre, _, tasa = regla.partition('=')
+        tasas[nombre.strip()] = int(tasa)
+    return tasas
+
+
+class ManejadorCola(logging.handlers.QueueHandler):
+    """
+    QueueHandler que no formatea en el hilo que registra y nunca espera
+
+    El QueueHandler estándar formatea el mensaje antes de encolar; aquí el
+    registro se encola tal cual (la cola es del mismo proceso) y el formateo
+    ocurre en el hilo del QueueListener. Si la cola está llena el registro se
+    descarta y se cuenta en sirij_logs_total{resultado="cola_llena"}.
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        return record
+
+    def enqueue(self, record: logging.LogRecord):
+        try:
+            self.queue.put_nowait(record)
+            _ENCOLADOS.inc()
+        except queue.Full:
+            _DESCARTADOS.inc()
+
+
+_escucha: Optional[logging.handlers.QueueListener] = None
+
+
+def configurar_logging(
+    nivel: str = 'INFO',
+    archivo: Optional[str] = None,
+    formato_consola: str = 'texto',
+    max_bytes: int = 10 * 1024 * 1024,
+    respaldos: int = 5,
+    muestreo: Optional[Dict[str, int]] = None,
+    tamano_cola: int = 10000,
+    proceso: Optional[str] = None
+) -> logging.handlers.QueueListener:
+    """
+    Reemplaza los manejadores del logger raíz por la cola asíncrona
+
+    Args:
+        nivel: Nivel mínimo (DEBUG, INFO, WARNING, ERROR, CRITICAL)
+        archivo: Archivo de log en JSON con rotación (None = solo consola)
+        formato_consola: 'texto' (legible) o 'json'
+        max_bytes: Tamaño del archivo antes de rotar
+        respaldos: Archivos rotados que se conservan
+        muestreo: Tasa de muestreo (1 de cada N) por nombre de logger
+        tamano_cola: Registros pendientes antes de descartar
+        proceso: Nombre del proceso incluido en cada registro (modo multiproceso)
+
+    Returns:
+        QueueListener: Hilo escritor ya iniciado
+    """
+    global _escucha
+    detener_logging()
+
+    # Ningún formateador usa hilo ni proceso del sistema: evita calcularlos en cada registro
+    logging.logThreads = False
+    logging.logProcesses = False
+    logging.logMultiprocessing = False
+
+    consola = logging.StreamHandler()
+    if formato_consola == 'json':
+        consola.setFormatter(FormateadorJSON(proceso))
+    else:
+        prefijo = f'%(asctime)s - {proceso} - ' if proceso else '%(asctime)s - '
+        consola.setFormatter(FormateadorTexto(prefijo + '%(name)s - %(levelname)s - %(message)s'))
+    destinos = [consola]
+
+    if archivo:
+        # La rotación ocurre en el hilo escritor: los manejadores no esperan el renombrado
+        rotativo = logging.handlers.RotatingFileHandler(
+            archivo, maxBytes=max_bytes, backupCount=respaldos, encoding='utf-8'
+        )
+        rotativo.setFormatter(FormateadorJSON(proceso))
+        destinos.append(rotativo)
+
+    cola = ManejadorCola(queue.Queue(tamano_cola))
+    if muestreo:
+        cola.addFilter(FiltroMuestreo(muestreo))
+
+    raiz = logging.getLogger()
+    for manejador in list(raiz.handlers):
+        raiz.removeHandler(manejador)
+        manejador.close()
+    raiz.addHandler(cola)
+    raiz.setLevel(getattr(logging, nivel.upper(), logging.INFO))
+
+    _escucha = logging.handlers.QueueListener(cola.queue, *destinos, respect_handler_level=True)
+    _escucha.start()
+    return _escucha
+
+
+def detener_logging():
+    """
+    Escribe los registros pendientes y detiene el hilo escritor
+    """
+    global _escucha
+    if _escucha is None:
+        return
+    escucha, _escucha = _escucha, None
+    escucha.stop()
+    for manejador in escucha.handlers:
+        manejador.close()
+
+
+atexit.register(detener_logging)
@@ -0,0 +1,377 @@
+# -*- coding: utf-8 -*-
+"""
+Métricas internas de SIRIJ BOT
+Contadores e histogramas de bajo costo para los caminos calientes (manejadores,
+validadores, consultas de database/models.py, fotografías y sesiones),
+exportados en el formato de texto de Prometheus desde un endpoint HTTP local.
+
+Cada observación es una suma en una celda propia del hilo (sin locks,
+asignaciones ni formateo); el texto se genera solo cuando se consulta el endpoint. Las familias
+con etiquetas resuelven el hijo una vez (etiquetas(...)) y los caminos
+calientes guardan la referencia.
+"""
+
+import asyncio
+import functools
+import logging
+import math
+import threading
+import time
+from bisect import bisect_left
+from threading import get_ident
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Límites (segundos) de los histogramas de latencia: de 50 µs a 10 s
+LIMITES_LATENCIA = (
+    0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01,
+    0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0
+)
+
+TIPO_CONTENIDO = 'text/plain; version=0.0.4; charset=utf-8'
+
+
+def _escapar_etiqueta(valor: str) -> str:
+    return str(valor).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _formatear_valor(valor: float) -> str:
+    if valor == math.inf:
+        return '+Inf'
+    if isinstance(valor, float) and valor.is_integer() and abs(valor) < 1e15:
+        return str(int(valor))
+    return repr(valor)
+
+
+class Contador:
+    """
+    Contador monótono
+
+    Cada hilo suma en su propia celda (sin lock: solo ese hilo la escribe) y
+    al exportar se suman las celdas.
+    """
+
+    __slots__ = ('_celdas', '_lock')
+
+    def __init__(self):
+        self._celdas: Dict[int, List[float]] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, cantidad: float = 1):
+        celda = self._celdas.get(get_ident())
+        if celda is None:
+            celda = self._nueva_celda()
+        celda[0] += cantidad
+
+    def _nueva_celda(self) -> List[float]:
+        with self._lock:
+            return self._celdas.setdefault(get_ident(), [0])
+
+    @property
+    def valor(self) -> float:
+        return sum(celda[0] for celda in list(self._celdas.values()))
+
+
+class Histograma:
+    """
+    Histograma de límites fijos
+
+    Cada observación incrementa una sola cubeta (búsqueda binaria en C) en la
+    celda del hilo que observa, cuyo último elemento es la suma; las cuentas
+    acumuladas que exige Prometheus se calculan al exportar.
+    """
+
+    __slots__ = ('limites', '_celdas', '_lock')
+
+    def __init__(self, limites: Sequence[float] = LIMITES_LATENCIA):
+        self.limites = tuple(limites)
+        self._celdas: Dict[int, List[float]] = {}
+        self._lock = threading.Lock()
+
+    def observar(self, valor: float):
+        celda = self._celdas.get(get_ident())
+        if celda is None:
+            celda = self._nueva_celda()
+        celda[bisect_left(self.limites, valor)] += 1
+        celda[-1] += valor
+
+    def _nueva_celda(self) -> List[float]:
+        with self._lock:
+            return self._celdas.setdefault(get_ident(), [0] * (len(self.limites) + 1) + [0.0])
+
+    def instantanea(self) -> Tuple[List[int], float]:
+        """Cuentas acumuladas por límite (la última es +Inf) y suma"""
+        totales = [0] * (len(self.limites) + 2)
+        for celda in list(self._celdas.values()):
+            for indice, valor in enumerate(celda):
+                totales[indice] += valor
+        acumuladas = []
+        total = 0
+        for cuenta in totales[:-1]:
+            total += cuenta
+            acumuladas.append(total)
+        return acumuladas, totales[-1]
+
+
+class Familia:
+    """
+    Métrica con nombre, ayuda y etiquetas; cada combinación de valores es un hijo
+    """
+
+    def __init__(self, nombre: str, ayuda: str, tipo: str, etiquetas: Sequence[str] = (),
+                 limites: Sequence[float] = LIMITES_LATENCIA):
+        self.nombre = nombre
+        self.ayuda = ayuda
+        self.tipo = tipo
+        self.nombres_etiquetas = tuple(etiquetas)
+        self.limites = tuple(limites)
+        self._hijos: Dict[Tuple[str, ...], Any] = {}
+        self._lock = threading.Lock()
+
+    def etiquetas(self, *valores: str) -> Any:
+        """
+        Obtiene (o crea) el hijo de una combinación de valores de etiquetas
+
+        Returns:
+            Contador o Histograma
+        """
+        hijo = self._hijos.get(valores)
+        if hijo is None:
+            if len(valores) != len(self.nombres_etiquetas):
+                raise ValueError(f"{self.nombre} espera las etiquetas {self.nombres_etiquetas}")
+            with self._lock:
+                hijo = self._hijos.get(valores)
+                if hijo is None:
+                    hijo = Histograma(self.limites) if self.tipo == 'histogram' else Contador()
+                    self._hijos[valores] = hijo
+        return hijo
+
+    # Atajos para familias sin etiquetas
+    def inc(self, cantidad: float = 1):
+        self.etiquetas().inc(cantidad)
+
+    def observar(self, valor: float):
+        self.etiquetas().observar(valor)
+
+    def _selector(self, valores: Tuple[str, ...], extra: str = '') -> str:
+        pares = [f'{nombre}="{_escapar_etiqueta(valor)}"' for nombre, valor in zip(self.nombres_etiquetas, valores)]
+        if extra:
+            pares.append(extra)
+        return '{' + ','.join(pares) + '}' if pares else ''
+
+    def exportar(self) -> List[str]:
+        lineas = [f'# HELP {self.nombre} {self.ayuda}', f'# TYPE {self.nombre} {self.tipo}']
+        for valores, hijo in sorted(self._hijos.items()):
+            if self.tipo == 'histogram':
+                acumuladas, suma = hijo.instantanea()
+                for limite, cuenta in zip(self.limites + (math.inf,), acumuladas):
+                    selector = self._selector(valores, 'le="' + _formatear_valor(limite) + '"')
+                    lineas.append(f'{self.nombre}_bucket{selector} {cuenta}')
+                lineas.append(f'{self.nombre}_sum{self._selector(valores)} {_formatear_valor(suma)}')
+                lineas.append(f'{self.nombre}_count{self._selector(valores)} {acumuladas[-1]}')
+            else:
+                lineas.append(f'{self.nombre}{self._selector(valores)} {_formatear_valor(hijo.valor)}')
+        return lineas
+
+
+class FamiliaCalculada:
+    """
+    Métrica cuyo valor se lee al exportar (p. ej. de los contadores que ya
+    lleva un servicio), sin costo en el camino caliente
+    """
+
+    def __init__(self, nombre: str, ayuda: str, tipo: str, etiquetas: Sequence[str],
+                 funcion: Callable[[], Dict[Tuple[str, ...], float]]):
+        self.nombre = nombre
+        self.ayuda = ayuda
+        self.tipo = tipo
+        self.nombres_etiquetas = tuple(etiquetas)
+        self.funcion = funcion
+
+    def exportar(self) -> List[str]:
+        lineas = [f'# HELP {self.nombre} {self.ayuda}', f'# TYPE {self.nombre} {self.tipo}']
+        try:
+            valores = self.funcion()
+        except Exception as e:
+            logger.error(f"Error calculando la métrica {self.nombre}: {e}")
+            return lineas
+        for etiquetas, valor in sorted(valores.items()):
+            selector = ','.join(
+                f'{nombre}="{_escapar_etiqueta(v)}"' for nombre, v in zip(self.nombres_etiquetas, etiquetas)
+            )
+            lineas.append(f'{self.nombre}{{{selector}}} {_formatear_valor(valor)}' if selector
+                          else f'{self.nombre} {_formatear_valor(valor)}')
+        return lineas
+
+
+class RegistroMetricas:
+    """Conjunto de métricas de un proceso"""
+
+    def __init__(self):
+        self._familias: Dict[str, Any] = {}
+        self._lock = threading.Lock()
+
+    def _registrar(self, familia: Any) -> Any:
+        with self._lock:
+            existente = self._familias.get(familia.nombre)
+            if existente is not None:
+                if existente.tipo != familia.tipo:
+                    raise ValueError(f"La métrica {familia.nombre} ya existe con tipo {existente.tipo}")
+                return existente
+            self._familias[familia.nombre] = familia
+            return familia
+
+    def contador(self, nombre: str, ayuda: str, etiquetas: Sequence[str] = ()) -> Familia:
+        """Registra (u obtiene) una familia de contadores"""
+        return self._registrar(Familia(nombre, ayuda, 'counter', etiquetas))
+
+    def histograma(self, nombre: str, ayuda: str, etiquetas: Sequence[str] = (),
+                   limites: Sequence[float] = LIMITES_LATENCIA) -> Familia:
+        """Registra (u obtiene) una familia de histogramas"""
+        return self._registrar(Familia(nombre, ayuda, 'histogram', etiquetas, limites))
+
+    def calculada(self, nombre: str, ayuda: str, funcion: Callable[[], Dict[Tuple[str, ...], float]],
+                  etiquetas: Sequence[str] = (), tipo: str = 'gauge') -> FamiliaCalculada:
+        """
+        Registra una métrica calculada al exportar
+
+        Args:
+            funcion: Devuelve {tupla de valores de etiquetas: valor}
+            tipo: 'gauge' o 'counter'
+        """
+        familia = FamiliaCalculada(nombre, ayuda, tipo, etiquetas, funcion)
+        with self._lock:
+            self._familias[nombre] = familia
+        return familia
+
+    def exportar(self) -> str:
+        """Texto de todas las métricas en el formato de exposición de Prometheus"""
+        with self._lock:
+            familias = list(self._familias.values())
+        lineas: List[str] = []
+        for familia in familias:
+            lineas.extend(familia.exportar())
+        return '\n'.join(lineas) + '\n'
+
+
+# Registro del proceso
+REGISTRO = RegistroMetricas()
+
+LATENCIA_MANEJADORES = REGISTRO.histograma(
+    'sirij_manejador_segundos', 'Latencia de los manejadores de Telegram por tipo de actualización', ('tipo',)
+)
+ERRORES_MANEJADORES = REGISTRO.contador(
+    'sirij_manejador_errores_total', 'Excepciones no controladas en los manejadores', ('tipo',)
+)
+LATENCIA_VALIDACION = REGISTRO.histograma(
+    'sirij_validacion_segundos', 'Tiempo de validación de respuestas por tipo', ('tipo',)
+)
+LATENCIA_DB = REGISTRO.histograma(
+    'sirij_db_segundos', 'Tiempo de las operaciones de database/models.py por función', ('funcion',)
+)
+LATENCIA_FOTOS = REGISTRO.histograma(
+    'sirij_foto_etapa_segundos', 'Tiempo de cada etapa del procesamiento de fotografías', ('etapa',)
+)
+CONSULTAS_SESION = REGISTRO.contador(
+    'sirij_sesion_consultas_total', 'Consultas de la sesión de un usuario por resultado', ('resultado',)
+)
+REUNIONES_DUPLICADAS = REGISTRO.contador(
+    'sirij_reuniones_duplicadas_total', 'Reuniones duplicadas detectadas al guardar por política aplicada', ('politica',)
+)
+
+
+def cronometrar(histograma: Histograma):
+    """
+    Decorador que observa en el histograma la duración de cada llamada
+
+    Funciona con funciones normales y corrutinas. Las excepciones se propagan y
+    también se cronometran.
+    """
+    observar = histograma.observar
+    reloj = time.perf_counter
+
+    def decorador(funcion):
+        if asyncio.iscoroutinefunction(funcion):
+            @functools.wraps(funcion)
+            async def envoltura_async(*args, **kwargs):
+                inicio = reloj()
+                try:
+                    return await funcion(*args, **kwargs)
+                finally:
+                    observar(reloj() - inicio)
+            return envoltura_async
+
+        @functools.wraps(funcion)
+        def envoltura(*args, **kwargs):
+            inicio = reloj()
+            try:
+                return funcion(*args, **kwargs)
+            finally:
+                observar(reloj() - inicio)
+        return envoltura
+    return decorador
+
+
+def cronometrar_db(funcion):
+    """Decorador de las funciones de database/models.py (etiqueta = nombre de la función)"""
+    return cronometrar(LATENCIA_DB.etiquetas(funcion.__name__))(funcion)
+
+
+def _crear_manejador(registro: RegistroMetricas) -> Any:
+    # http.server se importa al abrir el endpoint, no al arrancar el bot
+    from http.server import BaseHTTPRequestHandler
+
+    class ManejadorMetricas(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.split('?', 1)[0] not in ('/metrics', '/'):
+                self.send_error(404)
+                return
+            cuerpo = registro.exportar().encode('utf-8')
+            self.send_response(200)
+            self.send_header('Content-Type', TIPO_CONTENIDO)
+            self.send_header('Content-Length', str(len(cuerpo)))
+            self.end_headers()
+            self.wfile.write(cuerpo)
+
+        def log_message(self, formato: str, *args):
+            logger.debug(f"Métricas: {self.address_string()} {formato % args}")
+
+    return ManejadorMetricas
+
+
+class ServidorMetricas:
+    """Endpoint HTTP (GET /metrics) en un hilo aparte"""
+
+    def __init__(self, host: str = '127.0.0.1', port: int = 9464, registro: RegistroMetricas = REGISTRO):
+        self.host = host
+        self.port = port
+        self.registro = registro
+        self._servidor: Optional[Any] = None
+
+    def iniciar(self) -> bool:
+        """
+        Abre el puerto y atiende en segundo plano
+
+        Returns:
+            bool: True si el servidor quedó escuchando
+        """
+        from http.server import ThreadingHTTPServer
+
+        try:
+            self._servidor = ThreadingHTTPServer((self.host, self.port), _crear_manejador(self.registro))
+        except OSError as e:
+            logger.error(f"No se pudo abrir el endpoint de métricas en {self.host}:{self.port}: {e}")
+            return False
+
+        self._servidor.daemon_threads = True
+        self.port = self._servidor.server_address[1]
+        threading.Thread(target=self._servidor.serve_forever, name='metricas', daemon=True).start()
+        logger.info(f"Métricas disponibles en http://{self.host}:{self.port}/metrics")
+        return True
+
+    def detener(self):
+        if self._servidor is not None:
+            self._servidor.shutdown()
+            self._servidor.server_close()
+            self._servidor = None
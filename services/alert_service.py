@@ -0,0 +1,436 @@
+# -*- coding: utf-8 -*-
+"""
+Servicio de alertas de seguridad para SIRIJ BOT
+Evalúa reglas configurables sobre cada reunión guardada (banderas como
+detecto_anomalias_salud y palabras clave en las notas) y avisa a los chats
+responsables sin esperar a que alguien revise las exportaciones.
+
+Todas las palabras clave de todas las reglas se buscan en una sola pasada por
+cada campo de texto con un autómata de Aho-Corasick: el costo depende del largo
+del texto, no del número de reglas. Las alertas se encolan al guardar y se
+envían desde la cola de trabajos, así el guardado no espera a Telegram.
+"""
+
+import json
+import logging
+from collections import deque
+from typing import Any, Deque, Dict, Iterator, List, Optional, Sequence, Set, Tuple
+
+from database.models import registrar_observador_reuniones
+
+logger = logging.getLogger(__name__)
+
+# Mayúsculas y acentos no cuentan al comparar palabras clave
+_NORMALIZACION = str.maketrans('ÁÉÍÓÚÜáéíóúü', 'aeiouuaeiouu')
+
+CAMPOS_NOTAS = ('observaciones', 'otra_informacion', 'descripcion_actividades_seguridad', 'meta_proposito_jornada')
+
+# Reglas usadas cuando no se configura ALERT_RULES_PATH
+REGLAS_PREDETERMINADAS: List[Dict[str, Any]] = [
+    {
+        'nombre': 'anomalias_salud',
+        'tipo': 'bandera',
+        'campos': ['detecto_anomalias_salud'],
+        'mensaje': 'Se detectaron anomalías de salud en el personal'
+    },
+    {
+        'nombre': 'lesiones',
+        'tipo': 'palabras',
+        'campos': list(CAMPOS_NOTAS),
+        'palabras': [
+            'accidente*', 'lesion*', 'lesionad*', 'herid*', 'lastimad*', 'fractura*', 'quemadura*',
+            'desmay*', 'atrapad*', 'amputa*', 'hospital*', 'primeros auxilios', 'ambulancia*'
+        ],
+        'mensaje': 'Posible lesión o accidente reportado'
+    },
+    {
+        'nombre': 'riesgo_electrico',
+        'tipo': 'palabras',
+        'campos': list(CAMPOS_NOTAS),
+        'palabras': ['descarga electrica', 'electrocu*', 'arco electrico', 'choque electrico', 'sin libranza'],
+        'mensaje': 'Incidente o riesgo eléctrico reportado'
+    },
+    {
+        'nombre': 'emergencias',
+        'tipo': 'palabras',
+        'campos': list(CAMPOS_NOTAS),
+        'palabras': ['incendio*', 'fuego', 'explosion*', 'fuga*', 'derrame*', 'evacua*', 'conato*'],
+        'mensaje': 'Emergencia reportada (fuego, fuga o derrame)'
+    },
+]
+
+
+def normalizar_texto(texto: str) -> str:
+    """Minúsculas y sin acentos, conservando la longitud del texto"""
+    return texto.lower().translate(_NORMALIZACION)
+
+
+class AutomataAhoCorasick:
+    """
+    Autómata de Aho-Corasick para buscar muchos patrones en una sola pasada
+
+    Construirlo cuesta O(suma de los largos de los patrones) y buscar cuesta
+    O(largo del texto + coincidencias), sin importar cuántos patrones haya.
+    Los patrones que terminan en '*' coinciden como prefijo de palabra; los
+    demás solo como palabras o frases completas.
+    """
+
+    def __init__(self, patrones: Sequence[str]):
+        self.patrones: List[Tuple[str, bool]] = []
+        self._transiciones: List[Dict[str, int]] = [{}]
+        self._fallo: List[int] = [0]
+        # Patrones que terminan en cada estado, incluidos los de sus sufijos
+        self._salidas: List[Tuple[int, ...]] = [()]
+
+        propias: List[List[int]] = [[]]
+        for indice, patron in enumerate(patrones):
+            prefijo = patron.endswith('*')
+            texto = normalizar_texto(patron.rstrip('*').strip())
+            self.patrones.append((texto, prefijo))
+            if not texto:
+                continue
+
+            estado = 0
+            for caracter in texto:
+                siguiente = self._transiciones[estado].get(caracter)
+                if siguiente is None:
+                    siguiente = len(self._transiciones)
+                    self._transiciones[estado][caracter] = siguiente
+                    self._transiciones.append({})
+                    self._fallo.append(0)
+                    self._salidas.append(())
+                    propias.append([])
+                estado = siguiente
+            propias[estado].append(indice)
+
+        # Enlaces de fallo por niveles (BFS): cada estado apunta al sufijo más
+        # largo que también es prefijo de algún patrón
+        pendientes = deque(self._transiciones[0].values())
+        for estado in pendientes:
+            self._salidas[estado] = tuple(propias[estado])
+        while pendientes:
+            estado = pendientes.popleft()
+            for caracter, siguiente in self._transiciones[estado].items():
+                fallo = self._fallo[estado]
+                while fallo and caracter not in self._transiciones[fallo]:
+                    fallo = self._fallo[fallo]
+                destino = self._transiciones[fallo].get(caracter, 0)
+                self._fallo[siguiente] = destino if destino != siguiente else 0
+                self._salidas[siguiente] = tuple(propias[siguiente]) + self._salidas[self._fallo[siguiente]]
+                pendientes.append(siguiente)
+
+    def __len__(self) -> int:
+        return len(self.patrones)
+
+    def buscar(self, texto: str) -> Iterator[Tuple[int, int]]:
+        """
+        Busca todos los patrones en el texto
+
+        Args:
+            texto: Texto donde buscar (se normaliza igual que los patrones)
+
+        Returns:
+            Iterador de (índice del patrón, posición final) por cada coincidencia
+        """
+        texto = normalizar_texto(texto)
+        transiciones = self._transiciones
+        fallo = self._fallo
+        salidas = self._salidas
+        largo = len(texto)
+
+        estado = 0
+        for posicion, caracter in enumerate(texto):
+            siguiente = transiciones[estado].get(caracter)
+            while siguiente is None and estado:
+                estado = fallo[estado]
+                siguiente = transiciones[estado].get(caracter)
+            estado = siguiente or 0
+            if not salidas[estado]:
+                continue
+
+            for indice in salidas[estado]:
+                patron, prefijo = self.patrones[indice]
+                inicio = posicion - len(patron) + 1
+                # Debe empezar en un límite de palabra; y terminar en uno si no es prefijo
+                if inicio > 0 and texto[inicio - 1].isalnum():
+                    continue
+                if not prefijo and posicion + 1 < largo and texto[posicion + 1].isalnum():
+                    continue
+                yield indice, posicion + 1
+
+
+class ReglaAlerta:
+    """
+    Regla de alerta sobre los datos de una reunión
+
+    - 'bandera': se cumple si alguno de los campos es verdadero (o igual a `valor`)
+    - 'palabras': se cumple si alguno de los campos contiene alguna de las palabras
+    """
+
+    TIPOS = ('bandera', 'palabras')
+
+    def __init__(self, nombre: str, tipo: str, campos: Sequence[str], mensaje: str,
+                 palabras: Sequence[str] = (), valor: Any = True):
+        if tipo not in self.TIPOS:
+            raise ValueError(f"Tipo de regla no reconocido: {tipo}")
+        if not campos:
+            raise ValueError(f"La regla {nombre} no indica campos")
+        if tipo == 'palabras' and not palabras:
+            raise ValueError(f"La regla {nombre} no indica palabras")
+
+        self.nombre = nombre
+        self.tipo = tipo
+        self.campos = list(campos)
+        self.mensaje = mensaje
+        self.palabras = list(palabras)
+        self.valor = valor
+
+    @classmethod
+    def desde_dict(cls, datos: Dict[str, Any]) -> 'ReglaAlerta':
+        """Crea una regla a partir de su definición en JSON"""
+        return cls(
+            datos['nombre'],
+            datos['tipo'],
+            datos.get('campos', []),
+            datos.get('mensaje', datos['nombre']),
+            datos.get('palabras', ()),
+            datos.get('valor', True)
+        )
+
+    def cumple_bandera(self, valor: Any) -> bool:
+        # Las respuestas Sí/No se guardan como booleanos, pero se aceptan también como texto
+        if self.valor is True:
+            if isinstance(valor, str):
+                return normalizar_texto(valor.strip()) in ('si', 's', 'true', '1', 'verdadero')
+            return bool(valor)
+        return valor == self.valor
+
+
+class MotorReglas:
+    """
+    Evalúa un conjunto de reglas sobre cada reunión
+
+    Las palabras de todas las reglas se compilan en un solo autómata; cada
+    campo de texto se recorre una vez y cada coincidencia se atribuye a las
+    reglas que vigilan ese campo.
+    """
+
+    def __init__(self, reglas: Sequence[ReglaAlerta]):
+        self.reglas = list(reglas)
+        self._banderas: Dict[str, List[int]] = {}
+        self._campos_texto: Set[str] = set()
+
+        patrones: List[str] = []
+        # Por patrón: reglas que lo usan (una palabra puede repetirse entre reglas)
+        self._reglas_patron: List[List[int]] = []
+        indice_patron: Dict[str, int] = {}
+        for numero, regla in enumerate(self.reglas):
+            if regla.tipo == 'bandera':
+                for campo in regla.campos:
+                    self._banderas.setdefault(campo, []).append(numero)
+                continue
+
+            self._campos_texto.update(regla.campos)
+            for palabra in regla.palabras:
+                clave = normalizar_texto(palabra.strip())
+                if clave not in indice_patron:
+                    indice_patron[clave] = len(patrones)
+                    patrones.append(clave)
+                    self._reglas_patron.append([])
+                if numero not in self._reglas_patron[indice_patron[clave]]:
+                    self._reglas_patron[indice_patron[clave]].append(numero)
+
+        self.automata = AutomataAhoCorasick(patrones)
+
+    @classmethod
+    def desde_json(cls, ruta: Optional[str] = None) -> 'MotorReglas':
+        """
+        Carga las reglas de un archivo JSON (lista de reglas) o las predeterminadas
+
+        Args:
+            ruta: Ruta del archivo; vacío para usar REGLAS_PREDETERMINADAS
+        """
+        definiciones = REGLAS_PREDETERMINADAS
+        if ruta:
+            with open(ruta, encoding='utf-8') as archivo:
+                definiciones = json.load(archivo)
+        return cls([ReglaAlerta.desde_dict(definicion) for definicion in definiciones])
+
+    def evaluar(self, datos: Dict[str, Any]) -> List[Dict[str, Any]]:
+        """
+        Evalúa todas las reglas sobre los datos de una reunión
+
+        Args:
+            datos: Columnas de la reunión
+
+        Returns:
+            Lista de dicts con 'regla', 'mensaje', 'campos' y 'coincidencias'
+            (palabras encontradas), una por regla cumplida
+        """
+        cumplidas: Dict[int, Dict[str, Any]] = {}
+
+        for campo, numeros in self._banderas.items():
+            valor = datos.get(campo)
+            if valor is None:
+                continue
+            for numero in numeros:
+                regla = self.reglas[numero]
+                if regla.cumple_bandera(valor):
+                    alerta = cumplidas.setdefault(numero, self._alerta(regla))
+                    alerta['campos'].append(campo)
+
+        for campo in self._campos_texto:
+            texto = datos.get(campo)
+            if not texto or not isinstance(texto, str):
+                continue
+            normalizado = normalizar_texto(texto)
+            for indice_patron, fin in self.automata.buscar(texto):
+                patron, prefijo = self.automata.patrones[indice_patron]
+                for numero in self._reglas_patron[indice_patron]:
+                    regla = self.reglas[numero]
+                    if campo not in regla.campos:
+                        continue
+                    alerta = cumplidas.setdefault(numero, self._alerta(regla))
+                    if campo not in alerta['campos']:
+                        alerta['campos'].append(campo)
+                    # La palabra tal como se escribió (completa si el patrón es prefijo)
+                    inicio = fin - len(patron)
+                    if prefijo:
+                        while fin < len(normalizado) and normalizado[fin].isalnum():
+                            fin += 1
+                    palabra = texto[inicio:fin]
+                    if palabra not in alerta['coincidencias']:
+                        alerta['coincidencias'].append(palabra)
+
+        return [cumplidas[numero] for numero in sorted(cumplidas)]
+
+    @staticmethod
+    def _alerta(regla: ReglaAlerta) -> Dict[str, Any]:
+        return {'regla': regla.nombre, 'mensaje': regla.mensaje, 'campos': [], 'coincidencias': []}
+
+
+class AlertService:
+    """Servicio para generar y enviar alertas de seguridad de las reuniones guardadas"""
+
+    def __init__(self, message_service: Any, chat_ids: Sequence[int] = (),
+                 motor: Optional[MotorReglas] = None, queue_size: int = 1000,
+                 flush_seconds: float = 2.0):
+        self.message_service = message_service
+        self.chat_ids = list(chat_ids)
+        self.motor = motor or MotorReglas.desde_json()
+        self.flush_seconds = flush_seconds
+
+        # deque es segura entre hilos para append/popleft: las reuniones pueden
+        # guardarse desde hilos de trabajo y la cola se vacía en el event loop
+        self._cola: Deque[Dict[str, Any]] = deque()
+        self._capacidad = queue_size
+        self._registrado = False
+
+        self.metricas = {
+            'evaluadas': 0,
+            'alertas': 0,
+            'descartadas': 0,
+            'enviadas': 0,
+            'errores': 0
+        }
+
+    def registrar(self, job_queue: Any):
+        """
+        Evalúa las reglas en cada reunión guardada y programa el envío de las
+        alertas en la cola de trabajos de la aplicación
+
+        Args:
+            job_queue: JobQueue de python-telegram-bot (application.job_queue)
+        """
+        if not self._registrado:
+            registrar_observador_reuniones(self.reunion_guardada)
+            self._registrado = True
+
+        job_queue.run_repeating(
+            self.enviar_pendientes,
+            interval=self.flush_seconds,
+            name='alertas_seguridad'
+        )
+        logger.info(
+            f"Alertas de seguridad activas: {len(self.motor.reglas)} reglas, "
+            f"{len(self.motor.automata)} palabras clave, {len(self.chat_ids)} chats"
+        )
+
+    def reunion_guardada(self, reunion_id: int, datos: Dict[str, Any]):
+        """
+        Observador de guardar_reunion_completa: evalúa las reglas y encola las alertas
+
+        Solo recorre el texto de la reunión; el envío ocurre en enviar_pendientes.
+        """
+        self.metricas['evaluadas'] += 1
+        alertas = self.motor.evaluar(datos)
+        if not alertas:
+            return
+
+        if len(self._cola) >= self._capacidad:
+            self.metricas['descartadas'] += 1
+            logger.warning(f"Cola de alertas llena: alerta de la reunión {reunion_id} descartada")
+            return
+
+        self._cola.append({
+            'reunion_id': reunion_id,
+            'departamento': datos.get('departamento'),
+            'fecha': datos.get('fecha'),
+            'nombre_supervisor': datos.get('nombre_supervisor'),
+            'alertas': alertas
+        })
+        self.metricas['alertas'] += len(alertas)
+
+    def pendientes(self) -> int:
+        """Número de reuniones con alertas sin enviar"""
+        return len(self._cola)
+
+    def tomar_pendientes(self) -> List[Dict[str, Any]]:
+        """
+        Saca de la cola todas las alertas pendientes
+
+        Returns:
+            Lista de dicts con los datos de la reunión y sus 'alertas'
+        """
+        pendientes = []
+        while True:
+            try:
+                pendientes.append(self._cola.popleft())
+            except IndexError:
+                return pendientes
+
+    async def enviar_pendientes(self, context: Any):
+        """
+        Callback de la cola de trabajos: envía las alertas pendientes a los chats configurados
+        """
+        for evento in self.tomar_pendientes():
+            texto = self.formatear(evento)
+            logger.warning(texto.replace('\n', ' | '))
+            for chat_id in self.chat_ids:
+                try:
+                    self.message_service.enviar(context.bot, chat_id, texto)
+                    self.metricas['enviadas'] += 1
+                except Exception as e:
+                    self.metricas['errores'] += 1
+                    logger.error(f"Error enviando alerta de la reunión {evento['reunion_id']} a {chat_id}: {e}")
+
+    @staticmethod
+    def formatear(evento: Dict[str, Any]) -> str:
+        """
+        Texto de la alerta de una reunión (sin formato, para no escapar las notas)
+        """
+        lineas = [
+            f"⚠️ Alerta de seguridad - Reunión #{evento['reunion_id']}",
+            f"{evento.get('departamento') or '-'} · {evento.get('fecha') or '-'} · "
+            f"{evento.get('nombre_supervisor') or '-'}"
+        ]
+        for alerta in evento['alertas']:
+            detalle = f": {', '.join(alerta['coincidencias'])}" if alerta['coincidencias'] else ''
+            lineas.append(f"• {alerta['mensaje']}{detalle}")
+        return '\n'.join(lineas)
+
+    def obtener_metricas(self) -> Dict[str, int]:
+        """
+        Obtiene las métricas acumuladas y el número de alertas pendientes
+        """
+        return {**self.metricas, 'pendientes': len(self._cola)}
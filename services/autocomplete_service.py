@@ -0,0 +1,241 @@
+# -*- coding: utf-8 -*-
+"""
+Servicio de autocompletado para SIRIJ BOT
+Sugiere los valores de departamento, categoría máxima y supervisor ya usados
+en reuniones anteriores y unifica sus variantes de escritura, para que
+"Distribución Zona Centro" y "distribucion zona centro" no cuenten como dos
+departamentos en las estadísticas.
+
+Cada campo tiene en memoria sus valores agrupados por forma normalizada (la
+misma de la huella de duplicados: sin acentos, mayúsculas ni signos). La
+escritura canónica de cada grupo es la más usada. Un índice ordenado con
+cada sufijo de palabra permite buscar por prefijo con bisect ("zona c"
+encuentra "Distribución Zona Centro"). El índice se llena al arrancar con una
+sola agrupación sobre reuniones_inicio_jornada y se actualiza con cada
+reunión guardada.
+"""
+
+import asyncio
+import heapq
+import logging
+import threading
+from bisect import bisect_left, insort
+from datetime import date, timedelta
+from typing import Any, Dict, List, Optional, Tuple
+
+from database.duplicates import normalizar
+from database.models import obtener_valores_frecuentes, registrar_observador_reuniones
+
+logger = logging.getLogger(__name__)
+
+CAMPOS_AUTOCOMPLETADO = ('departamento', 'categoria_maxima', 'nombre_supervisor')
+
+# Coincidencias revisadas como máximo por búsqueda de prefijo (prefijos de una letra)
+_MAX_COINCIDENCIAS = 500
+
+
+class _IndiceCampo:
+    """Valores de un campo agrupados por forma normalizada, con índice de prefijos"""
+
+    __slots__ = ('escrituras', 'usos', '_sufijos')
+
+    def __init__(self):
+        # forma normalizada -> {escritura: usos}, en orden de aparición
+        self.escrituras: Dict[str, Dict[str, int]] = {}
+        self.usos: Dict[str, int] = {}
+        # (sufijo desde cada palabra, forma normalizada), ordenado
+        self._sufijos: List[Tuple[str, str]] = []
+
+    def agregar(self, valor: Any, veces: int = 1) -> Optional[str]:
+        """
+        Cuenta un uso de un valor
+
+        Returns:
+            Forma normalizada del valor o None si está vacío
+        """
+        escritura = ' '.join(str(valor or '').split())
+        clave = normalizar(escritura)
+        if not clave:
+            return None
+
+        escrituras = self.escrituras.get(clave)
+        if escrituras is None:
+            escrituras = self.escrituras[clave] = {}
+            self.usos[clave] = 0
+            palabras = clave.split(' ')
+            for inicio in range(len(palabras)):
+                insort(self._sufijos, (' '.join(palabras[inicio:]), clave))
+
+        escrituras[escritura] = escrituras.get(escritura, 0) + veces
+        self.usos[clave] += veces
+        return clave
+
+    def canonico(self, clave: str) -> str:
+        """Escritura más usada de una forma normalizada (la primera en caso de empate)"""
+        escrituras = self.escrituras[clave]
+        return max(escrituras, key=escrituras.__getitem__)
+
+    def buscar(self, prefijo: str, limite: int) -> List[str]:
+        """
+        Formas normalizadas que tienen una palabra que empieza con el prefijo, las más usadas primero
+        """
+        if not prefijo:
+            return heapq.nlargest(limite, self.usos, key=self.usos.__getitem__)
+
+        coincidencias = set()
+        for posicion in range(bisect_left(self._sufijos, (prefijo,)), len(self._sufijos)):
+            sufijo, clave = self._sufijos[posicion]
+            if not sufijo.startswith(prefijo) or len(coincidencias) >= _MAX_COINCIDENCIAS:
+                break
+            coincidencias.add(clave)
+        return heapq.nlargest(limite, coincidencias, key=self.usos.__getitem__)
+
+
+class AutocompleteService:
+    """Servicio de sugerencias y normalización de departamento, categoría y supervisor"""
+
+    def __init__(self, limite_sugerencias: int = 4, meses_historial: int = 12,
+                 refresh_minutes: int = 60):
+        self.limite_sugerencias = limite_sugerencias
+        self.meses_historial = meses_historial
+        self.refresh_minutes = refresh_minutes
+
+        self._indices: Dict[str, _IndiceCampo] = {campo: _IndiceCampo() for campo in CAMPOS_AUTOCOMPLETADO}
+        # user_id -> formas normalizadas de su última reunión, en el orden de CAMPOS_AUTOCOMPLETADO
+        self._ultimos: Dict[int, Tuple[Optional[str], ...]] = {}
+        # Las reuniones pueden guardarse desde hilos de trabajo mientras se consulta
+        self._lock = threading.Lock()
+        self._registrado = False
+
+        self.metricas = {
+            'cargas': 0,
+            'agregadas': 0,
+            'normalizadas': 0
+        }
+
+    @property
+    def activo(self) -> bool:
+        return self.limite_sugerencias > 0
+
+    def registrar(self, job_queue: Any):
+        """
+        Actualiza el índice con cada reunión guardada y programa su carga en
+        segundo plano en la cola de trabajos de la aplicación
+
+        Args:
+            job_queue: JobQueue de python-telegram-bot (application.job_queue)
+        """
+        if not self.activo:
+            return
+
+        if not self._registrado:
+            registrar_observador_reuniones(self.reunion_guardada)
+            self._registrado = True
+
+        # En modo multiproceso cada trabajador solo ve sus propias reuniones: la
+        # recarga periódica incorpora las de los demás
+        if self.refresh_minutes > 0:
+            job_queue.run_repeating(self.recargar, interval=self.refresh_minutes * 60, first=0,
+                                    name='autocompletado')
+        else:
+            job_queue.run_once(self.recargar, 0, name='autocompletado')
+
+    async def recargar(self, context: Any = None):
+        """
+        Callback de la cola de trabajos: recarga el índice sin bloquear el event loop
+        """
+        await asyncio.get_running_loop().run_in_executor(None, self.cargar)
+
+    def cargar(self) -> int:
+        """
+        Reconstruye el índice desde las reuniones de los últimos meses_historial meses
+
+        Lee de la réplica si está configurada. Las reuniones guardadas mientras
+        se carga pueden faltar hasta la siguiente recarga.
+
+        Returns:
+            int: Valores distintos cargados
+        """
+        fecha_inicio = None
+        if self.meses_historial > 0:
+            fecha_inicio = (date.today() - timedelta(days=30 * self.meses_historial)).isoformat()
+
+        indices = {campo: _IndiceCampo() for campo in CAMPOS_AUTOCOMPLETADO}
+        ultimos: Dict[int, Tuple[int, Tuple[Optional[str], ...]]] = {}
+
+        for fila in obtener_valores_frecuentes(fecha_inicio, replica=True):
+            claves = tuple(indices[campo].agregar(fila[campo], fila['cantidad']) for campo in CAMPOS_AUTOCOMPLETADO)
+            usuario = fila['usuario_telegram_id']
+            if usuario is not None and fila['ultimo_id'] > ultimos.get(usuario, (0,))[0]:
+                ultimos[usuario] = (fila['ultimo_id'], claves)
+
+        with self._lock:
+            self._indices = indices
+            self._ultimos = {usuario: claves for usuario, (_, claves) in ultimos.items()}
+
+        self.metricas['cargas'] += 1
+        total = sum(len(indice.usos) for indice in indices.values())
+        logger.info(f"Autocompletado cargado: {total} valores de {len(ultimos)} usuarios")
+        return total
+
+    def reunion_guardada(self, reunion_id: int, datos: Dict[str, Any]):
+        """
+        Observador de guardar_reunion_completa: cuenta los valores de la reunión
+        """
+        with self._lock:
+            claves = tuple(self._indices[campo].agregar(datos.get(campo)) for campo in CAMPOS_AUTOCOMPLETADO)
+            if datos.get('usuario_telegram_id') is not None:
+                self._ultimos[datos['usuario_telegram_id']] = claves
+        self.metricas['agregadas'] += 1
+
+    def sugerencias(self, campo: str, user_id: Optional[int] = None, prefijo: str = '',
+                    limite: Optional[int] = None) -> List[str]:
+        """
+        Sugiere valores para un campo
+
+        Args:
+            campo: Campo de CAMPOS_AUTOCOMPLETADO
+            user_id: Usuario; su último valor del campo va primero si coincide con el prefijo
+            prefijo: Texto escrito hasta ahora (vacío = los más usados)
+            limite: Sugerencias como máximo (por defecto limite_sugerencias)
+
+        Returns:
+            Lista de escrituras canónicas
+        """
+        limite = self.limite_sugerencias if limite is None else limite
+        if limite <= 0 or campo not in self._indices:
+            return []
+
+        prefijo = normalizar(prefijo)
+        with self._lock:
+            indice = self._indices[campo]
+            claves = indice.buscar(prefijo, limite)
+
+            ultimo = self._ultimos.get(user_id, ())
+            ultima = ultimo[CAMPOS_AUTOCOMPLETADO.index(campo)] if ultimo else None
+            if ultima is not None and ultima in indice.usos and f' {prefijo}' in f' {ultima}':
+                claves = [ultima] + [clave for clave in claves if clave != ultima][:limite - 1]
+
+            return [indice.canonico(clave) for clave in claves]
+
+    def canonico(self, campo: str, valor: Any) -> Any:
+        """
+        Reemplaza una variante por la escritura canónica de su forma normalizada
+
+        Los valores que no son texto, los campos sin autocompletado y los valores
+        nuevos se devuelven sin cambios.
+        """
+        if not self.activo or campo not in self._indices or not isinstance(valor, str):
+            return valor
+
+        clave = normalizar(valor)
+        with self._lock:
+            indice = self._indices[campo]
+            if clave not in indice.usos:
+                return valor
+            canonico = indice.canonico(clave)
+
+        if canonico != valor:
+            self.metricas['normalizadas'] += 1
+            logger.debug(f"Valor de {campo} normalizado a su escritura canónica")
+        return canonico
@@ -0,0 +1,249 @@
+# -*- coding: utf-8 -*-
+"""
+Servicio de generación masiva de reportes para SIRIJ BOT
+Genera reportes HTML de muchas reuniones en paralelo, con miniaturas de la evidencia
+"""
+
+import base64
+import html
+import io
+import logging
+import os
+import zipfile
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from typing import Any, Dict, Optional, Tuple
+
+from database.models import iterar_reuniones
+from services.report_service import SECCIONES_BOOLEANAS
+
+logger = logging.getLogger(__name__)
+
+ENCABEZADO_HTML = """<!DOCTYPE html>
+<html lang="es">
+<head>
+<meta charset="utf-8">
+<title>{titulo}</title>
+<style>
+body {{ font-family: Arial, sans-serif; margin: 2em; color: #222; }}
+.reunion {{ page-break-after: always; border-bottom: 1px solid #ccc; padding-bottom: 1em; }}
+table {{ border-collapse: collapse; margin-bottom: 0.5em; }}
+td {{ padding: 2px 8px; vertical-align: top; }}
+td.etiqueta {{ font-weight: bold; }}
+img.evidencia {{ max-width: {miniatura}px; max-height: {miniatura}px; border: 1px solid #999; }}
+</style>
+</head>
+<body>
+<h1>{titulo}</h1>
+<p>Generado: {generado}</p>
+"""
+
+PIE_HTML = """<p>Total de reuniones: {total}</p>
+</body>
+</html>
+"""
+
+
+def _fila(etiqueta: str, valor: Any) -> str:
+    """
+    Renderiza una fila etiqueta/valor escapada para HTML
+    """
+    if valor is None or valor == '':
+        valor = 'N/A'
+    elif isinstance(valor, (list, tuple)):
+        valor = ', '.join(str(elemento) for elemento in valor)
+    return f'<tr><td class="etiqueta">{html.escape(etiqueta)}</td><td>{html.escape(str(valor))}</td></tr>'
+
+
+def _miniatura_base64(ruta_foto: Optional[str], tamano: int) -> Optional[str]:
+    """
+    Genera una miniatura JPEG en base64 de la foto de evidencia
+
+    Args:
+        ruta_foto: Ruta de la foto guardada
+        tamano: Lado máximo de la miniatura en píxeles
+
+    Returns:
+        str: Data URI de la miniatura o None si no se pudo generar
+    """
+    if not ruta_foto or not os.path.exists(ruta_foto):
+        return None
+
+    try:
+        # Importación diferida: solo los procesos que generan miniaturas cargan PIL
+        from PIL import Image
+
+        with Image.open(ruta_foto) as img:
+            img.draft('RGB', (tamano, tamano))  # Decodificación reducida en JPEG
+            img.thumbnail((tamano, tamano))
+            if img.mode != 'RGB':
+                img = img.convert('RGB')
+
+            buffer = io.BytesIO()
+            img.save(buffer, format='JPEG', quality=70, optimize=True)
+
+        return 'data:image/jpeg;base64,' + base64.b64encode(buffer.getvalue()).decode('ascii')
+
+    except Exception as e:
+        logger.error(f"Error generando miniatura de {ruta_foto}: {e}")
+        return None
+
+
+def renderizar_reunion_html(reunion: Dict[str, Any], tamano_miniatura: int = 320) -> Tuple[int, str]:
+    """
+    Renderiza el reporte HTML de una reunión (se ejecuta en los procesos del pool)
+
+    Args:
+        reunion: Fila de reuniones_inicio_jornada como diccionario
+        tamano_miniatura: Lado máximo de la miniatura en píxeles
+
+    Returns:
+        Tuple[int, str]: (id de la reunión, fragmento HTML)
+    """
+    partes = [
+        f'<div class="reunion" id="reunion-{reunion["id"]}">',
+        f'<h2>Reunión #{reunion["id"]} - {html.escape(str(reunion.get("departamento", "")))} '
+        f'({html.escape(str(reunion.get("fecha", "")))})</h2>',
+        '<h3>Datos generales</h3><table>',
+        _fila('Categoría máxima', reunion.get('categoria_maxima')),
+        _fila('Supervisor', reunion.get('nombre_supervisor')),
+        _fila('Horario', f"{reunion.get('hora_inicio', '')} - {reunion.get('hora_termino', '')}"),
+        _fila('Personal', reunion.get('nombres_personal')),
+        '</table>'
+    ]
+
+    for seccion in SECCIONES_BOOLEANAS:
+        partes.append(f'<h3>{html.escape(seccion.titulo.replace("*", ""))}</h3><table>')
+        for campo, etiqueta in seccion.preguntas:
+            partes.append(_fila(etiqueta, 'Sí' if reunion.get(campo) else 'No'))
+        partes.append('</table>')
+
+    partes.extend([
+        '<h3>Información adicional</h3><table>',
+        _fila('Otra información', reunion.get('otra_informacion')),
+        _fila('Actividades de seguridad', reunion.get('descripcion_actividades_seguridad')),
+        _fila('Meta/Propósito de la jornada', reunion.get('meta_proposito_jornada')),
+        _fila('Observaciones', reunion.get('observaciones')),
+        _fila('Fecha de registro', reunion.get('fecha_registro')),
+        _fila('Usuario', reunion.get('usuario_telegram_id')),
+        '</table>',
+        '<h3>Evidencia fotográfica</h3>'
+    ])
+
+    miniatura = _miniatura_base64(reunion.get('ruta_evidencia_fotografica'), tamano_miniatura)
+    if miniatura:
+        partes.append(f'<img class="evidencia" src="{miniatura}" alt="Evidencia reunión {reunion["id"]}">')
+    else:
+        partes.append('<p>Sin fotografía disponible</p>')
+
+    partes.append('</div>')
+    return reunion['id'], '\n'.join(partes)
+
+
+class BulkReportService:
+    """Servicio para generar reportes de muchas reuniones con memoria acotada"""
+
+    def __init__(self, max_workers: Optional[int] = None, tamano_lote: int = 200,
+                 tamano_miniatura: int = 320, replica: bool = False):
+        self.max_workers = max_workers or os.cpu_count() or 1
+        # Leer de la réplica: el recorrido completo no compite con las escrituras del bot
+        self.replica = replica
+        self.tamano_lote = tamano_lote
+        self.tamano_miniatura = tamano_miniatura
+
+        # Reportes en vuelo como máximo: acota la memoria sin importar cuántas reuniones coincidan
+        self.max_en_vuelo = self.max_workers * 4
+
+    def generar(self, destino: str, fecha_inicio: Optional[str] = None, fecha_fin: Optional[str] = None,
+                departamento: Optional[str] = None, supervisor: Optional[str] = None,
+                formato: str = 'html') -> Dict[str, Any]:
+        """
+        Genera los reportes de todas las reuniones que cumplen los filtros
+
+        Args:
+            destino: Ruta del archivo de salida
+            fecha_inicio: Fecha mínima (YYYY-MM-DD, opcional)
+            fecha_fin: Fecha máxima (YYYY-MM-DD, opcional)
+            departamento: Departamento (opcional)
+            supervisor: Nombre del supervisor (opcional)
+            formato: 'html' (un documento imprimible) o 'zip' (un HTML por reunión)
+
+        Returns:
+            Dict con 'exito', 'total' y 'destino' o 'error'
+        """
+        if formato not in ('html', 'zip'):
+            return {'exito': False, 'error': f'Formato no soportado: {formato}'}
+
+        titulo = self._titulo(fecha_inicio, fecha_fin, departamento, supervisor)
+        reuniones = iterar_reuniones(
+            fecha_inicio, fecha_fin, departamento, supervisor, self.tamano_lote, replica=self.replica
+        )
+
+        try:
+            if formato == 'zip':
+                total = self._generar_zip(destino, titulo, reuniones)
+            else:
+                total = self._generar_html(destino, titulo, reuniones)
+
+            logger.info(f"Reporte masivo generado: {total} reuniones en {destino}")
+            return {'exito': True, 'total': total, 'destino': destino}
+
+        except Exception as e:
+            logger.error(f"Error generando reporte masivo: {e}")
+            return {'exito': False, 'error': str(e)}
+
+    def _renderizar_en_paralelo(self, reuniones):
+        """
+        Renderiza las reuniones en el pool de procesos conservando el orden
+
+        Nunca hay más de max_en_vuelo reportes pendientes en memoria.
+        """
+        with ProcessPoolExecutor(max_workers=self.max_workers) as pool:
+            pendientes = deque()
+
+            for reunion in reuniones:
+                pendientes.append(pool.submit(renderizar_reunion_html, reunion, self.tamano_miniatura))
+                if len(pendientes) >= self.max_en_vuelo:
+                    yield pendientes.popleft().result()
+
+            while pendientes:
+                yield pendientes.popleft().result()
+
+    def _encabezado(self, titulo: str) -> str:
+        return ENCABEZADO_HTML.format(
+            titulo=html.escape(titulo),
+            miniatura=self.tamano_miniatura,
+            generado=datetime.now().strftime('%d/%m/%Y %H:%M')
+        )
+
+    def _generar_html(self, destino: str, titulo: str, reuniones) -> int:
+        total = 0
+        with open(destino, 'w', encoding='utf-8') as archivo:
+            archivo.write(self._encabezado(titulo))
+            for _, fragmento in self._renderizar_en_paralelo(reuniones):
+                archivo.write(fragmento)
+                archivo.write('\n')
+                total += 1
+            archivo.write(PIE_HTML.format(total=total))
+        return total
+
+    def _generar_zip(self, destino: str, titulo: str, reuniones) -> int:
+        total = 0
+        with zipfile.ZipFile(destino, 'w', compression=zipfile.ZIP_DEFLATED) as archivo_zip:
+            for reunion_id, fragmento in self._renderizar_en_paralelo(reuniones):
+                documento = self._encabezado(f"{titulo} - Reunión #{reunion_id}") + fragmento + PIE_HTML.format(total=1)
+                archivo_zip.writestr(f'reunion_{reunion_id}.html', documento)
+                total += 1
+        return total
+
+    @staticmethod
+    def _titulo(fecha_inicio, fecha_fin, departamento, supervisor) -> str:
+        partes = ['Reportes RIJ']
+        if departamento:
+            partes.append(f'Departamento {departamento}')
+        if supervisor:
+            partes.append(f'Supervisor {supervisor}')
+        if fecha_inicio or fecha_fin:
+            partes.append(f"{fecha_inicio or '...'} a {fecha_fin or '...'}")
+        return ' - '.join(partes)
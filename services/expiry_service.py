@@ -0,0 +1,301 @@
+# -*- coding: utf-8 -*-
+"""
+Servicio de expiración de sesiones para SIRIJ BOT
+Sigue el plazo de inactividad de cada sesión abierta con una rueda de temporizadores
+jerárquica y avisa al usuario antes y después de que su sesión expire
+"""
+
+import asyncio
+import logging
+import math
+import time
+from typing import Any, Callable, Dict, Hashable, Iterator, List, Optional, Tuple
+
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+FASE_AVISO = 'aviso'
+FASE_EXPIRACION = 'expiracion'
+
+
+class _Temporizador:
+    __slots__ = ('clave', 'vencimiento', 'datos', 'nivel', 'ranura')
+
+    def __init__(self, clave: Hashable, vencimiento: int, datos: Any):
+        self.clave = clave
+        self.vencimiento = vencimiento
+        self.datos = datos
+        self.nivel = 0
+        self.ranura = 0
+
+
+class RuedaTemporizadores:
+    """
+    Rueda de temporizadores jerárquica
+
+    Programar y cancelar cuestan O(1). Cada nivel tiene 2**bits_ranuras ranuras y
+    cubre un rango 2**bits_ranuras veces mayor que el anterior; al completar una
+    vuelta de un nivel, la siguiente ranura del nivel superior se redistribuye en
+    los niveles inferiores. Con los valores por defecto (64 ranuras, 4 niveles,
+    resolución de 1 s) cubre unos 194 días.
+    """
+
+    def __init__(self, resolucion: float = 1.0, bits_ranuras: int = 6, niveles: int = 4,
+                 reloj: Callable[[], float] = time.monotonic):
+        self.resolucion = resolucion
+        self.reloj = reloj
+        self._bits = bits_ranuras
+        self._mascara = (1 << bits_ranuras) - 1
+        self._alcance = 1 << (bits_ranuras * niveles)
+        self._niveles: List[List[Dict[Hashable, _Temporizador]]] = [
+            [{} for _ in range(1 << bits_ranuras)] for _ in range(niveles)
+        ]
+        self._temporizadores: Dict[Hashable, _Temporizador] = {}
+        self._tick = self._ticks(reloj())
+
+    def _ticks(self, instante: float) -> int:
+        return int(instante / self.resolucion)
+
+    def programar(self, clave: Hashable, retraso_segundos: float, datos: Any = None):
+        """
+        Programa (o reprograma) el temporizador de una clave
+
+        Args:
+            clave: Identificador del temporizador (p. ej. el user_id)
+            retraso_segundos: Segundos hasta el vencimiento
+            datos: Valor devuelto junto con la clave al vencer
+        """
+        self.cancelar(clave)
+        ticks = max(1, math.ceil(retraso_segundos / self.resolucion))
+        temporizador = _Temporizador(clave, self._tick + ticks, datos)
+        self._temporizadores[clave] = temporizador
+        self._insertar(temporizador)
+
+    def cancelar(self, clave: Hashable) -> bool:
+        """
+        Cancela el temporizador de una clave
+
+        Returns:
+            bool: True si existía un temporizador pendiente
+        """
+        temporizador = self._temporizadores.pop(clave, None)
+        if temporizador is None:
+            return False
+        del self._niveles[temporizador.nivel][temporizador.ranura][clave]
+        return True
+
+    def _insertar(self, temporizador: _Temporizador):
+        delta = temporizador.vencimiento - self._tick
+        vencimiento = temporizador.vencimiento
+        if delta >= self._alcance:
+            # Fuera de rango: se estaciona en el último nivel y se reubica al redistribuirse
+            vencimiento = self._tick + self._alcance - 1
+
+        nivel = 0
+        limite = 1 << self._bits
+        while delta >= limite and nivel < len(self._niveles) - 1:
+            nivel += 1
+            limite <<= self._bits
+
+        ranura = (vencimiento >> (self._bits * nivel)) & self._mascara
+        temporizador.nivel = nivel
+        temporizador.ranura = ranura
+        self._niveles[nivel][ranura][temporizador.clave] = temporizador
+
+    def avanzar(self, ahora: Optional[float] = None) -> List[Tuple[Hashable, Any]]:
+        """
+        Avanza la rueda hasta el instante indicado
+
+        Args:
+            ahora: Instante del reloj de la rueda (por defecto, el actual)
+
+        Returns:
+            Lista de (clave, datos) de los temporizadores vencidos
+        """
+        objetivo = self._ticks(self.reloj() if ahora is None else ahora)
+        vencidos = []
+
+        while self._tick < objetivo:
+            self._tick += 1
+
+            # Redistribuir los niveles superiores que completaron una vuelta
+            for nivel in range(1, len(self._niveles)):
+                if self._tick & ((1 << (self._bits * nivel)) - 1):
+                    break
+                ranura = (self._tick >> (self._bits * nivel)) & self._mascara
+                pendientes = self._niveles[nivel][ranura]
+                if pendientes:
+                    self._niveles[nivel][ranura] = {}
+                    for temporizador in pendientes.values():
+                        self._insertar(temporizador)
+
+            ranura = self._tick & self._mascara
+            pendientes = self._niveles[0][ranura]
+            if pendientes:
+                self._niveles[0][ranura] = {}
+                for clave, temporizador in pendientes.items():
+                    del self._temporizadores[clave]
+                    vencidos.append((clave, temporizador.datos))
+
+        return vencidos
+
+    def pendientes(self) -> Iterator[Tuple[Hashable, float, Any]]:
+        """
+        Recorre los temporizadores pendientes
+
+        Returns:
+            Iterador de (clave, segundos_restantes, datos)
+        """
+        for clave, temporizador in self._temporizadores.items():
+            yield clave, (temporizador.vencimiento - self._tick) * self.resolucion, temporizador.datos
+
+    def __contains__(self, clave: Hashable) -> bool:
+        return clave in self._temporizadores
+
+    def __len__(self) -> int:
+        return len(self._temporizadores)
+
+
+class SessionExpiryService:
+    """Servicio que avisa y expira las sesiones inactivas sin una tarea por sesión"""
+
+    def __init__(self, session_service: Any, message_service: Any, timeout_minutes: int = 60,
+                 warning_minutes: int = 5, bloqueo: Any = None, resolucion: float = 1.0):
+        self.session_service = session_service
+        self.message_service = message_service
+        self.timeout_segundos = timeout_minutes * 60
+        # El aviso nunca puede quedar antes de la última actividad
+        self.aviso_segundos = min(warning_minutes * 60, self.timeout_segundos)
+        self.bloqueo = bloqueo
+        self.resolucion = resolucion
+        self.rueda = RuedaTemporizadores(resolucion)
+        self._tareas = set()
+
+        self.metricas = {
+            'avisos': 0,
+            'expiradas': 0
+        }
+
+    def registrar(self, job_queue: Any):
+        """
+        Programa el avance de la rueda en la cola de trabajos de la aplicación
+
+        Args:
+            job_queue: JobQueue de python-telegram-bot (application.job_queue)
+        """
+        job_queue.run_repeating(
+            self.procesar_vencimientos,
+            interval=self.resolucion,
+            name='expiracion_sesiones'
+        )
+
+    def registrar_actividad(self, user_id: int, chat_id: int):
+        """
+        Reinicia el plazo de inactividad de la sesión del usuario
+        """
+        if self.aviso_segundos > 0:
+            self.rueda.programar(user_id, self.timeout_segundos - self.aviso_segundos, (chat_id, FASE_AVISO))
+        else:
+            self.rueda.programar(user_id, self.timeout_segundos, (chat_id, FASE_EXPIRACION))
+
+    def cancelar(self, user_id: int):
+        """
+        Deja de seguir la sesión del usuario (completada o cancelada)
+        """
+        self.rueda.cancelar(user_id)
+
+    def exportar_plazos(self) -> Iterator[Tuple[int, int, float]]:
+        """
+        Recorre los plazos de las sesiones seguidas en tiempo de reloj (epoch)
+
+        Returns:
+            Iterador de (user_id, chat_id, vencimiento) donde vencimiento es el
+            instante en que la sesión expira
+        """
+        ahora = time.time()
+        for user_id, restante, (chat_id, fase) in self.rueda.pendientes():
+            if fase == FASE_AVISO:
+                restante += self.aviso_segundos
+            yield user_id, chat_id, ahora + restante
+
+    def restaurar_plazo(self, user_id: int, chat_id: int, vencimiento: float,
+                        ahora: Optional[float] = None) -> bool:
+        """
+        Vuelve a seguir una sesión a partir de su instante de expiración
+
+        Args:
+            user_id: ID del usuario
+            chat_id: ID del chat
+            vencimiento: Instante de expiración (epoch)
+            ahora: Instante actual (epoch, por defecto time.time())
+
+        Returns:
+            bool: False si la sesión ya expiró (no se sigue)
+        """
+        restante = vencimiento - (time.time() if ahora is None else ahora)
+        if restante <= 0:
+            # El mantenimiento la eliminará; no se notifica para no tocar sesiones ajenas
+            return False
+
+        if restante > self.aviso_segundos > 0:
+            self.rueda.programar(user_id, restante - self.aviso_segundos, (chat_id, FASE_AVISO))
+        else:
+            self.rueda.programar(user_id, restante, (chat_id, FASE_EXPIRACION))
+        return True
+
+    async def procesar_vencimientos(self, context: Any):
+        """
+        Callback de la cola de trabajos: envía avisos y expira las sesiones vencidas
+        """
+        for user_id, (chat_id, fase) in self.rueda.avanzar():
+            if fase == FASE_AVISO:
+                self.rueda.programar(user_id, self.aviso_segundos, (chat_id, FASE_EXPIRACION))
+                self.metricas['avisos'] += 1
+                self.message_service.enviar(
+                    context.bot, chat_id,
+                    Config.MESSAGES['session_warning'].format(minutos=math.ceil(self.aviso_segundos / 60))
+                )
+            else:
+                tarea = asyncio.create_task(self._expirar(context.bot, user_id, chat_id))
+                self._tareas.add(tarea)
+                tarea.add_done_callback(self._tareas.discard)
+
+    async def _expirar(self, bot: Any, user_id: int, chat_id: int):
+        if self.bloqueo is None:
+            await self._expirar_sesion(bot, user_id, chat_id)
+            return
+
+        # Espera a que termine el mensaje del usuario que pudiera estar en proceso
+        async with self.bloqueo.bloquear(user_id):
+            await self._expirar_sesion(bot, user_id, chat_id)
+
+    async def _expirar_sesion(self, bot: Any, user_id: int, chat_id: int):
+        if user_id in self.rueda:
+            # El usuario respondió mientras se esperaba el bloqueo
+            return
+
+        try:
+            resultado = await asyncio.get_running_loop().run_in_executor(
+                None, self.session_service.cancelar_sesion, user_id
+            )
+        except Exception as e:
+            logger.error(f"Error expirando sesión de usuario {user_id}: {e}")
+            return
+
+        if not resultado['exito']:
+            # La sesión ya no existía: no hay nada que notificar
+            return
+
+        self.metricas['expiradas'] += 1
+        logger.info(f"Sesión de usuario {user_id} expirada por inactividad")
+        self.message_service.enviar(bot, chat_id, Config.MESSAGES['session_expired'])
+
+    def obtener_metricas(self) -> Dict[str, Any]:
+        """
+        Obtiene las métricas del servicio
+
+        Returns:
+            Dict con avisos enviados, sesiones expiradas y sesiones seguidas
+        """
+        return {**self.metricas, 'sesiones_activas': len(self.rueda)}
@@ -0,0 +1,213 @@
+# -*- coding: utf-8 -*-
+"""
+Servicio de mantenimiento programado para SIRIJ BOT
+Expira sesiones, limpia fotos antiguas y mantiene las particiones mensuales de reuniones
+en segundo plano usando la cola de trabajos del bot
+"""
+
+import asyncio
+import logging
+import time
+from datetime import date, datetime
+from functools import partial
+from typing import Any, Dict, Optional
+
+from database.migrations import aplicar_migraciones, hay_rellenos_pendientes
+from database.partitions import archivar_anteriores_a, asegurar_particiones, mes_de, sumar_meses
+from services.session_service import SessionService
+
+logger = logging.getLogger(__name__)
+
+
+class MaintenanceService:
+    """Servicio para ejecutar tareas de mantenimiento periódicas con presupuesto de tiempo"""
+
+    def __init__(self, session_service: SessionService, photo_service: Optional[Any] = None,
+                 interval_minutes: int = 15, window_start_hour: int = 0, window_end_hour: int = 24,
+                 jitter_seconds: int = 60, batch_size: int = 500, time_budget_seconds: float = 5.0,
+                 photo_retention_days: int = 0, migration_interval_seconds: int = 30,
+                 migration_batch_size: int = 500, migration_pause_seconds: float = 0.05,
+                 business_hours: Optional[tuple] = None, business_slowdown: int = 10,
+                 partition_months_ahead: int = 2, archive_after_months: int = 0,
+                 archive_path: str = './archivo'):
+        self.session_service = session_service
+        self.photo_service = photo_service
+        self.interval_minutes = interval_minutes
+        self.window_start_hour = window_start_hour
+        self.window_end_hour = window_end_hour
+        self.jitter_seconds = jitter_seconds
+        self.batch_size = batch_size
+        self.time_budget_seconds = time_budget_seconds
+        self.photo_retention_days = photo_retention_days
+        self.migration_interval_seconds = migration_interval_seconds
+        self.migration_batch_size = migration_batch_size
+        self.migration_pause_seconds = migration_pause_seconds
+        self.business_hours = business_hours
+        self.business_slowdown = business_slowdown
+        self.partition_months_ahead = partition_months_ahead
+        self.archive_after_months = archive_after_months
+        self.archive_path = archive_path
+
+        self.ultima_ejecucion: Optional[Dict[str, Any]] = None
+        self.totales = {
+            'ejecuciones': 0,
+            'omitidas': 0,
+            'sesiones_eliminadas': 0,
+            'fotos_eliminadas': 0,
+            'meses_archivados': 0,
+            'rellenos': 0,
+            'errores': 0
+        }
+
+    def registrar(self, job_queue: Any):
+        """
+        Programa el mantenimiento en la cola de trabajos de la aplicación
+
+        Args:
+            job_queue: JobQueue de python-telegram-bot (application.job_queue)
+        """
+        job_queue.run_repeating(
+            self.ejecutar,
+            interval=self.interval_minutes * 60,
+            first=self.interval_minutes * 60,
+            name='mantenimiento',
+            job_kwargs={'jitter': self.jitter_seconds}
+        )
+        logger.info(
+            f"Mantenimiento programado cada {self.interval_minutes} minutos "
+            f"(ventana {self.window_start_hour:02d}-{self.window_end_hour:02d} h)"
+        )
+
+        # Los rellenos de migraciones avanzan todo el día, más despacio en horario laboral
+        if hay_rellenos_pendientes():
+            job_queue.run_repeating(
+                self.ejecutar_rellenos,
+                interval=self.migration_interval_seconds,
+                first=self.migration_interval_seconds,
+                name='rellenos_migraciones'
+            )
+            logger.info("Rellenos de migraciones pendientes programados en segundo plano")
+
+    def en_ventana(self, ahora: Optional[datetime] = None) -> bool:
+        """
+        Indica si la hora actual está dentro de la ventana de baja actividad
+
+        La ventana puede cruzar la medianoche (por ejemplo, de 22 a 6 h).
+        """
+        hora = (ahora or datetime.now()).hour
+        if self.window_start_hour <= self.window_end_hour:
+            return self.window_start_hour <= hora < self.window_end_hour
+        return hora >= self.window_start_hour or hora < self.window_end_hour
+
+    async def ejecutar(self, context: Any = None):
+        """
+        Callback de la cola de trabajos: ejecuta el mantenimiento sin bloquear el event loop
+        """
+        if not self.en_ventana():
+            self.totales['omitidas'] += 1
+            logger.debug("Mantenimiento omitido: fuera de la ventana de baja actividad")
+            return
+
+        await asyncio.get_running_loop().run_in_executor(None, self.ejecutar_mantenimiento)
+
+    async def ejecutar_rellenos(self, context: Any = None):
+        """
+        Callback de la cola de trabajos: avanza los rellenos de migraciones pendientes
+        """
+        try:
+            resultado = await asyncio.get_running_loop().run_in_executor(None, partial(
+                aplicar_migraciones,
+                ejecutar_rellenos=True,
+                tamano_lote=self.migration_batch_size,
+                pausa_segundos=self.migration_pause_seconds,
+                horario_laboral=self.business_hours,
+                factor_laboral=self.business_slowdown,
+                presupuesto_segundos=self.time_budget_seconds
+            ))
+        except Exception as e:
+            logger.error(f"Error ejecutando rellenos de migraciones: {e}")
+            self.totales['errores'] += 1
+            return
+
+        self.totales['rellenos'] += 1
+        if not resultado['pendientes'] and context is not None and context.job:
+            logger.info(f"Migraciones completas: esquema en versión {resultado['version']}")
+            context.job.schedule_removal()
+
+    def ejecutar_mantenimiento(self) -> Dict[str, Any]:
+        """
+        Ejecuta una ronda de mantenimiento dentro del presupuesto de tiempo
+
+        Returns:
+            Dict con las métricas de la ejecución
+        """
+        inicio = time.monotonic()
+        metricas = {
+            'inicio': datetime.now().isoformat(),
+            'sesiones_eliminadas': 0,
+            'fotos_eliminadas': 0,
+            'meses_archivados': 0,
+            'duracion_segundos': 0.0,
+            'presupuesto_agotado': False,
+            'error': None
+        }
+
+        try:
+            metricas['sesiones_eliminadas'] = self.session_service.clean_expired_sessions(
+                self.batch_size, self.time_budget_seconds
+            )
+
+            restante = self.time_budget_seconds - (time.monotonic() - inicio)
+            if self.photo_service and self.photo_retention_days > 0:
+                if restante > 0:
+                    metricas['fotos_eliminadas'] = self.photo_service.cleanup_old_photos(
+                        self.photo_retention_days, restante
+                    )
+                else:
+                    metricas['presupuesto_agotado'] = True
+
+            # Particiones del mes actual y los siguientes antes de que lleguen sus reuniones
+            asegurar_particiones(self.partition_months_ahead)
+
+            restante = self.time_budget_seconds - (time.monotonic() - inicio)
+            if self.archive_after_months > 0:
+                if restante > 0:
+                    conservar_desde = sumar_meses(mes_de(date.today()), 1 - self.archive_after_months)
+                    archivados = archivar_anteriores_a(conservar_desde, self.archive_path, restante)
+                    metricas['meses_archivados'] = sum(1 for resultado in archivados if resultado['exito'])
+                else:
+                    metricas['presupuesto_agotado'] = True
+
+        except Exception as e:
+            logger.error(f"Error en mantenimiento programado: {e}")
+            metricas['error'] = str(e)
+            self.totales['errores'] += 1
+
+        metricas['duracion_segundos'] = round(time.monotonic() - inicio, 3)
+        if metricas['duracion_segundos'] >= self.time_budget_seconds:
+            metricas['presupuesto_agotado'] = True
+
+        self.totales['ejecuciones'] += 1
+        self.totales['sesiones_eliminadas'] += metricas['sesiones_eliminadas']
+        self.totales['fotos_eliminadas'] += metricas['fotos_eliminadas']
+        self.totales['meses_archivados'] += metricas['meses_archivados']
+        self.ultima_ejecucion = metricas
+
+        logger.info(
+            f"Mantenimiento: {metricas['sesiones_eliminadas']} sesiones y "
+            f"{metricas['fotos_eliminadas']} fotos eliminadas, {metricas['meses_archivados']} meses archivados "
+            f"en {metricas['duracion_segundos']}s"
+        )
+        return metricas
+
+    def obtener_metricas(self) -> Dict[str, Any]:
+        """
+        Obtiene las métricas acumuladas y de la última ejecución
+
+        Returns:
+            Dict con 'totales' y 'ultima_ejecucion'
+        """
+        return {
+            'totales': dict(self.totales),
+            'ultima_ejecucion': self.ultima_ejecucion
+        }
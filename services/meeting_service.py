@@ -7,20 +7,50 @@ import logging
 from datetime import datetime
 from typing import Dict, Any, Optional, List
 from database.models import (
-    save_complete_meeting,
-    get_meeting_by_id,
-    get_meetings_by_user,
-    get_meeting_statistics,
-    export_meetings_to_csv
+    guardar_reunion_completa,
+    obtener_reunion_por_id,
+    obtener_reuniones_por_usuario,
+    obtener_reuniones_por_fecha,
+    obtener_estadisticas_reuniones,
+    obtener_antiguedad_replica,
+    buscar_reuniones,
+    exportar_reuniones_csv
+)
+from services.bulk_report_service import BulkReportService
+from services.report_service import (
+    SECCION_INICIO,
+    SECCION_INFORMACION,
+    SECCION_SEGURIDAD,
+    renderizar_reporte_reunion,
+    renderizar_resumen_diario
 )
 
 logger = logging.getLogger(__name__)
 
+# Atraso a partir del cual el resumen diario avisa que sus datos no son los últimos
+AVISO_ANTIGUEDAD_SEGUNDOS = 60
+
 class MeetingService:
     """Servicio para manejar la lógica de negocio de las reuniones"""
     
-    def __init__(self):
-        pass
+    def __init__(self, usar_replica: bool = True):
+        """
+        Args:
+            usar_replica: Las estadísticas, exportaciones y reportes leen de la
+                réplica de lectura (DATABASE_REPLICA_URL) si está configurada
+        """
+        self.usar_replica = usar_replica
+    
+    def get_data_staleness(self) -> Optional[float]:
+        """
+        Obtiene el atraso de los datos que leen las estadísticas, exportaciones y reportes
+        
+        Returns:
+            float: Segundos de atraso (0 si se lee de la base principal) o None si hay error
+        """
+        if not self.usar_replica:
+            return 0.0
+        return obtener_antiguedad_replica()
     
     def save_meeting_from_session(self, session_data: Dict[str, Any]) -> Optional[str]:
         """
@@ -35,74 +65,21 @@ class MeetingService:
         try:
             answers = session_data.get('answers', {})
             photos = session_data.get('photos', [])
-            user_id = session_data.get('user_id')
-            
-            # Preparar datos generales
-            general_data = {
-                'departamento': answers.get('departamento', ''),
-                'fecha': answers.get('fecha', ''),
-                'categoria_maxima': answers.get('categoria_maxima', ''),
-                'nombres_personal': answers.get('nombres_personal', ''),
-                'hora_inicio': answers.get('hora_inicio', ''),
-                'hora_termino': answers.get('hora_termino', '')
-            }
-            
-            # Preparar secciones S/N
-            inicio_data = {
-                'saludo_inicio_jornada': answers.get('saludo_inicio_jornada', False),
-                'enumero_personal_participante': answers.get('enumero_personal_participante', False),
-                'pregunto_estado_salud_participantes': answers.get('pregunto_estado_salud_participantes', False),
-                'detectaron_anomalias_salud': answers.get('detectaron_anomalias_salud', False),
-                'tomo_lista_asistencia': answers.get('tomo_lista_asistencia', False)
-            }
-            
-            informacion_data = {
-                'comentaron_trabajos_mantenimiento': answers.get('comentaron_trabajos_mantenimiento', False),
-                'comentaron_trabajos_operacion': answers.get('comentaron_trabajos_operacion', False),
-                'comentaron_trabajos_potencial_riesgo': answers.get('comentaron_trabajos_potencial_riesgo', False),
-                'comentaron_incidentes_accidentes': answers.get('comentaron_incidentes_accidentes', False)
-            }
             
-            seguridad_data = {
-                'realizo_revision_equipo': answers.get('realizo_revision_equipo', False),
-                'comento_uso_epp': answers.get('comento_uso_epp', False),
-                'dio_lectura_articulo_reglamento': answers.get('dio_lectura_articulo_reglamento', False),
-                'relato_experiencia_peligro': answers.get('relato_experiencia_peligro', False),
-                'actividades_relevantes_posteriores': answers.get('actividades_relevantes_posteriores', False),
-                'especifico_actividades_seguridad': answers.get('especifico_actividades_seguridad', False)
-            }
-            
-            # Preparar meta y observaciones
-            meta_data = {
-                'otra_informacion': answers.get('otra_informacion', ''),
-                'meta_proposito_jornada': answers.get('meta_proposito_jornada', ''),
-                'observaciones': answers.get('observaciones', '')
-            }
-            
-            # Preparar evidencia
-            evidencia_data = {
-                'fotos_paths': [photo.get('path', '') for photo in photos],
-                'total_fotos': len(photos),
-                'usuario_telegram': user_id,
-                'fecha_creacion': datetime.now().isoformat(),
-                'completado_por_bot': True
-            }
+            # Las claves de las respuestas coinciden con las columnas de la tabla
+            datos = dict(answers)
+            datos['usuario_telegram_id'] = session_data.get('user_id')
+            if photos and not datos.get('ruta_evidencia_fotografica'):
+                datos['ruta_evidencia_fotografica'] = photos[0].get('path', '')
             
             # Guardar en la base de datos
-            meeting_id = save_complete_meeting(
-                general_data=general_data,
-                inicio_data=inicio_data,
-                informacion_data=informacion_data,
-                seguridad_data=seguridad_data,
-                meta_data=meta_data,
-                evidencia_data=evidencia_data
-            )
+            resultado = guardar_reunion_completa(datos)
             
-            if meeting_id:
-                logger.info(f"Reunión guardada exitosamente con ID: {meeting_id}")
-                return meeting_id
+            if resultado['exito']:
+                logger.info(f"Reunión guardada exitosamente con ID: {resultado['reunion_id']}")
+                return resultado['reunion_id']
             else:
-                logger.error("Error guardando reunión en la base de datos")
+                logger.error(f"Error guardando reunión en la base de datos: {resultado['error']}")
                 return None
                 
         except Exception as e:
@@ -120,34 +97,18 @@ class MeetingService:
             Dict con el resumen de la reunión
         """
         try:
-            meeting = get_meeting_by_id(meeting_id)
+            meeting = obtener_reunion_por_id(meeting_id)
             if not meeting:
                 return None
             
             # Contar respuestas positivas por sección
-            inicio_positivas = sum([
-                meeting.get('saludo_inicio_jornada', False),
-                meeting.get('enumero_personal_participante', False),
-                meeting.get('pregunto_estado_salud_participantes', False),
-                meeting.get('detectaron_anomalias_salud', False),
-                meeting.get('tomo_lista_asistencia', False)
-            ])
+            inicio_positivas = SECCION_INICIO.contar_positivas(meeting)
+            informacion_positivas = SECCION_INFORMACION.contar_positivas(meeting)
+            seguridad_positivas = SECCION_SEGURIDAD.contar_positivas(meeting)
             
-            informacion_positivas = sum([
-                meeting.get('comentaron_trabajos_mantenimiento', False),
-                meeting.get('comentaron_trabajos_operacion', False),
-                meeting.get('comentaron_trabajos_potencial_riesgo', False),
-                meeting.get('comentaron_incidentes_accidentes', False)
-            ])
-            
-            seguridad_positivas = sum([
-                meeting.get('realizo_revision_equipo', False),
-                meeting.get('comento_uso_epp', False),
-                meeting.get('dio_lectura_articulo_reglamento', False),
-                meeting.get('relato_experiencia_peligro', False),
-                meeting.get('actividades_relevantes_posteriores', False),
-                meeting.get('especifico_actividades_seguridad', False)
-            ])
+            total_inicio = len(SECCION_INICIO.campos)
+            total_informacion = len(SECCION_INFORMACION.campos)
+            total_seguridad = len(SECCION_SEGURIDAD.campos)
             
             return {
                 'id': meeting_id,
@@ -155,19 +116,19 @@ class MeetingService:
                 'fecha': meeting.get('fecha', ''),
                 'hora_inicio': meeting.get('hora_inicio', ''),
                 'hora_termino': meeting.get('hora_termino', ''),
-                'total_fotos': meeting.get('total_fotos', 0),
+                'total_fotos': 1 if meeting.get('ruta_evidencia_fotografica') else 0,
                 'secciones': {
-                    'inicio': f"{inicio_positivas}/5",
-                    'informacion': f"{informacion_positivas}/4",
-                    'seguridad': f"{seguridad_positivas}/6"
+                    'inicio': f"{inicio_positivas}/{total_inicio}",
+                    'informacion': f"{informacion_positivas}/{total_informacion}",
+                    'seguridad': f"{seguridad_positivas}/{total_seguridad}"
                 },
                 'completitud': {
-                    'inicio': round((inicio_positivas / 5) * 100, 1),
-                    'informacion': round((informacion_positivas / 4) * 100, 1),
-                    'seguridad': round((seguridad_positivas / 6) * 100, 1)
+                    'inicio': round((inicio_positivas / total_inicio) * 100, 1),
+                    'informacion': round((informacion_positivas / total_informacion) * 100, 1),
+                    'seguridad': round((seguridad_positivas / total_seguridad) * 100, 1)
                 },
-                'fecha_creacion': meeting.get('fecha_creacion', ''),
-                'usuario': meeting.get('usuario_telegram', '')
+                'fecha_creacion': meeting.get('fecha_registro', ''),
+                'usuario': meeting.get('usuario_telegram_id', '')
             }
             
         except Exception as e:
@@ -186,7 +147,7 @@ class MeetingService:
             Lista de reuniones del usuario
         """
         try:
-            meetings = get_meetings_by_user(user_id, limit)
+            meetings = obtener_reuniones_por_usuario(user_id, limit)
             summaries = []
             
             for meeting in meetings:
@@ -267,10 +228,12 @@ class MeetingService:
         Obtiene estadísticas generales de las reuniones
         
         Returns:
-            Dict con estadísticas o None si hay error
+            Dict con estadísticas (incluye 'antiguedad_datos_segundos') o None si hay error
         """
         try:
-            return get_meeting_statistics()
+            estadisticas = obtener_estadisticas_reuniones(replica=self.usar_replica)
+            estadisticas['antiguedad_datos_segundos'] = self.get_data_staleness()
+            return estadisticas
         except Exception as e:
             logger.error(f"Error obteniendo estadísticas: {e}")
             return None
@@ -288,11 +251,36 @@ class MeetingService:
             bool: True si se exportó exitosamente
         """
         try:
-            return export_meetings_to_csv(output_path, start_date, end_date)
+            if self.usar_replica:
+                logger.info(f"Exportando reuniones desde la réplica (atraso: {self.get_data_staleness()} s)")
+            return exportar_reuniones_csv(output_path, start_date, end_date, replica=self.usar_replica)
         except Exception as e:
             logger.error(f"Error exportando reuniones: {e}")
             return False
     
+    def search_meetings(self, query: str, start_date: Optional[str] = None, end_date: Optional[str] = None,
+                        department: Optional[str] = None, limit: int = 20) -> List[Dict[str, Any]]:
+        """
+        Busca reuniones por el texto de sus notas (observaciones, otra información,
+        actividades de seguridad y meta de la jornada)
+        
+        Args:
+            query: Palabras a buscar (sin distinguir mayúsculas ni acentos)
+            start_date: Fecha de inicio (opcional)
+            end_date: Fecha de fin (opcional)
+            department: Departamento (opcional)
+            limit: Máximo de resultados
+            
+        Returns:
+            Lista de reuniones de mayor a menor relevancia, con un 'fragmento' que
+            marca las coincidencias entre corchetes y su 'puntaje'
+        """
+        try:
+            return buscar_reuniones(query, start_date, end_date, department, limit, replica=self.usar_replica)
+        except Exception as e:
+            logger.error(f"Error buscando reuniones: {e}")
+            return []
+    
     def generate_meeting_report(self, meeting_id: str) -> Optional[str]:
         """
         Genera un reporte textual de una reunión
@@ -301,57 +289,65 @@ class MeetingService:
             meeting_id: ID de la reunión
             
         Returns:
-            str: Reporte en formato texto
+            str: Reporte en formato MarkdownV2 de Telegram
         """
         try:
-            meeting = get_meeting_by_id(meeting_id)
+            meeting = obtener_reunion_por_id(meeting_id)
             if not meeting:
                 return None
             
-            report = f"""📋 REPORTE DE REUNIÓN DE INICIO DE JORNADA
-
-🏢 DATOS GENERALES:
-• Departamento: {meeting.get('departamento', 'N/A')}
-• Fecha: {meeting.get('fecha', 'N/A')}
-• Categoría máxima: {meeting.get('categoria_maxima', 'N/A')}
-• Hora inicio: {meeting.get('hora_inicio', 'N/A')}
-• Hora término: {meeting.get('hora_termino', 'N/A')}
-• Personal: {meeting.get('nombres_personal', 'N/A')}
-
-🚀 SECCIÓN INICIO:
-• Saludo inicio de jornada: {'✅ Sí' if meeting.get('saludo_inicio_jornada') else '❌ No'}
-• Enumeró personal participante: {'✅ Sí' if meeting.get('enumero_personal_participante') else '❌ No'}
-• Preguntó estado de salud: {'✅ Sí' if meeting.get('pregunto_estado_salud_participantes') else '❌ No'}
-• Detectaron anomalías de salud: {'✅ Sí' if meeting.get('detectaron_anomalias_salud') else '❌ No'}
-• Tomó lista de asistencia: {'✅ Sí' if meeting.get('tomo_lista_asistencia') else '❌ No'}
-
-📢 SECCIÓN INFORMACIÓN:
-• Comentaron trabajos de mantenimiento: {'✅ Sí' if meeting.get('comentaron_trabajos_mantenimiento') else '❌ No'}
-• Comentaron trabajos de operación: {'✅ Sí' if meeting.get('comentaron_trabajos_operacion') else '❌ No'}
-• Comentaron trabajos con potencial de riesgo: {'✅ Sí' if meeting.get('comentaron_trabajos_potencial_riesgo') else '❌ No'}
-• Comentaron incidentes o accidentes: {'✅ Sí' if meeting.get('comentaron_incidentes_accidentes') else '❌ No'}
-
-🛡️ SECCIÓN ACTIVIDADES DE SEGURIDAD:
-• Realizó revisión de equipo: {'✅ Sí' if meeting.get('realizo_revision_equipo') else '❌ No'}
-• Comentó uso de EPP: {'✅ Sí' if meeting.get('comento_uso_epp') else '❌ No'}
-• Dio lectura a artículo del reglamento: {'✅ Sí' if meeting.get('dio_lectura_articulo_reglamento') else '❌ No'}
-• Relató experiencia de peligro: {'✅ Sí' if meeting.get('relato_experiencia_peligro') else '❌ No'}
-• Actividades relevantes posteriores: {'✅ Sí' if meeting.get('actividades_relevantes_posteriores') else '❌ No'}
-• Especificó actividades de seguridad: {'✅ Sí' if meeting.get('especifico_actividades_seguridad') else '❌ No'}
-
-📝 INFORMACIÓN ADICIONAL:
-• Otra información: {meeting.get('otra_informacion', 'N/A')}
-• Meta/Propósito de la jornada: {meeting.get('meta_proposito_jornada', 'N/A')}
-• Observaciones: {meeting.get('observaciones', 'N/A')}
-
-📸 EVIDENCIA:
-• Total de fotos: {meeting.get('total_fotos', 0)}
-• Fecha de creación: {meeting.get('fecha_creacion', 'N/A')}
-• Usuario: {meeting.get('usuario_telegram', 'N/A')}
-"""
-            
-            return report
+            return renderizar_reporte_reunion(meeting)
             
         except Exception as e:
             logger.error(f"Error generando reporte de reunión {meeting_id}: {e}")
-            return None
\ No newline at end of file
+            return None
+    
+    def generate_daily_digest(self, fecha: str) -> Optional[str]:
+        """
+        Genera el resumen diario con los reportes de todas las reuniones de una fecha
+        
+        Args:
+            fecha: Fecha de las reuniones (YYYY-MM-DD)
+            
+        Returns:
+            str: Resumen en formato MarkdownV2 o None si hay error
+        """
+        try:
+            reuniones = obtener_reuniones_por_fecha(fecha, replica=self.usar_replica)
+            titulo = f"Resumen diario {fecha} - {len(reuniones)} reuniones"
+            
+            antiguedad = self.get_data_staleness()
+            if antiguedad and antiguedad >= AVISO_ANTIGUEDAD_SEGUNDOS:
+                titulo += f" (datos de hace {int(antiguedad // 60)} min)"
+            
+            return renderizar_resumen_diario(reuniones, titulo=titulo)
+            
+        except Exception as e:
+            logger.error(f"Error generando resumen diario de {fecha}: {e}")
+            return None
+    
+    def generate_bulk_report(self, output_path: str, start_date: Optional[str] = None,
+                             end_date: Optional[str] = None, department: Optional[str] = None,
+                             supervisor: Optional[str] = None, output_format: str = 'html',
+                             max_workers: Optional[int] = None) -> Dict[str, Any]:
+        """
+        Genera los reportes de todas las reuniones que cumplen los filtros
+        
+        Args:
+            output_path: Ruta del archivo de salida
+            start_date: Fecha de inicio (opcional)
+            end_date: Fecha de fin (opcional)
+            department: Departamento (opcional)
+            supervisor: Nombre del supervisor (opcional)
+            output_format: 'html' (documento único) o 'zip' (un HTML por reunión)
+            max_workers: Procesos para renderizar (por defecto, uno por núcleo)
+            
+        Returns:
+            Dict con 'exito', 'total', 'destino' y 'antiguedad_datos_segundos' o 'error'
+        """
+        antiguedad = self.get_data_staleness()
+        resultado = BulkReportService(max_workers=max_workers, replica=self.usar_replica).generar(
+            output_path, start_date, end_date, department, supervisor, output_format
+        )
+        resultado['antiguedad_datos_segundos'] = antiguedad
+        return resultado
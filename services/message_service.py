@@ -0,0 +1,323 @@
+# -*- coding: utf-8 -*-
+"""
+Servicio de envío de mensajes salientes para SIRIJ BOT
+Respeta los límites de Telegram y agrupa respuestas consecutivas al mismo chat
+"""
+
+import asyncio
+import logging
+import time
+from collections import deque
+from typing import Any, Deque, Dict, List, Optional
+
+from telegram.error import RetryAfter
+
+logger = logging.getLogger(__name__)
+
+# Longitud máxima de un mensaje de texto en Telegram
+MAX_MESSAGE_LENGTH = 4096
+
+# Cubetas de chat a partir de las cuales se descartan las de chats inactivos
+MIN_BUCKETS_PURGA = 1024
+
+
+class TokenBucket:
+    """Cubeta de fichas para limitar la tasa de envío"""
+
+    __slots__ = ('rate', 'capacity', 'tokens', 'updated')
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+
+    def tiempo_espera(self, ahora: float) -> float:
+        """
+        Recarga la cubeta y calcula cuánto falta para tener una ficha
+
+        Args:
+            ahora: Tiempo actual (time.monotonic)
+
+        Returns:
+            float: Segundos de espera (0 si hay ficha disponible)
+        """
+        self.tokens = min(self.capacity, self.tokens + (ahora - self.updated) * self.rate)
+        self.updated = ahora
+
+        if self.tokens >= 1:
+            return 0.0
+        return (1 - self.tokens) / self.rate
+
+    def consumir(self):
+        """Consume una ficha"""
+        self.tokens -= 1
+
+    def llena(self, ahora: float) -> bool:
+        """Indica si la cubeta ya recuperó todas sus fichas"""
+        return self.tokens + (ahora - self.updated) * self.rate >= self.capacity
+
+
+class _MensajePendiente:
+    """Mensaje en espera de envío"""
+
+    __slots__ = ('texto', 'parse_mode', 'reply_markup', 'future')
+
+    def __init__(self, texto: str, parse_mode: Optional[str], future: asyncio.Future,
+                 reply_markup: Any = None):
+        self.texto = texto
+        self.parse_mode = parse_mode
+        self.reply_markup = reply_markup
+        self.future = future
+
+
+class MessageService:
+    """Servicio para programar el envío de mensajes respetando los límites de Telegram"""
+
+    def __init__(self, global_rate: float = 30.0, chat_rate: float = 1.0,
+                 chat_burst: int = 3, max_retries: int = 5):
+        self.global_bucket = TokenBucket(global_rate, global_rate)
+        self.chat_rate = chat_rate
+        self.chat_burst = chat_burst
+        self.max_retries = max_retries
+
+        self._colas: Dict[int, Deque[_MensajePendiente]] = {}
+        self._buckets: Dict[int, TokenBucket] = {}
+        self._tareas: Dict[int, asyncio.Task] = {}
+        self._pausa_hasta = 0.0
+        self._limite_purga = MIN_BUCKETS_PURGA
+
+        self.metricas = {
+            'encolados': 0,
+            'enviados': 0,
+            'agrupados': 0,
+            'limitados': 0,
+            'reintentos': 0,
+            'fallidos': 0
+        }
+
+    def enviar(self, bot: Any, chat_id: int, texto: str, parse_mode: Optional[str] = None,
+               reply_markup: Any = None) -> asyncio.Future:
+        """
+        Encola un mensaje para el chat indicado
+
+        No espera el envío: los mensajes encolados uno tras otro para el mismo
+        chat se agrupan en uno solo cuando comparten parse_mode, caben en un
+        mensaje de Telegram y a lo sumo uno lleva teclado.
+
+        Args:
+            bot: Instancia del bot de Telegram
+            chat_id: ID del chat destino
+            texto: Texto del mensaje
+            parse_mode: Modo de formato (None, 'Markdown', 'MarkdownV2')
+            reply_markup: Teclado del mensaje (p. ej. ReplyKeyboardMarkup), opcional
+
+        Returns:
+            asyncio.Future: Se resuelve con True al enviarse o False si falló
+        """
+        future = asyncio.get_running_loop().create_future()
+
+        cola = self._colas.get(chat_id)
+        if cola is None:
+            cola = self._colas[chat_id] = deque()
+        cola.append(_MensajePendiente(texto, parse_mode, future, reply_markup))
+        self.metricas['encolados'] += 1
+
+        if chat_id not in self._tareas:
+            self._tareas[chat_id] = asyncio.create_task(self._vaciar_chat(bot, chat_id))
+
+        return future
+
+    def responder(self, update: Any, context: Any, texto: str, parse_mode: Optional[str] = None,
+                  reply_markup: Any = None) -> asyncio.Future:
+        """
+        Encola una respuesta al chat de la actualización
+
+        Args:
+            update: Actualización de Telegram
+            context: Contexto del handler
+            texto: Texto de la respuesta
+            parse_mode: Modo de formato
+            reply_markup: Teclado de la respuesta (opcional)
+
+        Returns:
+            asyncio.Future: Resultado del envío
+        """
+        return self.enviar(context.bot, update.effective_chat.id, texto, parse_mode, reply_markup)
+
+    async def _esperar_turno(self, chat_id: int):
+        """
+        Espera hasta tener ficha global y del chat
+        """
+        bucket_chat = self._buckets.get(chat_id)
+        if bucket_chat is None:
+            if len(self._buckets) >= self._limite_purga:
+                self._purgar_buckets()
+            bucket_chat = self._buckets[chat_id] = TokenBucket(self.chat_rate, self.chat_burst)
+
+        limitado = False
+        while True:
+            ahora = time.monotonic()
+            espera = max(
+                self._pausa_hasta - ahora,
+                self.global_bucket.tiempo_espera(ahora),
+                bucket_chat.tiempo_espera(ahora)
+            )
+            if espera <= 0:
+                break
+
+            limitado = True
+            await asyncio.sleep(espera)
+
+        if limitado:
+            self.metricas['limitados'] += 1
+
+        self.global_bucket.consumir()
+        bucket_chat.consumir()
+
+    def _tomar_lote(self, cola: Deque[_MensajePendiente]) -> List[_MensajePendiente]:
+        """
+        Toma el primer mensaje y los siguientes que se pueden agrupar con él
+        """
+        lote = [cola.popleft()]
+        longitud = len(lote[0].texto)
+        con_teclado = lote[0].reply_markup is not None
+
+        while cola:
+            siguiente = cola[0]
+            if siguiente.parse_mode != lote[0].parse_mode:
+                break
+            if longitud + 2 + len(siguiente.texto) > MAX_MESSAGE_LENGTH:
+                break
+            if con_teclado and siguiente.reply_markup is not None:
+                break
+
+            lote.append(cola.popleft())
+            longitud += 2 + len(siguiente.texto)
+            con_teclado = con_teclado or siguiente.reply_markup is not None
+
+        return lote
+
+    async def _vaciar_chat(self, bot: Any, chat_id: int):
+        """
+        Envía en orden los mensajes pendientes de un chat
+        """
+        cola = self._colas[chat_id]
+
+        try:
+            while cola:
+                await self._esperar_turno(chat_id)
+
+                # Tomar el lote después de esperar permite agrupar lo encolado mientras tanto
+                lote = self._tomar_lote(cola)
+                texto = '\n\n'.join(pendiente.texto for pendiente in lote)
+                teclado = next((pendiente.reply_markup for pendiente in lote if pendiente.reply_markup is not None), None)
+                enviado = await self._enviar_con_reintentos(bot, chat_id, texto, lote[0].parse_mode, teclado)
+
+                if enviado:
+                    self.metricas['enviados'] += 1
+                    self.metricas['agrupados'] += len(lote) - 1
+                else:
+                    self.metricas['fallidos'] += 1
+
+                for pendiente in lote:
+                    if not pendiente.future.done():
+                        pendiente.future.set_result(enviado)
+        finally:
+            del self._tareas[chat_id]
+            if not cola:
+                del self._colas[chat_id]
+                # Una cubeta llena equivale a no tenerla; si aún se está recargando
+                # se conserva y la descarta _purgar_buckets
+                bucket_chat = self._buckets.get(chat_id)
+                if bucket_chat is not None and bucket_chat.llena(time.monotonic()):
+                    del self._buckets[chat_id]
+
+    def _purgar_buckets(self):
+        """
+        Descarta las cubetas llenas de chats sin envíos pendientes
+
+        Se llama al crear una cubeta cuando hay _limite_purga o más; el límite
+        se duplica respecto de las que quedan, así que el costo por cubeta
+        creada es constante.
+        """
+        ahora = time.monotonic()
+        inactivos = [
+            chat_id for chat_id, bucket in self._buckets.items()
+            if chat_id not in self._tareas and bucket.llena(ahora)
+        ]
+        for chat_id in inactivos:
+            del self._buckets[chat_id]
+        self._limite_purga = max(MIN_BUCKETS_PURGA, 2 * len(self._buckets))
+        logger.debug(f"Descartadas {len(inactivos)} cubetas de chats inactivos")
+
+    async def vaciar(self, application: Any = None, timeout: float = 30.0):
+        """
+        Espera a que se envíen los mensajes pendientes (usable como post_stop)
+
+        enviar() no espera el envío, así que al apagar puede haber mensajes en
+        cola. Debe llamarse antes de Application.shutdown(), que cierra la
+        conexión del bot.
+
+        Args:
+            application: Aplicación que se detiene (no se usa)
+            timeout: Segundos máximos de espera; lo que quede se descarta
+        """
+        tareas = list(self._tareas.values())
+        if not tareas:
+            return
+
+        pendientes = sum(len(cola) for cola in self._colas.values())
+        logger.info(f"Enviando {pendientes} mensajes pendientes antes de apagar")
+        _, sin_terminar = await asyncio.wait(tareas, timeout=timeout)
+        if sin_terminar:
+            for tarea in sin_terminar:
+                tarea.cancel()
+            await asyncio.gather(*sin_terminar, return_exceptions=True)
+
+            descartados = 0
+            for cola in self._colas.values():
+                while cola:
+                    pendiente = cola.popleft()
+                    if not pendiente.future.done():
+                        pendiente.future.set_result(False)
+                    descartados += 1
+            self._colas.clear()
+            logger.warning(f"Se descartaron {descartados} mensajes pendientes al apagar")
+
+    async def _enviar_con_reintentos(self, bot: Any, chat_id: int, texto: str, parse_mode: Optional[str],
+                                     reply_markup: Any = None) -> bool:
+        """
+        Envía un mensaje atendiendo las respuestas 429 (RetryAfter) de Telegram
+        """
+        for intento in range(self.max_retries + 1):
+            try:
+                await bot.send_message(chat_id=chat_id, text=texto, parse_mode=parse_mode, reply_markup=reply_markup)
+                return True
+
+            except RetryAfter as e:
+                # El límite de Telegram aplica al bot completo: pausar todos los envíos
+                retry_after = float(e.retry_after)
+                self._pausa_hasta = max(self._pausa_hasta, time.monotonic() + retry_after)
+                self.metricas['reintentos'] += 1
+                logger.warning(f"Límite de Telegram alcanzado (chat {chat_id}), reintento en {retry_after}s")
+                await asyncio.sleep(retry_after)
+
+            except Exception as e:
+                logger.error(f"Error enviando mensaje al chat {chat_id}: {e}")
+                return False
+
+        logger.error(f"Mensaje al chat {chat_id} descartado tras {self.max_retries} reintentos")
+        return False
+
+    def obtener_metricas(self) -> Dict[str, int]:
+        """
+        Obtiene las métricas del servicio
+
+        Returns:
+            Dict con mensajes en cola, encolados, enviados, agrupados,
+            limitados, reintentos y fallidos
+        """
+        metricas = dict(self.metricas)
+        metricas['en_cola'] = sum(len(cola) for cola in self._colas.values())
+        return metricas
@@ -4,14 +4,31 @@ Servicio de gestión de fotografías para SIRIJ BOT
 """
 
 import os
+import time
 import logging
 from datetime import datetime
-from typing import Optional, Tuple
-from PIL import Image
+from typing import Any, Optional, Tuple, TYPE_CHECKING
 import hashlib
 
+from metrics import LATENCIA_FOTOS
+
+if TYPE_CHECKING:
+    from PIL import Image
+
 logger = logging.getLogger(__name__)
 
+_ETAPA_APERTURA = LATENCIA_FOTOS.etiquetas('apertura')
+_ETAPA_HASH = LATENCIA_FOTOS.etiquetas('hash')
+_ETAPA_OPTIMIZACION = LATENCIA_FOTOS.etiquetas('optimizacion')
+_ETAPA_ESCRITURA = LATENCIA_FOTOS.etiquetas('escritura')
+
+def _imagen():
+    """
+    Importa PIL.Image en el primer uso para que el arranque del bot no cargue PIL
+    """
+    from PIL import Image
+    return Image
+
 class PhotoService:
     """Servicio para manejar la subida y procesamiento de fotografías"""
     
@@ -46,6 +63,8 @@ class PhotoService:
                 return False, f"El archivo es muy grande. Máximo {self.max_size_bytes // (1024*1024)}MB", None
             
             # Verificar y procesar la imagen
+            inicio = time.perf_counter()
+            Image = _imagen()
             try:
                 with Image.open(file_path) as img:
                     # Verificar formato
@@ -54,7 +73,9 @@ class PhotoService:
                     
                     # Generar nombre único para el archivo
                     timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+                    inicio = self._fin_etapa(_ETAPA_APERTURA, inicio)
                     file_hash = self._generate_file_hash(file_path)
+                    inicio = self._fin_etapa(_ETAPA_HASH, inicio)
                     extension = img.format.lower()
                     if extension == 'jpeg':
                         extension = 'jpg'
@@ -70,7 +91,9 @@ class PhotoService:
                     
                     # Optimizar y guardar la imagen
                     optimized_img = self._optimize_image(img)
+                    inicio = self._fin_etapa(_ETAPA_OPTIMIZACION, inicio)
                     optimized_img.save(save_path, format=img.format, optimize=True, quality=85)
+                    self._fin_etapa(_ETAPA_ESCRITURA, inicio)
                     
                     logger.info(f"Foto guardada exitosamente: {save_path}")
                     return True, "Foto guardada exitosamente", save_path
@@ -83,6 +106,15 @@ class PhotoService:
             logger.error(f"Error guardando foto: {e}")
             return False, f"Error guardando la foto: {str(e)}", None
     
+    @staticmethod
+    def _fin_etapa(etapa: Any, inicio: float) -> float:
+        """
+        Registra la duración de una etapa del procesamiento y devuelve el inicio de la siguiente
+        """
+        ahora = time.perf_counter()
+        etapa.observar(ahora - inicio)
+        return ahora
+    
     def _generate_file_hash(self, file_path: str) -> str:
         """
         Genera un hash único para el archivo
@@ -99,7 +131,7 @@ class PhotoService:
                 hash_md5.update(chunk)
         return hash_md5.hexdigest()
     
-    def _optimize_image(self, img: Image.Image) -> Image.Image:
+    def _optimize_image(self, img: 'Image.Image') -> 'Image.Image':
         """
         Optimiza la imagen para reducir el tamaño
         
@@ -109,6 +141,8 @@ class PhotoService:
         Returns:
             Image.Image: Imagen optimizada
         """
+        Image = _imagen()
+        
         # Redimensionar si es muy grande
         max_dimension = 1920
         if max(img.size) > max_dimension:
@@ -166,7 +200,7 @@ class PhotoService:
             file_size = os.path.getsize(photo_path)
             file_stat = os.stat(photo_path)
             
-            with Image.open(photo_path) as img:
+            with _imagen().open(photo_path) as img:
                 return {
                     'path': photo_path,
                     'size_bytes': file_size,
@@ -208,7 +242,7 @@ class PhotoService:
             
             # Verificar que es una imagen válida
             try:
-                with Image.open(file_path) as img:
+                with _imagen().open(file_path) as img:
                     if img.format not in self.allowed_formats:
                         return False, f"Formato no permitido. Use: {', '.join(self.allowed_formats)}"
                     
@@ -224,21 +258,27 @@ class PhotoService:
         except Exception as e:
             return False, f"Error validando archivo: {str(e)}"
     
-    def cleanup_old_photos(self, days_old: int = 30) -> int:
+    def cleanup_old_photos(self, days_old: int = 30, time_budget_seconds: Optional[float] = None) -> int:
         """
         Limpia fotos antiguas del sistema
         
         Args:
             days_old: Días de antigüedad para considerar una foto como antigua
+            time_budget_seconds: Tiempo máximo de ejecución (None = sin límite)
             
         Returns:
             int: Número de fotos eliminadas
         """
         deleted_count = 0
         cutoff_time = datetime.now().timestamp() - (days_old * 24 * 60 * 60)
+        deadline = time.monotonic() + time_budget_seconds if time_budget_seconds is not None else None
         
         try:
             for root, dirs, files in os.walk(self.storage_path):
+                if deadline is not None and time.monotonic() >= deadline:
+                    logger.info("Limpieza de fotos interrumpida por presupuesto de tiempo")
+                    break
+                
                 for file in files:
                     file_path = os.path.join(root, file)
                     try:
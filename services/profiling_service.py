@@ -0,0 +1,290 @@
+# -*- coding: utf-8 -*-
+"""
+Servicio de perfilado de actualizaciones para SIRIJ BOT
+Perfila una fracción configurable de las actualizaciones y acumula sus pilas
+de llamadas en formato "collapsed stacks" (una línea por pila con los
+microsegundos que pasó en ella), listo para flamegraph.pl o speedscope.
+
+Cada pila empieza con el manejador, el estado de la conversación y la
+pregunta actual del usuario, así se separa el tiempo de PIL, SQLite, JSON o
+los validadores según el punto de la conversación. Solo se perfila mientras
+la corrutina de la actualización muestreada se ejecuta; el tiempo que pasa
+suspendida (red, límites de Telegram) se cuenta aparte
+en el marco [espera]. Con PROFILE_SAMPLE_RATE=0 los manejadores no se
+envuelven y el costo es nulo.
+"""
+
+import functools
+import logging
+import os
+import random
+import sys
+import time
+from collections import defaultdict
+from datetime import datetime
+from typing import Any, Callable, Dict, Generator, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+MARCO_ESPERA = '[espera]'
+
+Pila = Tuple[str, ...]
+
+
+def _nombre_codigo(codigo: Any, modulo: str) -> str:
+    # co_qualname existe desde Python 3.11
+    return f"{modulo}.{getattr(codigo, 'co_qualname', codigo.co_name)}"
+
+
+def _nombre_funcion_c(funcion: Any) -> str:
+    modulo = getattr(funcion, '__module__', None)
+    if modulo is None:
+        duenio = getattr(funcion, '__self__', None)
+        modulo = type(duenio).__module__ if duenio is not None else 'builtins'
+    return f"{modulo}.{getattr(funcion, '__qualname__', repr(funcion))}"
+
+
+class _PilaLlamadas:
+    """
+    Pila de llamadas de una actualización perfilada
+
+    Cada evento de sys.setprofile suma el tiempo transcurrido desde el evento
+    anterior a la pila actual (tiempo propio) y luego entra o sale de un marco.
+    """
+
+    __slots__ = ('raiz', 'pila', 'tiempos', 'ultimo', 'externo', '_nombres')
+
+    def __init__(self, raiz: Pila, tiempos: Dict[Pila, int], nombres: Dict[Any, str]):
+        self.raiz = raiz
+        self.pila: List[Pila] = [raiz]
+        self.tiempos = tiempos
+        self.ultimo = 0
+        # Marco que activa el perfilado: sus llamadas a C (send, throw,
+        # setprofile) no aparecen como marcos propios
+        self.externo = None
+        self._nombres = nombres
+
+    def evento(self, frame: Any, evento: str, arg: Any):
+        ahora = time.perf_counter_ns()
+        pila = self.pila
+        self.tiempos[pila[-1]] += ahora - self.ultimo
+
+        if evento == 'call':
+            codigo = frame.f_code
+            nombre = self._nombres.get(codigo)
+            if nombre is None:
+                nombre = self._nombres[codigo] = _nombre_codigo(codigo, frame.f_globals.get('__name__', '?'))
+            pila.append(pila[-1] + (nombre,))
+        elif evento == 'c_call':
+            pila.append(pila[-1] if frame is self.externo else pila[-1] + (_nombre_funcion_c(arg),))
+        elif len(pila) > 1:
+            # return, c_return, c_exception (también al suspenderse en un await)
+            pila.pop()
+
+        self.ultimo = time.perf_counter_ns()
+
+    def activar(self):
+        """
+        Activa el perfilado en el hilo actual (desactivar con sys.setprofile(None))
+        """
+        self.pila[1:] = []
+        self.externo = sys._getframe(1)
+        self.ultimo = time.perf_counter_ns()
+        sys.setprofile(self.evento)
+
+
+class _CorrutinaPerfilada:
+    """
+    Ejecuta una corrutina paso a paso con el perfilado activo solo dentro de cada paso
+
+    Así las actualizaciones de otros usuarios que avanzan mientras esta espera
+    no se mezclan en su perfil.
+    """
+
+    __slots__ = ('corrutina', 'llamadas', 'espera')
+
+    def __init__(self, corrutina: Any, llamadas: _PilaLlamadas, espera: Pila):
+        self.corrutina = corrutina
+        self.llamadas = llamadas
+        self.espera = espera
+
+    def __await__(self) -> Generator[Any, Any, Any]:
+        corrutina, llamadas = self.corrutina, self.llamadas
+        valor, excepcion = None, None
+        while True:
+            llamadas.activar()
+            try:
+                if excepcion is None:
+                    futuro = corrutina.send(valor)
+                else:
+                    futuro = corrutina.throw(excepcion)
+            except StopIteration as fin:
+                return fin.value
+            finally:
+                sys.setprofile(None)
+
+            suspendida = time.perf_counter_ns()
+            try:
+                valor, excepcion = (yield futuro), None
+            except BaseException as e:
+                valor, excepcion = None, e
+            llamadas.tiempos[self.espera] += time.perf_counter_ns() - suspendida
+
+
+class ProfilingService:
+    """
+    Perfila una fracción de las actualizaciones y escribe sus pilas acumuladas
+
+    Los perfiles se acumulan por hora (los archivos del arranque de turno
+    quedan separados del resto del día) y se escriben en
+    <directorio>/perfil-<AAAA-MM-DDTHH>-<proceso>.folded.
+    """
+
+    def __init__(self, sample_rate: float = 0.0, output_dir: str = './perfiles',
+                 flush_seconds: float = 60.0,
+                 contexto: Optional[Callable[[Any], Tuple[Optional[str], Optional[str]]]] = None,
+                 proceso: Optional[str] = None):
+        """
+        Args:
+            sample_rate: Fracción de actualizaciones perfiladas (0 = desactivado, 1 = todas)
+            output_dir: Directorio de los archivos .folded
+            flush_seconds: Segundos entre escrituras de los archivos
+            contexto: Función que recibe el Update y devuelve (estado, pregunta_actual)
+            proceso: Sufijo del archivo (por defecto el PID)
+        """
+        self.sample_rate = sample_rate
+        self.output_dir = output_dir
+        self.flush_seconds = flush_seconds
+        self.contexto = contexto
+        self.proceso = proceso or str(os.getpid())
+
+        # Hora (AAAA-MM-DDTHH) -> pila -> nanosegundos
+        self._ventanas: Dict[str, Dict[Pila, int]] = {}
+        self._nombres: Dict[Any, str] = {}
+        self.metricas = {'perfiladas': 0, 'errores_contexto': 0, 'archivos': 0}
+
+    @property
+    def activo(self) -> bool:
+        return self.sample_rate > 0
+
+    def perfilar(self, manejador: str) -> Callable:
+        """
+        Decorador que perfila una fracción de las llamadas a un manejador async
+
+        Si el perfilado está desactivado devuelve el manejador sin envolver.
+
+        Args:
+            manejador: Nombre del manejador en la raíz de la pila ('mensaje', 'foto'...)
+        """
+        def decorador(handler):
+            if not self.activo:
+                return handler
+
+            @functools.wraps(handler)
+            async def wrapper(update, context):
+                if random.random() >= self.sample_rate:
+                    return await handler(update, context)
+                return await self._ejecutar(manejador, update, handler(update, context))
+
+            return wrapper
+        return decorador
+
+    def _raiz(self, manejador: str, update: Any) -> Pila:
+        estado, pregunta = None, None
+        if self.contexto:
+            try:
+                estado, pregunta = self.contexto(update)
+            except Exception as e:
+                self.metricas['errores_contexto'] += 1
+                logger.debug(f"No se pudo obtener el estado para el perfil: {e}")
+        raiz = (manejador, f"estado={estado or 'sin_sesion'}")
+        return raiz + (f"pregunta={pregunta}",) if pregunta else raiz
+
+    async def _ejecutar(self, manejador: str, update: Any, corrutina: Any) -> Any:
+        hora = datetime.now().strftime('%Y-%m-%dT%H')
+        tiempos = self._ventanas.get(hora)
+        if tiempos is None:
+            tiempos = self._ventanas[hora] = defaultdict(int)
+
+        raiz = self._raiz(manejador, update)
+        self.metricas['perfiladas'] += 1
+        llamadas = _PilaLlamadas(raiz, tiempos, self._nombres)
+        return await _CorrutinaPerfilada(corrutina, llamadas, raiz + (MARCO_ESPERA,))
+
+    @staticmethod
+    def formatear(tiempos: Dict[Pila, int]) -> str:
+        """
+        Convierte las pilas acumuladas al formato collapsed stacks
+
+        Args:
+            tiempos: Nanosegundos por pila
+
+        Returns:
+            str: Una línea "marco;marco;marco microsegundos" por pila
+        """
+        lineas = []
+        for pila, nanosegundos in sorted(tiempos.items()):
+            microsegundos = nanosegundos // 1000
+            if microsegundos > 0:
+                lineas.append(f"{';'.join(marco.replace(';', ',') for marco in pila)} {microsegundos}")
+        return '\n'.join(lineas) + '\n' if lineas else ''
+
+    def escribir(self) -> List[str]:
+        """
+        Escribe los archivos .folded de las horas con perfiles
+
+        Las horas ya terminadas se escriben por última vez y se liberan.
+
+        Returns:
+            List[str]: Rutas escritas
+        """
+        if not self._ventanas:
+            return []
+
+        hora_actual = datetime.now().strftime('%Y-%m-%dT%H')
+        rutas = []
+        try:
+            os.makedirs(self.output_dir, exist_ok=True)
+            for hora in list(self._ventanas):
+                ruta = os.path.join(self.output_dir, f"perfil-{hora}-{self.proceso}.folded")
+                temporal = f"{ruta}.tmp"
+                with open(temporal, 'w', encoding='utf-8') as archivo:
+                    archivo.write(self.formatear(self._ventanas[hora]))
+                os.replace(temporal, ruta)
+                rutas.append(ruta)
+                if hora != hora_actual:
+                    del self._ventanas[hora]
+        except OSError as e:
+            logger.error(f"Error escribiendo perfiles en {self.output_dir}: {e}")
+
+        self.metricas['archivos'] += len(rutas)
+        return rutas
+
+    async def _escribir_periodico(self, context: Any = None):
+        self.escribir()
+
+    def registrar(self, job_queue: Any):
+        """
+        Programa la escritura periódica de los perfiles en la cola de trabajos
+
+        Args:
+            job_queue: JobQueue de python-telegram-bot (application.job_queue)
+        """
+        if not self.activo:
+            return
+
+        job_queue.run_repeating(
+            self._escribir_periodico,
+            interval=self.flush_seconds,
+            name='perfiles'
+        )
+        logger.info(
+            f"Perfilado activo: {self.sample_rate:.1%} de las actualizaciones, "
+            f"archivos en {self.output_dir} cada {self.flush_seconds:.0f} s"
+        )
+
+    def obtener_metricas(self) -> Dict[str, int]:
+        """
+        Obtiene las métricas acumuladas del perfilado
+        """
+        return {**self.metricas, 'pilas': sum(len(tiempos) for tiempos in self._ventanas.values())}
@@ -0,0 +1,121 @@
+# -*- coding: utf-8 -*-
+"""
+Servicio de réplica de lectura para SIRIJ BOT
+Las estadísticas, exportaciones y reportes leen de una réplica (DATABASE_REPLICA_URL)
+para que sus lecturas largas no compitan con las escrituras de las conversaciones.
+
+- SQLite: la réplica es una copia completa de la base hecha con la API de backup
+  en línea, renovada periódicamente en segundo plano.
+- PostgreSQL: la réplica es un servidor en streaming (hot standby) que el propio
+  PostgreSQL mantiene al día; aquí solo se informa su atraso.
+"""
+
+import asyncio
+import logging
+import time
+from datetime import datetime
+from typing import Any, Dict, Optional
+
+from database.backends import obtener_backend, obtener_backend_replica
+from database.models import obtener_antiguedad_replica
+
+logger = logging.getLogger(__name__)
+
+
+class ReplicaService:
+    """Servicio para mantener la réplica de lectura de las consultas analíticas"""
+
+    def __init__(self, refresh_seconds: int = 300):
+        self.refresh_seconds = refresh_seconds
+
+        self.ultima_actualizacion: Optional[Dict[str, Any]] = None
+        self.totales = {
+            'actualizaciones': 0,
+            'errores': 0
+        }
+
+    def requiere_copias(self) -> bool:
+        """
+        Indica si la réplica se mantiene con copias periódicas (principal y réplica SQLite)
+        """
+        replica = obtener_backend_replica()
+        return (
+            replica is not None
+            and replica.nombre == 'sqlite'
+            and obtener_backend().nombre == 'sqlite'
+        )
+
+    def registrar(self, job_queue: Any):
+        """
+        Programa la actualización de la réplica en la cola de trabajos de la aplicación
+
+        Args:
+            job_queue: JobQueue de python-telegram-bot (application.job_queue)
+        """
+        if obtener_backend_replica() is None:
+            return
+
+        if not self.requiere_copias():
+            logger.info("Réplica de lectura en streaming: las consultas analíticas leen del servidor réplica")
+            return
+
+        # La primera copia se hace al arrancar; hasta entonces se lee de la base principal
+        job_queue.run_repeating(
+            self.ejecutar,
+            interval=self.refresh_seconds,
+            first=0,
+            name='replica_lectura'
+        )
+        logger.info(f"Réplica de lectura programada cada {self.refresh_seconds} segundos")
+
+    async def ejecutar(self, context: Any = None):
+        """
+        Callback de la cola de trabajos: copia la base sin bloquear el event loop
+        """
+        await asyncio.get_running_loop().run_in_executor(None, self.actualizar)
+
+    def actualizar(self) -> Dict[str, Any]:
+        """
+        Copia la base principal sobre la réplica
+
+        Returns:
+            Dict con las métricas de la copia
+        """
+        inicio = time.monotonic()
+        metricas = {
+            'inicio': datetime.now().isoformat(),
+            'bytes': 0,
+            'duracion_segundos': 0.0,
+            'error': None
+        }
+
+        try:
+            metricas['bytes'] = obtener_backend().crear_replica(obtener_backend_replica().ruta)
+        except Exception as e:
+            logger.error(f"Error actualizando la réplica de lectura: {e}")
+            metricas['error'] = str(e)
+            self.totales['errores'] += 1
+
+        metricas['duracion_segundos'] = round(time.monotonic() - inicio, 3)
+        self.totales['actualizaciones'] += 1
+        self.ultima_actualizacion = metricas
+
+        if not metricas['error']:
+            logger.debug(
+                f"Réplica de lectura actualizada: {metricas['bytes'] / 1_000_000:.1f} MB "
+                f"en {metricas['duracion_segundos']}s"
+            )
+        return metricas
+
+    def obtener_metricas(self) -> Dict[str, Any]:
+        """
+        Obtiene las métricas acumuladas, la última copia y el atraso actual de la réplica
+
+        Returns:
+            Dict con 'totales', 'ultima_actualizacion' y 'antiguedad_segundos'
+        """
+        return {
+            'totales': dict(self.totales),
+            'ultima_actualizacion': self.ultima_actualizacion,
+            'antiguedad_segundos': obtener_antiguedad_replica()
+        }
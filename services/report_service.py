@@ -0,0 +1,368 @@
+# -*- coding: utf-8 -*-
+"""
+Servicio de generación de reportes para SIRIJ BOT
+Plantillas compiladas una sola vez y renderizadas en formato MarkdownV2 de Telegram
+"""
+
+import re
+import logging
+from functools import lru_cache
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from metrics import REGISTRO
+
+logger = logging.getLogger(__name__)
+
+# Caracteres reservados de MarkdownV2 (https://core.telegram.org/bots/api#markdownv2-style)
+# La barra invertida va primero para no escapar las que se agregan después
+_RESERVADOS_MARKDOWN_V2 = '\\_*[]()~`>#+-=|{}.!'
+
+_PATRON_CAMPO = re.compile(r'\{(\w+)\}')
+
+VALOR_VACIO = 'N/A'
+
+# Caché de valores cortos ya escapados (departamentos, supervisores, horas...)
+_CACHE_ESCAPE: Dict[str, str] = {}
+_MAX_CACHE_ESCAPE = 8192
+_MAX_LONGITUD_CACHEABLE = 64
+
+
+def escapar_markdown_v2(texto: Any) -> str:
+    """
+    Escapa un valor para insertarlo como texto literal en MarkdownV2
+
+    Args:
+        texto: Valor a escapar (se convierte a str)
+
+    Returns:
+        str: Texto escapado
+    """
+    if type(texto) is not str:
+        texto = str(texto)
+
+    escapado = _CACHE_ESCAPE.get(texto)
+    if escapado is not None:
+        return escapado
+
+    escapado = texto
+    for caracter in _RESERVADOS_MARKDOWN_V2:
+        if caracter in escapado:
+            escapado = escapado.replace(caracter, '\\' + caracter)
+
+    if len(texto) <= _MAX_LONGITUD_CACHEABLE:
+        if len(_CACHE_ESCAPE) >= _MAX_CACHE_ESCAPE:
+            _CACHE_ESCAPE.clear()
+        _CACHE_ESCAPE[texto] = escapado
+
+    return escapado
+
+
+class PlantillaReporte:
+    """
+    Plantilla compilada a partir de un texto con campos {nombre}
+
+    El texto de la plantilla ya está escrito en MarkdownV2 (el formato es
+    intencional); solo los valores se escapan. Al compilar, los campos se
+    sustituyen por índices posicionales, de modo que renderizar es extraer
+    la tupla plana de valores y un único str.format sin recorrer la plantilla.
+    """
+
+    def __init__(self, texto: str, secciones: Optional[Dict[str, 'SeccionBooleana']] = None):
+        self.texto = texto
+        self.secciones = secciones or {}
+
+        campos: Dict[str, int] = {}
+        partes: List[str] = []
+        ultimo = 0
+        for m in _PATRON_CAMPO.finditer(texto):
+            indice = campos.setdefault(m.group(1), len(campos))
+            partes.append(_duplicar_llaves(texto[ultimo:m.start()]))
+            partes.append('{%d}' % indice)
+            ultimo = m.end()
+        partes.append(_duplicar_llaves(texto[ultimo:]))
+
+        self.campos: Tuple[str, ...] = tuple(campos)
+        self._formato = ''.join(partes)
+        # (campo, fragmento de su sección booleana o None) en el orden de la plantilla
+        self._extractores: Tuple[Tuple[str, Any], ...] = tuple(
+            (campo, self.secciones[campo].fragmento if campo in self.secciones else None)
+            for campo in self.campos
+        )
+
+    def valores(self, datos: Dict[str, Any]) -> Tuple[str, ...]:
+        """
+        Extrae de un diccionario la tupla plana de valores en el orden de la plantilla
+
+        Los textos ya escapados salen de la caché; las secciones booleanas se
+        insertan como fragmentos cacheados.
+
+        Args:
+            datos: Diccionario con los valores
+
+        Returns:
+            Tuple con los valores escapados
+        """
+        obtener = datos.get
+        cache = _CACHE_ESCAPE
+        return tuple([
+            fragmento(datos) if fragmento is not None
+            else cache[valor] if type(valor := obtener(campo)) is str and valor in cache
+            else _valor_escapado(valor)
+            for campo, fragmento in self._extractores
+        ])
+
+    def renderizar(self, valores: Sequence[str]) -> str:
+        """
+        Renderiza la plantilla con valores ya escapados
+
+        Args:
+            valores: Tupla plana en el orden de self.campos
+
+        Returns:
+            str: Texto renderizado
+        """
+        return self._formato.format(*valores)
+
+    def renderizar_dict(self, datos: Dict[str, Any]) -> str:
+        """
+        Renderiza la plantilla a partir de un diccionario
+        """
+        return self._formato.format(*self.valores(datos))
+
+
+class SeccionBooleana:
+    """
+    Sección de preguntas Sí/No con fragmentos precalculados
+
+    El texto de la sección depende solo de la combinación de respuestas,
+    por lo que cada combinación se renderiza una sola vez y se reutiliza.
+    """
+
+    def __init__(self, titulo: str, preguntas: Sequence[Tuple[str, str]]):
+        self.titulo = titulo
+        self.preguntas: Tuple[Tuple[str, str], ...] = tuple(preguntas)
+        self.campos: Tuple[str, ...] = tuple(campo for campo, _ in preguntas)
+        self.etiquetas: Tuple[str, ...] = tuple(escapar_markdown_v2(etiqueta) for _, etiqueta in preguntas)
+        self._renderizar_cacheado = lru_cache(maxsize=None)(self._renderizar)
+
+    def valores(self, datos: Dict[str, Any]) -> Tuple[bool, ...]:
+        """
+        Extrae la tupla de respuestas de la sección
+        """
+        return tuple(map(bool, map(datos.get, self.campos)))
+
+    def _renderizar(self, respuestas: Tuple[bool, ...]) -> str:
+        lineas = [self.titulo]
+        for etiqueta, respuesta in zip(self.etiquetas, respuestas):
+            lineas.append(f"• {etiqueta}: {'✅ Sí' if respuesta else '❌ No'}")
+        return '\n'.join(lineas)
+
+    def renderizar(self, respuestas: Tuple[bool, ...]) -> str:
+        """
+        Renderiza la sección (desde la caché si la combinación ya se vio)
+
+        Args:
+            respuestas: Tupla de booleanos en el orden de self.campos
+
+        Returns:
+            str: Fragmento en MarkdownV2
+        """
+        return self._renderizar_cacheado(respuestas)
+
+    def fragmento(self, datos: Dict[str, Any]) -> str:
+        """
+        Renderiza la sección a partir de un diccionario
+        """
+        return self._renderizar_cacheado(tuple(map(bool, map(datos.get, self.campos))))
+
+    def contar_positivas(self, datos: Dict[str, Any]) -> int:
+        """
+        Cuenta las respuestas afirmativas de la sección
+        """
+        return sum(self.valores(datos))
+
+
+def _duplicar_llaves(texto: str) -> str:
+    """
+    Duplica las llaves literales para que str.format las conserve
+    """
+    return texto.replace('{', '{{').replace('}', '}}')
+
+
+def _valor_escapado(valor: Any) -> str:
+    """
+    Convierte y escapa un valor; los textos ya vistos salen directo de la caché
+    """
+    if type(valor) is str:
+        escapado = _CACHE_ESCAPE.get(valor)
+        if escapado is not None:
+            return escapado
+    return escapar_markdown_v2(_texto_valor(valor))
+
+
+def _texto_valor(valor: Any) -> str:
+    """
+    Convierte un valor de la base de datos o la sesión a texto para el reporte
+    """
+    if type(valor) is str:
+        return valor or VALOR_VACIO
+    if valor is None:
+        return VALOR_VACIO
+    if isinstance(valor, (list, tuple)):
+        return ', '.join(str(elemento) for elemento in valor) or VALOR_VACIO
+    if hasattr(valor, 'strftime') and hasattr(valor, 'year'):
+        return valor.strftime('%d/%m/%Y')
+    if hasattr(valor, 'strftime'):
+        return valor.strftime('%H:%M')
+    return str(valor)
+
+
+# Secciones del formulario (columnas de reuniones_inicio_jornada)
+SECCION_INICIO = SeccionBooleana('🚀 *SECCIÓN INICIO:*', (
+    ('saludo_inicio_jornada', 'Saludo inicio de jornada'),
+    ('enumero_personal', 'Enumeró personal participante'),
+    ('pregunto_estado_salud', 'Preguntó estado de salud'),
+    ('realizo_ejercicios', 'Realizó ejercicios'),
+    ('detecto_anomalias_salud', 'Detectó anomalías de salud'),
+    ('tomo_lista_asistencia', 'Tomó lista de asistencia'),
+))
+
+SECCION_INFORMACION = SeccionBooleana('📢 *SECCIÓN INFORMACIÓN:*', (
+    ('comento_trabajos_mantenimiento', 'Comentó trabajos de mantenimiento'),
+    ('comento_trabajos_operacion', 'Comentó trabajos de operación'),
+    ('comento_trabajos_alto_riesgo', 'Comentó trabajos con potencial de alto riesgo'),
+    ('comento_incidentes_accidentes', 'Comentó incidentes o accidentes'),
+))
+
+SECCION_SEGURIDAD = SeccionBooleana('🛡️ *SECCIÓN ACTIVIDADES DE SEGURIDAD:*', (
+    ('realizo_revision_espejo', 'Realizó revisión espejo'),
+    ('realizo_prediccion_peligro', 'Realizó predicción de peligro (APP)'),
+    ('dio_lectura_reglamento', 'Dio lectura al reglamento de seguridad e higiene'),
+    ('realizo_exposicion_sentir_peligro', 'Realizó exposición de sentir el peligro'),
+    ('actividades_posteriores', 'Actividades relevantes posteriores'),
+))
+
+SECCIONES_BOOLEANAS = (SECCION_INICIO, SECCION_INFORMACION, SECCION_SEGURIDAD)
+
+
+def _consultas_cache_secciones() -> Dict[Tuple[str, ...], float]:
+    informacion = [seccion._renderizar_cacheado.cache_info() for seccion in SECCIONES_BOOLEANAS]
+    return {
+        ('acierto',): sum(info.hits for info in informacion),
+        ('fallo',): sum(info.misses for info in informacion)
+    }
+
+
+# Se lee al exportar las métricas: no agrega costo al renderizar
+REGISTRO.calculada(
+    'sirij_cache_secciones_reporte_total', 'Consultas a la caché de secciones Sí/No de los reportes',
+    _consultas_cache_secciones, etiquetas=('resultado',), tipo='counter'
+)
+REGISTRO.calculada(
+    'sirij_cache_escape_entradas', 'Textos escapados en la caché de MarkdownV2',
+    lambda: {(): len(_CACHE_ESCAPE)}
+)
+
+PLANTILLA_REPORTE_REUNION = PlantillaReporte(
+    "📋 *REPORTE DE REUNIÓN DE INICIO DE JORNADA*\n"
+    "\n"
+    "🏢 *DATOS GENERALES:*\n"
+    "• ID: {id}\n"
+    "• Departamento: {departamento}\n"
+    "• Fecha: {fecha}\n"
+    "• Categoría máxima: {categoria_maxima}\n"
+    "• Supervisor: {nombre_supervisor}\n"
+    "• Hora inicio: {hora_inicio}\n"
+    "• Hora término: {hora_termino}\n"
+    "• Personal: {nombres_personal}\n"
+    "\n"
+    "{seccion_inicio}\n"
+    "\n"
+    "{seccion_informacion}\n"
+    "\n"
+    "{seccion_seguridad}\n"
+    "\n"
+    "📝 *INFORMACIÓN ADICIONAL:*\n"
+    "• Otra información: {otra_informacion}\n"
+    "• Actividades de seguridad: {descripcion_actividades_seguridad}\n"
+    "• Meta/Propósito de la jornada: {meta_proposito_jornada}\n"
+    "• Observaciones: {observaciones}\n"
+    "\n"
+    "📸 *EVIDENCIA:*\n"
+    "• Fotografía: {ruta_evidencia_fotografica}\n"
+    "• Fecha de registro: {fecha_registro}\n"
+    "• Usuario: {usuario_telegram_id}",
+    secciones={
+        'seccion_inicio': SECCION_INICIO,
+        'seccion_informacion': SECCION_INFORMACION,
+        'seccion_seguridad': SECCION_SEGURIDAD
+    }
+)
+
+PLANTILLA_RESUMEN_CONFIRMACION = PlantillaReporte(
+    "📋 *RESUMEN:*\n"
+    "• Departamento: {departamento}\n"
+    "• Fecha: {fecha}\n"
+    "• Supervisor: {nombre_supervisor}\n"
+    "• Personal: {nombres_personal}\n"
+    "• Horario: {hora_inicio} \\- {hora_termino}\n"
+    "• Evidencia fotográfica: ✅ Guardada"
+)
+
+PLANTILLA_RESUMEN_FINAL = PlantillaReporte(
+    "✅ *¡Reunión registrada exitosamente\\!*\n"
+    "\n"
+    "🆔 *ID de registro:* {reunion_id}\n"
+    "📅 *Fecha de registro:* {fecha_registro}\n"
+    "\n"
+    "¡Gracias por usar SIRIJ BOT\\! 🚀\n"
+    "\n"
+    "Usa /start cuando necesites registrar otra reunión\\."
+)
+
+PLANTILLA_REUNION_DUPLICADA = PlantillaReporte(
+    "⚠️ *Esta reunión ya estaba registrada*\n"
+    "\n"
+    "🆔 *ID de registro:* {reunion_id}\n"
+    "\n"
+    "No se guardó de nuevo\\. Usa /start cuando necesites registrar otra reunión\\."
+)
+
+PLANTILLA_ERROR_GUARDADO = PlantillaReporte(
+    "❌ *Error al guardar la reunión:*\n"
+    "{error}\n"
+    "\n"
+    "Por favor, contacta al administrador\\."
+)
+
+
+def renderizar_reporte_reunion(reunion: Dict[str, Any]) -> str:
+    """
+    Renderiza el reporte completo de una reunión en MarkdownV2
+
+    Args:
+        reunion: Fila de reuniones_inicio_jornada como diccionario
+
+    Returns:
+        str: Reporte en MarkdownV2
+    """
+    return PLANTILLA_REPORTE_REUNION.renderizar_dict(reunion)
+
+
+def renderizar_resumen_diario(reuniones: Iterable[Dict[str, Any]], titulo: Optional[str] = None) -> str:
+    """
+    Renderiza varias reuniones en un único resumen
+
+    Args:
+        reuniones: Reuniones a incluir
+        titulo: Título opcional del resumen (texto plano)
+
+    Returns:
+        str: Resumen en MarkdownV2
+    """
+    separador = '\n\n' + escapar_markdown_v2('────────────') + '\n\n'
+    partes: List[str] = []
+    if titulo:
+        partes.append('*' + escapar_markdown_v2(titulo) + '*')
+    partes.extend(map(PLANTILLA_REPORTE_REUNION.renderizar_dict, reuniones))
+    return separador.join(partes)
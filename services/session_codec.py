@@ -0,0 +1,504 @@
+# -*- coding: utf-8 -*-
+"""
+Codecs de la columna datos_sesion para SIRIJ BOT
+
+- binario: formato compatible con MessagePack con tipos de extensión para
+  date, time y datetime, precedido por una cabecera con la versión del
+  esquema. Las respuestas se guardan como mapa de índice de campo (orden de
+  CAMPOS en esa versión) a valor; las 15 respuestas Sí/No van juntas en un
+  campo de bits.
+- json: formato anterior, texto UTF-8.
+
+Las filas se leen con el codec que indique su contenido, por lo que cambiar
+SESSION_CODEC no invalida las sesiones abiertas: se reescriben con el codec
+configurado en su siguiente actualización.
+"""
+
+import json
+import struct
+from datetime import date, datetime, time
+from operator import attrgetter
+from typing import Any, Dict, Optional, Sequence, Tuple, Union
+
+from services.session_state import CAMPOS, CAMPOS_BOOLEANOS, Respuestas, Sesion
+
+# 0xC1 no es un prefijo válido en MessagePack ni en JSON
+MARCA_BINARIO = 0xC1
+VERSION_SESION = 1
+_CABECERA = struct.Struct('>BB')
+
+# Tipos de extensión (fixext 4/8)
+_EXT_FECHA = 1  # ordinal
+_EXT_HORA = 2  # segundos desde la medianoche (4 bytes) o microsegundos (8 bytes)
+_EXT_FECHA_HORA = 3  # microsegundos desde 0001-01-01, sin zona horaria
+
+_U16 = struct.Struct('>H')
+_U32 = struct.Struct('>I')
+_I32 = struct.Struct('>i')
+_I64 = struct.Struct('>q')
+_F64 = struct.Struct('>d')
+_EXT4 = struct.Struct('>BbI')
+_EXT8 = struct.Struct('>Bbq')
+
+_MICROSEGUNDOS_DIA = 86_400_000_000
+
+Datos = Union[bytes, bytearray, memoryview, str]
+
+
+def _escribir_longitud(salida: bytearray, longitud: int, fija: int, limite_fijo: int, etiquetas: Tuple[int, int, int]):
+    if longitud < limite_fijo:
+        salida.append(fija | longitud)
+    elif longitud < 0x100 and etiquetas[0]:
+        salida.append(etiquetas[0])
+        salida.append(longitud)
+    elif longitud < 0x10000:
+        salida.append(etiquetas[1])
+        salida += _U16.pack(longitud)
+    else:
+        salida.append(etiquetas[2])
+        salida += _U32.pack(longitud)
+
+
+def _escribir(valor: Any, salida: bytearray):
+    tipo = type(valor)
+    if tipo is str:
+        codificado = valor.encode('utf-8')
+        _escribir_longitud(salida, len(codificado), 0xA0, 32, (0xD9, 0xDA, 0xDB))
+        salida += codificado
+    elif tipo is bool:
+        salida.append(0xC3 if valor else 0xC2)
+    elif valor is None:
+        salida.append(0xC0)
+    elif tipo is int:
+        if 0 <= valor < 0x80:
+            salida.append(valor)
+        elif -32 <= valor < 0:
+            salida.append(valor & 0xFF)
+        elif -0x80000000 <= valor < 0x80000000:
+            salida.append(0xD2)
+            salida += _I32.pack(valor)
+        else:
+            salida.append(0xD3)
+            salida += _I64.pack(valor)
+    elif tipo is list or tipo is tuple:
+        _escribir_longitud(salida, len(valor), 0x90, 16, (0, 0xDC, 0xDD))
+        for elemento in valor:
+            _escribir(elemento, salida)
+    elif tipo is dict:
+        _escribir_longitud(salida, len(valor), 0x80, 16, (0, 0xDE, 0xDF))
+        for clave, elemento in valor.items():
+            _escribir(clave, salida)
+            _escribir(elemento, salida)
+    elif tipo is date:
+        salida += _EXT4.pack(0xD6, _EXT_FECHA, valor.toordinal())
+    elif tipo is time:
+        if valor.tzinfo is not None:
+            raise TypeError(f"Hora con zona horaria no soportada: {valor}")
+        segundos = valor.hour * 3600 + valor.minute * 60 + valor.second
+        if valor.microsecond:
+            salida += _EXT8.pack(0xD7, _EXT_HORA, segundos * 1_000_000 + valor.microsecond)
+        else:
+            salida += _EXT4.pack(0xD6, _EXT_HORA, segundos)
+    elif tipo is datetime:
+        if valor.tzinfo is not None:
+            raise TypeError(f"Fecha y hora con zona horaria no soportada: {valor}")
+        microsegundos = (
+            (valor.toordinal() * 86400 + valor.hour * 3600 + valor.minute * 60 + valor.second) * 1_000_000
+            + valor.microsecond
+        )
+        salida += _EXT8.pack(0xD7, _EXT_FECHA_HORA, microsegundos)
+    elif tipo is float:
+        salida.append(0xCB)
+        salida += _F64.pack(valor)
+    elif tipo is bytes:
+        _escribir_longitud(salida, len(valor), 0, 0, (0xC4, 0xC5, 0xC6))
+        salida += valor
+    else:
+        raise TypeError(f"Tipo no soportado por el codec binario: {tipo.__name__}")
+
+
+def _extension(tipo: int, valor: int) -> Any:
+    if tipo == _EXT_FECHA:
+        return date.fromordinal(valor)
+    if tipo == _EXT_HORA:
+        return time(valor // 3600, valor // 60 % 60, valor % 60)
+    raise ValueError(f"Tipo de extensión desconocido: {tipo}")
+
+
+def _extension8(tipo: int, valor: int) -> Any:
+    if tipo == _EXT_HORA:
+        segundos, micro = divmod(valor, 1_000_000)
+        return time(segundos // 3600, segundos // 60 % 60, segundos % 60, micro)
+    if tipo == _EXT_FECHA_HORA:
+        dias, micro = divmod(valor, _MICROSEGUNDOS_DIA)
+        segundos, micro = divmod(micro, 1_000_000)
+        return datetime.fromordinal(dias).replace(
+            hour=segundos // 3600, minute=segundos // 60 % 60, second=segundos % 60, microsecond=micro
+        )
+    raise ValueError(f"Tipo de extensión desconocido: {tipo}")
+
+
+def _longitud(datos: bytes, etiqueta: int, posicion: int) -> Tuple[int, int]:
+    """Longitud de str/bin/array/map con prefijo de 1, 2 o 4 bytes"""
+    if etiqueta in (0xD9, 0xC4):
+        return datos[posicion], posicion + 1
+    if etiqueta in (0xDA, 0xC5, 0xDC, 0xDE):
+        return _U16.unpack_from(datos, posicion)[0], posicion + 2
+    return _U32.unpack_from(datos, posicion)[0], posicion + 4
+
+
+def _leer(datos: bytes, posicion: int) -> Tuple[Any, int]:
+    """Decodifica el valor que empieza en `posicion`; devuelve (valor, posición siguiente)"""
+    etiqueta = datos[posicion]
+    posicion += 1
+    if etiqueta < 0x80:
+        return etiqueta, posicion
+    if 0xA0 <= etiqueta <= 0xBF:
+        fin = posicion + (etiqueta & 0x1F)
+        return datos[posicion:fin].decode('utf-8'), fin
+    if etiqueta == 0xC3:
+        return True, posicion
+    if etiqueta == 0xC2:
+        return False, posicion
+    if etiqueta == 0xC0:
+        return None, posicion
+    if etiqueta == 0xD6:
+        _, tipo, valor = _EXT4.unpack_from(datos, posicion - 1)
+        return _extension(tipo, valor), posicion + 5
+    if 0x90 <= etiqueta <= 0x9F or etiqueta in (0xDC, 0xDD):
+        if etiqueta <= 0x9F:
+            cantidad = etiqueta & 0x0F
+        else:
+            cantidad, posicion = _longitud(datos, etiqueta, posicion)
+        lista = []
+        for _ in range(cantidad):
+            valor, posicion = _leer(datos, posicion)
+            lista.append(valor)
+        return lista, posicion
+    if 0x80 <= etiqueta <= 0x8F or etiqueta in (0xDE, 0xDF):
+        if etiqueta <= 0x8F:
+            cantidad = etiqueta & 0x0F
+        else:
+            cantidad, posicion = _longitud(datos, etiqueta, posicion)
+        mapa = {}
+        for _ in range(cantidad):
+            clave, posicion = _leer(datos, posicion)
+            mapa[clave], posicion = _leer(datos, posicion)
+        return mapa, posicion
+    if etiqueta >= 0xE0:
+        return etiqueta - 0x100, posicion
+    if etiqueta in (0xD9, 0xDA, 0xDB):
+        longitud, posicion = _longitud(datos, etiqueta, posicion)
+        return datos[posicion:posicion + longitud].decode('utf-8'), posicion + longitud
+    if etiqueta == 0xD7:
+        _, tipo, valor = _EXT8.unpack_from(datos, posicion - 1)
+        return _extension8(tipo, valor), posicion + 9
+    if etiqueta == 0xD2:
+        return _I32.unpack_from(datos, posicion)[0], posicion + 4
+    if etiqueta == 0xD3:
+        return _I64.unpack_from(datos, posicion)[0], posicion + 8
+    if etiqueta == 0xCB:
+        return _F64.unpack_from(datos, posicion)[0], posicion + 8
+    if etiqueta in (0xC4, 0xC5, 0xC6):
+        longitud, posicion = _longitud(datos, etiqueta, posicion)
+        return bytes(datos[posicion:posicion + longitud]), posicion + longitud
+    raise ValueError(f"Etiqueta no soportada por el codec binario: 0x{etiqueta:02X}")
+
+
+def _saltar(datos: bytes, posicion: int) -> int:
+    """Posición siguiente al valor que empieza en `posicion`, sin decodificarlo"""
+    etiqueta = datos[posicion]
+    posicion += 1
+    if etiqueta < 0x80 or etiqueta >= 0xE0 or etiqueta in (0xC0, 0xC2, 0xC3):
+        return posicion
+    if 0xA0 <= etiqueta <= 0xBF:
+        return posicion + (etiqueta & 0x1F)
+    if etiqueta == 0xD6:
+        return posicion + 5
+    if etiqueta == 0xD7:
+        return posicion + 9
+    if etiqueta == 0xD2:
+        return posicion + 4
+    if etiqueta in (0xD3, 0xCB):
+        return posicion + 8
+    if etiqueta in (0xD9, 0xDA, 0xDB, 0xC4, 0xC5, 0xC6):
+        longitud, posicion = _longitud(datos, etiqueta, posicion)
+        return posicion + longitud
+    if 0x90 <= etiqueta <= 0x9F or etiqueta in (0xDC, 0xDD):
+        if etiqueta <= 0x9F:
+            elementos = etiqueta & 0x0F
+        else:
+            elementos, posicion = _longitud(datos, etiqueta, posicion)
+    elif 0x80 <= etiqueta <= 0x8F or etiqueta in (0xDE, 0xDF):
+        if etiqueta <= 0x8F:
+            elementos = (etiqueta & 0x0F) * 2
+        else:
+            elementos, posicion = _longitud(datos, etiqueta, posicion)
+            elementos *= 2
+    else:
+        raise ValueError(f"Etiqueta no soportada por el codec binario: 0x{etiqueta:02X}")
+    for _ in range(elementos):
+        posicion = _saltar(datos, posicion)
+    return posicion
+
+
+def _encabezado_mapa(datos: bytes, posicion: int) -> Tuple[int, int]:
+    etiqueta = datos[posicion]
+    if 0x80 <= etiqueta <= 0x8F:
+        return etiqueta & 0x0F, posicion + 1
+    if etiqueta in (0xDE, 0xDF):
+        return _longitud(datos, etiqueta, posicion + 1)
+    raise ValueError(f"Se esperaba un mapa y se encontró la etiqueta 0x{etiqueta:02X}")
+
+
+def codificar(valor: Any) -> bytes:
+    """Codifica un valor en formato binario (sin cabecera)"""
+    salida = bytearray()
+    _escribir(valor, salida)
+    return bytes(salida)
+
+
+def decodificar(datos: bytes) -> Any:
+    """Decodifica un valor escrito con codificar()"""
+    valor, _ = _leer(datos, 0)
+    return valor
+
+
+def _validar_cabecera(datos: bytes) -> int:
+    marca, version = _CABECERA.unpack_from(datos, 0)
+    if marca != MARCA_BINARIO:
+        raise ValueError("datos_sesion no está en formato binario")
+    if version != VERSION_SESION:
+        raise ValueError(f"Versión de esquema de sesión desconocida: {version}")
+    return _CABECERA.size
+
+
+def leer_campos(datos: bytes, claves: Sequence[str]) -> Dict[str, Any]:
+    """
+    Lee solo algunos campos de datos_sesion en formato binario
+
+    Recorre el mapa principal en orden, decodifica únicamente los valores de
+    `claves` (el resto se salta por su longitud) y se detiene al encontrarlas
+    todas.
+
+    Args:
+        datos: Contenido de datos_sesion
+        claves: Campos a leer (numero_pregunta, fotos, respuestas)
+
+    Returns:
+        Dict con los campos encontrados
+
+    Raises:
+        ValueError: Si los datos no están en formato binario o su versión es desconocida
+    """
+    datos = bytes(datos)
+    buscadas = set(claves)
+    encontrados: Dict[str, Any] = {}
+    cantidad, posicion = _encabezado_mapa(datos, _validar_cabecera(datos))
+    for _ in range(cantidad):
+        if not buscadas:
+            break
+        clave, posicion = _leer(datos, posicion)
+        if clave in buscadas:
+            encontrados[clave], posicion = _leer(datos, posicion)
+            buscadas.discard(clave)
+        else:
+            posicion = _saltar(datos, posicion)
+    return encontrados
+
+
+_VALORES_RESPUESTAS = attrgetter(*CAMPOS)
+_INDICES_BOOLEANOS = frozenset(CAMPOS.index(campo) for campo in CAMPOS_BOOLEANOS)
+_BIT_BOOLEANO = {CAMPOS.index(campo): 1 << i for i, campo in enumerate(CAMPOS_BOOLEANOS)}
+# Clave del campo de bits de las respuestas Sí/No (fuera del rango de índices de CAMPOS)
+_CLAVE_BOOLEANOS = 0x7F
+
+
+def _escribir_respuestas(respuestas: Respuestas, salida: bytearray):
+    """
+    Mapa de índice de campo a respuesta (índices < 128: un byte cada uno)
+
+    Las 15 respuestas Sí/No van juntas en una sola entrada _CLAVE_BOOLEANOS:
+    un entero con los bits de las respondidas en los 16 bits altos y los de
+    las respondidas con Sí en los 16 bajos (6 bytes en lugar de 2 por respuesta).
+    """
+    valores = _VALORES_RESPUESTAS(respuestas)
+    presentes = sies = 0
+    cantidad = 0
+    for indice, valor in enumerate(valores):
+        if valor is None:
+            continue
+        if indice in _INDICES_BOOLEANOS and type(valor) is bool:
+            bit = _BIT_BOOLEANO[indice]
+            presentes |= bit
+            if valor:
+                sies |= bit
+        else:
+            cantidad += 1
+
+    _escribir_longitud(salida, cantidad + (presentes != 0), 0x80, 16, (0, 0xDE, 0xDF))
+    if presentes:
+        salida.append(_CLAVE_BOOLEANOS)
+        salida.append(0xD2)
+        salida += _I32.pack(presentes << 16 | sies)
+    for indice, valor in enumerate(valores):
+        if valor is None or type(valor) is bool and indice in _INDICES_BOOLEANOS:
+            continue
+        salida.append(indice)
+        # Los textos cortos son casi todas las demás respuestas
+        if type(valor) is str:
+            codificado = valor.encode()
+            _escribir_longitud(salida, len(codificado), 0xA0, 32, (0xD9, 0xDA, 0xDB))
+            salida += codificado
+        else:
+            _escribir(valor, salida)
+
+
+def _respuestas_desde(datos: bytes, posicion: int) -> Respuestas:
+    respuestas = Respuestas()
+    cantidad, posicion = _encabezado_mapa(datos, posicion)
+    for _ in range(cantidad):
+        indice = datos[posicion]
+        etiqueta = datos[posicion + 1]
+        if indice == _CLAVE_BOOLEANOS:
+            bits, posicion = _leer(datos, posicion + 1)
+            presentes, sies = bits >> 16, bits & 0xFFFF
+            for campo_indice, bit in _BIT_BOOLEANO.items():
+                if presentes & bit:
+                    setattr(respuestas, CAMPOS[campo_indice], bool(sies & bit))
+            continue
+        # Sesiones escritas antes del campo de bits: una entrada por respuesta Sí/No
+        if etiqueta == 0xC3:
+            valor, posicion = True, posicion + 2
+        elif etiqueta == 0xC2:
+            valor, posicion = False, posicion + 2
+        elif 0xA0 <= etiqueta <= 0xBF:
+            posicion += 2
+            fin = posicion + (etiqueta & 0x1F)
+            valor, posicion = datos[posicion:fin].decode(), fin
+        else:
+            valor, posicion = _leer(datos, posicion + 1)
+        # Los valores ya tienen su tipo (date, time, list); no hace falta establecer()
+        setattr(respuestas, CAMPOS[indice], valor)
+    return respuestas
+
+
+# Cabecera, mapa de 3 entradas y claves ya codificadas
+_INICIO = _CABECERA.pack(MARCA_BINARIO, VERSION_SESION) + bytes((0x83,)) + codificar('numero_pregunta')
+_CLAVE_FOTOS = codificar('fotos')
+_CLAVE_RESPUESTAS = codificar('respuestas')
+
+
+class CodecSesion:
+    """
+    Formato de la columna datos_sesion (respuestas, fotos y numero_pregunta)
+    """
+
+    nombre = ''
+
+    def codificar(self, sesion: Sesion) -> bytes:
+        raise NotImplementedError
+
+    def cargar(self, sesion: Sesion, datos: bytes):
+        """Carga en la sesión los datos escritos por codificar()"""
+        raise NotImplementedError
+
+
+class CodecJSON(CodecSesion):
+    """
+    JSON en UTF-8, con fechas y horas en ISO
+    """
+
+    nombre = 'json'
+
+    def codificar(self, sesion: Sesion) -> bytes:
+        return json.dumps(sesion.datos_a_dict(), ensure_ascii=False).encode('utf-8')
+
+    def cargar(self, sesion: Sesion, datos: bytes):
+        sesion.cargar_datos(json.loads(datos))
+
+
+class CodecBinario(CodecSesion):
+    """
+    MessagePack con cabecera de versión; las respuestas se decodifican al usarlas
+
+    El mapa principal lleva numero_pregunta y fotos antes de las respuestas,
+    de modo que cargar una sesión solo decodifica los primeros bytes y las
+    respuestas quedan pendientes hasta el primer acceso a sesion.respuestas.
+    """
+
+    nombre = 'binario'
+
+    def codificar(self, sesion: Sesion) -> bytes:
+        salida = bytearray(_INICIO)
+        _escribir(sesion.numero_pregunta, salida)
+        salida += _CLAVE_FOTOS
+        _escribir(sesion.fotos, salida)
+        salida += _CLAVE_RESPUESTAS
+        _escribir_respuestas(sesion.respuestas, salida)
+        return bytes(salida)
+
+    def cargar(self, sesion: Sesion, datos: bytes):
+        datos = bytes(datos)
+        if datos.startswith(_INICIO):
+            # Disposición que escribe codificar(): sin decodificar las claves
+            sesion.numero_pregunta, posicion = _leer(datos, len(_INICIO))
+            if datos.startswith(_CLAVE_FOTOS, posicion):
+                fotos, posicion = _leer(datos, posicion + len(_CLAVE_FOTOS))
+                if datos.startswith(_CLAVE_RESPUESTAS, posicion):
+                    sesion.fotos = [tuple(foto) for foto in fotos]
+                    inicio = posicion + len(_CLAVE_RESPUESTAS)
+                    sesion.diferir_respuestas(lambda: _respuestas_desde(datos, inicio))
+                    return
+
+        cantidad, posicion = _encabezado_mapa(datos, _validar_cabecera(datos))
+        sesion.numero_pregunta, sesion.fotos = 0, []
+        for indice in range(cantidad):
+            clave, posicion = _leer(datos, posicion)
+            if clave == 'respuestas':
+                sesion.diferir_respuestas(lambda inicio=posicion: _respuestas_desde(datos, inicio))
+                if indice == cantidad - 1:
+                    return
+                posicion = _saltar(datos, posicion)
+            elif clave == 'fotos':
+                fotos, posicion = _leer(datos, posicion)
+                sesion.fotos = [tuple(foto) for foto in fotos]
+            else:
+                valor, posicion = _leer(datos, posicion)
+                if clave == 'numero_pregunta':
+                    sesion.numero_pregunta = valor
+
+
+CODECS: Dict[str, CodecSesion] = {codec.nombre: codec for codec in (CodecBinario(), CodecJSON())}
+
+
+def obtener_codec(nombre: str) -> CodecSesion:
+    """
+    Obtiene un codec por nombre (SESSION_CODEC)
+
+    Raises:
+        ValueError: Si el codec no existe
+    """
+    try:
+        return CODECS[nombre]
+    except KeyError:
+        raise ValueError(f"SESSION_CODEC no soportado: {nombre} (opciones: {', '.join(CODECS)})") from None
+
+
+def codec_de(datos: bytes) -> CodecSesion:
+    """Codec con el que fue escrito un valor de datos_sesion"""
+    return CODECS['binario'] if datos[0] == MARCA_BINARIO else CODECS['json']
+
+
+def cargar_datos_sesion(sesion: Sesion, datos: Optional[Datos]):
+    """
+    Carga datos_sesion en la sesión con el codec con que se escribió
+
+    Args:
+        sesion: Sesión a completar
+        datos: Contenido de la columna (texto JSON, bytes o None)
+    """
+    if not datos:
+        return
+    datos = datos.encode('utf-8') if isinstance(datos, str) else bytes(datos)
+    codec_de(datos).cargar(sesion, datos)
@@ -3,26 +3,35 @@
 Servicio de gestión de sesiones temporales para SIRIJ BOT
 """
 
-import json
 import logging
-from datetime import datetime, timedelta
-from typing import Dict, Any, Optional
+from datetime import datetime
+from typing import Dict, Any, Optional, Tuple
 from database.models import (
     get_db_connection, 
     save_session, 
     get_session, 
     update_session, 
     delete_session,
-    clean_expired_sessions
+    clean_expired_sessions,
+    obtener_estados_sesiones
 )
+from services.session_codec import CodecSesion, cargar_datos_sesion, obtener_codec
+from services.session_state import Sesion
 
 logger = logging.getLogger(__name__)
 
 class SessionService:
     """Servicio para manejar sesiones temporales de usuarios"""
     
-    def __init__(self, session_timeout_minutes: int = 60):
+    def __init__(self, session_timeout_minutes: int = 60, codec: str = 'binario'):
+        """
+        Args:
+            session_timeout_minutes: Minutos de inactividad tras los que la sesión expira
+            codec: Formato con que se escribe datos_sesion ('binario' o 'json');
+                las sesiones se leen con el formato en que fueron escritas
+        """
         self.session_timeout = session_timeout_minutes
+        self.codec: CodecSesion = obtener_codec(codec)
     
     def create_session(self, user_id: str, chat_id: str) -> bool:
         """
@@ -36,25 +45,34 @@ class SessionService:
             bool: True si se creó exitosamente
         """
         try:
-            session_data = {
-                'current_question': 0,
-                'answers': {},
-                'photos': [],
-                'status': 'active',
-                'created_at': datetime.now().isoformat()
-            }
+            sesion = Sesion('', user_id, chat_id, 'activa')
             
             return save_session(
                 user_id=user_id,
                 chat_id=chat_id,
-                session_data=json.dumps(session_data, ensure_ascii=False)
+                session_data=self._serializar(sesion)
             )
             
         except Exception as e:
             logger.error(f"Error creando sesión para usuario {user_id}: {e}")
             return False
     
-    def get_session(self, user_id: str) -> Optional[Dict[str, Any]]:
+    def _serializar(self, sesion: Sesion) -> bytes:
+        return self.codec.codificar(sesion)
+    
+    @staticmethod
+    def _sesion_desde_fila(fila: Dict[str, Any]) -> Sesion:
+        """
+        Construye la sesión desde el resultado de database.models.get_session
+        """
+        sesion = Sesion(
+            fila['id'], fila['user_id'], fila['chat_id'], fila['estado'], fila['pregunta_actual'],
+            fecha_creacion=fila['created_at'], fecha_actualizacion=fila['updated_at']
+        )
+        cargar_datos_sesion(sesion, fila['session_data'])
+        return sesion
+    
+    def get_session(self, user_id: str) -> Optional[Sesion]:
         """
         Obtiene la sesión activa del usuario
         
@@ -62,54 +80,35 @@ class SessionService:
             user_id: ID del usuario
             
         Returns:
-            Dict con los datos de la sesión o None si no existe
+            Sesion o None si no existe
         """
         try:
-            session = get_session(user_id)
-            if not session:
-                return None
-            
-            # Verificar si la sesión ha expirado
-            created_at = datetime.fromisoformat(session['created_at'])
-            if datetime.now() - created_at > timedelta(minutes=self.session_timeout):
-                self.delete_session(user_id)
-                return None
-            
-            # Parsear los datos de la sesión
-            session_data = json.loads(session['session_data'])
-            session_data.update({
-                'user_id': session['user_id'],
-                'chat_id': session['chat_id'],
-                'created_at': session['created_at']
-            })
-            
-            return session_data
+            # Las sesiones expiradas se filtran en la consulta (índice de
+            # fecha_actualizacion) y las elimina el mantenimiento programado
+            fila = get_session(user_id, self.session_timeout)
+            return self._sesion_desde_fila(fila) if fila else None
             
         except Exception as e:
             logger.error(f"Error obteniendo sesión para usuario {user_id}: {e}")
             return None
     
-    def update_session(self, user_id: str, session_data: Dict[str, Any]) -> bool:
+    def update_session(self, user_id: str, sesion: Sesion) -> bool:
         """
-        Actualiza los datos de la sesión
+        Guarda los datos, el estado y la pregunta actual de la sesión
         
         Args:
             user_id: ID del usuario
-            session_data: Nuevos datos de la sesión
+            sesion: Sesión modificada
             
         Returns:
             bool: True si se actualizó exitosamente
         """
         try:
-            # Remover campos que no deben guardarse en session_data
-            clean_data = session_data.copy()
-            clean_data.pop('user_id', None)
-            clean_data.pop('chat_id', None)
-            clean_data.pop('created_at', None)
-            
             return update_session(
                 user_id=user_id,
-                session_data=json.dumps(clean_data, ensure_ascii=False)
+                session_data=self._serializar(sesion),
+                estado=sesion.estado,
+                pregunta_actual=sesion.pregunta_actual
             )
             
         except Exception as e:
@@ -145,12 +144,12 @@ class SessionService:
         Returns:
             bool: True si se agregó exitosamente
         """
-        session = self.get_session(user_id)
-        if not session:
+        sesion = self.get_session(user_id)
+        if not sesion:
             return False
         
-        session['answers'][question_key] = answer
-        return self.update_session(user_id, session)
+        sesion.respuestas.establecer(question_key, answer)
+        return self.update_session(user_id, sesion)
     
     def add_photo(self, user_id: str, photo_path: str) -> bool:
         """
@@ -163,19 +162,12 @@ class SessionService:
         Returns:
             bool: True si se agregó exitosamente
         """
-        session = self.get_session(user_id)
-        if not session:
+        sesion = self.get_session(user_id)
+        if not sesion:
             return False
         
-        if 'photos' not in session:
-            session['photos'] = []
-        
-        session['photos'].append({
-            'path': photo_path,
-            'uploaded_at': datetime.now().isoformat()
-        })
-        
-        return self.update_session(user_id, session)
+        sesion.fotos.append((photo_path, datetime.now().isoformat()))
+        return self.update_session(user_id, sesion)
     
     def advance_question(self, user_id: str) -> bool:
         """
@@ -187,12 +179,12 @@ class SessionService:
         Returns:
             bool: True si se avanzó exitosamente
         """
-        session = self.get_session(user_id)
-        if not session:
+        sesion = self.get_session(user_id)
+        if not sesion:
             return False
         
-        session['current_question'] += 1
-        return self.update_session(user_id, session)
+        sesion.numero_pregunta += 1
+        return self.update_session(user_id, sesion)
     
     def set_status(self, user_id: str, status: str) -> bool:
         """
@@ -205,26 +197,39 @@ class SessionService:
         Returns:
             bool: True si se estableció exitosamente
         """
-        session = self.get_session(user_id)
-        if not session:
+        sesion = self.get_session(user_id)
+        if not sesion:
             return False
         
-        session['status'] = status
-        return self.update_session(user_id, session)
+        sesion.estado = status
+        return self.update_session(user_id, sesion)
     
-    def clean_expired_sessions(self) -> int:
+    def clean_expired_sessions(self, tamano_lote: int = 500, presupuesto_segundos: Optional[float] = None) -> int:
         """
         Limpia las sesiones expiradas
         
+        Args:
+            tamano_lote: Sesiones eliminadas por transacción
+            presupuesto_segundos: Tiempo máximo de ejecución (None = sin límite)
+        
         Returns:
             int: Número de sesiones eliminadas
         """
         try:
-            return clean_expired_sessions(self.session_timeout)
+            return clean_expired_sessions(self.session_timeout, tamano_lote, presupuesto_segundos)
         except Exception as e:
             logger.error(f"Error limpiando sesiones expiradas: {e}")
             return 0
     
+    def obtener_estados_activos(self) -> Dict[int, Tuple[str, Optional[str]]]:
+        """
+        Obtiene el estado de conversación de todas las sesiones vigentes
+        
+        Returns:
+            Dict de user_id a (estado, pregunta_actual)
+        """
+        return obtener_estados_sesiones(self.session_timeout)
+    
     def get_session_summary(self, user_id: str) -> Optional[Dict[str, Any]]:
         """
         Obtiene un resumen de la sesión para confirmación
@@ -235,18 +240,137 @@ class SessionService:
         Returns:
             Dict con el resumen de la sesión
         """
-        session = self.get_session(user_id)
-        if not session:
+        sesion = self.get_session(user_id)
+        if not sesion:
+            return None
+        
+        return {
+            'total_questions': len(sesion.respuestas),
+            'total_photos': len(sesion.fotos),
+            'status': sesion.estado,
+            'created_at': sesion.fecha_creacion,
+            'answers': sesion.respuestas.a_dict(),
+            'photos': [ruta for ruta, _ in sesion.fotos]
+        }
+    
+    # Operaciones usadas por el flujo de conversación (ConversationManager)
+    
+    @staticmethod
+    def _usuario_de_sesion(sesion_id: str) -> int:
+        """
+        Obtiene el user_id a partir del ID de sesión ("<user_id>_<timestamp>")
+        """
+        return int(str(sesion_id).split('_', 1)[0])
+    
+    def obtener_sesion_activa(self, user_id: int) -> Optional[Sesion]:
+        """
+        Obtiene la sesión vigente del usuario para el flujo de conversación
+        
+        Args:
+            user_id: ID del usuario
+            
+        Returns:
+            Sesion o None
+        """
+        try:
+            fila = get_session(user_id, self.session_timeout)
+            return self._sesion_desde_fila(fila) if fila else None
+            
+        except Exception as e:
+            logger.error(f"Error obteniendo sesión activa de usuario {user_id}: {e}")
+            return None
+    
+    def crear_nueva_sesion(self, user_id: int) -> Optional[Sesion]:
+        """
+        Crea una sesión nueva (reemplaza la anterior) esperando la confirmación inicial
+        
+        Returns:
+            Sesion creada o None si hubo error
+        """
+        datos = self._serializar(Sesion('', user_id, user_id, 'esperando_confirmacion'))
+        if not save_session(user_id, user_id, datos, estado='esperando_confirmacion'):
             return None
+        return self.obtener_sesion_activa(user_id)
+    
+    def actualizar_estado_sesion(self, sesion_id: str, estado: str,
+                                 datos_extra: Optional[Dict[str, Any]] = None) -> bool:
+        """
+        Cambia el estado de la sesión y su pregunta actual
         
-        answers = session.get('answers', {})
-        photos = session.get('photos', [])
+        La pregunta actual queda en la de datos_extra; si no se indica se borra,
+        para que los estados sin pregunta pendiente (foto, confirmación final)
+        no conserven la última respondida.
+        
+        Args:
+            sesion_id: ID de la sesión
+            estado: Nuevo estado de la conversación
+            datos_extra: Campos adicionales (p. ej. {'pregunta_actual': ...})
+            
+        Returns:
+            bool: True si se actualizó exitosamente
+        """
+        user_id = self._usuario_de_sesion(sesion_id)
+        sesion = get_session(user_id)
+        if not sesion:
+            return False
+        
+        pregunta_actual = (datos_extra or {}).get('pregunta_actual')
+        return update_session(
+            user_id,
+            sesion['session_data'],
+            estado=estado,
+            pregunta_actual=pregunta_actual,
+            borrar_pregunta=pregunta_actual is None
+        )
+    
+    def guardar_respuesta(self, sesion_id: str, clave: str, valor: Any) -> bool:
+        """
+        Guarda la respuesta a una pregunta en la sesión
+        
+        Returns:
+            bool: True si se guardó exitosamente
+        """
+        try:
+            user_id = self._usuario_de_sesion(sesion_id)
+            fila = get_session(user_id)
+            if not fila:
+                return False
+            
+            sesion = self._sesion_desde_fila(fila)
+            sesion.respuestas.establecer(clave, valor)
+            return update_session(user_id, self._serializar(sesion))
+            
+        except Exception as e:
+            logger.error(f"Error guardando respuesta '{clave}' en sesión {sesion_id}: {e}")
+            return False
+    
+    def obtener_datos_sesion_completa(self, sesion_id: str) -> Dict[str, Any]:
+        """
+        Obtiene las respuestas de la sesión listas para guardar la reunión
+        
+        Returns:
+            Dict con las respuestas y el usuario de Telegram
+        """
+        user_id = self._usuario_de_sesion(sesion_id)
+        fila = get_session(user_id)
+        respuestas = self._sesion_desde_fila(fila).respuestas.a_dict() if fila else {}
         
         return {
-            'total_questions': len(answers),
-            'total_photos': len(photos),
-            'status': session.get('status', 'unknown'),
-            'created_at': session.get('created_at'),
-            'answers': answers,
-            'photos': [photo['path'] for photo in photos]
-        }
\ No newline at end of file
+            **respuestas,
+            'usuario_telegram_id': user_id
+        }
+    
+    def cancelar_sesion(self, user_id: int) -> Dict[str, Any]:
+        """
+        Cancela la sesión del usuario
+        
+        Returns:
+            Dict con 'exito' (False si no había sesión)
+        """
+        return {'exito': self.delete_session(user_id)}
+    
+    def finalizar_sesion(self, sesion_id: str) -> bool:
+        """
+        Elimina la sesión una vez guardada la reunión
+        """
+        return self.delete_session(self._usuario_de_sesion(sesion_id))
@@ -0,0 +1,210 @@
+# -*- coding: utf-8 -*-
+"""
+Estado de las sesiones de SIRIJ BOT
+Clases con __slots__ para la sesión y sus respuestas, y su conversión a un
+diccionario apto para JSON (los formatos de datos_sesion están en
+services/session_codec.py).
+"""
+
+from datetime import date, datetime, time
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+CAMPOS_HORA = ('hora_inicio', 'hora_termino')
+CAMPOS_BOOLEANOS = (
+    'saludo_inicio_jornada', 'enumero_personal', 'pregunto_estado_salud', 'realizo_ejercicios',
+    'detecto_anomalias_salud', 'tomo_lista_asistencia', 'comento_trabajos_mantenimiento',
+    'comento_trabajos_operacion', 'comento_trabajos_alto_riesgo', 'comento_incidentes_accidentes',
+    'realizo_revision_espejo', 'realizo_prediccion_peligro', 'dio_lectura_reglamento',
+    'realizo_exposicion_sentir_peligro', 'actividades_posteriores'
+)
+# Campos del formulario en el orden de la conversación; el formato binario de
+# datos_sesion identifica cada respuesta por su índice: agregar campos solo al final
+CAMPOS = (
+    'departamento', 'fecha', 'categoria_maxima', 'nombre_supervisor', 'nombres_personal',
+    'hora_inicio', 'hora_termino', *CAMPOS_BOOLEANOS[:10], 'otra_informacion',
+    *CAMPOS_BOOLEANOS[10:], 'descripcion_actividades_seguridad', 'meta_proposito_jornada',
+    'observaciones', 'ruta_evidencia_fotografica'
+)
+
+_CAMPOS = frozenset(CAMPOS)
+
+
+def _como_fecha(valor: Any) -> Any:
+    if isinstance(valor, str):
+        try:
+            return date.fromisoformat(valor)
+        except ValueError:
+            return valor
+    if isinstance(valor, datetime):
+        return valor.date()
+    return valor
+
+
+def _como_hora(valor: Any) -> Any:
+    if isinstance(valor, str):
+        try:
+            return time.fromisoformat(valor)
+        except ValueError:
+            return valor
+    return valor
+
+
+class Respuestas:
+    """
+    Respuestas del formulario, un atributo por pregunta (None = sin responder)
+
+    La fecha se guarda como date, las horas como time y la lista de personal
+    como lista de cadenas, igual que los devuelve el validador.
+    """
+
+    __slots__ = CAMPOS
+
+    def __init__(self, **valores: Any):
+        for campo in CAMPOS:
+            setattr(self, campo, None)
+        for campo, valor in valores.items():
+            self.establecer(campo, valor)
+
+    def establecer(self, campo: str, valor: Any):
+        """
+        Guarda la respuesta de un campo
+
+        Raises:
+            KeyError: Si el campo no es una pregunta del formulario
+        """
+        if campo not in _CAMPOS:
+            raise KeyError(campo)
+        if campo == 'fecha':
+            valor = _como_fecha(valor)
+        elif campo in CAMPOS_HORA:
+            valor = _como_hora(valor)
+        setattr(self, campo, valor)
+
+    def obtener(self, campo: str, defecto: Any = None) -> Any:
+        valor = getattr(self, campo, None)
+        return defecto if valor is None else valor
+
+    def __iter__(self) -> Iterator[Tuple[str, Any]]:
+        for campo in CAMPOS:
+            valor = getattr(self, campo)
+            if valor is not None:
+                yield campo, valor
+
+    def __len__(self) -> int:
+        return sum(1 for _ in self)
+
+    def __eq__(self, otra: object) -> bool:
+        return isinstance(otra, Respuestas) and all(
+            getattr(self, campo) == getattr(otra, campo) for campo in CAMPOS
+        )
+
+    def a_dict(self) -> Dict[str, Any]:
+        """
+        Respuestas contestadas con fechas y horas en ISO (apto para JSON y la base de datos)
+        """
+        return {
+            campo: valor.isoformat() if isinstance(valor, (date, time)) else valor
+            for campo, valor in self
+        }
+
+    @classmethod
+    def desde_dict(cls, datos: Dict[str, Any]) -> 'Respuestas':
+        """
+        Crea las respuestas desde un diccionario (ignora las claves que no son preguntas)
+        """
+        respuestas = cls()
+        for campo, valor in datos.items():
+            if campo in _CAMPOS:
+                respuestas.establecer(campo, valor)
+        return respuestas
+
+
+class Sesion:
+    """
+    Sesión temporal de un usuario: columnas de sesiones_temporales y datos de la conversación
+
+    Solo respuestas, fotos y numero_pregunta van en datos_sesion; el resto
+    son columnas propias de la tabla. Las respuestas pueden quedar pendientes
+    de decodificar (diferir_respuestas) hasta el primer acceso.
+    """
+
+    __slots__ = (
+        'sesion_id', 'user_id', 'chat_id', 'estado', 'pregunta_actual', '_respuestas', '_respuestas_diferidas',
+        'fotos', 'numero_pregunta', 'fecha_creacion', 'fecha_actualizacion'
+    )
+
+    def __init__(self, sesion_id: str, user_id: int, chat_id: int, estado: str,
+                 pregunta_actual: Optional[str] = None, respuestas: Optional[Respuestas] = None,
+                 fotos: Optional[List[Tuple[str, str]]] = None, numero_pregunta: int = 0,
+                 fecha_creacion: Optional[str] = None, fecha_actualizacion: Optional[str] = None):
+        """
+        Args:
+            sesion_id: ID de la sesión ("<user_id>_<timestamp>")
+            user_id: ID de Telegram del usuario
+            chat_id: ID del chat
+            estado: Estado de la conversación
+            pregunta_actual: Pregunta pendiente (si el estado es esperando_respuesta)
+            respuestas: Respuestas del formulario
+            fotos: Fotos subidas como (ruta, fecha ISO)
+            numero_pregunta: Preguntas avanzadas (API original de SessionService)
+            fecha_creacion: Timestamp de creación
+            fecha_actualizacion: Timestamp de la última actualización
+        """
+        self.sesion_id = sesion_id
+        self.user_id = user_id
+        self.chat_id = chat_id
+        self.estado = estado
+        self.pregunta_actual = pregunta_actual
+        self._respuestas = respuestas
+        # Sin respuestas, se crean vacías al primer acceso
+        self._respuestas_diferidas: Optional[Callable[[], Respuestas]] = Respuestas if respuestas is None else None
+        self.fotos = fotos if fotos is not None else []
+        self.numero_pregunta = numero_pregunta
+        self.fecha_creacion = fecha_creacion
+        self.fecha_actualizacion = fecha_actualizacion
+
+    @property
+    def respuestas(self) -> Respuestas:
+        if self._respuestas_diferidas is not None:
+            self._respuestas = self._respuestas_diferidas()
+            self._respuestas_diferidas = None
+        return self._respuestas
+
+    @respuestas.setter
+    def respuestas(self, respuestas: Respuestas):
+        self._respuestas = respuestas
+        self._respuestas_diferidas = None
+
+    def diferir_respuestas(self, decodificar: Callable[[], Respuestas]):
+        """
+        Deja las respuestas sin decodificar hasta que se lean
+
+        Args:
+            decodificar: Función que devuelve las respuestas
+        """
+        self._respuestas_diferidas = decodificar
+
+    def datos_a_dict(self) -> Dict[str, Any]:
+        """
+        Datos de la conversación para la columna datos_sesion (JSON)
+        """
+        datos: Dict[str, Any] = {'respuestas': self.respuestas.a_dict()}
+        if self.fotos:
+            datos['fotos'] = [list(foto) for foto in self.fotos]
+        if self.numero_pregunta:
+            datos['numero_pregunta'] = self.numero_pregunta
+        return datos
+
+    def cargar_datos(self, datos: Dict[str, Any]):
+        """
+        Carga datos_sesion desde JSON
+
+        Acepta también el formato anterior de la API original de SessionService
+        (answers, photos, current_question, status).
+        """
+        self.respuestas = Respuestas.desde_dict(datos.get('respuestas') or datos.get('answers') or {})
+        if 'fotos' in datos:
+            self.fotos = [tuple(foto) for foto in datos['fotos']]
+        else:
+            self.fotos = [(foto['path'], foto.get('uploaded_at', '')) for foto in datos.get('photos', [])]
+        self.numero_pregunta = datos.get('numero_pregunta', datos.get('current_question', 0))
@@ -0,0 +1,190 @@
+# -*- coding: utf-8 -*-
+"""
+Servicio de instantáneas de sesiones para SIRIJ BOT
+Guarda periódicamente y al apagar el bot el plazo de expiración de cada
+sesión abierta y los restaura al arrancar, volviendo a plantear a cada
+usuario la pregunta pendiente según la base
+"""
+
+import asyncio
+import logging
+import os
+import struct
+import time
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+MAGIA = b'SRJS'
+# Versión 2: sin tabla de cadenas ni estado por registro (se leen de la base)
+VERSION = 2
+
+# Cabecera: magia, versión, instante de creación, número de registros
+_CABECERA = struct.Struct('<4sHdI')
+# Registro: user_id, chat_id, vencimiento (epoch)
+_REGISTRO = struct.Struct('<qqd')
+
+
+class SessionSnapshotService:
+    """
+    Servicio para conservar las conversaciones en curso entre reinicios
+
+    El archivo es binario y compacto (24 bytes por sesión): solo guarda los
+    plazos. El estado y la pregunta pendiente se leen de la base al restaurar,
+    que es la fuente vigente tras una caída.
+
+    Además de al apagar, se reescribe cada SESSION_SNAPSHOT_INTERVAL_SECONDS
+    para que una caída pierda a lo sumo ese intervalo de plazos.
+    """
+
+    def __init__(self, expiry_service: Any, session_service: Any, conversation_manager: Any,
+                 message_service: Any):
+        self.expiry_service = expiry_service
+        self.session_service = session_service
+        self.conversation_manager = conversation_manager
+        self.message_service = message_service
+
+        self._reanudaciones: List[Tuple[int, str]] = []
+
+    def guardar(self, ruta: str, plazos: Optional[Iterable[Tuple[int, int, float]]] = None) -> int:
+        """
+        Escribe la instantánea de las sesiones abiertas
+
+        Args:
+            ruta: Ruta del archivo de instantánea
+            plazos: (user_id, chat_id, vencimiento) de las sesiones seguidas
+                (por defecto, los del servicio de expiración)
+
+        Returns:
+            int: Número de sesiones guardadas
+        """
+        try:
+            if plazos is None:
+                plazos = self.expiry_service.exportar_plazos()
+            registros = bytearray()
+            total = 0
+
+            for user_id, chat_id, vencimiento in plazos:
+                registros += _REGISTRO.pack(user_id, chat_id, vencimiento)
+                total += 1
+
+            contenido = bytearray(_CABECERA.pack(MAGIA, VERSION, time.time(), total))
+            contenido += registros
+
+            # Escritura atómica: nunca queda una instantánea a medias
+            temporal = f"{ruta}.tmp"
+            with open(temporal, 'wb') as archivo:
+                archivo.write(contenido)
+            os.replace(temporal, ruta)
+
+            logger.debug(f"Instantánea de {total} sesiones guardada en {ruta} ({len(contenido)} bytes)")
+            return total
+
+        except Exception as e:
+            logger.error(f"Error guardando instantánea de sesiones: {e}")
+            return 0
+
+    def restaurar(self, ruta: str, filtro: Optional[Callable[[int], bool]] = None) -> int:
+        """
+        Carga la instantánea y vuelve a seguir las sesiones que no han expirado
+
+        El archivo se elimina tras leerlo para que un arranque posterior a una
+        caída no restaure plazos obsoletos. Tras una caída la instantánea puede
+        tener hasta un intervalo de antigüedad: solo se restauran las sesiones
+        que siguen abiertas en la base y la pregunta se toma de la base.
+
+        Args:
+            ruta: Ruta del archivo de instantánea
+            filtro: Función que indica si un user_id pertenece a este proceso (opcional)
+
+        Returns:
+            int: Número de sesiones restauradas
+        """
+        if not os.path.exists(ruta):
+            return 0
+
+        try:
+            with open(ruta, 'rb') as archivo:
+                datos = archivo.read()
+            os.remove(ruta)
+
+            magia, version, creado, total_registros = _CABECERA.unpack_from(datos, 0)
+            if magia != MAGIA or version != VERSION:
+                logger.warning(f"Instantánea {ruta} con formato desconocido, se ignora")
+                return 0
+
+            posicion = _CABECERA.size
+            fin = posicion + total_registros * _REGISTRO.size
+            estados = self.session_service.obtener_estados_activos()
+            ahora = time.time()
+            textos: Dict[Tuple[str, Optional[str]], Optional[str]] = {}
+            restaurados = 0
+
+            for user_id, chat_id, vencimiento in _REGISTRO.iter_unpack(memoryview(datos)[posicion:fin]):
+                if filtro is not None and not filtro(user_id):
+                    continue
+                # Sesiones terminadas o canceladas después de la instantánea
+                estado = estados.get(user_id)
+                if estado is None:
+                    continue
+                if not self.expiry_service.restaurar_plazo(user_id, chat_id, vencimiento, ahora):
+                    continue
+
+                restaurados += 1
+                if estado not in textos:
+                    textos[estado] = self._texto_reanudacion(*estado)
+                if textos[estado]:
+                    self._reanudaciones.append((chat_id, textos[estado]))
+
+            logger.info(
+                f"Restauradas {restaurados} de {total_registros} sesiones de la instantánea "
+                f"del {time.strftime('%d/%m/%Y %H:%M', time.localtime(creado))}"
+            )
+            return restaurados
+
+        except Exception as e:
+            logger.error(f"Error restaurando instantánea de sesiones: {e}")
+            return 0
+
+    def _texto_reanudacion(self, estado: str, pregunta_actual: Optional[str]) -> Optional[str]:
+        texto = self.conversation_manager.texto_reanudacion(estado, pregunta_actual)
+        return Config.MESSAGES['session_restored'].format(pregunta=texto) if texto else None
+
+    def registrar(self, job_queue: Any, ruta: Optional[str] = None, intervalo_segundos: float = 0):
+        """
+        Programa el reenvío de la pregunta pendiente a los usuarios restaurados
+        y el guardado periódico de la instantánea
+
+        Args:
+            job_queue: JobQueue de python-telegram-bot (application.job_queue)
+            ruta: Ruta del archivo de instantánea
+            intervalo_segundos: Segundos entre guardados (0 = solo al apagar)
+        """
+        if self._reanudaciones:
+            job_queue.run_once(self.enviar_reanudaciones, when=0, name='reanudar_sesiones')
+
+        if ruta and intervalo_segundos > 0:
+            job_queue.run_repeating(
+                self.guardar_periodico, interval=intervalo_segundos, first=intervalo_segundos,
+                data=ruta, name='instantanea_sesiones'
+            )
+
+    async def guardar_periodico(self, context: Any):
+        """
+        Callback de la cola de trabajos: reescribe la instantánea sin bloquear el event loop
+        """
+        # Los plazos se copian en el event loop, que es quien modifica la rueda de expiración
+        plazos = list(self.expiry_service.exportar_plazos())
+        await asyncio.get_running_loop().run_in_executor(None, self.guardar, context.job.data, plazos)
+
+    async def enviar_reanudaciones(self, context: Any):
+        """
+        Callback de la cola de trabajos: vuelve a plantear la pregunta pendiente
+        """
+        reanudaciones, self._reanudaciones = self._reanudaciones, []
+        for chat_id, texto in reanudaciones:
+            self.message_service.enviar(context.bot, chat_id, texto)
+
+        logger.info(f"Pregunta pendiente reenviada a {len(reanudaciones)} usuarios")